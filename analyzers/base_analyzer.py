@@ -6,19 +6,49 @@ Facilita la extensión a nuevos tipos de activos (crypto, commodities, etc.).
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+
+def default_confidence_factors() -> Dict[str, float]:
+    """Factores de confianza de partida de un análisis."""
+    return {
+        "completeness": 1.0,  # Completitud de datos (0-1)
+        "dispersion": 1.0,    # Concordancia entre fuentes (0-1)
+        "freshness": 1.0      # Frescura de datos (0-1) - futuro
+    }
+
+
+@dataclass
+class AnalysisContext:
+    """
+    Estado de una sola invocación del análisis.
+
+    Los analizadores son singletons compartidos entre hilos: todo lo que un
+    análisis escribe (factores de confianza, contadores de normalización de
+    períodos y de uso de benchmarks sectoriales) vive aquí y no en la
+    instancia. Los contadores se vuelcan a los agregados compartidos al
+    terminar el análisis. ``benchmarks`` fija el set de benchmarks sectoriales
+    de toda la invocación aunque se recargue a mitad.
+    """
+
+    confidence_factors: Dict[str, float] = field(default_factory=default_confidence_factors)
+    normalization_stats: Optional[Dict[str, Any]] = None
+    sector_stats: Optional[Dict[str, Any]] = None
+    benchmarks: Optional[Any] = None
 
 
 class BaseAnalyzer(ABC):
-    """Clase abstracta base para analizadores de activos financieros."""
-    
-    def __init__(self):
-        """Inicializa factores de confianza."""
-        self.confidence_factors = {
-            "completeness": 1.0,  # Completitud de datos (0-1)
-            "dispersion": 1.0,    # Concordancia entre fuentes (0-1)
-            "freshness": 1.0      # Frescura de datos (0-1) - futuro
-        }
+    """
+    Clase abstracta base para analizadores de activos financieros.
+
+    Las subclases no deben guardar estado por llamada en la instancia; se
+    pasa un ``AnalysisContext`` (ver ``new_context``).
+    """
+
+    def new_context(self) -> AnalysisContext:
+        """Contexto vacío para una invocación del análisis."""
+        return AnalysisContext()
 
     @abstractmethod
     def analyze(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
@@ -56,13 +86,19 @@ class BaseAnalyzer(ABC):
         """
         return all(metrics.get(field) is not None for field in required_fields)
 
-    def get_data_completeness(self, metrics: Dict[str, Any], critical_fields: list) -> float:
+    def get_data_completeness(
+        self,
+        metrics: Dict[str, Any],
+        critical_fields: list,
+        context: Optional[AnalysisContext] = None
+    ) -> float:
         """
         Calcula el porcentaje de completitud de datos.
 
         Args:
             metrics: Diccionario de métricas
             critical_fields: Lista de campos críticos
+            context: Contexto de la invocación donde anotar el factor de confianza
 
         Returns:
             Porcentaje de completitud (0-100)
@@ -74,26 +110,29 @@ class BaseAnalyzer(ABC):
         completeness_pct = (present / len(critical_fields)) * 100
         
         # Actualizar factor de confidence
-        self.confidence_factors["completeness"] = completeness_pct / 100.0
+        if context is not None:
+            context.confidence_factors["completeness"] = completeness_pct / 100.0
         
         return completeness_pct
     
-    def calculate_dispersion_confidence(self, metrics: Dict[str, Any]) -> float:
+    def calculate_dispersion_confidence(
+        self,
+        metrics: Dict[str, Any],
+        context: Optional[AnalysisContext] = None
+    ) -> float:
         """
         Calcula factor de confianza basado en dispersión entre fuentes.
         
         Args:
             metrics: Diccionario con campo "dispersion" (si existe)
+            context: Contexto de la invocación donde anotar el factor de confianza
         
         Returns:
             Factor de confianza promedio (0-1) basado en dispersión
         """
-        dispersion_data = metrics.get("dispersion", {})
-        
-        if not dispersion_data:
-            # Sin datos de dispersión, asumir confianza completa
-            self.confidence_factors["dispersion"] = 1.0
-            return 1.0
+        dispersion_data = metrics.get("dispersion") or {}
+        # Sin datos de dispersión válidos, asumir confianza completa
+        dispersion = 1.0
         
         # Calcular promedio de confidence_adj de todas las métricas
         confidence_values = []
@@ -102,21 +141,23 @@ class BaseAnalyzer(ABC):
                 confidence_values.append(disp_info["confidence_adj"])
         
         if confidence_values:
-            avg_confidence = sum(confidence_values) / len(confidence_values)
-            self.confidence_factors["dispersion"] = avg_confidence
-            return avg_confidence
+            dispersion = sum(confidence_values) / len(confidence_values)
         
-        # Sin datos válidos, asumir confianza completa
-        self.confidence_factors["dispersion"] = 1.0
-        return 1.0
+        if context is not None:
+            context.confidence_factors["dispersion"] = dispersion
+        return dispersion
     
-    def get_overall_confidence(self) -> float:
+    def get_overall_confidence(self, context: AnalysisContext) -> float:
         """
         Calcula score de confianza general combinando todos los factores.
         
+        Args:
+            context: Contexto de la invocación con los factores calculados
+        
         Returns:
             Score de confianza (0-100)
         """
         # Promedio de todos los factores
-        avg_confidence = sum(self.confidence_factors.values()) / len(self.confidence_factors)
+        factors = context.confidence_factors
+        avg_confidence = sum(factors.values()) / len(factors)
         return avg_confidence * 100
@@ -12,18 +12,102 @@ Migrado desde scoring_engine.py para arquitectura modular.
 
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, List, Optional
-
-from .base_analyzer import BaseAnalyzer
-from .sector_benchmarks import SectorNormalizer, SECTOR_BENCHMARKS
-from metric_normalizer import MetricNormalizer
+import hashlib
+import json
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .base_analyzer import AnalysisContext, BaseAnalyzer
+from .scoring_tables import SCORE_LABELS, SCORE_TABLES, SCORING_RULES
+from .sector_benchmarks import SectorNormalizer, empty_sector_stats, industry_key, primary_sector
+from metric_normalizer import PERIOD_HIERARCHY, MetricNormalizer, empty_normalization_stats
+
+# Subir al cambiar la lógica de scoring (casos de inversión, categorías, normalización).
+# Pesos, tablas de umbrales y benchmarks ya forman parte de engine_version().
+SCORING_ENGINE_VERSION = 1
+
+# Métricas críticas que requieren normalización de período
+NORMALIZED_METRICS = (
+    # Calidad
+    "roe",
+    "roic",
+    "roa",
+    "operating_margin",
+    "net_margin",
+    "gross_margin",
+
+    # Crecimiento
+    "revenue_growth",
+    "earnings_growth",
+    "revenue_growth_qoq",
+    "earnings_growth_qoq",
+    "earnings_growth_this_y",
+    "earnings_growth_next_y",
+    "earnings_growth_next_5y",
+    "revenue_growth_5y",
+
+    # Valoración (generalmente usan TTM)
+    "pe_ratio",
+    "peg_ratio",
+    "price_to_book",
+    "price_to_sales",
+    "ev_to_ebitda",
+
+    # Salud financiera
+    "debt_to_equity",
+    "current_ratio",
+    "quick_ratio",
+)
+
+# Orden de preferencia de _calculate_growth (compartido con score_batch)
+REVENUE_GROWTH_KEYS = ("revenue_growth_5y", "revenue_growth", "revenue_growth_qoq")
+EARNINGS_GROWTH_KEYS = (
+    "earnings_growth_this_y",
+    "earnings_growth_next_y",
+    "earnings_growth_next_5y",
+    "earnings_growth_qoq",
+    "earnings_growth",
+)
+
+# (etiqueta, clave de métrica) de los componentes de calidad, en orden de suma
+QUALITY_COMPONENTS = (
+    ("ROE", "roe"),
+    ("ROIC", "roic"),
+    ("Op. Margin", "operating_margin"),
+    ("Net Margin", "net_margin"),
+)
+
+
+# Campos de métricas que leen los scores (con sus variantes por período):
+# un cambio fuera de estos no cambia el resultado
+SCORING_INPUT_FIELDS = tuple(sorted(
+    {f"{name}_{period.lower()}" for name in NORMALIZED_METRICS for period in PERIOD_HIERARCHY}
+    | set(NORMALIZED_METRICS)
+    | {"ev_to_ebit", "fcf_yield", "net_debt_to_ebitda", "interest_coverage", "sector", "industry"}
+))
+# Campos que además lee calculate_all_scores para completitud, confianza y dispersión
+RESULT_INPUT_FIELDS = SCORING_INPUT_FIELDS + ("currency", "data_completeness", "dispersion", "primary_source")
+
+# Tablas de umbrales: fijas por proceso, se resumen una vez
+_STATIC_FINGERPRINT = hashlib.sha1(json.dumps({"rules": SCORING_RULES}, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """``round(x, 2)`` elemento a elemento (np.round difiere del builtin en algunos empates)."""
+    return np.fromiter((round(value, 2) for value in values.tolist()), dtype=float, count=len(values))
 
 
 class EquityAnalyzer(BaseAnalyzer):
-    """Analizador especializado para acciones (EQUITY)."""
+    """
+    Analizador especializado para acciones (EQUITY).
+
+    Una instancia puede compartirse entre hilos: la configuración (pesos,
+    flag sector-relativo) es de solo lectura durante el análisis y el estado
+    de cada llamada vive en su ``AnalysisContext``.
+    """
 
     def __init__(self):
-        # Inicializar BaseAnalyzer (confidence_factors)
         super().__init__()
         
         # Inicializar MetricNormalizer para normalización de períodos
@@ -32,6 +116,8 @@ class EquityAnalyzer(BaseAnalyzer):
         # Inicializar SectorNormalizer para scores sector-relativos (Mejora #4)
         self.sector_normalizer = SectorNormalizer()
         self.use_sector_relative = True  # Flag para activar/desactivar normalización sectorial
+        # (configuración, versión) de la última llamada a engine_version()
+        self._engine_version: Optional[Tuple[tuple, str]] = None
         
         # Pesos para sub-scores
         self.quality_weights = {
@@ -58,10 +144,70 @@ class EquityAnalyzer(BaseAnalyzer):
             "earnings_growth": 0.40,
         }
 
+    def engine_version(self) -> str:
+        """
+        Versión del motor de scoring: ``SCORING_ENGINE_VERSION`` + huella de la configuración.
+
+        La huella cubre pesos, ``use_sector_relative``, tablas de umbrales y
+        la versión del set de benchmarks sectoriales activo, de modo que
+        cualquier cambio de configuración (o recarga de benchmarks) marca como
+        desactualizados los scores guardados. Se recalcula solo cuando cambian
+        pesos, flag o benchmarks (las tablas son fijas por proceso).
+        """
+        config = (
+            tuple(self.quality_weights.items()),
+            tuple(self.valuation_weights.items()),
+            tuple(self.health_weights.items()),
+            tuple(self.growth_weights.items()),
+            self.use_sector_relative,
+            self.sector_normalizer.benchmark_set.version,
+        )
+        cached = self._engine_version
+        if cached is not None and cached[0] == config:
+            return cached[1]
+        payload = {
+            "weights": [self.quality_weights, self.valuation_weights, self.health_weights, self.growth_weights],
+            "use_sector_relative": self.use_sector_relative,
+            "static": _STATIC_FINGERPRINT,
+            "benchmarks": config[-1],
+        }
+        digest = hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+        version = f"{SCORING_ENGINE_VERSION}-{digest[:12]}"
+        self._engine_version = (config, version)
+        return version
+
+    @staticmethod
+    def scoring_inputs(metrics: Dict[str, Any], fields: Sequence[str] = SCORING_INPUT_FIELDS) -> Dict[str, Any]:
+        """Subconjunto de ``metrics`` que influye en los scores (sin valores None)."""
+        return {key: metrics[key] for key in fields if metrics.get(key) is not None}
+
+    @classmethod
+    def input_hash(cls, metrics: Dict[str, Any], fields: Sequence[str] = SCORING_INPUT_FIELDS) -> str:
+        """Hash estable de las entradas de scoring de ``metrics`` (o de ``fields``)."""
+        payload = json.dumps(cls.scoring_inputs(metrics, fields), sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def result_key(self, metrics: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Clave estable del resultado completo de ``calculate_all_scores``.
+
+        (versión del motor, hash de todos los campos que lee el análisis,
+        incluidos los de confianza y dispersión); apta para memoizar.
+        """
+        return self.engine_version(), self.input_hash(metrics, RESULT_INPUT_FIELDS)
+
     def get_asset_type(self) -> str:
         """Retorna tipo de activo que analiza."""
         return "EQUITY"
 
+    def new_context(self) -> AnalysisContext:
+        """Contexto de una invocación: contadores propios y el set de benchmarks activo."""
+        return AnalysisContext(
+            normalization_stats=empty_normalization_stats(),
+            sector_stats=empty_sector_stats(),
+            benchmarks=self.sector_normalizer.benchmark_set,
+        )
+
     def analyze(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
         """
         Análisis completo de acción individual.
@@ -83,17 +229,31 @@ class EquityAnalyzer(BaseAnalyzer):
                 return value
         return None
 
-    def calculate_all_scores(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+    def calculate_all_scores(
+        self,
+        metrics: Dict[str, Any],
+        context: Optional[AnalysisContext] = None
+    ) -> Dict[str, Any]:
         """
         Calcula todos los scores de la empresa.
 
+        Args:
+            metrics: Métricas financieras de la acción
+            context: Contexto de la invocación (por defecto uno nuevo). Al
+                terminar, sus contadores se suman a los de los normalizadores.
+
         Returns:
             Dict con quality_score, valuation_score, investment_score,
             recommendation, category, y breakdown completo
         """
+        if context is None:
+            context = self.new_context()
+        if context.benchmarks is None:
+            context.benchmarks = self.sector_normalizer.benchmark_set
+
         # 0. NORMALIZACIÓN DE MÉTRICAS (MEJORA #2)
         # Normalizar métricas a períodos estándar (TTM > MRQ > MRY > 5Y > FWD)
-        normalized_metrics = self._normalize_metrics(metrics)
+        normalized_metrics = self._normalize_metrics(metrics, context)
         
         # Usar métricas normalizadas para todos los cálculos
         working_metrics = {**metrics, **normalized_metrics}
@@ -101,13 +261,13 @@ class EquityAnalyzer(BaseAnalyzer):
         # 1. CALCULAR FACTORES DE CONFIANZA
         # Completeness (ya existente)
         critical_fields = ["pe_ratio", "roe", "roic", "operating_margin"]
-        data_completeness = self.get_data_completeness(working_metrics, critical_fields)
+        data_completeness = self.get_data_completeness(working_metrics, critical_fields, context)
         
         # Dispersion (NUEVO)
-        dispersion_confidence = self.calculate_dispersion_confidence(working_metrics)
+        dispersion_confidence = self.calculate_dispersion_confidence(working_metrics, context)
         
         # Overall confidence
-        overall_confidence = self.get_overall_confidence()
+        overall_confidence = self.get_overall_confidence(context)
         
         # 2. CALIDAD: ¿Qué tan buena es la empresa?
         # Mejora #4: Usar scores sector-relativos si hay información de sector
@@ -116,11 +276,11 @@ class EquityAnalyzer(BaseAnalyzer):
             self.use_sector_relative and 
             sector and 
             sector != "Unknown" and
-            self._extract_primary_sector(sector) in SECTOR_BENCHMARKS
+            context.benchmarks.has_sector(self._extract_primary_sector(sector))
         )
         
         if use_sector_scoring:
-            quality_result = self._calculate_quality_sector_relative(working_metrics, sector)
+            quality_result = self._calculate_quality_sector_relative(working_metrics, sector, context)
         else:
             quality_result = self._calculate_quality(working_metrics)
         
@@ -167,6 +327,8 @@ class EquityAnalyzer(BaseAnalyzer):
             category
         )
 
+        self._record_context(context)
+
         return {
             "quality_score": round(quality_score, 2),
             "valuation_score": round(valuation_score, 2),
@@ -184,15 +346,81 @@ class EquityAnalyzer(BaseAnalyzer):
             "data_completeness": round(data_completeness, 2),
             "confidence_level": self._confidence(working_metrics),
             "confidence_factors": {
-                "completeness": round(self.confidence_factors["completeness"] * 100, 2),
-                "dispersion": round(self.confidence_factors["dispersion"] * 100, 2),
+                "completeness": round(context.confidence_factors["completeness"] * 100, 2),
+                "dispersion": round(context.confidence_factors["dispersion"] * 100, 2),
                 "overall": round(overall_confidence, 2)
             },
             "dispersion_detail": working_metrics.get("dispersion", {}),  # Detalle técnico para debugging
             "normalization_metadata": normalized_metrics.get("_normalization_metadata", {})  # Metadata de normalización
         }
     
-    def _normalize_metrics(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+    def score_batch(
+        self,
+        table: Union[pd.DataFrame, Mapping[str, Any], Sequence[Dict[str, Any]]]
+    ) -> pd.DataFrame:
+        """
+        Calcula los scores de muchos tickers a la vez sobre columnas.
+
+        Pensado para re-puntuar todo el universo en cache (por ejemplo tras un
+        cambio de pesos). Reproduce ``calculate_all_scores`` -normalización de
+        períodos, calidad absoluta o sector-relativa, valoración y salud
+        TIER1/TIER2, crecimiento, inversión y categoría- con búsquedas de umbral
+        vectorizadas (``np.searchsorted`` sobre las mismas tablas de
+        ``scoring_tables``), y sus resultados son idénticos bit a bit a los del
+        camino escalar. No genera breakdown, recomendación ni factores
+        de confianza.
+
+        Args:
+            table: DataFrame con una fila por ticker y una columna por métrica,
+                dict ``columna -> array`` o lista de dicts de métricas.
+                NaN/None equivale a métrica ausente.
+
+        Returns:
+            DataFrame con el mismo índice y columnas quality_score,
+            valuation_score, financial_health_score, growth_score,
+            investment_score y category (nombre)
+        """
+        frame = table if isinstance(table, pd.DataFrame) else pd.DataFrame(table)
+        normalized = self.normalizer.normalize_columns(frame, NORMALIZED_METRICS)
+
+        def column(name: str) -> np.ndarray:
+            if name in normalized.columns:
+                return normalized[name].to_numpy()
+            if name in frame.columns:
+                return pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=float)
+            return np.full(len(frame), np.nan)
+
+        quality = self._batch_quality(frame, column)
+        valuation = self._batch_valuation(column)
+        health = self._batch_health(column)
+        growth = self._batch_growth(column)
+        investment = self._batch_investment(quality, valuation, health, growth)
+        category = self._batch_categorize(quality, valuation)
+
+        return pd.DataFrame(
+            {
+                "quality_score": _round2(quality),
+                "valuation_score": _round2(valuation),
+                "financial_health_score": _round2(health),
+                "growth_score": _round2(growth),
+                "investment_score": _round2(investment),
+                "category": category,
+            },
+            index=frame.index,
+        )
+
+    def _record_context(self, context: AnalysisContext) -> None:
+        """Suma los contadores de una invocación a los agregados de los normalizadores."""
+        if context.normalization_stats is not None:
+            self.normalizer.record_stats(context.normalization_stats)
+        if context.sector_stats is not None:
+            self.sector_normalizer.record_stats(context.sector_stats)
+
+    def _normalize_metrics(
+        self,
+        metrics: Dict[str, Any],
+        context: Optional[AnalysisContext] = None
+    ) -> Dict[str, Any]:
         """
         Normaliza métricas a período estándar (TTM > MRQ > MRY > 5Y > FWD).
         
@@ -200,6 +428,7 @@ class EquityAnalyzer(BaseAnalyzer):
         
         Args:
             metrics: Dict con métricas crudas (pueden tener sufijos _ttm, _mrq, etc.)
+            context: Contexto de la invocación donde contar los períodos usados
         
         Returns:
             Dict con métricas normalizadas + metadata:
@@ -211,44 +440,12 @@ class EquityAnalyzer(BaseAnalyzer):
                     "_normalization_metadata": {...}
                 }
         """
-        # Lista de métricas críticas que requieren normalización
-        metrics_to_normalize = [
-            # Calidad
-            "roe",
-            "roic", 
-            "roa",
-            "operating_margin",
-            "net_margin",
-            "gross_margin",
-            
-            # Crecimiento
-            "revenue_growth",
-            "earnings_growth",
-            "revenue_growth_qoq",
-            "earnings_growth_qoq",
-            "earnings_growth_this_y",
-            "earnings_growth_next_y",
-            "earnings_growth_next_5y",
-            "revenue_growth_5y",
-            
-            # Valoración (generalmente usan TTM)
-            "pe_ratio",
-            "peg_ratio",
-            "price_to_book",
-            "price_to_sales",
-            "ev_to_ebitda",
-            
-            # Salud financiera
-            "debt_to_equity",
-            "current_ratio",
-            "quick_ratio"
-        ]
-        
         # Normalizar en lote
         normalized = self.normalizer.normalize_metrics_batch(
             metrics_dict=metrics,
-            metric_names=metrics_to_normalize,
-            currency=metrics.get("currency", "USD")
+            metric_names=list(NORMALIZED_METRICS),
+            currency=metrics.get("currency", "USD"),
+            stats=context.normalization_stats if context is not None else None
         )
         
         return normalized
@@ -266,23 +463,15 @@ class EquityAnalyzer(BaseAnalyzer):
             sector: String de sector (puede incluir sub-industria)
         
         Returns:
-            Sector principal compatible con SECTOR_BENCHMARKS
+            Sector principal (clave de los benchmarks sectoriales)
         """
-        if not sector or sector == "Unknown":
-            return "Unknown"
-        
-        # Si tiene guión, tomar la parte antes del guión
-        if " - " in sector:
-            primary = sector.split(" - ")[0].strip()
-        else:
-            primary = sector.strip()
-        
-        return primary
+        return primary_sector(sector)
     
     def _calculate_quality_sector_relative(
         self, 
         metrics: Dict[str, Any],
-        sector: str
+        sector: str,
+        context: Optional[AnalysisContext] = None
     ) -> Dict[str, Any]:
         """
         Score de CALIDAD con normalización sector-relativa (Mejora #4).
@@ -296,66 +485,39 @@ class EquityAnalyzer(BaseAnalyzer):
         Args:
             metrics: Dict con métricas financieras
             sector: Sector de la empresa (ej: "Technology")
+            context: Contexto de la invocación donde contar el uso de benchmarks
         
         Returns:
             Dict con score, components, used_metrics, method="sector_relative"
         """
-        primary_sector = self._extract_primary_sector(sector)
+        primary = self._extract_primary_sector(sector)
+        industry = industry_key(metrics.get("industry"))
+        stats = context.sector_stats if context is not None else None
+        benchmark_set = context.benchmarks if context is not None else None
         components = []
         used: List[str] = []
         
-        # ROE sector-relativo
-        roe = metrics.get("roe")
-        if roe is not None:
-            roe_result = self.sector_normalizer.normalize_metric(
-                roe, "roe", primary_sector, invert=False
-            )
-            roe_score = roe_result["score"]
-            z_roe = roe_result.get("z_score", 0)
-            
-            components.append(("ROE", roe_score, self.quality_weights["roe"]))
-            used.append(f"ROE: {roe:.1f}% (z={z_roe:.2f})")
-        
-        # ROIC sector-relativo
-        roic = metrics.get("roic")
-        if roic is not None:
-            roic_result = self.sector_normalizer.normalize_metric(
-                roic, "roic", primary_sector, invert=False
-            )
-            roic_score = roic_result["score"]
-            z_roic = roic_result.get("z_score", 0)
-            
-            components.append(("ROIC", roic_score, self.quality_weights["roic"]))
-            used.append(f"ROIC: {roic:.1f}% (z={z_roic:.2f})")
-        
-        # Operating Margin sector-relativo
-        op_margin = metrics.get("operating_margin")
-        if op_margin is not None:
-            op_result = self.sector_normalizer.normalize_metric(
-                op_margin, "operating_margin", primary_sector, invert=False
-            )
-            op_score = op_result["score"]
-            z_op = op_result.get("z_score", 0)
-            
-            components.append(("Op. Margin", op_score, self.quality_weights["operating_margin"]))
-            used.append(f"Op. Margin: {op_margin:.1f}% (z={z_op:.2f})")
-        
-        # Net Margin sector-relativo
-        net_margin = metrics.get("net_margin")
-        if net_margin is not None:
-            net_result = self.sector_normalizer.normalize_metric(
-                net_margin, "net_margin", primary_sector, invert=False
+        # ROE, ROIC, márgenes: z-score contra la industria (si hay benchmark) o el sector
+        for label, key in QUALITY_COMPONENTS:
+            value = metrics.get(key)
+            if value is None:
+                continue
+            normalized = self.sector_normalizer.normalize_metric(
+                value, key, primary, invert=False, stats=stats, industry=industry, benchmark_set=benchmark_set
             )
-            net_score = net_result["score"]
-            z_net = net_result.get("z_score", 0)
-            
-            components.append(("Net Margin", net_score, self.quality_weights["net_margin"]))
-            used.append(f"Net Margin: {net_margin:.1f}% (z={z_net:.2f})")
+            components.append((label, normalized["score"], self.quality_weights[key]))
+            z_score = normalized.get("z_score")
+            if z_score is None:
+                used.append(f"{label}: {value:.1f}% (sin benchmark)")
+            else:
+                used.append(f"{label}: {value:.1f}% (z={z_score:.2f})")
         
         # Calcular score ponderado
         result = self._weighted_result(components, used, "Sin datos de calidad")
         result["method"] = "sector_relative"  # Metadata
-        result["sector"] = primary_sector
+        result["sector"] = primary
+        if industry is not None:
+            result["industry"] = industry
         
         return result
 
@@ -371,74 +533,28 @@ class EquityAnalyzer(BaseAnalyzer):
         # ROE (Return on Equity)
         roe = metrics.get("roe")
         if roe is not None:
-            if roe > 30:
-                score = 100
-            elif roe > 25:
-                score = 95
-            elif roe > 20:
-                score = 85
-            elif roe > 15:
-                score = 70
-            elif roe > 10:
-                score = 50
-            elif roe > 5:
-                score = 30
-            else:
-                score = 10
+            score = SCORE_TABLES["roe"].score(roe)
             components.append(("ROE", score, self.quality_weights["roe"]))
             used.append(f"ROE: {roe:.1f}%")
 
         # ROIC (Return on Invested Capital)
         roic = metrics.get("roic")
         if roic is not None:
-            if roic > 25:
-                score = 100
-            elif roic > 20:
-                score = 90
-            elif roic > 15:
-                score = 80
-            elif roic > 10:
-                score = 60
-            elif roic > 8:
-                score = 40
-            else:
-                score = 20
+            score = SCORE_TABLES["roic"].score(roic)
             components.append(("ROIC", score, self.quality_weights["roic"]))
             used.append(f"ROIC: {roic:.1f}%")
 
         # Operating Margin
         op_margin = metrics.get("operating_margin")
         if op_margin is not None:
-            if op_margin > 30:
-                score = 100
-            elif op_margin > 25:
-                score = 90
-            elif op_margin > 20:
-                score = 80
-            elif op_margin > 15:
-                score = 65
-            elif op_margin > 10:
-                score = 45
-            else:
-                score = 25
+            score = SCORE_TABLES["operating_margin"].score(op_margin)
             components.append(("Op. Margin", score, self.quality_weights["operating_margin"]))
             used.append(f"Op. Margin: {op_margin:.1f}%")
 
         # Net Margin
         net_margin = metrics.get("net_margin")
         if net_margin is not None:
-            if net_margin > 25:
-                score = 100
-            elif net_margin > 20:
-                score = 85
-            elif net_margin > 15:
-                score = 70
-            elif net_margin > 10:
-                score = 50
-            elif net_margin > 5:
-                score = 30
-            else:
-                score = 15
+            score = SCORE_TABLES["net_margin"].score(net_margin)
             components.append(("Net Margin", score, self.quality_weights["net_margin"]))
             used.append(f"Net Margin: {net_margin:.1f}%")
 
@@ -498,18 +614,7 @@ class EquityAnalyzer(BaseAnalyzer):
         
         # EV/EBIT Score (60% del peso TIER1)
         if ev_ebit > 0:  # Validar positivo (EBIT negativo invalida el ratio)
-            if ev_ebit < 8:
-                ev_score = 100  # Muy barato
-            elif ev_ebit < 12:
-                ev_score = 85
-            elif ev_ebit < 15:
-                ev_score = 70
-            elif ev_ebit < 20:
-                ev_score = 50
-            elif ev_ebit < 25:
-                ev_score = 35
-            else:
-                ev_score = 20  # Caro
+            ev_score = SCORE_TABLES["ev_to_ebit"].score(ev_ebit)
             
             components.append(("EV/EBIT", ev_score, 0.60))
             used.append(f"EV/EBIT: {ev_ebit:.2f}")
@@ -517,18 +622,7 @@ class EquityAnalyzer(BaseAnalyzer):
         # FCF Yield Score (40% del peso TIER1)
         # Yield positivo = empresa genera caja (bueno)
         # Yield negativo = quema caja (malo)
-        if fcf_yield > 10:
-            fcf_score = 100  # Excelente generación de caja
-        elif fcf_yield > 7:
-            fcf_score = 85
-        elif fcf_yield > 5:
-            fcf_score = 70
-        elif fcf_yield > 3:
-            fcf_score = 50
-        elif fcf_yield > 0:
-            fcf_score = 30   # Genera caja pero poco
-        else:
-            fcf_score = 10   # Quema caja (FCF negativo)
+        fcf_score = SCORE_TABLES["fcf_yield"].score(fcf_yield)
         
         components.append(("FCF Yield", fcf_score, 0.40))
         used.append(f"FCF Yield: {fcf_yield:.1f}%")
@@ -567,56 +661,21 @@ class EquityAnalyzer(BaseAnalyzer):
         # P/E Ratio
         pe = metrics.get("pe_ratio")
         if pe is not None and pe > 0:
-            if pe < 12:
-                score = 100
-            elif pe < 15:
-                score = 90
-            elif pe < 20:
-                score = 75
-            elif pe < 25:
-                score = 60
-            elif pe < 30:
-                score = 45
-            elif pe < 40:
-                score = 30
-            else:
-                score = 15
+            score = SCORE_TABLES["pe_ratio"].score(pe)
             components.append(("P/E", score, self.valuation_weights["pe_ratio"]))
             used.append(f"P/E: {pe:.2f}")
 
         # PEG Ratio
         peg = metrics.get("peg_ratio")
         if peg is not None and peg > 0:
-            if peg < 0.8:
-                score = 100
-            elif peg < 1.0:
-                score = 90
-            elif peg < 1.25:
-                score = 75
-            elif peg < 1.5:
-                score = 60
-            elif peg < 2.0:
-                score = 40
-            else:
-                score = 20
+            score = SCORE_TABLES["peg_ratio"].score(peg)
             components.append(("PEG", score, self.valuation_weights["peg_ratio"]))
             used.append(f"PEG: {peg:.2f}")
 
         # P/B Ratio
         pb = metrics.get("price_to_book")
         if pb is not None and pb > 0:
-            if pb < 1:
-                score = 100
-            elif pb < 2:
-                score = 85
-            elif pb < 3:
-                score = 70
-            elif pb < 5:
-                score = 50
-            elif pb < 8:
-                score = 30
-            else:
-                score = 15
+            score = SCORE_TABLES["price_to_book"].score(pb)
             components.append(("P/B", score, self.valuation_weights["price_to_book"]))
             used.append(f"P/B: {pb:.2f}")
 
@@ -633,54 +692,21 @@ class EquityAnalyzer(BaseAnalyzer):
         # Debt to Equity
         debt = metrics.get("debt_to_equity")
         if debt is not None:
-            if debt < 0.3:
-                score = 100
-            elif debt < 0.5:
-                score = 90
-            elif debt < 1:
-                score = 75
-            elif debt < 1.5:
-                score = 55
-            elif debt < 2:
-                score = 35
-            else:
-                score = 15
+            score = SCORE_TABLES["debt_to_equity"].score(debt)
             components.append(("Debt/Equity", score, self.health_weights["debt_to_equity"]))
             used.append(f"D/E: {debt:.2f}")
 
         # Current Ratio
         current = metrics.get("current_ratio")
         if current is not None:
-            if current > 2.5:
-                score = 100
-            elif current > 2:
-                score = 90
-            elif current > 1.5:
-                score = 75
-            elif current > 1:
-                score = 60
-            elif current > 0.7:
-                score = 40
-            else:
-                score = 20
+            score = SCORE_TABLES["current_ratio"].score(current)
             components.append(("Current Ratio", score, self.health_weights["current_ratio"]))
             used.append(f"Current: {current:.2f}")
 
         # Quick Ratio
         quick = metrics.get("quick_ratio")
         if quick is not None:
-            if quick > 2:
-                score = 100
-            elif quick > 1.5:
-                score = 90
-            elif quick > 1.2:
-                score = 75
-            elif quick > 1:
-                score = 60
-            elif quick > 0.7:
-                score = 40
-            else:
-                score = 20
+            score = SCORE_TABLES["quick_ratio"].score(quick)
             components.append(("Quick Ratio", score, self.health_weights["quick_ratio"]))
             used.append(f"Quick: {quick:.2f}")
 
@@ -720,52 +746,16 @@ class EquityAnalyzer(BaseAnalyzer):
         
         # Net Debt/EBITDA (65% del peso)
         # Métrica principal para medir apalancamiento real
-        if net_debt_to_ebitda < 0:
-            # Caja neta (deuda negativa) - empresa tiene más caja que deuda
-            nd_score = 100
-            interpretation = "Caja neta"
-        elif net_debt_to_ebitda < 1.5:
-            # Excelente - deuda muy baja vs generación de caja
-            nd_score = 90
-            interpretation = "Muy bajo"
-        elif net_debt_to_ebitda < 3.0:
-            # Bueno - apalancamiento moderado
-            nd_score = 75
-            interpretation = "Moderado"
-        elif net_debt_to_ebitda < 5.0:
-            # Aceptable - apalancamiento elevado pero manejable
-            nd_score = 50
-            interpretation = "Elevado"
-        else:
-            # Malo - apalancamiento muy alto, riesgo de insolvencia
-            nd_score = 20
-            interpretation = "Muy alto"
+        nd_score = SCORE_TABLES["net_debt_to_ebitda"].score(net_debt_to_ebitda)
+        interpretation = SCORE_LABELS["net_debt_to_ebitda"][nd_score]
         
         components.append(("Net Debt/EBITDA", nd_score, 0.65))
         used.append(f"Net Debt/EBITDA: {net_debt_to_ebitda:.2f}x ({interpretation})")
         
         # Interest Coverage (35% del peso)
         # Mide capacidad de pagar intereses desde operaciones
-        if interest_coverage > 10:
-            # Excelente - ganancias cubren intereses 10+ veces
-            ic_score = 100
-            interpretation = "Muy alta"
-        elif interest_coverage > 5:
-            # Bueno - cobertura sólida
-            ic_score = 85
-            interpretation = "Alta"
-        elif interest_coverage > 3:
-            # Aceptable - cobertura adecuada
-            ic_score = 70
-            interpretation = "Adecuada"
-        elif interest_coverage > 1.5:
-            # Débil - cobertura justa
-            ic_score = 45
-            interpretation = "Débil"
-        else:
-            # Malo - no genera suficiente para cubrir intereses
-            ic_score = 15
-            interpretation = "Insuficiente"
+        ic_score = SCORE_TABLES["interest_coverage"].score(interest_coverage)
+        interpretation = SCORE_LABELS["interest_coverage"][ic_score]
         
         components.append(("Interest Coverage", ic_score, 0.35))
         used.append(f"Interest Coverage: {interest_coverage:.2f}x ({interpretation})")
@@ -786,58 +776,16 @@ class EquityAnalyzer(BaseAnalyzer):
         used: List[str] = []
 
         # Revenue Growth
-        revenue_growth = self._pick_metric(
-            metrics,
-            (
-                "revenue_growth_5y",
-                "revenue_growth",
-                "revenue_growth_qoq",
-            ),
-        )
+        revenue_growth = self._pick_metric(metrics, REVENUE_GROWTH_KEYS)
         if revenue_growth is not None:
-            if revenue_growth > 30:
-                score = 100
-            elif revenue_growth > 25:
-                score = 90
-            elif revenue_growth > 20:
-                score = 80
-            elif revenue_growth > 15:
-                score = 65
-            elif revenue_growth > 10:
-                score = 50
-            elif revenue_growth > 5:
-                score = 35
-            else:
-                score = 20
+            score = SCORE_TABLES["revenue_growth"].score(revenue_growth)
             components.append(("Revenue Growth", score, self.growth_weights["revenue_growth"]))
             used.append(f"Rev. Growth: {revenue_growth:.1f}%")
 
         # Earnings Growth
-        earnings_growth = self._pick_metric(
-            metrics,
-            (
-                "earnings_growth_this_y",
-                "earnings_growth_next_y",
-                "earnings_growth_next_5y",
-                "earnings_growth_qoq",
-                "earnings_growth",
-            ),
-        )
+        earnings_growth = self._pick_metric(metrics, EARNINGS_GROWTH_KEYS)
         if earnings_growth is not None:
-            if earnings_growth > 30:
-                score = 100
-            elif earnings_growth > 25:
-                score = 90
-            elif earnings_growth > 15:
-                score = 75
-            elif earnings_growth > 10:
-                score = 60
-            elif earnings_growth > 5:
-                score = 45
-            elif earnings_growth > 0:
-                score = 30
-            else:
-                score = 15
+            score = SCORE_TABLES["earnings_growth"].score(earnings_growth)
             components.append(("Earnings Growth", score, self.growth_weights["earnings_growth"]))
             used.append(f"Earn. Growth: {earnings_growth:.1f}%")
 
@@ -1102,6 +1050,208 @@ class EquityAnalyzer(BaseAnalyzer):
         else:
             return "Muy Baja"
 
+    # -------------------------------
+    # Motor columnar (score_batch)
+    # -------------------------------
+
+    @staticmethod
+    def _batch_weighted(
+        components: List[Tuple[np.ndarray, np.ndarray, float]],
+        rounded: bool = True
+    ) -> np.ndarray:
+        """
+        Equivalente columnar de ``_weighted_result``.
+
+        ``components`` son tuplas (scores, presente, peso) en el mismo orden que
+        el camino escalar: sumar 0.0 por los ausentes no altera ningún bit.
+        """
+        size = len(components[0][0])
+        weighted = np.zeros(size)
+        total = np.zeros(size)
+        plain = np.zeros(size)
+        count = np.zeros(size)
+        for scores, present, weight in components:
+            weighted = weighted + np.where(present, scores * weight, 0.0)
+            total = total + np.where(present, weight, 0.0)
+            plain = plain + np.where(present, scores, 0.0)
+            count = count + present
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            average = np.where(total == 0, plain / count, weighted / total)
+        if rounded:
+            average = _round2(average)
+        return np.where(count > 0, average, 50.0)
+
+    def _batch_quality(self, frame: pd.DataFrame, column: Callable[[str], np.ndarray]) -> np.ndarray:
+        """Calidad absoluta o sector-relativa según el sector de cada fila."""
+        roe = column("roe")
+        roic = column("roic")
+        op_margin = column("operating_margin")
+        net_margin = column("net_margin")
+
+        absolute = self._batch_weighted([
+            (SCORE_TABLES["roe"].score_array(roe), ~np.isnan(roe), self.quality_weights["roe"]),
+            (SCORE_TABLES["roic"].score_array(roic), ~np.isnan(roic), self.quality_weights["roic"]),
+            (SCORE_TABLES["operating_margin"].score_array(op_margin), ~np.isnan(op_margin), self.quality_weights["operating_margin"]),
+            (SCORE_TABLES["net_margin"].score_array(net_margin), ~np.isnan(net_margin), self.quality_weights["net_margin"]),
+        ])
+        if not self.use_sector_relative or "sector" not in frame.columns:
+            return absolute
+
+        benchmark_set = self.sector_normalizer.benchmark_set
+        # Sector principal por valor distinto (pocos) en lugar de por fila
+        codes, sectors = pd.factorize(frame["sector"])
+        primaries = [
+            self._extract_primary_sector(sector) if isinstance(sector, str) and sector else "Unknown"
+            for sector in sectors
+        ] + ["Unknown"]
+        known = np.array([benchmark_set.has_sector(primary) for primary in primaries[:-1]] + [False])
+        # codes == -1 (NaN) apunta al último elemento: sin sector
+        sector_rows = known[codes]
+        if not sector_rows.any():
+            return absolute
+
+        # Pares (sector, industria) distintos: el benchmark de industria prevalece
+        if "industry" in frame.columns:
+            industry_codes, industries = pd.factorize(frame["industry"])
+        else:
+            industry_codes, industries = np.full(len(frame), -1), []
+        industry_names = [industry_key(industry) for industry in industries] + [None]
+        width = len(industry_names)
+        pairs, pair_codes = np.unique((codes + 1) * width + (industry_codes + 1), return_inverse=True)
+        pair_codes = pair_codes.reshape(-1)
+        pair_groups = [(primaries[pair // width - 1], industry_names[pair % width - 1]) for pair in pairs.tolist()]
+
+        components = []
+        for _, key in QUALITY_COMPONENTS:
+            values = column(key)
+            found = [benchmark_set.lookup(key, primary, industry) for primary, industry in pair_groups]
+            mean = np.array([f[2]["mean"] if f else np.nan for f in found])[pair_codes]
+            std = np.array([f[2]["std"] if f else np.nan for f in found])[pair_codes]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                z = np.where(std == 0, 0.0, (values - mean) / std)
+            scores = SCORE_TABLES["z_score"].score_array(z)
+            # Sin benchmark para la métrica: score neutral
+            scores = np.where(np.isnan(mean), 50.0, scores)
+            components.append((scores, ~np.isnan(values), self.quality_weights[key]))
+
+        return np.where(sector_rows, self._batch_weighted(components), absolute)
+
+    def _batch_valuation(self, column: Callable[[str], np.ndarray]) -> np.ndarray:
+        """Valoración TIER1 (EV/EBIT + FCF Yield) o TIER2 (P/E + PEG + P/B)."""
+        ev_ebit = column("ev_to_ebit")
+        fcf_yield = column("fcf_yield")
+        tier1 = self._batch_weighted([
+            (SCORE_TABLES["ev_to_ebit"].score_array(ev_ebit), ev_ebit > 0, 0.60),
+            (SCORE_TABLES["fcf_yield"].score_array(fcf_yield), np.ones(len(fcf_yield), dtype=bool), 0.40),
+        ], rounded=False)
+
+        pe = column("pe_ratio")
+        peg = column("peg_ratio")
+        pb = column("price_to_book")
+        tier2 = self._batch_weighted([
+            (SCORE_TABLES["pe_ratio"].score_array(pe), pe > 0, self.valuation_weights["pe_ratio"]),
+            (SCORE_TABLES["peg_ratio"].score_array(peg), peg > 0, self.valuation_weights["peg_ratio"]),
+            (SCORE_TABLES["price_to_book"].score_array(pb), pb > 0, self.valuation_weights["price_to_book"]),
+        ])
+
+        return np.where(~np.isnan(ev_ebit) & ~np.isnan(fcf_yield), tier1, tier2)
+
+    def _batch_health(self, column: Callable[[str], np.ndarray]) -> np.ndarray:
+        """Salud TIER1 (Net Debt/EBITDA + Interest Coverage) o TIER2 (D/E + Current + Quick)."""
+        nd_ebitda = column("net_debt_to_ebitda")
+        interest_cov = column("interest_coverage")
+        always = np.ones(len(nd_ebitda), dtype=bool)
+        tier1 = self._batch_weighted([
+            (SCORE_TABLES["net_debt_to_ebitda"].score_array(nd_ebitda), always, 0.65),
+            (SCORE_TABLES["interest_coverage"].score_array(interest_cov), always, 0.35),
+        ])
+
+        debt = column("debt_to_equity")
+        current = column("current_ratio")
+        quick = column("quick_ratio")
+        tier2 = self._batch_weighted([
+            (SCORE_TABLES["debt_to_equity"].score_array(debt), ~np.isnan(debt), self.health_weights["debt_to_equity"]),
+            (SCORE_TABLES["current_ratio"].score_array(current), ~np.isnan(current), self.health_weights["current_ratio"]),
+            (SCORE_TABLES["quick_ratio"].score_array(quick), ~np.isnan(quick), self.health_weights["quick_ratio"]),
+        ])
+
+        return np.where(~np.isnan(nd_ebitda) & ~np.isnan(interest_cov), tier1, tier2)
+
+    def _batch_growth(self, column: Callable[[str], np.ndarray]) -> np.ndarray:
+        """Crecimiento con la misma prioridad de claves que ``_calculate_growth``."""
+
+        def pick(keys: Iterable[str]) -> np.ndarray:
+            picked = None
+            for key in keys:
+                values = column(key)
+                picked = values if picked is None else np.where(np.isnan(picked), values, picked)
+            return picked
+
+        revenue = pick(REVENUE_GROWTH_KEYS)
+        earnings = pick(EARNINGS_GROWTH_KEYS)
+        return self._batch_weighted([
+            (SCORE_TABLES["revenue_growth"].score_array(revenue), ~np.isnan(revenue), self.growth_weights["revenue_growth"]),
+            (SCORE_TABLES["earnings_growth"].score_array(earnings), ~np.isnan(earnings), self.growth_weights["earnings_growth"]),
+        ])
+
+    @staticmethod
+    def _batch_investment(
+        quality: np.ndarray,
+        valuation: np.ndarray,
+        health: np.ndarray,
+        growth: np.ndarray
+    ) -> np.ndarray:
+        """Casos de ``_calculate_investment`` en el mismo orden (gana el primero que aplica)."""
+        q, v, h, g = quality, valuation, health, growth
+
+        value = (q * 0.35) + (v * 0.55)
+        value = np.where(h >= 50, value + 5, value)
+        value = np.minimum(85, np.where(g >= 40, value + 3, value))
+
+        sweet = (q * 0.45) + (v * 0.45)
+        sweet = np.where(h >= 85, sweet + 3, sweet)
+        sweet = np.minimum(100, np.where(g >= 75, sweet + 2, sweet))
+
+        elite = (q * 0.50) + (v * 0.35)
+        elite = np.where(g >= 70, elite + 5, elite)
+        elite = np.where(v < 40, np.minimum(75, elite), np.minimum(85, elite))
+
+        medium = (q * 0.40) + (v * 0.50)
+        medium = np.where(h >= 75, medium + 3, medium)
+
+        good = (q * 0.45) + (v * 0.40)
+        good = np.where(g >= 65, good + 3, good)
+
+        return np.select(
+            [
+                q < 35,
+                (35 <= q) & (q < 60) & (v >= 70),
+                (35 <= q) & (q < 60),
+                (70 <= q) & (q <= 95) & (v >= 60),
+                (q >= 85) & (v < 60),
+                (60 <= q) & (q < 70) & (v >= 70),
+                (70 <= q) & (q < 85) & (50 <= v) & (v < 60),
+            ],
+            [q * 0.50, value, q * 0.60, sweet, elite, medium, good],
+            (q * 0.40) + (v * 0.40) + (h * 0.10) + (g * 0.10),
+        )
+
+    @staticmethod
+    def _batch_categorize(quality: np.ndarray, valuation: np.ndarray) -> np.ndarray:
+        """Nombre de categoría de ``_categorize`` por fila."""
+        q, v = quality, valuation
+        return np.select(
+            [
+                (q >= 75) & (v >= 60),
+                (q >= 85) & (v >= 40),
+                (q >= 45) & (v >= 70),
+                (q >= 85) & (v < 40),
+                (q < 45) & (v >= 60),
+            ],
+            ["SWEET SPOT", "PREMIUM", "VALOR", "CARA", "TRAMPA"],
+            "EVITAR",
+        ).astype(object)
 
 # Alias para compatibilidad hacia atrás
 InvestmentScorer = EquityAnalyzer
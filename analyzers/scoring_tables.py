@@ -0,0 +1,124 @@
+"""
+Scoring Tables - Umbrales de puntuación declarativos, compilados al importar.
+
+Cada regla por tramos ("ROE > 30 → 100, > 25 → 95, ...") se declara una sola
+vez como tabla de cortes y se compila a un ``ScoreTable`` con dos caminos de
+evaluación sobre los mismos cortes:
+
+- ``score(value)``: escalar, con ``bisect`` (usado por ``calculate_all_scores``)
+- ``score_array(values)``: columnar, con ``np.searchsorted`` (usado por ``score_batch``)
+
+Así el motor escalar, el columnar y cualquier otro futuro comparten la misma
+fuente de verdad.
+
+Formato de ``SCORING_RULES``: ``nombre -> (operador, [(umbral, score), ...], default)``
+con los tramos en el orden en que se evalúan:
+
+- ``">"``: el primer umbral superado gana (``value > umbral``), umbrales descendentes
+- ``"<"``: el primer umbral no alcanzado gana (``value < umbral``), umbrales ascendentes
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+Number = Union[int, float]
+
+SCORING_RULES: Dict[str, Tuple[str, List[Tuple[Number, Number]], Number]] = {
+    # Calidad (absoluta)
+    "roe": (">", [(30, 100), (25, 95), (20, 85), (15, 70), (10, 50), (5, 30)], 10),
+    "roic": (">", [(25, 100), (20, 90), (15, 80), (10, 60), (8, 40)], 20),
+    "operating_margin": (">", [(30, 100), (25, 90), (20, 80), (15, 65), (10, 45)], 25),
+    "net_margin": (">", [(25, 100), (20, 85), (15, 70), (10, 50), (5, 30)], 15),
+
+    # Calidad sector-relativa: z-score → 0-100 (invertir el z antes para "menor es mejor")
+    "z_score": (">", [(2.0, 100.0), (1.0, 85.0), (0, 70.0), (-1.0, 50.0), (-2.0, 30.0)], 15.0),
+
+    # Valoración TIER1 (caja libre)
+    "ev_to_ebit": ("<", [(8, 100), (12, 85), (15, 70), (20, 50), (25, 35)], 20),  # solo si EV/EBIT > 0
+    "fcf_yield": (">", [(10, 100), (7, 85), (5, 70), (3, 50), (0, 30)], 10),  # <= 0: quema caja
+
+    # Valoración TIER2 (múltiplos tradicionales)
+    # Solo se puntúan múltiplos > 0
+    "pe_ratio": ("<", [(12, 100), (15, 90), (20, 75), (25, 60), (30, 45), (40, 30)], 15),
+    "peg_ratio": ("<", [(0.8, 100), (1.0, 90), (1.25, 75), (1.5, 60), (2.0, 40)], 20),
+    "price_to_book": ("<", [(1, 100), (2, 85), (3, 70), (5, 50), (8, 30)], 15),
+
+    # Salud TIER1
+    "net_debt_to_ebitda": ("<", [(0, 100), (1.5, 90), (3.0, 75), (5.0, 50)], 20),
+    "interest_coverage": (">", [(10, 100), (5, 85), (3, 70), (1.5, 45)], 15),
+
+    # Salud TIER2
+    "debt_to_equity": ("<", [(0.3, 100), (0.5, 90), (1, 75), (1.5, 55), (2, 35)], 15),
+    "current_ratio": (">", [(2.5, 100), (2, 90), (1.5, 75), (1, 60), (0.7, 40)], 20),
+    "quick_ratio": (">", [(2, 100), (1.5, 90), (1.2, 75), (1, 60), (0.7, 40)], 20),
+
+    # Crecimiento
+    "revenue_growth": (">", [(30, 100), (25, 90), (20, 80), (15, 65), (10, 50), (5, 35)], 20),
+    "earnings_growth": (">", [(30, 100), (25, 90), (15, 75), (10, 60), (5, 45), (0, 30)], 15),
+}
+
+# Interpretación textual por score (breakdown de salud TIER1)
+SCORE_LABELS: Dict[str, Dict[Number, str]] = {
+    "net_debt_to_ebitda": {100: "Caja neta", 90: "Muy bajo", 75: "Moderado", 50: "Elevado", 20: "Muy alto"},
+    "interest_coverage": {100: "Muy alta", 85: "Alta", 70: "Adecuada", 45: "Débil", 15: "Insuficiente"},
+}
+
+
+class ScoreTable:
+    """
+    Regla por tramos compilada a cortes ordenados.
+
+    Los cortes se guardan ascendentes; el tramo de un valor es el número de
+    cortes que quedan por debajo (``>``: estrictamente; ``<``: incluyendo
+    iguales), de modo que un valor exactamente en el umbral cae en el mismo
+    tramo que con la cadena de if/elif original.
+    """
+
+    __slots__ = ("name", "operator", "cuts", "scores", "_bisect", "_side", "_cut_array", "_score_array")
+
+    def __init__(self, name: str, operator: str, steps: Sequence[Tuple[Number, Number]], default: Number):
+        thresholds = [threshold for threshold, _ in steps]
+        scores = [score for _, score in steps]
+
+        if operator == ">":
+            if thresholds != sorted(thresholds, reverse=True):
+                raise ValueError(f"{name}: los umbrales '>' deben ir de mayor a menor")
+            cuts = thresholds[::-1]
+            by_bin = [default] + scores[::-1]
+            self._bisect, self._side = bisect_left, "left"
+        elif operator == "<":
+            if thresholds != sorted(thresholds):
+                raise ValueError(f"{name}: los umbrales '<' deben ir de menor a mayor")
+            cuts = thresholds
+            by_bin = scores + [default]
+            self._bisect, self._side = bisect_right, "right"
+        else:
+            raise ValueError(f"{name}: operador no soportado {operator!r}")
+
+        self.name = name
+        self.operator = operator
+        self.cuts = tuple(cuts)
+        self.scores = tuple(by_bin)
+        self._cut_array = np.asarray(cuts, dtype=float)
+        self._score_array = np.asarray(by_bin, dtype=float)
+
+    def score(self, value: Number) -> Number:
+        """Score de un valor escalar (mismo tipo que el declarado en la tabla)."""
+        return self.scores[self._bisect(self.cuts, value)]
+
+    def score_array(self, values: np.ndarray) -> np.ndarray:
+        """Scores (float) de un array; los NaN caen en el último tramo y deben enmascararse."""
+        return self._score_array[np.searchsorted(self._cut_array, values, side=self._side)]
+
+    def __repr__(self) -> str:
+        return f"ScoreTable({self.name!r}, cuts={self.cuts}, scores={self.scores})"
+
+
+def compile_tables(rules: Dict[str, Tuple[str, List[Tuple[Number, Number]], Number]]) -> Dict[str, ScoreTable]:
+    """Compila un dict de reglas declarativas a ``ScoreTable``."""
+    return {name: ScoreTable(name, operator, steps, default) for name, (operator, steps, default) in rules.items()}
+
+
+SCORE_TABLES: Dict[str, ScoreTable] = compile_tables(SCORING_RULES)
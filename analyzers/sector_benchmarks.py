@@ -4,11 +4,30 @@ Sector Benchmarks - Normalización de scores contra benchmarks sectoriales.
 Implementa z-scores para comparar empresas contra peers del mismo sector,
 evitando sesgos estructurales (ej: Tech naturalmente tiene ROE más alto que Utilities).
 
+Los benchmarks activos son un ``BenchmarkSet`` inmutable: por defecto la tabla
+estática ``SECTOR_BENCHMARKS``; si existe el fichero que genera
+``benchmark_builder.py`` (media/std winsorizadas y cuantiles empíricos por
+sector e industria calculados sobre financial_cache), se carga encima de la
+tabla estática y se recarga en caliente cuando cambia (``reload_if_changed``).
+
 Parte de IMPROVEMENT_PLAN.md - Mejora #4 (Prioridad P1)
 """
 
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple, Union
+import hashlib
+import io
+import json
 import logging
+import math
+import os
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from .scoring_tables import SCORE_TABLES
 
 logger = logging.getLogger("SectorBenchmarks")
 
@@ -150,6 +169,243 @@ SECTOR_BENCHMARKS = {
 }
 
 
+# Recorte de colas antes de calcular media/std (winsorización)
+WINSOR_LIMITS = (0.025, 0.975)
+# Máximo de cuantiles guardados por grupo y métrica (con menos muestras se guarda la muestra entera)
+QUANTILE_POINTS = 100
+
+BenchmarkTable = Dict[str, Dict[str, Dict[str, float]]]
+# (nivel, grupo, métrica) con nivel "sector" o "industry"
+QuantileKey = Tuple[str, str, str]
+
+
+def primary_sector(sector: Any) -> str:
+    """Sector principal: "Technology - Semiconductors" → "Technology"; vacío → "Unknown"."""
+    if not isinstance(sector, str) or not sector or sector == "Unknown":
+        return "Unknown"
+    if " - " in sector:
+        return sector.split(" - ")[0].strip()
+    return sector.strip()
+
+
+def industry_key(industry: Any) -> Optional[str]:
+    """Industria normalizada para buscar benchmarks (None si no hay)."""
+    if isinstance(industry, str) and industry.strip():
+        return industry.strip()
+    return None
+
+
+def robust_stats(values: np.ndarray) -> Tuple[Dict[str, float], np.ndarray]:
+    """
+    Media/std winsorizadas y cuantiles empíricos de una muestra.
+
+    Los cuantiles se toman de la muestra sin recortar en las probabilidades
+    ``(k + 0.5) / K`` con ``K = min(n, QUANTILE_POINTS)``: con pocas muestras
+    son la muestra ordenada completa, así que ``searchsorted`` da el percentil
+    empírico exacto.
+
+    Returns:
+        ({"mean", "std", "n"}, cuantiles ascendentes)
+    """
+    values = np.sort(np.asarray(values, dtype=float))
+    low, high = np.quantile(values, WINSOR_LIMITS, method="inverted_cdf")
+    clipped = np.clip(values, low, high)
+    stats = {
+        "mean": float(clipped.mean()),
+        "std": float(clipped.std(ddof=1)) if len(values) > 1 else 0.0,
+        "n": int(len(values)),
+    }
+    points = min(len(values), QUANTILE_POINTS)
+    probabilities = (np.arange(points) + 0.5) / points
+    quantiles = np.quantile(values, probabilities, method="inverted_cdf")
+    return stats, quantiles
+
+
+class BenchmarkSet:
+    """
+    Benchmarks inmutables por sector e industria.
+
+    Se sustituye entero al recargar (asignación atómica), de modo que un
+    análisis que tomó una referencia nunca ve una mezcla de dos versiones.
+
+    Args:
+        sectors: ``sector -> métrica -> {"mean", "std"[, "n"]}``
+        industries: Igual, por industria (prevalece sobre el sector si existe la métrica)
+        quantiles: ``(nivel, grupo, métrica) -> cuantiles ascendentes``
+        version: Identificador estable del contenido (forma parte de engine_version)
+        source: "static" o ruta del fichero cargado
+        built_at: Fecha de generación del fichero
+    """
+
+    __slots__ = ("sectors", "industries", "quantiles", "version", "source", "built_at")
+
+    def __init__(
+        self,
+        sectors: BenchmarkTable,
+        industries: Optional[BenchmarkTable] = None,
+        quantiles: Optional[Dict[QuantileKey, np.ndarray]] = None,
+        version: Optional[str] = None,
+        source: str = "static",
+        built_at: Optional[str] = None,
+    ):
+        self.sectors = sectors
+        self.industries = industries or {}
+        self.quantiles = quantiles or {}
+        self.version = version or "static-" + hashlib.sha1(
+            json.dumps(sectors, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:12]
+        self.source = source
+        self.built_at = built_at
+
+    @classmethod
+    def static(cls) -> "BenchmarkSet":
+        """Tabla estática ``SECTOR_BENCHMARKS`` (sin cuantiles)."""
+        return cls(SECTOR_BENCHMARKS)
+
+    def has_sector(self, sector: str) -> bool:
+        return sector in self.sectors
+
+    def lookup(
+        self,
+        metric: str,
+        sector: str,
+        industry: Optional[str] = None
+    ) -> Optional[Tuple[str, str, Dict[str, float]]]:
+        """(nivel, grupo, benchmark) para la métrica: industria si existe, si no sector."""
+        if industry is not None:
+            benchmark = self.industries.get(industry, {}).get(metric)
+            if benchmark is not None:
+                return "industry", industry, benchmark
+        benchmark = self.sectors.get(sector, {}).get(metric)
+        if benchmark is not None:
+            return "sector", sector, benchmark
+        return None
+
+    def percentile(
+        self,
+        level: str,
+        group: str,
+        metric: str,
+        value: float,
+        z_score: Optional[float]
+    ) -> Optional[float]:
+        """
+        Percentil (0-100) de ``value`` dentro de su grupo.
+
+        Con cuantiles empíricos: fracción de la muestra <= value (``searchsorted``).
+        Sin ellos (tabla estática): CDF normal del z-score.
+        """
+        quantiles = self.quantiles.get((level, group, metric))
+        if quantiles is not None and len(quantiles):
+            return round(100.0 * int(np.searchsorted(quantiles, value, side="right")) / len(quantiles), 1)
+        if z_score is None:
+            return None
+        return round(50.0 * (1.0 + math.erf(z_score / math.sqrt(2.0))), 1)
+
+    def over(self, base: "BenchmarkSet") -> "BenchmarkSet":
+        """Este set completado con los grupos/métricas de ``base`` que no cubre."""
+        sectors = {sector: dict(metrics) for sector, metrics in base.sectors.items()}
+        for sector, metrics in self.sectors.items():
+            sectors.setdefault(sector, {}).update(metrics)
+        return BenchmarkSet(sectors, self.industries, self.quantiles, self.version, self.source, self.built_at)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "built_at": self.built_at,
+            "sectors": len(self.sectors),
+            "industries": len(self.industries),
+        }
+
+
+def save_benchmark_set(
+    groups: Dict[QuantileKey, Tuple[Dict[str, float], np.ndarray]],
+    path: Union[str, Path],
+    built_at: Optional[str] = None,
+) -> str:
+    """
+    Guarda benchmarks calculados en un ``.npz`` comprimido, de forma atómica.
+
+    Formato: ``meta`` (JSON con la lista de grupos y su tramo) y ``quantiles``
+    (todos los cuantiles concatenados en un único array float64). Se escribe
+    a un temporal en el mismo directorio y se renombra con ``os.replace``:
+    los lectores ven el fichero anterior o el nuevo, nunca uno a medias.
+
+    Args:
+        groups: ``(nivel, grupo, métrica) -> (stats, cuantiles)`` (ver ``robust_stats``)
+        path: Fichero destino
+        built_at: Fecha de generación
+
+    Returns:
+        Versión del contenido escrito
+    """
+    entries = []
+    arrays = []
+    offset = 0
+    for (level, group, metric), (stats, quantiles) in sorted(groups.items()):
+        entries.append({
+            "level": level, "group": group, "metric": metric, **stats,
+            "offset": offset, "count": int(len(quantiles)),
+        })
+        arrays.append(np.asarray(quantiles, dtype=float))
+        offset += len(quantiles)
+    quantiles = np.concatenate(arrays) if arrays else np.zeros(0)
+
+    digest = hashlib.sha1(json.dumps(entries, sort_keys=True).encode("utf-8"))
+    digest.update(quantiles.tobytes())
+    version = "data-" + digest.hexdigest()[:12]
+    meta = {"version": version, "built_at": built_at, "groups": entries}
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, meta=np.array(json.dumps(meta)), quantiles=quantiles)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as fh:
+            fh.write(buffer.getvalue())
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return version
+
+
+def load_benchmark_set(path: Union[str, Path], base: Optional[BenchmarkSet] = None) -> BenchmarkSet:
+    """Carga un fichero de ``save_benchmark_set`` completado con ``base`` (por defecto la tabla estática)."""
+    with np.load(str(path), allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        quantile_data = data["quantiles"]
+
+    tables: Dict[str, BenchmarkTable] = {"sector": {}, "industry": {}}
+    quantiles: Dict[QuantileKey, np.ndarray] = {}
+    for entry in meta["groups"]:
+        level, group, metric = entry["level"], entry["group"], entry["metric"]
+        tables[level].setdefault(group, {})[metric] = {
+            "mean": entry["mean"], "std": entry["std"], "n": entry["n"],
+        }
+        quantiles[(level, group, metric)] = quantile_data[entry["offset"]:entry["offset"] + entry["count"]]
+
+    loaded = BenchmarkSet(
+        tables["sector"], tables["industry"], quantiles,
+        version=meta["version"], source=str(path), built_at=meta.get("built_at"),
+    )
+    return loaded.over(base or BenchmarkSet.static())
+
+
+def empty_sector_stats() -> Dict[str, Any]:
+    """Contadores de uso de benchmarks a cero (agregados o de una sola invocación)."""
+    return {
+        "total_normalized": 0,
+        "sector_usage": {sector: 0 for sector in SECTOR_BENCHMARKS.keys()},
+        "fallback_to_absolute": 0,
+    }
+
+
 class SectorNormalizer:
     """
     Normaliza métricas contra benchmarks sectoriales usando z-scores.
@@ -173,20 +429,74 @@ class SectorNormalizer:
         → Ambas son "buenas" vs sus sectores, aunque ROE absoluto es muy diferente
     """
     
-    def __init__(self):
-        """Inicializa el normalizador con benchmarks."""
-        self.benchmarks = SECTOR_BENCHMARKS
-        self.stats = {
-            "total_normalized": 0,
-            "sector_usage": {sector: 0 for sector in SECTOR_BENCHMARKS.keys()},
-            "fallback_to_absolute": 0,
-        }
+    def __init__(self, benchmark_set: Optional[BenchmarkSet] = None):
+        """Inicializa el normalizador con benchmarks (por defecto la tabla estática)."""
+        self.benchmark_set = benchmark_set or BenchmarkSet.static()
+        # Firma (mtime, tamaño) del fichero cargado y momento de la última comprobación
+        self._file_signature: Optional[Tuple[int, int]] = None
+        self._last_check: Optional[float] = None
+        self._reload_lock = threading.Lock()
+        # Agregados del proceso; cada invocación cuenta en su propio dict y los suma aquí
+        self.stats = empty_sector_stats()
+        self._stats_lock = threading.Lock()
+    
+    @property
+    def benchmarks(self) -> BenchmarkTable:
+        """Benchmarks por sector del set activo."""
+        return self.benchmark_set.sectors
+
+    def reload_if_changed(self, path: Union[str, Path], min_interval: float = 0.0) -> bool:
+        """
+        Recarga los benchmarks si el fichero cambió (mtime o tamaño).
+
+        Comprueba como máximo cada ``min_interval`` segundos. El set nuevo se
+        instala con una sola asignación; si el fichero no existe o no se puede
+        leer se mantiene el activo.
+
+        Returns:
+            True si se instaló un set nuevo
+        """
+        now = time.monotonic()
+        if self._last_check is not None and now - self._last_check < min_interval:
+            return False
+        with self._reload_lock:
+            self._last_check = now
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return False
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._file_signature:
+                return False
+            self._file_signature = signature
+            try:
+                benchmark_set = load_benchmark_set(path)
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile) as exc:
+                logger.warning("No se pudieron cargar los benchmarks de %s: %s", path, exc)
+                return False
+            self.benchmark_set = benchmark_set
+        logger.info(
+            "Benchmarks sectoriales %s cargados (%s sectores, %s industrias)",
+            benchmark_set.version, len(benchmark_set.sectors), len(benchmark_set.industries),
+        )
+        return True
+
+    def record_stats(self, stats: Dict[str, Any]) -> None:
+        """Suma a los agregados compartidos los contadores de una invocación."""
+        with self._stats_lock:
+            self.stats["total_normalized"] += stats["total_normalized"]
+            self.stats["fallback_to_absolute"] += stats["fallback_to_absolute"]
+            for sector, count in stats["sector_usage"].items():
+                self.stats["sector_usage"][sector] = self.stats["sector_usage"].get(sector, 0) + count
     
     def get_z_score(
         self, 
         value: float, 
         metric: str, 
-        sector: str
+        sector: str,
+        stats: Optional[Dict[str, Any]] = None,
+        industry: Optional[str] = None,
+        benchmark_set: Optional[BenchmarkSet] = None
     ) -> Optional[float]:
         """
         Calcula z-score sector-relativo para una métrica.
@@ -197,6 +507,10 @@ class SectorNormalizer:
             value: Valor de la métrica (ej: ROE = 25%)
             metric: Nombre de la métrica (ej: "roe")
             sector: Sector de la empresa (ej: "Technology")
+            stats: Contadores de la invocación (``empty_sector_stats``);
+                   None = contar directamente en los agregados
+            industry: Industria; su benchmark prevalece sobre el del sector
+            benchmark_set: Set a usar (por defecto el activo)
         
         Returns:
             z-score (float) o None si no hay benchmark disponible
@@ -205,17 +519,13 @@ class SectorNormalizer:
             >>> get_z_score(35.0, "roe", "Technology")
             1.53  # (35 - 22) / 8.5
         """
-        # Validar que exista benchmark para el sector y métrica
-        if sector not in self.benchmarks:
-            logger.debug(f"Sector '{sector}' no tiene benchmarks definidos")
-            return None
-        
-        sector_data = self.benchmarks[sector]
-        if metric not in sector_data:
+        # Validar que exista benchmark para el sector (o industria) y métrica
+        found = (benchmark_set or self.benchmark_set).lookup(metric, sector, industry)
+        if found is None:
             logger.debug(f"Métrica '{metric}' no tiene benchmark en sector '{sector}'")
             return None
         
-        benchmark = sector_data[metric]
+        _, _, benchmark = found
         mean = benchmark["mean"]
         std = benchmark["std"]
         
@@ -227,8 +537,11 @@ class SectorNormalizer:
         z_score = (value - mean) / std
         
         # Actualizar estadísticas
-        self.stats["total_normalized"] += 1
-        self.stats["sector_usage"][sector] += 1
+        counters = stats if stats is not None else empty_sector_stats()
+        counters["total_normalized"] += 1
+        counters["sector_usage"][sector] = counters["sector_usage"].get(sector, 0) + 1
+        if stats is None:
+            self.record_stats(counters)
         
         return z_score
     
@@ -278,25 +591,17 @@ class SectorNormalizer:
             z_score = -z_score
         
         # Convertir a escala 0-100
-        if z_score > 2.0:
-            return 100.0
-        elif z_score > 1.0:
-            return 85.0
-        elif z_score > 0:
-            return 70.0
-        elif z_score > -1.0:
-            return 50.0
-        elif z_score > -2.0:
-            return 30.0
-        else:
-            return 15.0
+        return SCORE_TABLES["z_score"].score(z_score)
     
     def normalize_metric(
         self,
         value: float,
         metric: str,
         sector: str,
-        invert: bool = False
+        invert: bool = False,
+        stats: Optional[Dict[str, Any]] = None,
+        industry: Optional[str] = None,
+        benchmark_set: Optional[BenchmarkSet] = None
     ) -> Dict[str, Any]:
         """
         Normaliza una métrica y retorna score + metadata.
@@ -306,14 +611,19 @@ class SectorNormalizer:
             metric: Nombre de la métrica
             sector: Sector de la empresa
             invert: True para "menores es mejor"
+            stats: Contadores de la invocación (None = agregados)
+            industry: Industria; su benchmark prevalece sobre el del sector
+            benchmark_set: Set a usar (por defecto el activo)
         
         Returns:
             Dict con:
                 - score: Score 0-100
                 - z_score: Z-score calculado
-                - sector_mean: Promedio del sector
-                - sector_std: Desviación estándar del sector
-                - percentile: Percentil aproximado (0-100)
+                - sector_mean: Promedio del grupo (sector o industria)
+                - sector_std: Desviación estándar del grupo
+                - benchmark_group: Grupo usado ("sector:..." o "industry:...")
+                - percentile: Percentil en el grupo (0-100); empírico si hay
+                  cuantiles, si no CDF normal del z-score
         
         Ejemplo:
             >>> normalize_metric(35.0, "roe", "Technology")
@@ -325,7 +635,8 @@ class SectorNormalizer:
                 "percentile": 93.7
             }
         """
-        z_score = self.get_z_score(value, metric, sector)
+        benchmark_set = benchmark_set or self.benchmark_set
+        z_score = self.get_z_score(value, metric, sector, stats=stats, industry=industry, benchmark_set=benchmark_set)
         score = self.z_to_score(z_score, invert=invert)
         
         # Metadata
@@ -336,19 +647,15 @@ class SectorNormalizer:
         }
         
         # Agregar benchmark info si está disponible
-        if sector in self.benchmarks and metric in self.benchmarks[sector]:
-            benchmark = self.benchmarks[sector][metric]
+        found = benchmark_set.lookup(metric, sector, industry)
+        if found is not None:
+            level, group, benchmark = found
             result["sector_mean"] = benchmark["mean"]
             result["sector_std"] = benchmark["std"]
-            
-            # Calcular percentil aproximado (asumiendo distribución normal)
-            if z_score is not None:
-                # Aproximación: percentil ≈ CDF de normal estándar
-                # z = 0 → 50%, z = 1 → 84%, z = 2 → 97.7%
-                import math
-                percentile = 50 + (z_score / 3) * 50  # Aproximación lineal simple
-                percentile = max(0, min(100, percentile))
-                result["percentile"] = round(percentile, 1)
+            result["benchmark_group"] = f"{level}:{group}"
+            percentile = benchmark_set.percentile(level, group, metric, value, z_score)
+            if percentile is not None:
+                result["percentile"] = percentile
         
         return result
     
@@ -364,12 +671,10 @@ class SectorNormalizer:
     
     def get_stats(self) -> Dict[str, Any]:
         """Retorna estadísticas de uso del normalizador."""
-        return self.stats.copy()
+        with self._stats_lock:
+            return {**self.stats, "sector_usage": self.stats["sector_usage"].copy()}
     
     def reset_stats(self):
         """Resetea estadísticas de uso."""
-        self.stats = {
-            "total_normalized": 0,
-            "sector_usage": {sector: 0 for sector in SECTOR_BENCHMARKS.keys()},
-            "fallback_to_absolute": 0,
-        }
+        with self._stats_lock:
+            self.stats = empty_sector_stats()
@@ -5,25 +5,56 @@ RVC Analyzer - Flask application orchestrating the IA agent and RVC calculator.
 
 from __future__ import annotations
 
+import atexit
 import json
 import logging
 import os
 import re
-import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 from datetime import datetime, timedelta
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 from flask import Flask, jsonify, render_template, request, session
 from dotenv import load_dotenv
 import requests
 
-from data_agent import DataAgent, METRIC_SCHEMA_VERSION
+from data_agent import DataAgent, METRIC_SCHEMA_VERSION, SOURCE_RESULT_TTL_HOURS
 from analyzers import EquityAnalyzer, ETFAnalyzer  # Modular architecture
 from investment_calculator import InvestmentCalculator
 from usage_limiter import get_limiter
 from db_manager import get_db_manager
+from cache_store import CacheStore, decode_payload
+from memory_cache import BoundedLRUCache, TimedMemo
+from single_flight import DatabaseLock, SingleFlight
+from services.circuit_breaker import get_breakers
+from services.http_cache import get_http_cache
+from services.http_replay import get_transport
+from services.rate_limit import (
+    DatabaseBucketStore,
+    RateLimiter,
+    configure_rate_limiter,
+    get_rate_limiter,
+    track_requests,
+)
+from services.source_planner import (
+    PLANNER_ENABLED,
+    DatabaseStatsStore,
+    SourcePlanner,
+    configure_source_planner,
+    get_source_planner,
+)
+from cache_warmer import (
+    CACHE_WARMER_FETCH_MODE,
+    CACHE_WARMER_INTERVAL_MINUTES,
+    CACHE_WARMER_MAX_TICKERS,
+    CacheWarmer,
+)
+from schema_migration import SchemaMigrator, needs_upgrade
 
 # Alias para compatibilidad con código existente
 InvestmentScorer = EquityAnalyzer
@@ -36,12 +67,48 @@ DATA_DIR = BASE_DIR / "data"
 DB_PATH = DATA_DIR / "cache.db"
 LOG_DIR = BASE_DIR / "logs"
 CACHE_EXPIRATION_HOURS = int(os.getenv("CACHE_EXPIRATION_HOURS", "24"))
+# Stale-while-revalidate: entradas expiradas se sirven hasta este máximo mientras se refrescan
+CACHE_STALE_MAX_HOURS = max(CACHE_EXPIRATION_HOURS, int(os.getenv("CACHE_STALE_MAX_HOURS", "168")))
+SWR_REFRESH_WORKERS = max(1, int(os.getenv("SWR_REFRESH_WORKERS", "2")))
+# Campos de cotización (precio, market cap, P/E): caducan antes y se refrescan con una
+# sola llamada al proveedor sobre los fundamentales cacheados (0 = con la entrada completa)
+QUOTE_TTL_MINUTES = float(os.getenv("QUOTE_TTL_MINUTES", "60"))
+# LRU en memoria de métricas ya decodificadas (0 entradas = deshabilitada)
+METRICS_LRU_MAX_ENTRIES = int(os.getenv("METRICS_LRU_MAX_ENTRIES", "512"))
+METRICS_LRU_MAX_MB = float(os.getenv("METRICS_LRU_MAX_MB", "32"))
+METRICS_LRU_TTL_SECONDS = float(os.getenv("METRICS_LRU_TTL_SECONDS", "300"))
+# Memo de resultados de EquityAnalyzer por hash de entradas + versión del motor (0 = deshabilitado)
+SCORE_MEMO_MAX_ENTRIES = int(os.getenv("SCORE_MEMO_MAX_ENTRIES", "2048"))
+SCORE_MEMO_MAX_MB = float(os.getenv("SCORE_MEMO_MAX_MB", "16"))
+SINGLE_FLIGHT_DB_LOCK = os.getenv("SINGLE_FLIGHT_DB_LOCK", "0").strip().lower() in {"1", "true", "yes"}
+SINGLE_FLIGHT_LOCK_TTL = float(os.getenv("SINGLE_FLIGHT_LOCK_TTL", "120"))
+# "database": cuotas de proveedores compartidas entre workers; "memory": por proceso
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "database").strip().lower()
+# Guardar el resultado crudo de cada proveedor (re-merge sin red, refresco por fuente)
+SOURCE_RESULT_CACHE = os.getenv("SOURCE_RESULT_CACHE", "1").strip().lower() in {"1", "true", "yes"}
+# Benchmarks sectoriales calculados por benchmark_builder.py (sin fichero: tabla estática)
+SECTOR_BENCHMARKS_PATH = Path(os.getenv("SECTOR_BENCHMARKS_PATH", str(DATA_DIR / "sector_benchmarks.npz")))
+SECTOR_BENCHMARKS_RELOAD_SECONDS = float(os.getenv("SECTOR_BENCHMARKS_RELOAD_SECONDS", "60"))
 
 # Crear directorio de logs si no existe
 LOG_DIR.mkdir(exist_ok=True)
 
 
 app = Flask(__name__)
+
+
+# Clave: (ticker, schema_version). El TTL acota la divergencia entre workers,
+# ya que save_cache en otro proceso no invalida esta memoria.
+metrics_memory_cache = BoundedLRUCache(
+    max_entries=METRICS_LRU_MAX_ENTRIES,
+    max_bytes=int(METRICS_LRU_MAX_MB * 1024 * 1024),
+    ttl_seconds=METRICS_LRU_TTL_SECONDS,
+)
+# Clave: EquityAnalyzer.result_key (versión del motor, hash de las métricas que lee).
+# Sin TTL: el resultado es determinista para la misma clave.
+score_memo = TimedMemo(
+    BoundedLRUCache(max_entries=SCORE_MEMO_MAX_ENTRIES, max_bytes=int(SCORE_MEMO_MAX_MB * 1024 * 1024))
+)
 app.config["SECRET_KEY"] = os.getenv("RVC_SECRET_KEY", "change-me")
 
 # ============================================
@@ -97,13 +164,36 @@ logger.info(f"Nivel de logging: {LOG_LEVEL}")
 logger.info("=" * 60)
 
 data_agent = DataAgent()
+# Clasificaciones de activos con volcado diferido: volcar lo pendiente al salir
+atexit.register(data_agent.classification_cache.flush)
 investment_scorer = InvestmentScorer()
+investment_scorer.sector_normalizer.reload_if_changed(SECTOR_BENCHMARKS_PATH)
 etf_analyzer = ETFAnalyzer()
 investment_calculator = InvestmentCalculator()
 
 # Inicializar gestor de base de datos (SQLite en dev, PostgreSQL en prod)
 db_manager = get_db_manager(DB_PATH)
 logger.info(f"Modo BD: {'PostgreSQL (produccion)' if db_manager.is_production else 'SQLite (desarrollo)'}")
+# financial_cache, source_results y rvc_scores (compartidos entre workers y redeploys en PostgreSQL)
+cache_store = CacheStore(db_manager)
+if SOURCE_RESULT_CACHE:
+    data_agent.source_store = cache_store
+
+# Token buckets por proveedor/host compartidos vía BD (tabla rate_limit_buckets)
+if RATE_LIMIT_BACKEND == "database":
+    configure_rate_limiter(RateLimiter(DatabaseBucketStore(db_manager)))
+
+# Rendimiento aprendido por fuente (tabla source_stats): sobrevive a reinicios
+if PLANNER_ENABLED:
+    source_planner = SourcePlanner(DatabaseStatsStore(db_manager))
+    configure_source_planner(source_planner)
+    atexit.register(source_planner.flush)
+
+# Un solo fetch en curso por ticker; opcionalmente coordinado entre workers vía BD
+fetch_flight = SingleFlight(
+    distributed_lock=DatabaseLock(db_manager, ttl=SINGLE_FLIGHT_LOCK_TTL) if SINGLE_FLIGHT_DB_LOCK else None,
+    lock_timeout=SINGLE_FLIGHT_LOCK_TTL,
+)
 
 # ============================================
 # CONTADOR DE VISITAS - FILTRO ANTI-BOTS
@@ -136,38 +226,6 @@ def is_bot_request() -> bool:
     return False
 
 
-def init_visits_counter() -> None:
-    """Inicializa la tabla de contador de visitas."""
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS site_visits (
-                id INTEGER PRIMARY KEY,
-                total_visits INTEGER DEFAULT 0,
-                last_updated TEXT
-            )
-        ''')
-        
-        # Inicializar contador si no existe
-        cursor.execute('SELECT COUNT(*) FROM site_visits')
-        if cursor.fetchone()[0] == 0:
-            cursor.execute('''
-                INSERT INTO site_visits (id, total_visits, last_updated) 
-                VALUES (1, 0, ?)
-            ''', (datetime.now().isoformat(),))
-        
-        # Tabla para visitas diarias (opcional)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS daily_visits (
-                date TEXT PRIMARY KEY,
-                visits INTEGER DEFAULT 0
-            )
-        ''')
-        
-        conn.commit()
-
-
 def pick_metric(metrics: Dict[str, Any], keys: Iterable[str], default: Optional[float] = None):
     """Return the first non-None metric value following the provided priority order."""
     for key in keys:
@@ -178,35 +236,80 @@ def pick_metric(metrics: Dict[str, Any], keys: Iterable[str], default: Optional[
 
 
 def init_database() -> None:
-    """Ensure sqlite cache schema exists."""
+    """Ensure cache, score and visit tables exist (SQLite or PostgreSQL)."""
     DATA_DIR.mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS financial_cache (
-                ticker TEXT PRIMARY KEY,
-                data TEXT,
-                last_updated TEXT,
-                source TEXT
-            )
-            """
-        )
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS rvc_scores (
-                ticker TEXT PRIMARY KEY,
-                score REAL,
-                classification TEXT,
-                breakdown TEXT,
-                last_calculated TEXT
-            )
-            """
+    cache_store.init_tables()
+    # Tablas de visitas (y locks) gestionadas por DatabaseManager
+    db_manager.init_tables()
+
+
+def get_cached_data(ticker: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Lee la entrada de cache de ``ticker``.
+
+    Entradas más viejas que ``CACHE_EXPIRATION_HOURS`` pero dentro de
+    ``CACHE_STALE_MAX_HOURS`` se devuelven con ``stale=True`` solo si
+    ``allow_stale`` (stale-while-revalidate); pasado el máximo se eliminan.
+
+    ``metrics`` viene ya decodificado (copia superficial: no mutar valores anidados).
+    Las entradas con el esquema vigente se sirven desde la LRU en memoria.
+    """
+    memory_key = (ticker, METRIC_SCHEMA_VERSION)
+    cache_entry = metrics_memory_cache.get(memory_key)
+    if cache_entry is None:
+        row = cache_store.get_entry(ticker)
+        if not row:
+            return None
+        metrics, size = decode_payload(row[0])
+        if metrics is None:
+            logger.warning("Cache corrupto para %s; se ignorará la entrada", ticker)
+        cache_entry = {"metrics": metrics, "last_updated": row[1], "source": row[2]}
+        if metrics and metrics.get("schema_version") == METRIC_SCHEMA_VERSION:
+            metrics_memory_cache.put(memory_key, cache_entry, size=size)
+
+    if cache_expired(cache_entry["last_updated"], CACHE_STALE_MAX_HOURS):
+        logger.info(
+            "Cache expirado para %s (>%s horas); eliminando entrada.",
+            ticker,
+            CACHE_STALE_MAX_HOURS,
         )
-        conn.commit()
-    
-    # Inicializar contador de visitas
-    init_visits_counter()
+        delete_cache_entry(ticker)
+        return None
+    stale = cache_expired(cache_entry["last_updated"])
+    if stale and not allow_stale:
+        return None
+    metrics = cache_entry["metrics"]
+    return {**cache_entry, "metrics": dict(metrics) if metrics else metrics, "stale": stale}
+
+
+def invalidate_memory_cache(ticker: Optional[str] = None) -> None:
+    """Invalida la LRU en memoria para ``ticker`` (todas las versiones) o completa."""
+    if ticker is None:
+        metrics_memory_cache.clear()
+    else:
+        metrics_memory_cache.invalidate_where(lambda key: key[0] == ticker)
+
+
+def cache_expired(last_updated: str, max_age_hours: int = CACHE_EXPIRATION_HOURS) -> bool:
+    dt = datetime.fromisoformat(last_updated)
+    return datetime.now() - dt > timedelta(hours=max_age_hours)
+
+
+def delete_cache_entry(ticker: str) -> None:
+    invalidate_memory_cache(ticker)
+    cache_store.delete_entry(ticker)
+
+
+def purge_expired_cache() -> int:
+    # Las entradas stale siguen siendo servibles hasta el máximo duro
+    cutoff = datetime.now() - timedelta(hours=CACHE_STALE_MAX_HOURS)
+    removed = cache_store.purge_older_than(cutoff.isoformat(timespec="seconds"))
+    if removed:
+        invalidate_memory_cache()
+    # Los resultados por fuente se conservan mientras puedan servir para un re-merge
+    keep_hours = max([CACHE_STALE_MAX_HOURS, *SOURCE_RESULT_TTL_HOURS.values()])
+    cache_store.purge_source_results_before(time.time() - keep_hours * 3600)
+    return removed
 
 
 # Asegurar el esquema de la base de datos al importar el módulo (modo WSGI)
@@ -217,7 +320,7 @@ try:
         logger.info(
             "Limpieza inicial de cache: %s entradas eliminadas (>%s horas).",
             purged_entries,
-            CACHE_EXPIRATION_HOURS,
+            CACHE_STALE_MAX_HOURS,
         )
     logger.info("Base de datos inicializada (tablas aseguradas)")
     logger.info("Contador de visitas inicializado")
@@ -225,104 +328,201 @@ except Exception as e:
     logger.error("Error inicializando base de datos al importar: %s", e, exc_info=True)
 
 
-def get_cached_data(ticker: str) -> Optional[Dict[str, Any]]:
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT data, last_updated, source
-            FROM financial_cache
-            WHERE ticker = ?
-            """,
-            (ticker,),
-        )
-        row = cursor.fetchone()
-    if not row:
+def save_cache(ticker: str, metrics: Dict[str, Any]) -> None:
+    cache_store.save_entry(
+        ticker,
+        metrics,
+        last_updated=datetime.now().isoformat(timespec="seconds"),
+        source=metrics.get("source", "web"),
+    )
+    invalidate_memory_cache(ticker)
+
+
+def save_score(ticker: str, score: Dict[str, Any], metrics: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Guarda el score en rvc_scores.
+
+    Con ``metrics`` (acciones puntuadas) la fila queda sellada con la versión del
+    motor y el hash de entradas, y el re-scoring (rescoring.py) no la repite.
+    """
+    # Simplificar breakdown a solo scores (2 decimales, igual que el re-scoring por lotes)
+    simplified_breakdown = {}
+    for key, value in score["breakdown"].items():
+        if isinstance(value, dict) and "score" in value:
+            value = value["score"]
+        simplified_breakdown[key] = round(value, 2) if isinstance(value, float) else value
+    stamped = metrics is not None and score.get("total_score") is not None
+    cache_store.save_score(
+        ticker,
+        score["total_score"],
+        score["classification"],
+        simplified_breakdown,
+        last_calculated=datetime.now().isoformat(timespec="seconds"),
+        engine_version=investment_scorer.engine_version() if stamped else None,
+        input_hash=investment_scorer.input_hash(metrics) if stamped else None,
+    )
+
+
+def get_current_cached_metrics(ticker: str) -> Optional[Dict[str, Any]]:
+    """Métricas en cache vigentes y con el esquema actual, o None."""
+    cached = get_cached_data(ticker)
+    if not cached:
         return None
-    cache_entry = {"data": row[0], "last_updated": row[1], "source": row[2]}
-    if cache_expired(cache_entry["last_updated"]):
-        logger.info(
-            "Cache expirado para %s (>%s horas); eliminando entrada.",
-            ticker,
-            CACHE_EXPIRATION_HOURS,
-        )
-        delete_cache_entry(ticker)
+    metrics = cached["metrics"]
+    if metrics and metrics.get("asset_type") and metrics.get("schema_version") == METRIC_SCHEMA_VERSION:
+        return metrics
+    return None
+
+
+# Migración de métricas cacheadas al esquema vigente (CLI: python schema_migration.py)
+schema_migrator = SchemaMigrator(
+    cache_store,
+    upgrade=data_agent.upgrade_metrics,
+    on_migrated=lambda ticker, _metrics: invalidate_memory_cache(ticker),
+)
+
+
+def upgrade_cached_metrics(ticker: str, cached: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Lleva una entrada de cache antigua al esquema vigente sin consultar las fuentes.
+
+    Retorna None si la migración requiere un fetch (el llamador lo hace).
+    """
+    try:
+        return schema_migrator.migrate_entry(ticker, cached["metrics"], cached["last_updated"])
+    except Exception as exc:
+        logger.warning("Migración de esquema fallida para %s: %s", ticker, exc)
         return None
-    return cache_entry
 
 
-def cache_expired(last_updated: str, max_age_hours: int = CACHE_EXPIRATION_HOURS) -> bool:
-    dt = datetime.fromisoformat(last_updated)
-    return datetime.now() - dt > timedelta(hours=max_age_hours)
+def quote_expired(metrics: Dict[str, Any]) -> bool:
+    """True si los campos de cotización superan ``QUOTE_TTL_MINUTES`` (sellos en UTC)."""
+    if QUOTE_TTL_MINUTES <= 0:
+        return False
+    stamp = (metrics.get("field_updated_at") or {}).get("quote") or metrics.get("scraped_at")
+    try:
+        age = datetime.utcnow() - datetime.fromisoformat(stamp)
+    except (TypeError, ValueError):
+        return False
+    return age > timedelta(minutes=QUOTE_TTL_MINUTES)
 
 
-def delete_cache_entry(ticker: str) -> None:
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "DELETE FROM financial_cache WHERE ticker = ?",
-            (ticker,),
-        )
-        conn.commit()
+def refresh_cached_quote(ticker: str, cached: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Refresca solo la cotización de una entrada de cache (una llamada al proveedor).
+
+    Fundamentales y ``last_updated`` se conservan, así que la entrada sigue caducando
+    según ``CACHE_EXPIRATION_HOURS``. Retorna None si no hubo cotización.
+    """
 
+    def refresh() -> Optional[Dict[str, Any]]:
+        metrics = data_agent.refresh_quote(cached["metrics"])
+        if metrics and cache_store.update_payload(ticker, metrics, cached["last_updated"]):
+            invalidate_memory_cache(ticker)
+        return metrics
 
-def purge_expired_cache() -> int:
-    cutoff = datetime.now() - timedelta(hours=CACHE_EXPIRATION_HOURS)
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            DELETE FROM financial_cache
-            WHERE last_updated < ?
-            """,
-            (cutoff.isoformat(timespec="seconds"),),
-        )
-        removed = cursor.rowcount
-        conn.commit()
-    return removed
+    try:
+        metrics, _shared = fetch_flight.do(f"quote:{ticker}", refresh)
+    except Exception as exc:
+        logger.warning("Refresco de cotización fallido para %s: %s", ticker, exc)
+        return None
+    return deepcopy(metrics)
 
 
-def save_cache(ticker: str, metrics: Dict[str, Any]) -> None:
-    payload = json.dumps(metrics)
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT OR REPLACE INTO financial_cache (ticker, data, last_updated, source)
-            VALUES (?, ?, ?, ?)
-            """,
-            (
-                ticker,
-                payload,
-                datetime.now().isoformat(timespec="seconds"),
-                metrics.get("source", "web"),
-            ),
-        )
-        conn.commit()
+def fetch_fresh_metrics(ticker: str, mode: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch + save_cache coalescido por ticker (single-flight).
 
+    Las peticiones concurrentes del mismo ticker esperan al fetch en curso y
+    comparten su resultado; cada llamador recibe su propia copia. ``mode`` se
+    pasa a ``DataAgent.fetch_financial_data``.
+    """
 
-def save_score(ticker: str, score: Dict[str, Any]) -> None:
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        # Simplificar breakdown a solo scores para SQLite
-        simplified_breakdown = {
-            key: value["score"] if isinstance(value, dict) and "score" in value else value
-            for key, value in score["breakdown"].items()
-        }
-        cursor.execute(
-            """
-            INSERT OR REPLACE INTO rvc_scores (ticker, score, classification, breakdown, last_calculated)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (
-                ticker,
-                score["total_score"],
-                score["classification"],
-                json.dumps(simplified_breakdown),
-                datetime.now().isoformat(timespec="seconds"),
-            ),
-        )
-        conn.commit()
+    def fetch_and_cache() -> Optional[Dict[str, Any]]:
+        metrics = data_agent.fetch_financial_data(ticker, mode=mode)
+        if metrics:
+            save_cache(ticker, metrics)
+        return metrics
+
+    metrics, shared = fetch_flight.do(
+        ticker,
+        fetch_and_cache,
+        recheck=lambda: get_current_cached_metrics(ticker),
+    )
+    if shared:
+        logger.info("Single-flight: %s reutiliza el fetch en curso", ticker)
+    return deepcopy(metrics)
+
+
+_refresh_executor = ThreadPoolExecutor(max_workers=SWR_REFRESH_WORKERS, thread_name_prefix="swr-refresh")
+_refresh_lock = threading.Lock()
+_refresh_queued: set = set()
+
+
+def schedule_background_refresh(ticker: str) -> bool:
+    """
+    Encola un refresco en segundo plano para una entrada stale.
+
+    Retorna False si el ticker ya estaba encolado (no se duplica el trabajo).
+    """
+    with _refresh_lock:
+        if ticker in _refresh_queued:
+            return False
+        _refresh_queued.add(ticker)
+
+    def refresh() -> None:
+        try:
+            metrics = fetch_fresh_metrics(ticker)
+            if metrics:
+                logger.info("✓ Refresco en segundo plano completado: %s", ticker)
+            else:
+                logger.warning("Refresco en segundo plano sin datos: %s", ticker)
+        except Exception as exc:
+            logger.error("Error en refresco en segundo plano de %s: %s", ticker, exc, exc_info=True)
+        finally:
+            with _refresh_lock:
+                _refresh_queued.discard(ticker)
+
+    _refresh_executor.submit(refresh)
+    return True
+
+
+def _build_equity_scores(metrics: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    investment_scores = investment_scorer.calculate_all_scores(metrics)
+    # Adaptar formato de investment_scores a rvc_score para compatibilidad
+    category_info = investment_scores.get("category", {})
+    rvc_score = {
+        "total_score": investment_scores.get("investment_score"),
+        "classification": category_info.get("name", "No evaluado") if isinstance(category_info, dict) else category_info,
+        "recommendation": investment_scores.get("recommendation"),
+        "breakdown": {
+            "calidad": investment_scores["breakdown"]["quality"],
+            "valoracion": investment_scores["breakdown"]["valuation"],
+            "salud": investment_scores["breakdown"]["health"],
+            "crecimiento": investment_scores["breakdown"]["growth"],
+        },
+        "data_completeness": investment_scores.get("data_completeness", 0),
+        "confidence_level": investment_scores.get("confidence_level", "Media"),
+        "confidence_factors": investment_scores.get("confidence_factors", {}),
+    }
+    return investment_scores, rvc_score
+
+
+def score_equity(metrics: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    (investment_scores, rvc_score) de una acción, memoizados en ``score_memo``.
+
+    Métricas idénticas con la misma configuración del motor devuelven el
+    fragmento ya construido (compartido: no mutarlo). Antes comprueba si hay
+    benchmarks sectoriales nuevos: recargarlos cambia la versión del motor y,
+    con ella, la clave.
+    """
+    investment_scorer.sector_normalizer.reload_if_changed(SECTOR_BENCHMARKS_PATH, SECTOR_BENCHMARKS_RELOAD_SECONDS)
+    return score_memo.get_or_compute(
+        investment_scorer.result_key(metrics),
+        lambda: _build_equity_scores(metrics),
+        size_of=lambda fragment: len(json.dumps(fragment, default=str)),
+    )
 
 
 def prepare_analysis_response(
@@ -336,23 +536,7 @@ def prepare_analysis_response(
     etf_summary: Optional[Dict[str, Any]] = None
 
     if asset_type == "EQUITY" and analysis_allowed:
-        investment_scores = investment_scorer.calculate_all_scores(metrics)
-        # Adaptar formato de investment_scores a rvc_score para compatibilidad
-        category_info = investment_scores.get("category", {})
-        rvc_score = {
-            "total_score": investment_scores.get("investment_score"),
-            "classification": category_info.get("name", "No evaluado") if isinstance(category_info, dict) else category_info,
-            "recommendation": investment_scores.get("recommendation"),
-            "breakdown": {
-                "calidad": investment_scores["breakdown"]["quality"],
-                "valoracion": investment_scores["breakdown"]["valuation"],
-                "salud": investment_scores["breakdown"]["health"],
-                "crecimiento": investment_scores["breakdown"]["growth"],
-            },
-            "data_completeness": investment_scores.get("data_completeness", 0),
-            "confidence_level": investment_scores.get("confidence_level", "Media"),
-            "confidence_factors": investment_scores.get("confidence_factors", {}),
-        }
+        investment_scores, rvc_score = score_equity(metrics)
     elif asset_type == "ETF":
         investment_scores = None
         etf_summary = etf_analyzer.analyze(metrics)
@@ -390,7 +574,7 @@ def prepare_analysis_response(
         }
 
     if analysis_allowed and save_scores_flag:
-        save_score(ticker, rvc_score)
+        save_score(ticker, rvc_score, metrics if investment_scores is not None else None)
 
     response = {
         "ticker": ticker,
@@ -416,6 +600,20 @@ def prepare_analysis_response(
     return response
 
 
+# Refresco proactivo de la cache (ver cache_warmer.py; CLI: python cache_warmer.py)
+cache_warmer = CacheWarmer(
+    cache_store,
+    fetch=lambda ticker: fetch_fresh_metrics(ticker, mode=CACHE_WARMER_FETCH_MODE),
+    rescore=prepare_analysis_response,
+    track_calls=track_requests,
+    popularity=lambda days: get_limiter().get_ticker_popularity(days),
+    lock=DatabaseLock(db_manager, ttl=CACHE_WARMER_INTERVAL_MINUTES * 60) if CACHE_WARMER_INTERVAL_MINUTES > 0 else None,
+    prefetch=data_agent.batch_prefetch,
+)
+if CACHE_WARMER_INTERVAL_MINUTES > 0:
+    cache_warmer.start(CACHE_WARMER_INTERVAL_MINUTES, limit=CACHE_WARMER_MAX_TICKERS)
+
+
 # ============================================
 # MIDDLEWARE - CONTADOR DE VISITAS
 # ============================================
@@ -439,38 +637,35 @@ def count_visit():
             return
         
         try:
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
+            with db_manager.connection() as conn:
+                cursor = conn.cursor()
 
-            # Incrementar contador total
-            query = '''
-                UPDATE site_visits
-                SET total_visits = total_visits + 1,
-                    last_updated = ?
-                WHERE id = 1
-            '''
-            if db_manager.is_production:
-                query = query.replace('?', '%s')
-            cursor.execute(query, (datetime.now().isoformat(),))
-
-            # Incrementar contador del día
-            today = datetime.now().strftime('%Y-%m-%d')
-            if db_manager.is_production:
-                # PostgreSQL requiere EXCLUDED para valores en conflicto
-                query = '''
-                    INSERT INTO daily_visits (date, visits) VALUES (%s, 1)
-                    ON CONFLICT(date) DO UPDATE SET visits = daily_visits.visits + 1
-                '''
-            else:
-                # SQLite usa sintaxis estándar
+                # Incrementar contador total
                 query = '''
-                    INSERT INTO daily_visits (date, visits) VALUES (?, 1)
-                    ON CONFLICT(date) DO UPDATE SET visits = visits + 1
+                    UPDATE site_visits
+                    SET total_visits = total_visits + 1,
+                        last_updated = ?
+                    WHERE id = 1
                 '''
-            cursor.execute(query, (today,))
-
-            conn.commit()
-            conn.close()
+                if db_manager.is_production:
+                    query = query.replace('?', '%s')
+                cursor.execute(query, (datetime.now().isoformat(),))
+
+                # Incrementar contador del día
+                today = datetime.now().strftime('%Y-%m-%d')
+                if db_manager.is_production:
+                    # PostgreSQL requiere EXCLUDED para valores en conflicto
+                    query = '''
+                        INSERT INTO daily_visits (date, visits) VALUES (%s, 1)
+                        ON CONFLICT(date) DO UPDATE SET visits = daily_visits.visits + 1
+                    '''
+                else:
+                    # SQLite usa sintaxis estándar
+                    query = '''
+                        INSERT INTO daily_visits (date, visits) VALUES (?, 1)
+                        ON CONFLICT(date) DO UPDATE SET visits = visits + 1
+                    '''
+                cursor.execute(query, (today,))
 
             # Marcar sesión como visitada
             session['visited'] = True
@@ -530,10 +725,24 @@ def health():
     except Exception:
         providers = {"alpha_vantage": {"enabled": False}, "twelve_data": {"enabled": False}, "fmp": {"enabled": False}}
 
+    planner = get_source_planner()
+    transport = get_transport()
+    http_cache = get_http_cache()
     return jsonify({
         "status": "ok",
         "timestamp": datetime.now().isoformat(timespec="seconds"),
         "providers": providers,
+        "metrics_cache": metrics_memory_cache.stats(),
+        "score_memo": score_memo.stats(),
+        "sector_benchmarks": investment_scorer.sector_normalizer.benchmark_set.info(),
+        "db_pool": db_manager.pool.stats(),
+        "cache_warmer": cache_warmer.status(),
+        "single_flight": fetch_flight.snapshot(),
+        "rate_limits": get_rate_limiter().stats(),
+        "sources": get_breakers().snapshot(),
+        "source_planner": planner.snapshot() if planner else None,
+        "http_transport": transport.snapshot() if transport else {"mode": "live"},
+        "http_cache": http_cache.snapshot() if http_cache else None,
     })
 
 
@@ -591,24 +800,22 @@ def get_visit_count():
     Incluye visitas totales y del día actual.
     """
     try:
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-
-        # Total visitas
-        cursor.execute('SELECT total_visits FROM site_visits WHERE id = 1')
-        result = cursor.fetchone()
-        total = result[0] if result else 0
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
 
-        # Visitas del día
-        today = datetime.now().strftime('%Y-%m-%d')
-        query = 'SELECT visits FROM daily_visits WHERE date = ?'
-        if db_manager.is_production:
-            query = query.replace('?', '%s')
-        cursor.execute(query, (today,))
-        result = cursor.fetchone()
-        daily = result[0] if result else 0
+            # Total visitas
+            cursor.execute('SELECT total_visits FROM site_visits WHERE id = 1')
+            result = cursor.fetchone()
+            total = result[0] if result else 0
 
-        conn.close()
+            # Visitas del día
+            today = datetime.now().strftime('%Y-%m-%d')
+            query = 'SELECT visits FROM daily_visits WHERE date = ?'
+            if db_manager.is_production:
+                query = query.replace('?', '%s')
+            cursor.execute(query, (today,))
+            result = cursor.fetchone()
+            daily = result[0] if result else 0
 
         return jsonify({
             'visits': total,
@@ -646,7 +853,7 @@ def analyze():
             }), 429  # Too Many Requests
         
         # Registrar uso
-        limiter.track_usage(user_id, "/analyze", request.headers.get("User-Agent"))
+        limiter.track_usage(user_id, "/analyze", request.headers.get("User-Agent"), tickers=ticker)
         
     except Exception as e:
         logger.error(f"Error en verificación de límite: {e}")
@@ -658,33 +865,42 @@ def analyze():
                 ticker, request.remote_addr, limit_check.get("plan", "FREE"))
 
     try:
-        cached = get_cached_data(ticker)
+        cached = get_cached_data(ticker, allow_stale=True)
         metrics: Optional[Dict[str, Any]] = None
+        stale = False
 
-        if cached and not cache_expired(cached["last_updated"]):
-            logger.info("✓ Cache HIT - Ticker: %s | Age: %s",
+        if cached and cached["metrics"]:
+            stale = cached["stale"]
+            logger.info("✓ Cache %s - Ticker: %s | Age: %s",
+                       "STALE" if stale else "HIT",
                        ticker,
                        datetime.now() - datetime.fromisoformat(cached["last_updated"]))
-            metrics = json.loads(cached["data"])
-
-            # Verificar si necesita actualización
-            if metrics and not metrics.get("asset_type"):
-                logger.warning("Cache obsoleto (sin asset_type) - Refrescando: %s", ticker)
-                metrics = data_agent.fetch_financial_data(ticker)
-                if metrics:
-                    save_cache(ticker, metrics)
-            elif metrics and metrics.get("schema_version") != METRIC_SCHEMA_VERSION:
-                logger.warning("Cache obsoleto (schema v%s vs v%s) - Refrescando: %s",
+            metrics = cached["metrics"]
+
+            # Verificar si necesita actualización: migrar en sitio y solo si no es posible, refrescar
+            if needs_upgrade(metrics):
+                logger.warning("Cache obsoleto (schema v%s vs v%s) - Migrando: %s",
                              metrics.get("schema_version"), METRIC_SCHEMA_VERSION, ticker)
-                metrics = data_agent.fetch_financial_data(ticker)
-                if metrics:
-                    save_cache(ticker, metrics)
+                metrics = upgrade_cached_metrics(ticker, cached)
+                if metrics is None:
+                    logger.warning("Migración no posible sin fuentes - Refrescando: %s", ticker)
+                    metrics = fetch_fresh_metrics(ticker)
+                    stale = False
+                    cached = None
+                elif stale:
+                    schedule_background_refresh(ticker)
+            elif stale:
+                # Servir inmediatamente y revalidar en segundo plano
+                schedule_background_refresh(ticker)
+
+            # Cotización vencida sobre fundamentales cacheados: solo se refresca el precio
+            if cached and metrics and quote_expired(metrics):
+                logger.info("Cotización vencida - Refrescando solo precio: %s", ticker)
+                metrics = refresh_cached_quote(ticker, {**cached, "metrics": metrics}) or metrics
         else:
-            cache_status = "EXPIRED" if cached else "MISS"
-            logger.info("✗ Cache %s - Fetching fresh data: %s", cache_status, ticker)
-            metrics = data_agent.fetch_financial_data(ticker)
+            logger.info("✗ Cache MISS - Fetching fresh data: %s", ticker)
+            metrics = fetch_fresh_metrics(ticker)
             if metrics:
-                save_cache(ticker, metrics)
                 logger.info("✓ Fresh data saved to cache: %s", ticker)
 
         if not metrics:
@@ -692,6 +908,7 @@ def analyze():
             return jsonify({"error": f"No se encontraron datos suficientes para {ticker}"}), 404
 
         response = prepare_analysis_response(ticker, metrics)
+        response["stale"] = stale
 
         elapsed = (datetime.now() - start_time).total_seconds()
         # Log de score con la nueva estructura (rvc_score.total_score)
@@ -729,14 +946,11 @@ def manual_metrics():
     cached = get_cached_data(ticker)
     metrics: Optional[Dict[str, Any]] = None
     if cached:
-        try:
-            metrics = json.loads(cached["data"])
-        except (TypeError, json.JSONDecodeError):
-            metrics = None
+        metrics = cached["metrics"]
 
     if not metrics:
         logger.info("No cached metrics for %s, attempting fresh fetch before manual overrides", ticker)
-        metrics = data_agent.fetch_financial_data(ticker)
+        metrics = fetch_fresh_metrics(ticker)
         if not metrics:
             metrics = {"ticker": ticker, "warnings": [], "provenance": {}}
 
@@ -764,19 +978,7 @@ def manual_metrics():
 @app.route("/history/<ticker>")
 def history(ticker: str):
     ticker = ticker.upper()
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT score, classification, breakdown, last_calculated
-            FROM rvc_scores
-            WHERE ticker = ?
-            ORDER BY last_calculated DESC
-            LIMIT 10
-            """,
-            (ticker,),
-        )
-        rows = cursor.fetchall()
+    rows = cache_store.score_history(ticker, limit=10)
 
     history_payload = [
         {
@@ -815,26 +1017,8 @@ def top_opportunities():
         if sort_by not in valid_sort_fields:
             sort_by = 'rvc_score'
         
-        # Consulta base para obtener tickers con RVC scores
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            
-            # Query para obtener tickers con scores y sus datos financieros
-            cursor.execute("""
-                SELECT 
-                    r.ticker,
-                    r.score as rvc_score,
-                    r.classification,
-                    r.breakdown,
-                    r.last_calculated,
-                    f.data as financial_data
-                FROM rvc_scores r
-                LEFT JOIN financial_cache f ON r.ticker = f.ticker
-                WHERE r.score >= ?
-                ORDER BY r.score DESC
-            """, (min_score,))
-            
-            rows = cursor.fetchall()
+        # Tickers con scores y sus datos financieros
+        rows = cache_store.scores_with_financials(min_score)
         
         # Preparar tipo de cambio si se solicitó otra moneda
         fx_rate = None
@@ -855,10 +1039,7 @@ def top_opportunities():
             # Parse financial data si existe
             financial_metrics = {}
             if financial_data:
-                try:
-                    financial_metrics = json.loads(financial_data)
-                except (json.JSONDecodeError, TypeError):
-                    financial_metrics = {}
+                financial_metrics = decode_payload(financial_data)[0] or {}
             
             # Parse breakdown
             try:
@@ -982,20 +1163,16 @@ def clear_cache():
     payload = request.get_json(silent=True) or {}
     ticker = payload.get("ticker")
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            if ticker:
-                symbol = ticker.upper()
-                cursor.execute("DELETE FROM financial_cache WHERE ticker = ?", (symbol,))
-                cursor.execute("DELETE FROM rvc_scores WHERE ticker = ?", (symbol,))
-                conn.commit()
-                cleared = "ticker"
-            else:
-                cursor.execute("DELETE FROM financial_cache")
-                cursor.execute("DELETE FROM rvc_scores")
-                conn.commit()
-                cleared = "all"
-    except sqlite3.Error as exc:
+        if ticker:
+            symbol = ticker.upper()
+            cache_store.clear(symbol)
+            invalidate_memory_cache(symbol)
+            cleared = "ticker"
+        else:
+            cache_store.clear()
+            invalidate_memory_cache()
+            cleared = "all"
+    except Exception as exc:
         logger.error("Error clearing cache: %s", exc)
         return jsonify({"error": "No se pudo limpiar la cache"}), 500
     return jsonify({"status": "ok", "cleared": cleared})
@@ -1075,7 +1252,7 @@ def comparar():
             }), 429
         
         # Registrar uso
-        limiter.track_usage(user_id, "/api/comparar", request.headers.get("User-Agent"))
+        limiter.track_usage(user_id, "/api/comparar", request.headers.get("User-Agent"), tickers=tickers[:5])
         
     except Exception as e:
         logger.error(f"Error en verificación de límite: {e}")
@@ -1092,129 +1269,127 @@ def comparar():
     companies_data = []
     errors = []
 
-    for ticker in tickers:
-        try:
-            # 1. Obtener métricas (usar caché si disponible)
-            cached = get_cached_data(ticker)
-            metrics: Optional[Dict[str, Any]] = None
-
-            if cached and not cache_expired(cached["last_updated"]):
-                logger.info("Using cached metrics for %s", ticker)
-                metrics = json.loads(cached["data"])
-                if metrics and not metrics.get("asset_type"):
-                    logger.info("Cached metrics desactualizados para %s, recargando", ticker)
-                    metrics = data_agent.fetch_financial_data(ticker)
-                    if metrics:
-                        save_cache(ticker, metrics)
-                elif metrics and metrics.get("schema_version") != METRIC_SCHEMA_VERSION:
-                    logger.info("Actualizando métricas a esquema vigente para %s", ticker)
-                    metrics = data_agent.fetch_financial_data(ticker)
-                    if metrics:
-                        save_cache(ticker, metrics)
-            else:
-                logger.info("Fetching fresh metrics for %s", ticker)
-                metrics = data_agent.fetch_financial_data(ticker)
-                if metrics:
-                    save_cache(ticker, metrics)
-
-            if not metrics:
-                errors.append(f"No se encontraron datos para {ticker}")
-                continue
-
-            if metrics.get("asset_type") != "EQUITY" or not metrics.get("analysis_allowed", False):
-                label = metrics.get("asset_type_label") or metrics.get("asset_type") or "activo"
-                errors.append(
-                    f"{ticker} es un tipo {label}. El comparador actual solo analiza acciones individuales."
-                )
-                continue
+    # Cotizaciones y perfiles por lotes para los tickers sin cache vigente
+    pending = [ticker for ticker in tickers if get_current_cached_metrics(ticker) is None]
+    with data_agent.batch_prefetch(pending):
+        for ticker in tickers:
+            try:
+                # 1. Obtener métricas (usar caché si disponible)
+                cached = get_cached_data(ticker)
+                metrics: Optional[Dict[str, Any]] = None
+
+                if cached and not cache_expired(cached["last_updated"]):
+                    logger.info("Using cached metrics for %s", ticker)
+                    metrics = cached["metrics"]
+                    if needs_upgrade(metrics):
+                        logger.info("Actualizando métricas a esquema vigente para %s", ticker)
+                        metrics = upgrade_cached_metrics(ticker, cached) or fetch_fresh_metrics(ticker)
+                    # Cotización vencida: se puntúa y guarda el score con el precio actual
+                    if metrics and quote_expired(metrics):
+                        logger.info("Cotización vencida - Refrescando solo precio: %s", ticker)
+                        metrics = refresh_cached_quote(ticker, {**cached, "metrics": metrics}) or metrics
+                else:
+                    logger.info("Fetching fresh metrics for %s", ticker)
+                    metrics = fetch_fresh_metrics(ticker)
+
+                if not metrics:
+                    errors.append(f"No se encontraron datos para {ticker}")
+                    continue
+
+                if metrics.get("asset_type") != "EQUITY" or not metrics.get("analysis_allowed", False):
+                    label = metrics.get("asset_type_label") or metrics.get("asset_type") or "activo"
+                    errors.append(
+                        f"{ticker} es un tipo {label}. El comparador actual solo analiza acciones individuales."
+                    )
+                    continue
 
-            # 2. Calcular scores con el nuevo motor
-            scores = investment_scorer.calculate_all_scores(metrics)
+                # 2. Calcular scores con el nuevo motor (memoizados)
+                scores, _ = score_equity(metrics)
             
-            # 2.1 Guardar scores en BD para que aparezcan en el Ranking
-            try:
-                score_data = {
-                    "total_score": scores["investment_score"],
-                    "classification": scores["category"]["name"],
-                    "breakdown": {
-                        "quality": scores["quality_score"],
-                        "valuation": scores["valuation_score"],
-                        "health": scores["financial_health_score"],
-                        "growth": scores["growth_score"]
+                # 2.1 Guardar scores en BD para que aparezcan en el Ranking
+                try:
+                    score_data = {
+                        "total_score": scores["investment_score"],
+                        "classification": scores["category"]["name"],
+                        "breakdown": {
+                            "quality": scores["quality_score"],
+                            "valuation": scores["valuation_score"],
+                            "health": scores["financial_health_score"],
+                            "growth": scores["growth_score"]
+                        }
                     }
-                }
-                save_score(ticker, score_data)
-                logger.info("✓ Scores guardados en BD para %s (desde comparador)", ticker)
-            except Exception as save_err:
-                logger.warning("No se pudieron guardar scores para %s: %s", ticker, save_err)
-
-            # 3. Compilar datos
-            company_data = {
-                "ticker": ticker,
-                "company_name": metrics.get("company_name", "N/A"),
-                "sector": metrics.get("sector", "Desconocido"),
-                "current_price": metrics.get("current_price"),
-                "market_cap": metrics.get("market_cap"),
-                "currency": metrics.get("currency"),
-                "price_currency": metrics.get("price_currency"),
-                "price_converted": metrics.get("price_converted"),
-                "market_cap_converted": metrics.get("market_cap_converted"),
-                "exchange_rates": metrics.get("exchange_rates"),
-                "primary_source": metrics.get("primary_source"),
-
-                # Scores principales
-                "quality_score": scores["quality_score"],
-                "valuation_score": scores["valuation_score"],
-                "financial_health_score": scores["financial_health_score"],
-                "growth_score": scores["growth_score"],
-                "investment_score": scores["investment_score"],
-
-                # Categorización y recomendación
-                "category": scores["category"],
-                "recommendation": scores["recommendation"],
-                "confidence_level": scores["confidence_level"],
-
-                # Métricas clave para la tabla
-                "metrics": {
-                    "pe_ratio": metrics.get("pe_ratio"),
-                    "peg_ratio": metrics.get("peg_ratio"),
-                    "price_to_book": metrics.get("price_to_book"),
-                    "roe": metrics.get("roe"),
-                    "roic": metrics.get("roic"),
-                    "operating_margin": metrics.get("operating_margin"),
-                    "net_margin": metrics.get("net_margin"),
-                    "debt_to_equity": metrics.get("debt_to_equity"),
-                    "current_ratio": metrics.get("current_ratio"),
-                    "quick_ratio": metrics.get("quick_ratio"),
-                    "revenue_growth": pick_metric(
-                        metrics,
-                        (
-                            "revenue_growth_5y",
-                            "revenue_growth",
-                            "revenue_growth_qoq",
+                    save_score(ticker, score_data, metrics)
+                    logger.info("✓ Scores guardados en BD para %s (desde comparador)", ticker)
+                except Exception as save_err:
+                    logger.warning("No se pudieron guardar scores para %s: %s", ticker, save_err)
+
+                # 3. Compilar datos
+                company_data = {
+                    "ticker": ticker,
+                    "company_name": metrics.get("company_name", "N/A"),
+                    "sector": metrics.get("sector", "Desconocido"),
+                    "current_price": metrics.get("current_price"),
+                    "market_cap": metrics.get("market_cap"),
+                    "currency": metrics.get("currency"),
+                    "price_currency": metrics.get("price_currency"),
+                    "price_converted": metrics.get("price_converted"),
+                    "market_cap_converted": metrics.get("market_cap_converted"),
+                    "exchange_rates": metrics.get("exchange_rates"),
+                    "primary_source": metrics.get("primary_source"),
+
+                    # Scores principales
+                    "quality_score": scores["quality_score"],
+                    "valuation_score": scores["valuation_score"],
+                    "financial_health_score": scores["financial_health_score"],
+                    "growth_score": scores["growth_score"],
+                    "investment_score": scores["investment_score"],
+
+                    # Categorización y recomendación
+                    "category": scores["category"],
+                    "recommendation": scores["recommendation"],
+                    "confidence_level": scores["confidence_level"],
+
+                    # Métricas clave para la tabla
+                    "metrics": {
+                        "pe_ratio": metrics.get("pe_ratio"),
+                        "peg_ratio": metrics.get("peg_ratio"),
+                        "price_to_book": metrics.get("price_to_book"),
+                        "roe": metrics.get("roe"),
+                        "roic": metrics.get("roic"),
+                        "operating_margin": metrics.get("operating_margin"),
+                        "net_margin": metrics.get("net_margin"),
+                        "debt_to_equity": metrics.get("debt_to_equity"),
+                        "current_ratio": metrics.get("current_ratio"),
+                        "quick_ratio": metrics.get("quick_ratio"),
+                        "revenue_growth": pick_metric(
+                            metrics,
+                            (
+                                "revenue_growth_5y",
+                                "revenue_growth",
+                                "revenue_growth_qoq",
+                            ),
                         ),
-                    ),
-                    "earnings_growth": pick_metric(
-                        metrics,
-                        (
-                            "earnings_growth_this_y",
-                            "earnings_growth_next_y",
-                            "earnings_growth_next_5y",
-                            "earnings_growth_qoq",
-                            "earnings_growth",
+                        "earnings_growth": pick_metric(
+                            metrics,
+                            (
+                                "earnings_growth_this_y",
+                                "earnings_growth_next_y",
+                                "earnings_growth_next_5y",
+                                "earnings_growth_qoq",
+                                "earnings_growth",
+                            ),
                         ),
-                    ),
-                },
+                    },
 
-                # Breakdown detallado
-                "breakdown": scores["breakdown"],
-            }
+                    # Breakdown detallado
+                    "breakdown": scores["breakdown"],
+                }
 
-            companies_data.append(company_data)
+                companies_data.append(company_data)
 
-        except Exception as e:
-            logger.error(f"Error analyzing {ticker}: {e}")
-            errors.append(f"Error al analizar {ticker}: {str(e)}")
+            except Exception as e:
+                logger.error(f"Error analyzing {ticker}: {e}")
+                errors.append(f"Error al analizar {ticker}: {str(e)}")
 
     if not companies_data:
         return jsonify({
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmarks sectoriales calculados sobre el universo en cache.
+
+``SECTOR_BENCHMARKS`` es una tabla escrita a mano (media/std de 11 sectores).
+Este job recorre financial_cache por lotes y calcula, por sector principal y
+por industria, la distribución de cada métrica con benchmark: media y std
+winsorizadas (recorte ``WINSOR_LIMITS``) y cuantiles empíricos para percentiles
+exactos. El resultado se guarda de forma atómica en un ``.npz`` compacto que la
+app recarga sola al cambiar (``SectorNormalizer.reload_if_changed``). Los grupos
+con menos de ``--min-samples`` valores no se guardan y siguen usando la tabla
+estática.
+
+Como la versión del set entra en ``EquityAnalyzer.engine_version``, tras
+regenerar el fichero conviene ejecutar ``python rescoring.py``.
+
+Uso (CLI):
+    python benchmark_builder.py                   # escribe data/sector_benchmarks.npz
+    python benchmark_builder.py --min-samples 50  # grupos más exigentes
+    python benchmark_builder.py --dry-run         # solo resume, sin escribir
+"""
+
+import argparse
+import logging
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analyzers.sector_benchmarks import (
+    SECTOR_BENCHMARKS,
+    industry_key,
+    primary_sector,
+    robust_stats,
+    save_benchmark_set,
+)
+from cache_store import decode_payload
+from metric_normalizer import PERIOD_HIERARCHY, MetricNormalizer
+
+logger = logging.getLogger(__name__)
+
+# Métricas con benchmark en la tabla estática (las mismas se calculan desde los datos)
+BENCHMARK_METRICS = tuple(sorted({metric for metrics in SECTOR_BENCHMARKS.values() for metric in metrics}))
+DEFAULT_MIN_SAMPLES = 30
+
+GroupKey = Tuple[str, str, str]
+
+
+def _metric_fields() -> List[str]:
+    """Columnas de financial_cache que alimentan ``BENCHMARK_METRICS`` (con sufijos de período)."""
+    return [
+        f"{metric}_{period.lower()}" for metric in BENCHMARK_METRICS for period in PERIOD_HIERARCHY
+    ] + list(BENCHMARK_METRICS)
+
+
+class BenchmarkBuilder:
+    """
+    Calcula benchmarks por sector e industria desde financial_cache.
+
+    Args:
+        store: ``CacheStore`` con financial_cache
+        min_samples: Valores mínimos por grupo y métrica para guardar el benchmark
+    """
+
+    def __init__(self, store, min_samples: int = DEFAULT_MIN_SAMPLES):
+        self.store = store
+        self.min_samples = max(2, min_samples)
+        self.normalizer = MetricNormalizer()
+
+    def _collect(self, batch_size: int, report: Dict[str, Any]) -> pd.DataFrame:
+        """Una fila por acción analizable con sector, industria y métricas crudas."""
+        fields = _metric_fields()
+        rows = []
+        for ticker, payload, _last_updated, _source in self.store.iter_entries(batch_size):
+            report["scanned"] += 1
+            metrics, _ = decode_payload(payload)
+            if metrics is None:
+                report["corrupt"] += 1
+                continue
+            if metrics.get("asset_type") != "EQUITY" or not metrics.get("analysis_allowed", False):
+                report["skipped"] += 1
+                continue
+            row = {field: metrics[field] for field in fields if metrics.get(field) is not None}
+            row["sector"] = primary_sector(metrics.get("sector"))
+            row["industry"] = industry_key(metrics.get("industry"))
+            rows.append(row)
+        report["equities"] = len(rows)
+        return pd.DataFrame(rows, columns=fields + ["sector", "industry"])
+
+    def _group_values(self, frame: pd.DataFrame) -> Dict[GroupKey, np.ndarray]:
+        """``(nivel, grupo, métrica) -> valores`` normalizados por período, sin NaN/inf."""
+        normalized = self.normalizer.normalize_columns(frame, BENCHMARK_METRICS)
+        samples: Dict[GroupKey, np.ndarray] = {}
+        for level in ("sector", "industry"):
+            labels = frame[level]
+            # Filas sin grupo ("Unknown"/None) no forman benchmark
+            grouped = frame[labels.notna() & (labels != "Unknown")].groupby(level)
+            for group, index in grouped.groups.items():
+                block = normalized.loc[index]
+                for metric in BENCHMARK_METRICS:
+                    values = block[metric].to_numpy(dtype=float)
+                    samples[(level, group, metric)] = values[np.isfinite(values)]
+        return samples
+
+    def build(self, batch_size: int = 500) -> Tuple[Dict[GroupKey, Tuple[Dict[str, float], np.ndarray]], Dict[str, Any]]:
+        """
+        Recorre financial_cache y calcula los benchmarks.
+
+        Returns:
+            (grupos para ``save_benchmark_set``, informe)
+        """
+        report: Dict[str, Any] = {
+            "scanned": 0, "equities": 0, "skipped": 0, "corrupt": 0,
+            "sectors": 0, "industries": 0, "groups": 0, "below_min_samples": 0,
+        }
+        frame = self._collect(batch_size, report)
+
+        groups: Dict[GroupKey, Tuple[Dict[str, float], np.ndarray]] = {}
+        if len(frame):
+            for key, values in self._group_values(frame).items():
+                if len(values) < self.min_samples:
+                    report["below_min_samples"] += int(len(values) > 0)
+                    continue
+                groups[key] = robust_stats(values)
+
+        counts: Dict[str, set] = defaultdict(set)
+        for level, group, _metric in groups:
+            counts[level].add(group)
+        report["sectors"] = len(counts["sector"])
+        report["industries"] = len(counts["industry"])
+        report["groups"] = len(groups)
+        return groups, report
+
+    def run(self, path: Path, batch_size: int = 500, dry_run: bool = False) -> Dict[str, Any]:
+        """Calcula los benchmarks y, salvo ``dry_run``, los escribe en ``path``."""
+        groups, report = self.build(batch_size)
+        report["path"] = str(path)
+        report["version"] = None
+        if not groups:
+            logger.warning("Benchmarks: ningún grupo alcanza %s muestras; no se escribe %s", self.min_samples, path)
+        elif not dry_run:
+            report["version"] = save_benchmark_set(groups, path, built_at=datetime.now().isoformat(timespec="seconds"))
+        logger.info(
+            "Benchmarks %s: %s acciones, %s sectores, %s industrias (%s grupos, %s por debajo del mínimo)",
+            report["version"] or "(sin escribir)",
+            report["equities"],
+            report["sectors"],
+            report["industries"],
+            report["groups"],
+            report["below_min_samples"],
+        )
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Calcula benchmarks sectoriales desde financial_cache sin red")
+    parser.add_argument("--output", type=Path, default=None, help="Fichero .npz destino (por defecto SECTOR_BENCHMARKS_PATH)")
+    parser.add_argument("--min-samples", type=int, default=DEFAULT_MIN_SAMPLES, help="Valores mínimos por grupo y métrica")
+    parser.add_argument("--batch-size", type=int, default=500, help="Filas leídas por lote")
+    parser.add_argument("--dry-run", action="store_true", help="Solo calcular y resumir, sin escribir")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # Reutiliza el cableado de la app: misma BD y misma ruta de benchmarks
+    import app as rvc_app
+
+    builder = BenchmarkBuilder(rvc_app.cache_store, min_samples=args.min_samples)
+    report = builder.run(args.output or rvc_app.SECTOR_BENCHMARKS_PATH, max(1, args.batch_size), args.dry_run)
+    print(
+        f"Versión: {report['version'] or '-'} | Acciones: {report['equities']} | "
+        f"Sectores: {report['sectors']} | Industrias: {report['industries']} | "
+        f"Grupos: {report['groups']} | Bajo mínimo: {report['below_min_samples']} | Corruptas: {report['corrupt']}"
+    )
+    if report["version"]:
+        print("Ejecuta 'python rescoring.py' para re-puntuar con los nuevos benchmarks.")
+    return 0 if report["groups"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Almacenamiento de financial_cache, source_results y rvc_scores sobre DatabaseManager.
+
+Mismo código para SQLite (desarrollo) y PostgreSQL (producción), de modo que
+en producción la cache sobrevive a los redeploys y se comparte entre workers.
+Con ``CACHE_JSONB=1`` (solo PostgreSQL) el payload de métricas se guarda como
+JSONB en lugar de TEXT.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+CACHE_JSONB = os.getenv("CACHE_JSONB", "0").strip().lower() in {"1", "true", "yes"}
+
+
+def decode_payload(payload: Any) -> Tuple[Optional[Dict[str, Any]], int]:
+    """
+    Decodifica el payload de financial_cache (TEXT o JSONB).
+
+    Returns:
+        Tupla (métricas o None si el JSON es inválido, tamaño aproximado en bytes)
+    """
+    if payload is None:
+        return None, 0
+    if isinstance(payload, dict):
+        # psycopg2 ya decodifica JSONB; el tamaño se estima re-serializando
+        return payload, len(json.dumps(payload))
+    try:
+        return json.loads(payload), len(payload)
+    except (TypeError, json.JSONDecodeError):
+        return None, len(payload) if isinstance(payload, (str, bytes)) else 0
+
+
+class CacheStore:
+    """
+    Acceso a las tablas financial_cache, source_results y rvc_scores.
+
+    Las fechas se guardan como texto ISO en ambos motores para conservar la
+    comparación lexicográfica y ``datetime.fromisoformat`` del código existente.
+    """
+
+    def __init__(self, db: DatabaseManager, use_jsonb: bool = CACHE_JSONB):
+        self.db = db
+        self.use_jsonb = bool(use_jsonb and db.is_production)
+
+    def init_tables(self) -> None:
+        """Crea las tablas de cache y scores si no existen."""
+        data_type = "JSONB" if self.use_jsonb else "TEXT"
+        score_type = "DOUBLE PRECISION" if self.db.is_production else "REAL"
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS financial_cache (
+                        ticker TEXT PRIMARY KEY,
+                        data {data_type},
+                        last_updated TEXT,
+                        source TEXT
+                    )
+                    """
+                )
+                # Resultado crudo de cada proveedor (re-merge sin red, TTL por fuente)
+                cursor.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS source_results (
+                        ticker TEXT NOT NULL,
+                        provider TEXT NOT NULL,
+                        source TEXT,
+                        data TEXT,
+                        coverage INTEGER,
+                        provenance TEXT,
+                        fetched_at {score_type},
+                        PRIMARY KEY (ticker, provider)
+                    )
+                    """
+                )
+                cursor.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS rvc_scores (
+                        ticker TEXT PRIMARY KEY,
+                        score {score_type},
+                        classification TEXT,
+                        breakdown TEXT,
+                        last_calculated TEXT,
+                        engine_version TEXT,
+                        input_hash TEXT
+                    )
+                    """
+                )
+                self._ensure_score_stamp_columns(cursor)
+            finally:
+                cursor.close()
+
+    def _ensure_score_stamp_columns(self, cursor) -> None:
+        """Agrega engine_version/input_hash a tablas rvc_scores creadas antes de existir."""
+        if self.db.is_production:
+            cursor.execute("ALTER TABLE rvc_scores ADD COLUMN IF NOT EXISTS engine_version TEXT")
+            cursor.execute("ALTER TABLE rvc_scores ADD COLUMN IF NOT EXISTS input_hash TEXT")
+            return
+        cursor.execute("PRAGMA table_info(rvc_scores)")
+        columns = {col[1] for col in cursor.fetchall()}
+        for column in ("engine_version", "input_hash"):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE rvc_scores ADD COLUMN {column} TEXT")
+                logger.info("Columna %s agregada a rvc_scores", column)
+
+    # -------------------------------
+    # financial_cache
+    # -------------------------------
+
+    def get_entry(self, ticker: str) -> Optional[Tuple[Any, str, Optional[str]]]:
+        """Retorna (payload, last_updated, source) o None."""
+        rows = self.db.execute_query(
+            "SELECT data, last_updated, source FROM financial_cache WHERE ticker = ?",
+            (ticker,),
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        return row[0], row[1], row[2]
+
+    def save_entry(self, ticker: str, metrics: Dict[str, Any], last_updated: str, source: str) -> None:
+        self.db.execute_update(
+            """
+            INSERT INTO financial_cache (ticker, data, last_updated, source)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (ticker) DO UPDATE SET
+                data = excluded.data,
+                last_updated = excluded.last_updated,
+                source = excluded.source
+            """,
+            (ticker, json.dumps(metrics), last_updated, source),
+        )
+
+    def update_payload(self, ticker: str, metrics: Dict[str, Any], last_updated: str) -> bool:
+        """
+        Reescribe las métricas de ``ticker`` conservando ``last_updated``.
+
+        Solo si la fila sigue teniendo ese ``last_updated``: un fetch concurrente
+        más reciente no se pisa. Retorna True si se actualizó.
+        """
+        updated = self.db.execute_update(
+            "UPDATE financial_cache SET data = ? WHERE ticker = ? AND last_updated = ?",
+            (json.dumps(metrics), ticker, last_updated),
+        )
+        return updated == 1
+
+    def iter_entries(self, batch_size: int = 200) -> Iterator[Tuple[str, Any, str, Optional[str]]]:
+        """Recorre financial_cache por lotes ordenados por ticker: (ticker, payload, last_updated, source)."""
+        last_ticker = ""
+        while True:
+            rows = self.db.execute_query(
+                """
+                SELECT ticker, data, last_updated, source FROM financial_cache
+                WHERE ticker > ?
+                ORDER BY ticker
+                LIMIT ?
+                """,
+                (last_ticker, batch_size),
+            )
+            for row in rows:
+                yield row[0], row[1], row[2], row[3]
+            if len(rows) < batch_size:
+                return
+            last_ticker = rows[-1][0]
+
+    def count_entries(self) -> int:
+        rows = self.db.execute_query("SELECT COUNT(*) FROM financial_cache")
+        return int(rows[0][0]) if rows else 0
+
+    def delete_entry(self, ticker: str) -> int:
+        return self.db.execute_update("DELETE FROM financial_cache WHERE ticker = ?", (ticker,))
+
+    def purge_older_than(self, cutoff: str) -> int:
+        return self.db.execute_update("DELETE FROM financial_cache WHERE last_updated < ?", (cutoff,))
+
+    def clear(self, ticker: Optional[str] = None) -> None:
+        """Elimina cache, resultados por fuente y scores de ``ticker`` o de todos los tickers."""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if ticker:
+                    cursor.execute(self.db.adapt_query("DELETE FROM financial_cache WHERE ticker = ?"), (ticker,))
+                    cursor.execute(self.db.adapt_query("DELETE FROM source_results WHERE ticker = ?"), (ticker,))
+                    cursor.execute(self.db.adapt_query("DELETE FROM rvc_scores WHERE ticker = ?"), (ticker,))
+                else:
+                    cursor.execute("DELETE FROM financial_cache")
+                    cursor.execute("DELETE FROM source_results")
+                    cursor.execute("DELETE FROM rvc_scores")
+            finally:
+                cursor.close()
+
+    # -------------------------------
+    # source_results
+    # -------------------------------
+
+    def get_source_results(self, ticker: str) -> List[Tuple[str, str, Dict[str, Any], int, Dict[str, str], float]]:
+        """
+        Resultados guardados de cada proveedor para ``ticker``.
+
+        Returns:
+            Lista de (provider, source, data, coverage, provenance, fetched_at);
+            las filas con JSON inválido se omiten.
+        """
+        rows = self.db.execute_query(
+            """
+            SELECT provider, source, data, coverage, provenance, fetched_at
+            FROM source_results WHERE ticker = ?
+            """,
+            (ticker,),
+        )
+        results = []
+        for provider, source, data, coverage, provenance, fetched_at in rows:
+            try:
+                decoded = json.loads(data)
+                decoded_provenance = json.loads(provenance) if provenance else {}
+            except (TypeError, json.JSONDecodeError):
+                logger.warning("Resultado de %s para %s corrupto; se ignora", provider, ticker)
+                continue
+            results.append((provider, source, decoded, int(coverage or 0), decoded_provenance, float(fetched_at or 0)))
+        return results
+
+    def save_source_results(
+        self,
+        ticker: str,
+        results: Iterable[Tuple[str, str, Dict[str, Any], int, Dict[str, str], float]],
+    ) -> None:
+        """Guarda (provider, source, data, coverage, provenance, fetched_at) en una transacción."""
+        query = self.db.adapt_query(
+            """
+            INSERT INTO source_results (ticker, provider, source, data, coverage, provenance, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (ticker, provider) DO UPDATE SET
+                source = excluded.source,
+                data = excluded.data,
+                coverage = excluded.coverage,
+                provenance = excluded.provenance,
+                fetched_at = excluded.fetched_at
+            """
+        )
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for provider, source, data, coverage, provenance, fetched_at in results:
+                    cursor.execute(
+                        query,
+                        (
+                            ticker,
+                            provider,
+                            source,
+                            json.dumps(data, separators=(",", ":")),
+                            coverage,
+                            json.dumps(provenance, separators=(",", ":")),
+                            fetched_at,
+                        ),
+                    )
+            finally:
+                cursor.close()
+
+    def purge_source_results_before(self, fetched_before: float) -> int:
+        """Elimina resultados por fuente obtenidos antes de ``fetched_before`` (epoch)."""
+        return self.db.execute_update("DELETE FROM source_results WHERE fetched_at < ?", (fetched_before,))
+
+    # -------------------------------
+    # rvc_scores
+    # -------------------------------
+
+    _SAVE_SCORE_QUERY = """
+        INSERT INTO rvc_scores (ticker, score, classification, breakdown, last_calculated, engine_version, input_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (ticker) DO UPDATE SET
+            score = excluded.score,
+            classification = excluded.classification,
+            breakdown = excluded.breakdown,
+            last_calculated = excluded.last_calculated,
+            engine_version = excluded.engine_version,
+            input_hash = excluded.input_hash
+    """
+
+    def save_score(
+        self,
+        ticker: str,
+        score: Optional[float],
+        classification: Optional[str],
+        breakdown: Dict[str, Any],
+        last_calculated: str,
+        engine_version: Optional[str] = None,
+        input_hash: Optional[str] = None,
+    ) -> None:
+        self.db.execute_update(
+            self._SAVE_SCORE_QUERY,
+            (ticker, score, classification, json.dumps(breakdown), last_calculated, engine_version, input_hash),
+        )
+
+    def save_scores(
+        self,
+        rows: Iterable[Tuple[str, Optional[float], Optional[str], Dict[str, Any], str, Optional[str], Optional[str]]],
+    ) -> None:
+        """Guarda (ticker, score, classification, breakdown, last_calculated, engine_version, input_hash) en una transacción."""
+        query = self.db.adapt_query(self._SAVE_SCORE_QUERY)
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for ticker, score, classification, breakdown, last_calculated, engine_version, input_hash in rows:
+                    cursor.execute(
+                        query,
+                        (ticker, score, classification, json.dumps(breakdown), last_calculated, engine_version, input_hash),
+                    )
+            finally:
+                cursor.close()
+
+    def score_stamps(self, tickers: Sequence[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """``ticker -> (engine_version, input_hash)`` de los scores guardados de ``tickers``."""
+        if not tickers:
+            return {}
+        placeholders = ", ".join("?" for _ in tickers)
+        rows = self.db.execute_query(
+            f"SELECT ticker, engine_version, input_hash FROM rvc_scores WHERE ticker IN ({placeholders})",
+            tuple(tickers),
+        )
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def score_history(self, ticker: str, limit: int = 10) -> List[Tuple]:
+        return self.db.execute_query(
+            """
+            SELECT score, classification, breakdown, last_calculated
+            FROM rvc_scores
+            WHERE ticker = ?
+            ORDER BY last_calculated DESC
+            LIMIT ?
+            """,
+            (ticker, limit),
+        )
+
+    def scores_with_financials(self, min_score: float) -> List[Tuple]:
+        """Scores >= min_score con el payload de métricas asociado (o None)."""
+        return self.db.execute_query(
+            """
+            SELECT
+                r.ticker,
+                r.score as rvc_score,
+                r.classification,
+                r.breakdown,
+                r.last_calculated,
+                f.data as financial_data
+            FROM rvc_scores r
+            LEFT JOIN financial_cache f ON r.ticker = f.ticker
+            WHERE r.score >= ?
+            ORDER BY r.score DESC
+            """,
+            (min_score,),
+        )
+
+    def refresh_candidates(self) -> List[Tuple[str, Optional[str]]]:
+        """
+        Tickers en cache o con score guardado, con su ``last_updated``.
+
+        Los tickers con score pero sin métricas en cache vienen con None.
+        """
+        rows = self.db.execute_query(
+            """
+            SELECT ticker, last_updated FROM financial_cache
+            UNION
+            SELECT r.ticker, NULL FROM rvc_scores r
+            WHERE NOT EXISTS (SELECT 1 FROM financial_cache f WHERE f.ticker = r.ticker)
+            """
+        )
+        return [(row[0], row[1]) for row in rows]
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Refresco proactivo de la cache (cache warmer).
+
+Recorre ``financial_cache`` / ``rvc_scores`` priorizando los tickers más
+consultados (``usage_tracking``) y los más antiguos, los vuelve a obtener con
+``DataAgent`` respetando un presupuesto de peticiones por proveedor y recalcula
+su score con ``EquityAnalyzer``. Así el universo de Top Opportunities se
+mantiene caliente sin que el primer visitante pague la cascada de fuentes.
+
+Uso (CLI):
+    python cache_warmer.py                      # refresca hasta CACHE_WARMER_MAX_TICKERS
+    python cache_warmer.py --limit 20 --budget fmp=80,alpha_vantage=10
+    python cache_warmer.py --dry-run            # solo muestra el plan
+
+En la app, ``CACHE_WARMER_INTERVAL_MINUTES > 0`` arranca un hilo programado.
+"""
+
+import argparse
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_WARMER_INTERVAL_MINUTES = float(os.getenv("CACHE_WARMER_INTERVAL_MINUTES", "0"))
+CACHE_WARMER_MAX_TICKERS = int(os.getenv("CACHE_WARMER_MAX_TICKERS", "50"))
+CACHE_WARMER_REFRESH_AFTER_HOURS = float(os.getenv("CACHE_WARMER_REFRESH_AFTER_HOURS", "18"))
+CACHE_WARMER_POPULARITY_DAYS = int(os.getenv("CACHE_WARMER_POPULARITY_DAYS", "7"))
+# Peticiones por proveedor y ejecución; los proveedores no listados no tienen límite
+CACHE_WARMER_BUDGET = os.getenv("CACHE_WARMER_BUDGET", "fmp=200,alpha_vantage=20,twelve_data=100")
+# "adaptive" solo consulta las fuentes necesarias, en el orden más barato aprendido
+CACHE_WARMER_FETCH_MODE = os.getenv("CACHE_WARMER_FETCH_MODE", "adaptive").strip().lower()
+
+WARMER_LOCK_KEY = "cache-warmer"
+
+
+def parse_budget(spec: Optional[str]) -> Dict[str, int]:
+    """Convierte ``"fmp=200,alpha_vantage=20"`` en ``{"fmp": 200, "alpha_vantage": 20}``."""
+    budget: Dict[str, int] = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Presupuesto inválido: {item!r} (formato proveedor=peticiones)")
+        budget[name.strip()] = int(value)
+    return budget
+
+
+class ProviderBudget:
+    """Presupuesto de peticiones por proveedor para una ejecución del warmer."""
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limits = dict(limits)
+        self.used: Counter = Counter()
+
+    def charge(self, calls: Dict[str, int]) -> None:
+        self.used.update(calls)
+
+    def exhausted(self) -> List[str]:
+        """Proveedores sin presupuesto restante."""
+        return sorted(name for name, limit in self.limits.items() if self.used[name] >= limit)
+
+    def remaining(self) -> Dict[str, int]:
+        return {name: max(0, limit - self.used[name]) for name, limit in self.limits.items()}
+
+
+@dataclass
+class WarmCandidate:
+    ticker: str
+    last_updated: Optional[str]
+    age_hours: float
+    popularity: int
+
+
+class CacheWarmer:
+    """
+    Refresca las entradas populares y antiguas de la cache.
+
+    Args:
+        store: ``CacheStore`` con financial_cache / rvc_scores
+        fetch: Obtiene y guarda métricas frescas de un ticker
+        rescore: Recalcula y guarda el score de ``(ticker, metrics)``
+        track_calls: Context manager que cuenta las peticiones enviadas a cada
+                     proveedor (``services.rate_limit.track_requests``)
+        popularity: ``days -> {ticker: consultas}`` (``UsageLimiter.get_ticker_popularity``)
+        lock: ``DatabaseLock`` opcional para que un solo worker ejecute cada intervalo
+        prefetch: Context manager opcional que pide por lotes los datos de todos los
+                  candidatos antes de refrescarlos (``DataAgent.batch_prefetch``)
+    """
+
+    def __init__(
+        self,
+        store,
+        fetch: Callable[[str], Optional[Dict[str, Any]]],
+        rescore: Callable[[str, Dict[str, Any]], Any],
+        track_calls: Callable[[], ContextManager[Counter]],
+        popularity: Optional[Callable[[int], Dict[str, int]]] = None,
+        budget: Optional[Dict[str, int]] = None,
+        refresh_after_hours: float = CACHE_WARMER_REFRESH_AFTER_HOURS,
+        popularity_days: int = CACHE_WARMER_POPULARITY_DAYS,
+        lock=None,
+        prefetch: Optional[Callable[[List[str]], ContextManager[Any]]] = None,
+    ):
+        self.store = store
+        self.fetch = fetch
+        self.rescore = rescore
+        self.track_calls = track_calls
+        self.popularity = popularity
+        self.budget_limits = parse_budget(CACHE_WARMER_BUDGET) if budget is None else dict(budget)
+        self.refresh_after_hours = refresh_after_hours
+        self.popularity_days = popularity_days
+        self.lock = lock
+        self.prefetch = prefetch
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def plan(self, limit: int = CACHE_WARMER_MAX_TICKERS) -> List[WarmCandidate]:
+        """Tickers a refrescar: más populares primero y, a igual popularidad, los más antiguos."""
+        popularity: Dict[str, int] = {}
+        if self.popularity is not None:
+            try:
+                popularity = self.popularity(self.popularity_days) or {}
+            except Exception as exc:
+                logger.warning("Popularidad no disponible para el warmer: %s", exc)
+
+        now = datetime.now()
+        candidates = []
+        for ticker, last_updated in self.store.refresh_candidates():
+            age_hours = math.inf
+            if last_updated:
+                try:
+                    age_hours = (now - datetime.fromisoformat(last_updated)).total_seconds() / 3600
+                except ValueError:
+                    pass
+            if age_hours < self.refresh_after_hours:
+                continue
+            candidates.append(WarmCandidate(ticker, last_updated, age_hours, popularity.get(ticker, 0)))
+
+        candidates.sort(key=lambda c: (-c.popularity, -c.age_hours, c.ticker))
+        return candidates[: max(0, limit)]
+
+    def run(self, limit: int = CACHE_WARMER_MAX_TICKERS, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Ejecuta una pasada del warmer.
+
+        Se detiene al agotarse el presupuesto de cualquier proveedor, ya que la
+        cascada de fuentes volvería a consultarlo en el siguiente ticker.
+        """
+        # El lock no se libera: expira con su TTL (= intervalo) y así marca entre
+        # workers que esta pasada ya se ejecutó
+        if self.lock is not None and not dry_run:
+            try:
+                acquired = self.lock.try_acquire(WARMER_LOCK_KEY)
+            except Exception as exc:
+                logger.warning("Lock del warmer no disponible: %s", exc)
+                acquired = True
+            if not acquired:
+                logger.info("Cache warmer: otra instancia ya se ejecutó en este intervalo")
+                return {"skipped": "locked"}
+
+        started = time.monotonic()
+        candidates = self.plan(limit)
+        budget = ProviderBudget(self.budget_limits)
+        report: Dict[str, Any] = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "dry_run": dry_run,
+            "candidates": len(candidates),
+            "refreshed": [],
+            "failed": [],
+            "skipped_budget": 0,
+            "exhausted": [],
+        }
+        if dry_run:
+            report["plan"] = [
+                {"ticker": c.ticker, "popularity": c.popularity, "last_updated": c.last_updated}
+                for c in candidates
+            ]
+            return report
+
+        logger.info("Cache warmer: %s tickers a refrescar (presupuesto %s)", len(candidates), budget.limits)
+        with ExitStack() as stack:
+            if self.prefetch and candidates:
+                # Las peticiones por lotes también consumen presupuesto
+                with self.track_calls() as calls:
+                    stack.enter_context(self.prefetch([c.ticker for c in candidates]))
+                budget.charge(calls)
+            self._refresh(candidates, budget, report)
+
+        report["provider_calls"] = dict(budget.used)
+        report["budget_remaining"] = budget.remaining()
+        report["elapsed_seconds"] = round(time.monotonic() - started, 2)
+        logger.info(
+            "Cache warmer completado: %s refrescados, %s fallidos, %s omitidos en %.1fs",
+            len(report["refreshed"]),
+            len(report["failed"]),
+            report["skipped_budget"],
+            report["elapsed_seconds"],
+        )
+        self.last_report = report
+        return report
+
+    def _refresh(self, candidates: List[WarmCandidate], budget: ProviderBudget, report: Dict[str, Any]) -> None:
+        """Refresca ``candidates`` en orden hasta agotar el presupuesto o recibir stop()."""
+        for index, candidate in enumerate(candidates, start=1):
+            if self._stop.is_set():
+                report["stopped"] = True
+                break
+            exhausted = budget.exhausted()
+            if exhausted:
+                report["exhausted"] = exhausted
+                report["skipped_budget"] = len(candidates) - index + 1
+                logger.warning(
+                    "Cache warmer: presupuesto agotado (%s); %s tickers pendientes",
+                    ", ".join(exhausted),
+                    report["skipped_budget"],
+                )
+                break
+
+            ticker = candidate.ticker
+            try:
+                with self.track_calls() as calls:
+                    metrics = self.fetch(ticker)
+                budget.charge(calls)
+                if not metrics:
+                    report["failed"].append(ticker)
+                    continue
+                self.rescore(ticker, metrics)
+                report["refreshed"].append(ticker)
+            except Exception as exc:
+                logger.error("Cache warmer: error refrescando %s: %s", ticker, exc, exc_info=True)
+                report["failed"].append(ticker)
+            logger.info("Cache warmer: %s/%s (%s)", index, len(candidates), ticker)
+
+    # -------------------------------
+    # Ejecución programada
+    # -------------------------------
+
+    def start(self, interval_minutes: float, limit: int = CACHE_WARMER_MAX_TICKERS) -> bool:
+        """Arranca el hilo programado; retorna False si ya estaba en marcha."""
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        self._stop.clear()
+        interval = max(60.0, interval_minutes * 60)
+
+        def loop() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.run(limit)
+                except Exception as exc:
+                    logger.error("Cache warmer: error en ejecución programada: %s", exc, exc_info=True)
+
+        self._thread = threading.Thread(target=loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+        logger.info("Cache warmer programado cada %.0f minutos", interval / 60)
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        report = self.last_report or {}
+        return {
+            "scheduled": self._thread is not None and self._thread.is_alive(),
+            "last_run": report.get("started_at"),
+            "last_refreshed": len(report.get("refreshed", [])),
+            "last_failed": len(report.get("failed", [])),
+            "last_exhausted": report.get("exhausted", []),
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Refresca la cache de métricas y scores (RVC Analyzer)")
+    parser.add_argument("--limit", type=int, default=CACHE_WARMER_MAX_TICKERS, help="Máximo de tickers")
+    parser.add_argument("--budget", default=None, help="Presupuesto por proveedor: fmp=200,alpha_vantage=20")
+    parser.add_argument("--refresh-after-hours", type=float, default=None, help="Antigüedad mínima para refrescar")
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar el plan")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # Reutiliza el cableado de la app: mismo fetch coalescido, cache y scoring
+    import app as rvc_app
+
+    warmer = rvc_app.cache_warmer
+    if args.budget is not None:
+        warmer.budget_limits = parse_budget(args.budget)
+    if args.refresh_after_hours is not None:
+        warmer.refresh_after_hours = args.refresh_after_hours
+    warmer.lock = None  # Ejecución manual: no esperar al intervalo de otros workers
+
+    report = warmer.run(limit=args.limit, dry_run=args.dry_run)
+    if args.dry_run:
+        for item in report["plan"]:
+            print(f"{item['ticker']:<8} consultas={item['popularity']:<4} last_updated={item['last_updated']}")
+        return 0
+    print(
+        f"Refrescados: {len(report['refreshed'])} | Fallidos: {len(report['failed'])} | "
+        f"Omitidos por presupuesto: {report['skipped_budget']} | Llamadas: {report['provider_calls']}"
+    )
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
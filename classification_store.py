@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Cache persistente de clasificaciones de activos (ticker -> tipo de activo).
+
+Sustituye al JSON que se reescribía completo en cada ticker clasificado: mapa en
+memoria + tabla SQLite con el ticker como clave primaria. Las escrituras se
+acumulan y se vuelcan por lotes en una sola transacción (UPSERT atómico, sin
+ficheros a medio escribir) como máximo cada ``CLASSIFICATION_FLUSH_SECONDS``; un
+temporizador vuelca el último lote aunque no lleguen más escrituras. Los volcados
+se serializan en el orden en que se tomó cada lote. ``flush()`` fuerza el volcado
+(la app lo registra en atexit). Asignar un valor igual al guardado no genera
+escritura.
+
+Si la tabla está vacía y existe el JSON antiguo, se importa una vez.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+CLASSIFICATION_FLUSH_SECONDS = float(os.getenv("CLASSIFICATION_FLUSH_SECONDS", "5"))
+
+
+class ClassificationStore(MutableMapping):
+    """
+    Mapa ``ticker -> clasificación`` respaldado por SQLite con volcado diferido.
+
+    Args:
+        path: Fichero SQLite (se crea si no existe)
+        legacy_json: JSON antiguo a importar si la tabla está vacía
+        flush_seconds: Intervalo mínimo entre volcados automáticos (0 = volcar en cada cambio);
+                       un cambio sin volcar se escribe como tarde tras este intervalo
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        legacy_json: Optional[Union[str, Path]] = None,
+        flush_seconds: float = CLASSIFICATION_FLUSH_SECONDS,
+    ):
+        self.path = Path(path)
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Cambios aún no volcados (None = borrado)
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._last_flush = time.monotonic()
+        # Volcado diferido del último lote (se cancela si otro volcado se adelanta)
+        self._timer: Optional[threading.Timer] = None
+        self.flushes = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout = 5000")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS asset_classifications (
+                ticker TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._load()
+        if not self._entries and legacy_json is not None:
+            self._import_json(Path(legacy_json))
+
+    def _load(self) -> None:
+        for ticker, data in self._conn.execute("SELECT ticker, data FROM asset_classifications"):
+            try:
+                self._entries[ticker] = json.loads(data)
+            except (TypeError, json.JSONDecodeError):
+                logger.warning("Clasificación corrupta para %s; se ignorará", ticker)
+
+    def _import_json(self, legacy_json: Path) -> None:
+        if not legacy_json.exists():
+            return
+        try:
+            with legacy_json.open("r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("No se pudo importar %s: %s", legacy_json, exc)
+            return
+        if not isinstance(data, dict):
+            return
+        with self._lock:
+            for ticker, entry in data.items():
+                if isinstance(entry, dict):
+                    self._entries[ticker] = entry
+                    self._pending[ticker] = entry
+        self.flush()
+        logger.info("Importadas %s clasificaciones desde %s", len(self._entries), legacy_json)
+
+    # -------------------------------
+    # MutableMapping
+    # -------------------------------
+
+    def __getitem__(self, ticker: str) -> Dict[str, Any]:
+        return self._entries[ticker]
+
+    def __setitem__(self, ticker: str, entry: Dict[str, Any]) -> None:
+        entry = dict(entry)
+        with self._lock:
+            if self._entries.get(ticker) == entry:
+                return
+            self._entries[ticker] = entry
+            self._pending[ticker] = entry
+            due = self._due_locked()
+        if due:
+            self.flush()
+
+    def __delitem__(self, ticker: str) -> None:
+        with self._lock:
+            del self._entries[ticker]
+            self._pending[ticker] = None
+            due = self._due_locked()
+        if due:
+            self.flush()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -------------------------------
+    # Persistencia
+    # -------------------------------
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _due_locked(self) -> bool:
+        """True si toca volcar ya; si no, programa el volcado diferido. Requiere ``_lock``."""
+        remaining = self.flush_seconds - (time.monotonic() - self._last_flush)
+        if remaining <= 0:
+            return True
+        if self._timer is None:
+            self._timer = threading.Timer(remaining, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+        return False
+
+    def _flush_from_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Vuelca los cambios pendientes en una transacción; retorna cuántos se escribieron."""
+        # El lote se toma con _io_lock ya adquirido: dos volcados nunca escriben fuera de orden
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._last_flush = time.monotonic()
+                timer, self._timer = self._timer, None
+            if timer is not None:
+                timer.cancel()
+            if not pending:
+                return 0
+            try:
+                self._write(pending)
+            except sqlite3.Error as exc:
+                logger.warning("No se pudo guardar la clasificacion de activos: %s", exc)
+                with self._lock:
+                    # Los cambios posteriores al fallo tienen prioridad
+                    for ticker, entry in pending.items():
+                        self._pending.setdefault(ticker, entry)
+                return 0
+        self.flushes += 1
+        return len(pending)
+
+    def _write(self, pending: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """UPSERT/DELETE de ``pending`` en una transacción. Requiere ``_io_lock``."""
+        now = time.time()
+        upserts = [(ticker, json.dumps(entry, sort_keys=True), now) for ticker, entry in pending.items() if entry is not None]
+        deletes = [(ticker,) for ticker, entry in pending.items() if entry is None]
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                """
+                INSERT INTO asset_classifications (ticker, data, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (ticker) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+                """,
+                upserts,
+            )
+            self._conn.executemany("DELETE FROM asset_classifications WHERE ticker = ?", deletes)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def close(self) -> None:
+        self.flush()
+        with self._io_lock:
+            self._conn.close()
@@ -4,37 +4,141 @@ DataAgent responsible for gathering financial metrics through web scraping and f
 
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
 import re
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from contextvars import ContextVar, copy_context
 from copy import deepcopy
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import requests
-from bs4 import BeautifulSoup
 
-from services import AlphaVantageClient, FMPClient, TwelveDataClient
+from services import (
+    AlphaVantageClient,
+    AsyncAlphaVantageClient,
+    AsyncFMPClient,
+    AsyncTwelveDataClient,
+    FMPClient,
+    TwelveDataClient,
+)
+from services import extractors, http_cache
+from services.http_pool import run_blocking
+from services.http_replay import mount_transport
+from services.circuit_breaker import OPEN, capture_signals, get_breakers, note_request_failure
+from services.rate_limit import get_rate_limiter
+from services.source_planner import get_source_planner
 from etf_reference import ETF_REFERENCE
 from asset_classifier import AssetClassifier, AssetClassification
+from classification_store import ClassificationStore
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(exist_ok=True)
 METRIC_SCHEMA_VERSION = 3
+# "sequential" (por defecto) conserva la cascada clásica con salida temprana; "adaptive" es
+# secuencial pero ordena/omite fuentes según lo aprendido por el planner; "concurrent" (opt-in)
+# lanza en paralelo las fuentes que el planner no descarta y consume más cuota de proveedores:
+# al salir antes de tiempo, las fuentes ya iniciadas terminan igualmente (cuota, breaker, planner)
+FETCH_MODE = os.getenv("DATA_FETCH_MODE", "sequential").strip().lower()
+FETCH_MAX_WORKERS = max(1, int(os.getenv("DATA_FETCH_MAX_WORKERS", "6")))
+# Vida de una clasificación de activo cacheada (0 = no caduca; los overrides manuales nunca caducan)
+CLASSIFICATION_TTL_HOURS = float(os.getenv("CLASSIFICATION_TTL_HOURS", "720"))
 logger = logging.getLogger("DataAgent")
 logger.setLevel(logging.INFO)
 
+# Buffer de provenance del fetcher en curso. Cuando está definido, _merge_provenance
+# escribe aquí en lugar de self.provenance (fetchers ejecutados en paralelo).
+_provenance_buffer: ContextVar[Optional[Dict[str, str]]] = ContextVar("provenance_buffer", default=None)
+# Provenance de la llamada en curso (fetch, refresco de cotización, migración, overrides):
+# vive en el contexto para que hilos y tareas que comparten un DataAgent no se pisen
+_call_provenance: ContextVar[Optional[Dict[str, str]]] = ContextVar("call_provenance", default=None)
+# Contador de fuentes realmente consultadas (ver DataAgent.track_source_calls)
+_source_calls: ContextVar[Optional[Counter]] = ContextVar("source_calls", default=None)
+# Respuestas de endpoints por lotes (ver DataAgent.batch_prefetch): {"fmp:quote": {TICKER: payload}}
+_prefetched: ContextVar[Optional[Dict[str, Dict[str, Any]]]] = ContextVar("prefetched_payloads", default=None)
+# Resultados guardados aún vigentes del ticker en curso (ver DataAgent._reuse_stored_sources)
+_stored_sources: ContextVar[Optional[Dict[str, "SourceResult"]]] = ContextVar("stored_sources", default=None)
+
+
+class SchemaRefetchRequired(Exception):
+    """Un dict de métricas cacheado no puede llevarse al esquema vigente sin consultar las fuentes."""
+
+
+# Migraciones de esquema: versión N -> función que recibe el dict en versión N y lo
+# devuelve en N+1 (o lanza SchemaRefetchRequired si el campo nuevo solo lo dan las
+# fuentes). Las versiones sin función solo necesitan recalcular derivadas y finalizar.
+SCHEMA_UPGRADES: Dict[int, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+
+
+def schema_upgrade(from_version: int) -> Callable:
+    """Registra la migración de ``from_version`` a ``from_version + 1`` (ver DataAgent.upgrade_metrics)."""
+
+    def register(fn: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+        SCHEMA_UPGRADES[from_version] = fn
+        return fn
+
+    return register
+
+
+def source_provider_name(source: Callable) -> str:
+    """Nombre de proveedor de un fetcher (``_fetch_fmp`` -> ``fmp``)."""
+    return source.__name__.replace("_fetch_", "", 1)
+
+
+def _note_source_call(source: Callable) -> None:
+    calls = _source_calls.get()
+    if calls is not None:
+        calls[source_provider_name(source)] += 1
+
+
+# Horas que se reutiliza el resultado guardado de cada proveedor (ver DataAgent.source_store):
+# cotización casi en tiempo real cada hora, fundamentales semanales, fuentes mixtas a diario.
+# Los proveedores fuera de la tabla (datos de ejemplo) no se guardan; 0 = guardar sin reutilizar.
+DEFAULT_SOURCE_TTL_HOURS: Dict[str, float] = {
+    "fmp": 24,
+    "alpha_vantage": 168,
+    "twelve_data": 1,
+    "finviz": 24,
+    "yahoo": 24,
+    "marketwatch": 168,
+}
+
+
+def parse_source_ttls(spec: Optional[str]) -> Dict[str, float]:
+    """``"twelve_data=1,alpha_vantage=168"`` -> horas por proveedor sobre ``DEFAULT_SOURCE_TTL_HOURS``."""
+    ttls = dict(DEFAULT_SOURCE_TTL_HOURS)
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"TTL inválido: {item!r} (formato proveedor=horas)")
+        ttls[name.strip()] = max(0.0, float(value))
+    return ttls
+
+
+SOURCE_RESULT_TTL_HOURS = parse_source_ttls(os.getenv("SOURCE_RESULT_TTL_HOURS"))
+
 
 @dataclass
 class SourceResult:
     data: Dict[str, float]
     source: str
     coverage: int = 0
+    provenance: Dict[str, str] = field(default_factory=dict)
+    # Proveedor que lo produjo (``fmp``, ``twelve_data``...) y momento de la consulta (epoch)
+    provider: Optional[str] = None
+    fetched_at: float = field(default_factory=time.time)
+    # Leído de source_store en lugar de consultado ahora
+    reused: bool = False
 
 
 class DataAgent:
@@ -43,6 +147,58 @@ class DataAgent:
     MarketWatch) with fallbacks and provenance tracking.
     """
 
+    # Señales de captcha / mantenimiento (nombres de empresa y títulos de página)
+    BLOCK_PAGE_KEYWORDS = ("captcha", "temporarily unavailable", "will be right back", "service unavailable")
+    _TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+    # Bloqueos y límites del host: reintentar solo suma espera
+    NON_RETRYABLE_STATUS = frozenset({401, 403, 404, 429})
+
+    # Proveedor con cuota -> (bucket, peticiones mínimas por consulta)
+    SOURCE_RATE_LIMITS: Dict[str, Tuple[str, int]] = {
+        "fmp": ("fmp", 4),
+        "alpha_vantage": ("alpha_vantage", 1),
+        "twelve_data": ("twelve_data", 1),
+    }
+
+    # Grupos que cuentan para data_completeness (con sus alias aceptados)
+    COMPLETENESS_FIELDS: Tuple[str, ...] = (
+        "pe_ratio",
+        "peg_ratio",
+        "price_to_book",
+        "roe",
+        "roic",
+        "operating_margin",
+        "net_margin",
+        "debt_to_equity",
+        "current_ratio",
+        "quick_ratio",
+        "revenue_growth",
+        "earnings_growth",
+    )
+    COMPLETENESS_ALTERNATIVES: Dict[str, Tuple[str, ...]] = {
+        "revenue_growth": ("revenue_growth_5y", "revenue_growth_qoq"),
+        "earnings_growth": (
+            "earnings_growth_this_y",
+            "earnings_growth_next_y",
+            "earnings_growth_next_5y",
+            "earnings_growth_qoq",
+        ),
+    }
+    # Objetivos del planner de fuentes: completitud + identidad y precio
+    PLANNER_TARGETS: Tuple[str, ...] = COMPLETENESS_FIELDS + (
+        "current_price",
+        "market_cap",
+        "company_name",
+        "sector",
+    )
+    # Avisos que _finalize_metrics recalcula con otro texto si cambian las métricas críticas
+    RECOMPUTED_WARNING_PREFIXES: Tuple[str, ...] = ("Las APIs no devolvieron metricas criticas",)
+    # Clases de frescura (``field_updated_at``): quote / fundamentals / classification.
+    # Los campos de cotización se refrescan solos con una llamada (ver refresh_quote)
+    QUOTE_FIELDS: Tuple[str, ...] = ("current_price", "market_cap", "pe_ratio")
+    # Múltiplos de precio cuyo denominador es fundamental: escalan con el precio
+    PRICE_MULTIPLES: Tuple[str, ...] = ("pe_ratio", "peg_ratio", "price_to_book", "price_to_sales")
+
     MANUAL_EDITABLE_FIELDS: Dict[str, str] = {
         "current_price": "number",
         "market_cap": "number",
@@ -78,7 +234,7 @@ class DataAgent:
     }
 
     def __init__(self):
-        self.session = requests.Session()
+        self.session = mount_transport(requests.Session())
         self.session.headers.update(
             {
                 "User-Agent": (
@@ -86,10 +242,8 @@ class DataAgent:
                     "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
                 ),
                 "Accept-Language": "es-ES,es;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Cache-Control": "no-cache",
             }
         )
-        self.provenance: Dict[str, str] = {}
         self.metric_aliases = {
             "current_price": {"Price", "Current Price"},
             "market_cap": {"Market Cap", "Market Capitalization"},
@@ -200,6 +354,8 @@ class DataAgent:
         self.alpha_client = AlphaVantageClient()
         self.twelve_client = TwelveDataClient()
         self.fmp_client = FMPClient()
+        # Almacén opcional de SourceResult por ticker y proveedor (CacheStore); lo asigna la app
+        self.source_store = None
         # Log de disponibilidad de proveedores (sin exponer secretos)
         try:
             av_env = "ALPHA_VANTAGE_KEY" if os.getenv("ALPHA_VANTAGE_KEY") else ("ALPHAVANTAGE_API_KEY" if os.getenv("ALPHAVANTAGE_API_KEY") else "none")
@@ -213,9 +369,13 @@ class DataAgent:
             # Evitar que un error de logging afecte la inicialización
             pass
         self.classifier = AssetClassifier()
-        self.classification_path = DATA_DIR / "asset_classifications.json"
-        self.classification_cache = self._load_classification_cache()
+        # Mapa en memoria + SQLite con volcado diferido (importa el JSON antiguo una vez)
+        self.classification_cache = ClassificationStore(
+            DATA_DIR / "asset_classifications.db",
+            legacy_json=DATA_DIR / "asset_classifications.json",
+        )
         for symbol, asset_type in self.classifier.MANUAL_OVERRIDES.items():
+            # Sin cambios no hay escritura: el arranque ya no reescribe la cache
             self.classification_cache[symbol] = {
                 "asset_type": asset_type,
                 "type_label": AssetClassifier.ASSET_NAMES.get(asset_type, asset_type),
@@ -223,22 +383,42 @@ class DataAgent:
                 "needs_special_metrics": asset_type in AssetClassifier.SPECIAL_METRICS,
                 "is_analyzable": asset_type == "EQUITY",
                 "source": "manual_override",
+                "classified_at": (self.classification_cache.get(symbol) or {}).get("classified_at"),
             }
-        self._save_classification_cache()
 
     def _get(self, url: str, timeout: int = 12, tries: int = 3, sleep: float = 1.2) -> Optional[requests.Response]:
+        # Página en la cache HTTP y vigente: ni petición ni token
+        cached = http_cache.lookup(url)
+        if cached is not None:
+            return cached
+        limiter = get_rate_limiter()
+        host_key = limiter.host_key(url)
         for attempt in range(tries):
+            # Cada intento es una petición al host: sin tokens se abandona sin esperar
+            if not limiter.try_acquire(host_key):
+                return None
             try:
-                resp = self.session.get(url, timeout=timeout)
+                resp = http_cache.conditional_get(self.session, url, timeout=timeout)
             except requests.RequestException as exc:  # pragma: no cover - defensive
                 logger.debug("Request error %s for %s", exc, url)
                 resp = None
-            if resp and resp.status_code == 200 and resp.text:
-                return resp
-            time.sleep(sleep * (attempt + 1))
+            if resp is not None and resp.status_code == 200 and resp.text:
+                if not self._is_block_page(resp.text):
+                    http_cache.remember(resp)
+                    return resp
+                # Captcha / página de bloqueo con 200: reintentar no ayuda
+                logger.warning("Página de bloqueo detectada en %s", url)
+                note_request_failure("suspicious")
+                return None
+            note_request_failure()
+            if resp is not None and resp.status_code in self.NON_RETRYABLE_STATUS:
+                logger.warning("HTTP %s en %s; sin reintentos", resp.status_code, url)
+                return None
+            if attempt < tries - 1:
+                time.sleep(sleep * (attempt + 1))
         return None
 
-    def fetch_financial_data(self, ticker: str) -> Optional[Dict]:
+    def _refresh_clients(self) -> None:
         # Asegurar que, si el agente fue construido antes de que la plataforma
         # inyectara variables, volvamos a resolver claves desde el entorno.
         # Esto es idempotente y barato.
@@ -261,14 +441,83 @@ class DataAgent:
                 except Exception:
                     pass
 
-        ticker = ticker.upper()
-        self.provenance = {}
-        metrics: Dict[str, Optional[float]] = {
-            "ticker": ticker,
-            "source": "web",
-            "warnings": [],
-        }
+    def _begin_source(self, source: Callable, ticker: str) -> bool:
+        """
+        Registra la consulta de ``source``; False si hay que omitirla ahora.
+
+        Se omite si su circuito está abierto o si su proveedor no tiene cuota. De la
+        cuota solo se comprueba (sin consumir) que el bucket cubra las peticiones
+        mínimas de la fuente; cada petición consume su token en el cliente.
+        """
+        provider = source_provider_name(source)
+        breaker = get_breakers().get(provider)
+        if not breaker.allow():
+            logger.info("Circuito abierto: se omite %s para %s", provider, ticker)
+            return False
+        rate = self.SOURCE_RATE_LIMITS.get(provider)
+        if rate is not None:
+            key, cost = rate
+            if get_rate_limiter().available(key) < cost:
+                logger.info("Rate limit: se omite %s para %s (sin cuota disponible)", provider, ticker)
+                breaker.record(None)
+                return False
+        _note_source_call(source)
+        return True
+
+    def _finish_source(
+        self,
+        source: Callable,
+        ticker: str,
+        started: float,
+        result: Optional[SourceResult],
+        signals: Counter,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Registra en el circuit breaker y en el planner el resultado de una fuente admitida por _begin_source."""
+        provider = source_provider_name(source)
+        suspicious = signals["suspicious"] > 0
+        if error is not None or suspicious:
+            ok: Optional[bool] = False
+        elif result:
+            ok = True
+        elif signals["failure"]:
+            ok = False
+        else:
+            # Sin datos pero sin errores (ticker sin cobertura, API deshabilitada): sin veredicto
+            ok = None
+        latency = time.monotonic() - started
+        breaker = get_breakers().get(provider)
+        was_open = breaker.state == OPEN
+        breaker.record(ok, latency, suspicious)
+        planner = get_source_planner()
+        if planner is not None:
+            planner.record(provider, latency, self._target_groups(result.data) if result else None)
+        if breaker.state == OPEN and not was_open:
+            logger.warning(
+                "Circuito abierto para %s tras fallos repetidos (reintento en %.0fs)",
+                provider,
+                breaker.open_seconds,
+            )
 
+    def _invoke_source(
+        self, source: Callable[[str], Optional[SourceResult]], ticker: str
+    ) -> Optional[SourceResult]:
+        """Ejecuta ``source`` aplicando circuit breaker y rate limit, y registra su salud."""
+        if not self._begin_source(source, ticker):
+            return None
+        started = time.monotonic()
+        result = error = None
+        with capture_signals() as signals:
+            try:
+                result = source(ticker)
+            except Exception as exc:
+                error = exc
+        self._finish_source(source, ticker, started, result, signals, error)
+        if error is not None:
+            raise error
+        return result
+
+    def _source_chain(self) -> List[Callable[[str], Optional[SourceResult]]]:
         # Cascada de fuentes optimizada (orden de prioridad)
         # 1. FMP (Financial Modeling Prep): API premium con datos completos y actualizados
         # 2. AlphaVantage: API premium con fundamentales completos
@@ -276,7 +525,7 @@ class DataAgent:
         # 4. Finviz: Scraping confiable como respaldo (funciona sin API key)
         # 5. Yahoo: Último recurso para métricas básicas
         # 6. MarketWatch: Backup adicional
-        sources = [
+        return [
             self._fetch_fmp,           # ← Primera prioridad
             self._fetch_alpha_vantage,
             self._fetch_twelve_data,
@@ -286,86 +535,508 @@ class DataAgent:
             self._fetch_example_data,
         ]
 
-        # Almacenar resultados para calcular dispersión
-        source_results = []
+    @contextmanager
+    def track_source_calls(self) -> Iterator[Counter]:
+        """
+        Count the sources actually queried by fetches made inside the block.
+
+        Keys are provider names (``fmp``, ``alpha_vantage``, ``finviz``...). Sources
+        cancelled before starting (early exit on completeness) are not counted.
+        """
+        calls: Counter = Counter()
+        token = _source_calls.set(calls)
+        try:
+            yield calls
+        finally:
+            _source_calls.reset(token)
+
+    @contextmanager
+    def batch_prefetch(self, tickers: Iterable[str]) -> Iterator[Dict[str, Dict[str, Any]]]:
+        """
+        Prefetch the batchable provider endpoints for ``tickers`` inside the block.
+
+        FMP profile/quote and Twelve Data quote are requested with comma-separated
+        symbols, chunked to each provider's limit. Single-ticker fetches made inside
+        the block (any mode, any thread started with a copied context) read their
+        slice instead of calling those endpoints again; tickers left out of a batch
+        (failed or rate-limited chunk) fall back to the per-ticker requests.
+        """
+        self._refresh_clients()
+        symbols = list(dict.fromkeys(ticker.upper() for ticker in tickers if ticker))
+        payloads: Dict[str, Dict[str, Any]] = {}
+        # Con un solo ticker el lote no ahorra peticiones
+        if len(symbols) > 1:
+            breakers = get_breakers()
+            if self.fmp_client.enabled and breakers.get("fmp").state != OPEN:
+                payloads["fmp:profile"] = self.fmp_client.get_profiles(symbols)
+                payloads["fmp:quote"] = self.fmp_client.get_quotes(symbols)
+            if self.twelve_client.enabled and breakers.get("twelve_data").state != OPEN:
+                payloads["twelve_data:quote"] = self.twelve_client.get_quotes(symbols)
+            logger.info(
+                "Prefetch por lotes para %s tickers: %s",
+                len(symbols),
+                ", ".join(f"{kind}={len(batch)}" for kind, batch in payloads.items()) or "sin proveedores",
+            )
+        token = _prefetched.set(payloads)
+        try:
+            yield payloads
+        finally:
+            _prefetched.reset(token)
+
+    def fetch_many(self, tickers: Iterable[str], mode: Optional[str] = None) -> Dict[str, Optional[Dict]]:
+        """
+        Fetch several tickers sharing batched provider requests (see :meth:`batch_prefetch`).
+
+        Returns ``{TICKER: metrics or None}`` in input order, duplicates removed. Each
+        ticker is then merged exactly as :meth:`fetch_financial_data` would do it.
+        """
+        symbols = list(dict.fromkeys(ticker.upper() for ticker in tickers if ticker))
+        results: Dict[str, Optional[Dict]] = {}
+        with self.batch_prefetch(symbols):
+            for ticker in symbols:
+                try:
+                    results[ticker] = self.fetch_financial_data(ticker, mode=mode)
+                except Exception as exc:
+                    logger.warning("Fetch de %s falló dentro del lote: %s", ticker, exc)
+                    results[ticker] = None
+        return results
+
+    def _prefetched_parts(self, provider: str, ticker: str, parts: Tuple[str, ...]) -> Dict[str, Any]:
+        """Payloads of ``provider`` endpoints already fetched in batch for ``ticker`` (may be None)."""
+        payloads = _prefetched.get() or {}
+        known: Dict[str, Any] = {}
+        for part in parts:
+            batch = payloads.get(f"{provider}:{part}") or {}
+            if ticker.upper() in batch:
+                known[part] = batch[ticker.upper()]
+        return known
+
+    def fetch_financial_data(self, ticker: str, mode: Optional[str] = None) -> Optional[Dict]:
+        """
+        Fetch and merge metrics for ``ticker`` from every configured source.
+
+        ``mode`` overrides ``DATA_FETCH_MODE``: ``"concurrent"`` queries all sources
+        in parallel on a bounded pool, ``"sequential"`` walks the cascade one by one,
+        ``"adaptive"`` walks it in the order the source planner expects to reach the
+        completeness target fastest and ``"async"`` runs
+        :meth:`fetch_financial_data_async` on a fresh event loop. Concurrent and async
+        launch only the sources the planner still expects to contribute; sequential,
+        concurrent and async merge results in the same priority order.
+        """
+        mode = (mode or FETCH_MODE).lower()
+        if mode == "async":
+            return asyncio.run(self.fetch_financial_data_async(ticker))
+
+        self._refresh_clients()
+        ticker, metrics = self._start_metrics(ticker)
+
+        with self._reuse_stored_sources(ticker):
+            sources = self._source_chain()
+            if mode == "concurrent":
+                results = self._iter_sources_concurrent(self._prune_sources(sources, ticker), ticker)
+            elif mode == "adaptive":
+                results = self._iter_sources_adaptive(sources, ticker, metrics)
+            else:
+                results = self._iter_sources_sequential(sources, ticker)
+
+            with closing(results):
+                source_results = self._merge_source_results(ticker, metrics, results)
+
+        self._save_source_results(ticker, source_results)
+        return self._assemble_metrics(metrics, source_results)
+
+    async def fetch_financial_data_async(self, ticker: str) -> Optional[Dict]:
+        """
+        Async variant of :meth:`fetch_financial_data`.
+
+        Providers with a ``<fetcher>_async`` counterpart run natively on the shared
+        HTTP pool (FMP endpoints are awaited together); scrapers run on the pool's
+        executor. Results are merged in priority order and sources still pending
+        when the completeness threshold is reached are cancelled.
+        """
+        self._refresh_clients()
+        ticker, metrics = self._start_metrics(ticker)
 
+        with self._reuse_stored_sources(ticker):
+            sources = self._prune_sources(self._source_chain(), ticker)
+            tasks = [asyncio.ensure_future(self._run_source_async(source, ticker)) for source in sources]
+        source_results: List[SourceResult] = []
+        try:
+            for source, task in zip(sources, tasks):
+                result = None
+                try:
+                    result = await task
+                except Exception as exc:  # pragma: no cover - defensive
+                    logger.warning("Source %s failed for %s: %s", source.__name__, ticker, exc)
+                if self._merge_source_result(ticker, metrics, source.__name__, result, source_results):
+                    break
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        await run_blocking(self._save_source_results, ticker, source_results)
+        # Dispersión, derivadas y conversión de moneda pueden bloquear (FX por HTTP)
+        return await run_blocking(self._assemble_metrics, metrics, source_results)
+
+    def _start_metrics(self, ticker: str) -> Tuple[str, Dict[str, Any]]:
+        ticker = ticker.upper()
+        self.provenance = {}
+        metrics: Dict[str, Optional[float]] = {
+            "ticker": ticker,
+            "source": "web",
+            "warnings": [],
+        }
+        return ticker, metrics
+
+    async def _run_source_async(
+        self, source: Callable[[str], Optional[SourceResult]], ticker: str
+    ) -> Optional[SourceResult]:
+        stored = self._stored_result(source)
+        if stored is not None:
+            return stored
+        native = getattr(self, f"{source.__name__}_async", None)
+        if native is None:
+            logger.info("Consultando %s para %s (executor)", source.__name__, ticker)
+            return await run_blocking(self._run_source_isolated, source, ticker)
+
+        logger.info("Consultando %s para %s (async)", source.__name__, ticker)
+        if not self._begin_source(source, ticker):
+            return None
+        started = time.monotonic()
+        result = error = None
+        buffer: Dict[str, str] = {}
+        token = _provenance_buffer.set(buffer)
+        with capture_signals() as signals:
+            try:
+                result = await native(ticker)
+            except Exception as exc:
+                error = exc
+            finally:
+                _provenance_buffer.reset(token)
+        self._finish_source(source, ticker, started, result, signals, error)
+        if error is not None:
+            raise error
+        if result:
+            result.provenance = buffer
+            result.provider = source_provider_name(source)
+        return result
+
+    def _iter_sources_sequential(
+        self, sources: List[Callable[[str], Optional[SourceResult]]], ticker: str
+    ) -> Iterator[Tuple[Callable, Optional[SourceResult]]]:
         for source in sources:
             logger.info("Consultando %s para %s", source.__name__, ticker)
             result = None
             try:
-                result = source(ticker)
+                result = self._run_source_isolated(source, ticker)
             except Exception as exc:  # pragma: no cover - defensive
                 logger.warning("Source %s failed for %s: %s", source.__name__, ticker, exc)
-            if not result:
-                logger.info("%s no aportó datos para %s", source.__name__, ticker)
-                continue
-
-            # Guardar resultado para análisis de dispersión
-            source_results.append(result)
+            yield source, result
+            # Solo se llega aquí si el merge no alcanzó el umbral de completitud
+            if result and not result.reused:
+                time.sleep(0.6)
+
+    def _iter_sources_adaptive(
+        self,
+        sources: List[Callable[[str], Optional[SourceResult]]],
+        ticker: str,
+        metrics: Dict[str, Any],
+    ) -> Iterator[Tuple[Callable, Optional[SourceResult]]]:
+        """
+        Sequential cascade ordered by expected gain per second of cost.
 
-            # Contar métricas realmente agregadas (no solo intentadas)
-            added_count = 0
-            for key, value in result.data.items():
-                if key in self.metric_priority:
-                    self._update_metric(metrics, key, value, result.source)
-                    added_count += 1
-                    continue
-                if value is None:
-                    continue
-                if metrics.get(key) is None:
-                    metrics[key] = value
-                    self.provenance[key] = self._resolve_provenance_label(key, result.source)
-                    added_count += 1
-            
-            metrics["primary_source"] = metrics.get("primary_source") or result.source
-            
-            # Log transparente: campos intentados vs campos agregados
-            attempted = len(result.data)
-            if added_count == attempted:
-                logger.info(
-                    "%s aportó %s campos para %s (origen %s)",
-                    source.__name__,
-                    added_count,
-                    ticker,
-                    result.source,
-                )
-            else:
-                logger.info(
-                    "%s aportó %s/%s campos para %s (origen %s) - %s ya existían",
-                    source.__name__,
-                    added_count,
-                    attempted,
-                    ticker,
-                    result.source,
-                    attempted - added_count,
-                )
+        Before each call the planner ranks the remaining sources by how many of the
+        still-missing target groups they usually supply, divided by their mean latency
+        plus a quota penalty. ``metrics`` is read after every merge, so the plan adapts
+        to what earlier sources already provided. The last source (example data) is
+        always kept as the final fallback.
+        """
+        planner = get_source_planner()
+        if planner is None:
+            yield from self._iter_sources_sequential(sources, ticker)
+            return
 
-            # Calcular completitud actual
-            current_completeness = self._calculate_completeness(metrics)
-
-            # OPTIMIZACIÓN: Si FMP proporcionó datos casi completos (≥85%), no consultar otras APIs
-            # Esto ahorra cuota de API y reduce latencia
-            # Umbral 85%: permite que otras fuentes aporten métricas críticas que FMP no tiene
-            # (peg_ratio, revenue_growth, earnings_growth, métricas avanzadas de flujo de caja)
-            if result.source == "fmp" and current_completeness >= 85:
-                logger.info(
-                    "✓ FMP proporcionó datos casi completos (%.1f%%) para %s - omitiendo otras fuentes",
-                    current_completeness,
-                    ticker
-                )
+        *remaining, fallback = sources
+        quota_costs = {provider: cost for provider, (_, cost) in self.SOURCE_RATE_LIMITS.items()}
+        while remaining:
+            by_provider = {source_provider_name(source): source for source in remaining}
+            provider, skipped = planner.choose_next(list(by_provider), self._missing_groups(metrics), quota_costs)
+            for name in skipped:
+                logger.info("Planner: se omite %s para %s (aporte esperado bajo)", name, ticker)
+                remaining.remove(by_provider[name])
+            if provider is None:
                 break
+            remaining.remove(by_provider[provider])
+            yield from self._iter_sources_sequential([by_provider[provider]], ticker)
+        yield from self._iter_sources_sequential([fallback], ticker)
+
+    def _prune_sources(
+        self, sources: List[Callable[[str], Optional[SourceResult]]], ticker: str
+    ) -> List[Callable[[str], Optional[SourceResult]]]:
+        """Drop sources the planner expects to add nothing over higher-priority ones (parallel modes)."""
+        planner = get_source_planner()
+        if planner is None:
+            return sources
+        *candidates, fallback = sources
+        kept, skipped = planner.prune([source_provider_name(source) for source in candidates], self.PLANNER_TARGETS)
+        if skipped:
+            logger.info("Planner: se omiten %s para %s (aporte esperado bajo)", ", ".join(skipped), ticker)
+        kept_names = set(kept)
+        return [source for source in candidates if source_provider_name(source) in kept_names] + [fallback]
+
+    def _target_groups(self, data: Dict[str, Any]) -> Set[str]:
+        """Planner target groups present in ``data`` (growth aliases count for their group)."""
+        groups = set()
+        for group in self.PLANNER_TARGETS:
+            keys = (group,) + self.COMPLETENESS_ALTERNATIVES.get(group, ())
+            if any(data.get(key) is not None for key in keys):
+                groups.add(group)
+        return groups
+
+    def _missing_groups(self, metrics: Dict[str, Any]) -> Set[str]:
+        return set(self.PLANNER_TARGETS) - self._target_groups(metrics)
+
+    def _iter_sources_concurrent(
+        self, sources: List[Callable[[str], Optional[SourceResult]]], ticker: str
+    ) -> Iterator[Tuple[Callable, Optional[SourceResult]]]:
+        """
+        Submit every source at once and yield results in priority order.
 
-            # Para otras fuentes o si FMP no alcanzó 85%, continuar consultando hasta 80%
-            if current_completeness >= 80:
-                logger.info(
-                    "✓ Completitud alcanzada (%.1f%%) para %s - finalizando consultas",
-                    current_completeness,
-                    ticker
-                )
+        Closing the generator (early exit on completeness) cancels queued sources;
+        sources already running finish in the background and are discarded. They
+        still spend their rate-limit tokens and provider quota and record their
+        outcome in the circuit breaker and the planner.
+        """
+        executor = ThreadPoolExecutor(
+            max_workers=min(FETCH_MAX_WORKERS, len(sources)),
+            thread_name_prefix=f"fetch-{ticker}",
+        )
+        try:
+            futures = []
+            for source in sources:
+                logger.info("Consultando %s para %s (concurrente)", source.__name__, ticker)
+                # Cada fetcher corre en una copia del contexto (conserva track_source_calls)
+                ctx = copy_context()
+                futures.append(executor.submit(ctx.run, self._run_source_isolated, source, ticker))
+            for source, future in zip(sources, futures):
+                result = None
+                try:
+                    result = future.result()
+                except Exception as exc:  # pragma: no cover - defensive
+                    logger.warning("Source %s failed for %s: %s", source.__name__, ticker, exc)
+                yield source, result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_source_isolated(
+        self, source: Callable[[str], Optional[SourceResult]], ticker: str
+    ) -> Optional[SourceResult]:
+        """Run a fetcher capturing its provenance in the result instead of self.provenance."""
+        stored = self._stored_result(source)
+        if stored is not None:
+            return stored
+        buffer: Dict[str, str] = {}
+        token = _provenance_buffer.set(buffer)
+        try:
+            result = self._invoke_source(source, ticker)
+        finally:
+            _provenance_buffer.reset(token)
+        if result:
+            result.provenance = buffer
+            result.provider = source_provider_name(source)
+        return result
+
+    @contextmanager
+    def _reuse_stored_sources(self, ticker: str) -> Iterator[Dict[str, SourceResult]]:
+        """
+        Serve the stored results still within their provider TTL to fetches made inside the block.
+
+        Each source then refreshes on its own schedule (``SOURCE_RESULT_TTL_HOURS``):
+        a fresh stored result replaces the call (no quota, breaker or planner
+        bookkeeping) and only stale sources are queried.
+        """
+        fresh: Dict[str, SourceResult] = {}
+        now = time.time()
+        for provider, result in self._load_source_results(ticker).items():
+            if now - result.fetched_at < SOURCE_RESULT_TTL_HOURS.get(provider, 0) * 3600:
+                fresh[provider] = result
+        if fresh:
+            logger.info("Reutilizando resultados guardados de %s para %s", ", ".join(sorted(fresh)), ticker)
+        token = _stored_sources.set(fresh)
+        try:
+            yield fresh
+        finally:
+            _stored_sources.reset(token)
+
+    def _stored_result(self, source: Callable) -> Optional[SourceResult]:
+        stored = (_stored_sources.get() or {}).get(source_provider_name(source))
+        return deepcopy(stored) if stored is not None else None
+
+    def _load_source_results(self, ticker: str) -> Dict[str, SourceResult]:
+        """Stored results of ``ticker`` by provider, whatever their age ({} without a store)."""
+        if self.source_store is None:
+            return {}
+        try:
+            rows = self.source_store.get_source_results(ticker)
+        except Exception as exc:
+            logger.warning("No se pudieron leer los resultados por fuente de %s: %s", ticker, exc)
+            return {}
+        return {
+            provider: SourceResult(
+                data=data,
+                source=source,
+                coverage=coverage,
+                provenance=provenance,
+                provider=provider,
+                fetched_at=fetched_at,
+                reused=True,
+            )
+            for provider, source, data, coverage, provenance, fetched_at in rows
+        }
+
+    def _save_source_results(self, ticker: str, source_results: List[SourceResult]) -> None:
+        """Persist the freshly fetched results merged for ``ticker`` (failures only logged)."""
+        if self.source_store is None:
+            return
+        rows = [
+            (result.provider, result.source, result.data, result.coverage, result.provenance, result.fetched_at)
+            for result in source_results
+            if not result.reused and result.provider in SOURCE_RESULT_TTL_HOURS
+        ]
+        if not rows:
+            return
+        try:
+            self.source_store.save_source_results(ticker, rows)
+        except Exception as exc:
+            logger.warning("No se pudieron guardar los resultados por fuente de %s: %s", ticker, exc)
+
+    def remerge(self, ticker: str) -> Optional[Dict]:
+        """
+        Re-run merge, dispersion and finalize for ``ticker`` from stored source results only.
+
+        No source is queried: every stored result is used regardless of its TTL, in
+        cascade priority order, so changes to ``metric_priority``, dispersion or
+        cleaning apply without a refetch. ``scraped_at`` is the fetch time of the
+        oldest result used. Returns None when nothing is stored for ``ticker``.
+        """
+        stored = self._load_source_results(ticker.upper())
+        if not stored:
+            return None
+        ticker, metrics = self._start_metrics(ticker)
+        results = (
+            (source, stored[source_provider_name(source)])
+            for source in self._source_chain()
+            if source_provider_name(source) in stored
+        )
+        source_results = self._merge_source_results(ticker, metrics, results)
+        merged = self._assemble_metrics(metrics, source_results)
+        if merged is not None and source_results:
+            oldest = min(result.fetched_at for result in source_results)
+            merged["scraped_at"] = datetime.utcfromtimestamp(oldest).isoformat(timespec="seconds")
+        return merged
+
+    def _merge_source_results(
+        self,
+        ticker: str,
+        metrics: Dict[str, Any],
+        results: Iterator[Tuple[Callable, Optional[SourceResult]]],
+    ) -> List[SourceResult]:
+        # Almacenar resultados para calcular dispersión
+        source_results: List[SourceResult] = []
+
+        for source, result in results:
+            if self._merge_source_result(ticker, metrics, source.__name__, result, source_results):
                 break
 
-            time.sleep(0.6)
+        return source_results
+
+    def _merge_source_result(
+        self,
+        ticker: str,
+        metrics: Dict[str, Any],
+        source_name: str,
+        result: Optional[SourceResult],
+        source_results: List[SourceResult],
+    ) -> bool:
+        """Merge one source into ``metrics``; returns True once no more sources are needed."""
+        if not result:
+            logger.info("%s no aportó datos para %s", source_name, ticker)
+            return False
+
+        # Provenance capturada en aislamiento (modos concurrent/async)
+        if result.provenance:
+            self._merge_provenance(result.provenance)
+
+        # Guardar resultado para análisis de dispersión
+        source_results.append(result)
+
+        # Contar métricas realmente agregadas (no solo intentadas)
+        added_count = 0
+        for key, value in result.data.items():
+            if key in self.metric_priority:
+                self._update_metric(metrics, key, value, result.source)
+                added_count += 1
+                continue
+            if value is None:
+                continue
+            if metrics.get(key) is None:
+                metrics[key] = value
+                self.provenance[key] = self._resolve_provenance_label(key, result.source)
+                added_count += 1
+        
+        metrics["primary_source"] = metrics.get("primary_source") or result.source
+        
+        # Log transparente: campos intentados vs campos agregados
+        attempted = len(result.data)
+        if added_count == attempted:
+            logger.info(
+                "%s aportó %s campos para %s (origen %s)",
+                source_name,
+                added_count,
+                ticker,
+                result.source,
+            )
+        else:
+            logger.info(
+                "%s aportó %s/%s campos para %s (origen %s) - %s ya existían",
+                source_name,
+                added_count,
+                attempted,
+                ticker,
+                result.source,
+                attempted - added_count,
+            )
+
+        # Calcular completitud actual
+        current_completeness = self._calculate_completeness(metrics)
+
+        # OPTIMIZACIÓN: Si FMP proporcionó datos casi completos (≥85%), no consultar otras APIs
+        # Esto ahorra cuota de API y reduce latencia
+        # Umbral 85%: permite que otras fuentes aporten métricas críticas que FMP no tiene
+        # (peg_ratio, revenue_growth, earnings_growth, métricas avanzadas de flujo de caja)
+        if result.source == "fmp" and current_completeness >= 85:
+            logger.info(
+                "✓ FMP proporcionó datos casi completos (%.1f%%) para %s - omitiendo otras fuentes",
+                current_completeness,
+                ticker
+            )
+            return True
+
+        # Para otras fuentes o si FMP no alcanzó 85%, continuar consultando hasta 80%
+        if current_completeness >= 80:
+            logger.info(
+                "✓ Completitud alcanzada (%.1f%%) para %s - finalizando consultas",
+                current_completeness,
+                ticker
+            )
+            return True
+
+        return False
 
+    def _assemble_metrics(self, metrics: Dict[str, Any], source_results: List[SourceResult]) -> Optional[Dict]:
         # Calcular dispersión para métricas críticas (solo si tenemos múltiples fuentes)
         dispersion_data = {}
         if len(source_results) >= 2:
@@ -393,11 +1064,18 @@ class DataAgent:
         metrics = self._calculate_derived_metrics(metrics)
         
         metrics = self._finalize_metrics(metrics)
+
+        # Cotización y fundamentales son tan recientes como el resultado más antiguo usado
+        if source_results:
+            oldest = datetime.utcfromtimestamp(min(result.fetched_at for result in source_results))
+            stamp = oldest.isoformat(timespec="seconds")
+        else:
+            stamp = metrics["scraped_at"]
+        metrics["field_updated_at"].update(quote=stamp, fundamentals=stamp)
         
         # Adjuntar información de dispersión
         if dispersion_data:
             metrics["dispersion"] = dispersion_data
-        
         # Adjuntar trazabilidad de origen por métrica para depuración/auditoría.
         # Esto permite verificar rápidamente qué fuente aportó cada valor
         # (p. ej., alpha_vantage, fmp, twelvedata, scraping, override manual, etc.).
@@ -410,6 +1088,176 @@ class DataAgent:
                 pass
         return metrics if len(metrics) > 2 else None
 
+    def upgrade_metrics(self, metrics: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Bring a cached metrics dict to ``METRIC_SCHEMA_VERSION`` without querying sources.
+
+        Applies the registered ``SCHEMA_UPGRADES`` from the stored version on, then
+        re-runs :meth:`_calculate_derived_metrics` and :meth:`_finalize_metrics` on the
+        stored values. ``scraped_at`` is kept (the data is as old as before) and
+        ``migrated_from`` records the original version. An upgrade raising
+        :class:`SchemaRefetchRequired` falls back to :meth:`remerge` from the stored
+        source results. Returns None when the dict cannot be migrated (newer schema,
+        or a required refetch with nothing stored); callers then fetch from the sources.
+        """
+        try:
+            version = int(metrics.get("schema_version") or 0)
+        except (TypeError, ValueError):
+            return None
+        if version > METRIC_SCHEMA_VERSION or not metrics.get("ticker"):
+            return None
+
+        upgraded = deepcopy(metrics)
+        for step in range(version, METRIC_SCHEMA_VERSION):
+            upgrade = SCHEMA_UPGRADES.get(step)
+            if upgrade is None:
+                continue
+            try:
+                upgraded = upgrade(upgraded)
+            except SchemaRefetchRequired as exc:
+                logger.info("Migración v%s->v%s de %s requiere fetch: %s", step, step + 1, metrics.get("ticker"), exc)
+                # Los resultados crudos por fuente guardados bastan si el campo nuevo sale del merge
+                remerged = self.remerge(metrics["ticker"])
+                if remerged is not None:
+                    remerged["migrated_from"] = version
+                return remerged
+
+        upgraded = self._refinalize(upgraded)
+        upgraded["migrated_from"] = version
+        return upgraded
+
+    def refresh_quote(self, metrics: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Refresh only the quote fields (``QUOTE_FIELDS``) of a cached metrics dict.
+
+        One provider call (FMP ``/quote``, else Twelve Data) replaces price, market
+        cap and P/E. Price multiples the quote does not carry are scaled by the price
+        change (their denominators are fundamentals) and enterprise value moves with
+        market cap; derived metrics and finalize then run on the cached fundamentals.
+        Manual overrides are kept. Only ``field_updated_at["quote"]`` is renewed.
+        Returns None when no provider returned a quote.
+        """
+        ticker = metrics.get("ticker")
+        if not ticker:
+            return None
+        self._refresh_clients()
+        quote = self._fetch_quote(ticker)
+        if quote is None:
+            return None
+
+        refreshed = deepcopy(metrics)
+        provenance = refreshed.setdefault("provenance", {})
+        manual = {key for key, label in provenance.items() if str(label).startswith("manual_override")}
+        old_price, old_cap = refreshed.get("current_price"), refreshed.get("market_cap")
+        for key in self.QUOTE_FIELDS:
+            value = quote.data.get(key)
+            if value is not None and key not in manual:
+                refreshed[key] = value
+                provenance[key] = quote.provenance.get(key, quote.source)
+
+        new_price, new_cap = refreshed.get("current_price"), refreshed.get("market_cap")
+        if old_price and new_price and old_price > 0 and new_price != old_price:
+            ratio = new_price / old_price
+            for key in self.PRICE_MULTIPLES:
+                if key in manual or quote.data.get(key) is not None or refreshed.get(key) is None:
+                    continue
+                refreshed[key] = refreshed[key] * ratio
+        if (
+            old_cap is not None
+            and new_cap is not None
+            and refreshed.get("enterprise_value") is not None
+            and "enterprise_value" not in manual
+        ):
+            refreshed["enterprise_value"] += new_cap - old_cap
+
+        refreshed = self._refinalize(refreshed)
+        refreshed.setdefault("field_updated_at", {})["quote"] = datetime.utcfromtimestamp(quote.fetched_at).isoformat(
+            timespec="seconds"
+        )
+        logger.info("Cotización de %s refrescada con %s", ticker, quote.provider)
+        return refreshed
+
+    def _fetch_quote(self, ticker: str) -> Optional[SourceResult]:
+        """Cheapest quote available: FMP ``/quote`` (batched if prefetched), else Twelve Data."""
+        candidates = []
+        if self.fmp_client.enabled:
+            known = self._prefetched_parts("fmp", ticker, ("quote",))
+            candidates.append(
+                (
+                    "fmp",
+                    lambda: self._parse_fmp(
+                        None, known["quote"] if "quote" in known else self.fmp_client.get_quote(ticker), None, None
+                    ),
+                )
+            )
+        if self.twelve_client.enabled:
+            candidates.append(("twelve_data", lambda: self._fetch_twelve_data(ticker)))
+
+        for provider, fetch in candidates:
+            breaker = get_breakers().get(provider)
+            if not breaker.allow():
+                logger.info("Circuito abierto: se omite %s para la cotización de %s", provider, ticker)
+                continue
+            started = time.monotonic()
+            result = None
+            buffer: Dict[str, str] = {}
+            token = _provenance_buffer.set(buffer)
+            with capture_signals() as signals:
+                try:
+                    result = fetch()
+                except Exception as exc:
+                    logger.warning("Cotización de %s vía %s falló: %s", ticker, provider, exc)
+                    signals["failure"] += 1
+                finally:
+                    _provenance_buffer.reset(token)
+            suspicious = signals["suspicious"] > 0
+            ok = True if result else (False if signals["failure"] or suspicious else None)
+            breaker.record(ok, time.monotonic() - started, suspicious)
+            if result and result.data.get("current_price") is not None:
+                result.provenance = buffer
+                result.provider = provider
+                return result
+        return None
+
+    def _refinalize(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Re-run derived metrics and finalize on a stored dict, keeping ``scraped_at``.
+
+        Idempotent: warnings recomputed by finalize are dropped first and repeated
+        ones deduplicated afterwards.
+        """
+        scraped_at = metrics.get("scraped_at")
+        metrics["warnings"] = [
+            warning
+            for warning in metrics.get("warnings") or []
+            if not (isinstance(warning, str) and warning.startswith(self.RECOMPUTED_WARNING_PREFIXES))
+        ]
+        token = _call_provenance.set(dict(metrics.get("provenance") or {}))
+        try:
+            metrics = self._calculate_derived_metrics(metrics)
+            metrics = self._finalize_metrics(metrics)
+        finally:
+            _call_provenance.reset(token)
+
+        # Re-finalizar repite avisos que ya estaban en el dict
+        metrics["warnings"] = list(dict.fromkeys(metrics["warnings"]))
+        if scraped_at:
+            metrics["scraped_at"] = scraped_at
+        return metrics
+
+    @property
+    def provenance(self) -> Dict[str, str]:
+        """Provenance of the call in progress in the current thread or task."""
+        current = _call_provenance.get()
+        if current is None:
+            current = {}
+            _call_provenance.set(current)
+        return current
+
+    @provenance.setter
+    def provenance(self, value: Dict[str, str]) -> None:
+        _call_provenance.set(value)
+
     def _priority_rank(self, key: str, source: Optional[str]) -> int:
         order = self.metric_priority.get(key, [])
         if not order:
@@ -461,30 +1309,15 @@ class DataAgent:
                 self.provenance[key] = self._resolve_provenance_label(key, source)
 
     def _merge_provenance(self, prov: Dict[str, str]) -> None:
+        buffer = _provenance_buffer.get()
+        target = buffer if buffer is not None else self.provenance
         for key, value in prov.items():
-            self.provenance.setdefault(key, value)
-
-    def _load_classification_cache(self) -> Dict[str, Dict[str, str]]:
-        if not self.classification_path.exists():
-            return {}
-        try:
-            with self.classification_path.open("r", encoding="utf-8") as fh:
-                data = json.load(fh)
-                if isinstance(data, dict):
-                    return data
-        except json.JSONDecodeError:
-            logging.warning("Corrupted classification cache; rebuilding")
-        return {}
-
-    def _save_classification_cache(self) -> None:
-        try:
-            with self.classification_path.open("w", encoding="utf-8") as fh:
-                json.dump(self.classification_cache, fh, indent=2, sort_keys=True)
-        except OSError as exc:
-            logging.warning("No se pudo guardar la clasificacion de activos: %s", exc)
+            target.setdefault(key, value)
 
-    def _cache_classification(self, classification: AssetClassification) -> None:
+    def _cache_classification(self, classification: AssetClassification, classified_at: Optional[float] = None) -> None:
+        # classified_at se conserva al reutilizar la entrada: solo una reclasificación lo renueva
         self.classification_cache[classification.ticker] = {
+            "classified_at": classified_at or time.time(),
             "asset_type": classification.asset_type,
             "type_label": classification.type_label,
             "raw_type": classification.raw_type,
@@ -492,7 +1325,6 @@ class DataAgent:
             "is_analyzable": classification.is_analyzable,
             "source": classification.source,
         }
-        self._save_classification_cache()
 
     def _fetch_alpha_vantage(self, ticker: str) -> Optional[SourceResult]:
         if not self.alpha_client.enabled:
@@ -503,6 +1335,39 @@ class DataAgent:
         if not overview:
             return None
 
+        data, prov = self._parse_alpha_vantage_overview(overview)
+        if not data:
+            return None
+
+        # Alpha Vantage overview does not include live price reliably.
+        # Only fetch when we still miss current_price to avoid extra calls.
+        quote = None
+        if "current_price" not in data or data["current_price"] is None:
+            quote = self.alpha_client.get_global_quote(ticker)
+        return self._build_alpha_vantage_result(data, prov, quote)
+
+    async def _fetch_alpha_vantage_async(self, ticker: str) -> Optional[SourceResult]:
+        if not self.alpha_client.enabled:
+            logger.info("Alpha Vantage deshabilitado (API key ausente)")
+            return None
+
+        client = AsyncAlphaVantageClient(self.alpha_client)
+        overview = await client.get_overview(ticker)
+        if not overview:
+            return None
+
+        data, prov = self._parse_alpha_vantage_overview(overview)
+        if not data:
+            return None
+
+        quote = None
+        if "current_price" not in data or data["current_price"] is None:
+            quote = await client.get_global_quote(ticker)
+        return self._build_alpha_vantage_result(data, prov, quote)
+
+    def _parse_alpha_vantage_overview(
+        self, overview: Dict[str, Any]
+    ) -> Tuple[Dict[str, Optional[float]], Dict[str, str]]:
         data: Dict[str, Optional[float]] = {}
         prov: Dict[str, str] = {}
 
@@ -549,26 +1414,27 @@ class DataAgent:
         set_percentage("revenue_growth", overview.get("QuarterlyRevenueGrowthYOY"))
         set_percentage("earnings_growth", overview.get("QuarterlyEarningsGrowthYOY"))
 
-        if not data:
-            return None
+        return data, prov
 
-        if "current_price" not in data or data["current_price"] is None:
-            quote = self.alpha_client.get_global_quote(ticker)
-            if quote:
-                price_str = quote.get("05. price") or quote.get("05.price")
-                if price_str:
-                    price_val = self._parse_number(price_str)
-                    if price_val is not None:
-                        data.setdefault("current_price", price_val)
-                        prov["current_price"] = "alpha_vantage:quote"
-
-                currency = data.get("currency")
-                if not currency:
-                    data["currency"] = "USD"
-                    prov["currency"] = "alpha_vantage:quote"
+    def _build_alpha_vantage_result(
+        self,
+        data: Dict[str, Optional[float]],
+        prov: Dict[str, str],
+        quote: Optional[Dict[str, Any]],
+    ) -> SourceResult:
+        if quote:
+            price_str = quote.get("05. price") or quote.get("05.price")
+            if price_str:
+                price_val = self._parse_number(price_str)
+                if price_val is not None:
+                    data.setdefault("current_price", price_val)
+                    prov["current_price"] = "alpha_vantage:quote"
+
+            currency = data.get("currency")
+            if not currency:
+                data["currency"] = "USD"
+                prov["currency"] = "alpha_vantage:quote"
 
-        # Alpha Vantage overview does not include live price reliably.
-        # Only fetch when we still miss current_price to avoid extra calls.
         if data.get("currency") and data.get("market_cap") and data.get("market_cap") < 1e6:
             # Sometimes AV returns values scaled wrongly; drop unrealistic cap.
             data.pop("market_cap", None)
@@ -584,7 +1450,22 @@ class DataAgent:
             logger.info("Twelve Data deshabilitado (API key ausente)")
             return None
 
-        payload = self.twelve_client.get_quote(ticker)
+        known = self._prefetched_parts("twelve_data", ticker, ("quote",))
+        payload = known["quote"] if "quote" in known else self.twelve_client.get_quote(ticker)
+        return self._parse_twelve_data(payload)
+
+    async def _fetch_twelve_data_async(self, ticker: str) -> Optional[SourceResult]:
+        if not self.twelve_client.enabled:
+            logger.info("Twelve Data deshabilitado (API key ausente)")
+            return None
+
+        known = self._prefetched_parts("twelve_data", ticker, ("quote",))
+        if "quote" in known:
+            return self._parse_twelve_data(known["quote"])
+        payload = await AsyncTwelveDataClient(self.twelve_client).get_quote(ticker)
+        return self._parse_twelve_data(payload)
+
+    def _parse_twelve_data(self, payload: Optional[Dict[str, Any]]) -> Optional[SourceResult]:
         if not payload:
             return None
 
@@ -638,10 +1519,35 @@ class DataAgent:
             logger.info("FMP deshabilitado (API key ausente)")
             return None
 
+        known = self._prefetched_parts("fmp", ticker, ("profile", "quote"))
+        endpoints = {
+            "profile": self.fmp_client.get_profile,
+            "quote": self.fmp_client.get_quote,
+            "ratios": self.fmp_client.get_ratios,
+            "key_metrics": self.fmp_client.get_key_metrics,
+        }
+        bundle = {name: known[name] if name in known else fetch(ticker) for name, fetch in endpoints.items()}
+        return self._parse_fmp(**bundle)
+
+    async def _fetch_fmp_async(self, ticker: str) -> Optional[SourceResult]:
+        if not self.fmp_client.enabled:
+            logger.info("FMP deshabilitado (API key ausente)")
+            return None
+
+        known = self._prefetched_parts("fmp", ticker, ("profile", "quote"))
+        bundle = await AsyncFMPClient(self.fmp_client).get_company_bundle(ticker, known=known)
+        return self._parse_fmp(**bundle)
+
+    def _parse_fmp(
+        self,
+        profile: Optional[Dict[str, Any]],
+        quote: Optional[Dict[str, Any]],
+        ratios: Optional[Dict[str, Any]],
+        key_metrics: Optional[Dict[str, Any]],
+    ) -> Optional[SourceResult]:
         data: Dict[str, Optional[float]] = {}
         prov: Dict[str, str] = {}
 
-        profile = self.fmp_client.get_profile(ticker)
         if profile:
             text_fields = {
                 "company_name": profile.get("companyName"),
@@ -668,7 +1574,6 @@ class DataAgent:
                     data.setdefault("market_cap", parsed_cap)
                     prov["market_cap"] = "fmp:profile"
 
-        quote = self.fmp_client.get_quote(ticker)
         if quote:
             price = quote.get("price") or quote.get("previousClose")
             if price is not None:
@@ -690,7 +1595,6 @@ class DataAgent:
                     data.setdefault("pe_ratio", parsed_pe)
                     prov["pe_ratio"] = "fmp:quote"
 
-        ratios = self.fmp_client.get_ratios(ticker)
         if ratios:
             ratio_map = {
                 "roe": ratios.get("returnOnEquityTTM"),
@@ -715,7 +1619,6 @@ class DataAgent:
                 data.setdefault(field, parsed)
                 prov[field] = "fmp:ratios"
 
-        key_metrics = self.fmp_client.get_key_metrics(ticker)
         if key_metrics:
             km_map = {
                 "peg_ratio": key_metrics.get("pegRatioTTM") or key_metrics.get("pegRatio"),
@@ -748,13 +1651,7 @@ class DataAgent:
         url_stats = f"https://finance.yahoo.com/quote/{ticker}/key-statistics"
         resp = self._get(url_stats)
         if resp:
-            soup = BeautifulSoup(resp.text, "lxml")
-            for row in soup.select("section table tr"):
-                cells = row.find_all("td")
-                if len(cells) != 2:
-                    continue
-                label = cells[0].get_text(strip=True)
-                value = cells[1].get_text(strip=True)
+            for label, value in extractors.yahoo_key_statistics(resp.text):
 
                 def set_pct(field: str):
                     parsed = self._parse_percentage(value)
@@ -796,31 +1693,27 @@ class DataAgent:
         url_quote = f"https://finance.yahoo.com/quote/{ticker}"
         resp_quote = self._get(url_quote)
         if resp_quote:
-            soup = BeautifulSoup(resp_quote.text, "lxml")
+            quote = extractors.yahoo_quote(resp_quote.text)
 
             # Extraer precio actual
-            price_tag = soup.select_one("fin-streamer[data-field='regularMarketPrice']")
-            if price_tag:
-                raw_price = price_tag.get("value") or price_tag.text
-                price_val = self._parse_number(raw_price)
+            if quote.price is not None:
+                price_val = self._parse_number(quote.price)
                 if price_val is not None:
                     data.setdefault("current_price", price_val)
                     prov["current_price"] = "yahoo:quote"
 
             # Extraer market cap
-            market_cap_tag = soup.select_one("fin-streamer[data-field='marketCap']")
-            if market_cap_tag and market_cap_tag.get("value"):
+            if quote.market_cap:
                 try:
-                    market_cap_val = float(market_cap_tag.get("value"))
+                    market_cap_val = float(quote.market_cap)
                     data.setdefault("market_cap", market_cap_val)
                     prov["market_cap"] = "yahoo:quote"
                 except (ValueError, TypeError):
                     pass
 
-            # Extraer company name y sector (de los meta tags)
-            company_name_tag = soup.select_one("h1")
-            if company_name_tag:
-                company_name_text = company_name_tag.get_text(strip=True)
+            # Extraer company name (título de la página)
+            if quote.title is not None:
+                company_name_text = quote.title
                 # Remover el ticker si está entre paréntesis
                 if "(" in company_name_text:
                     company_name_text = company_name_text.split("(")[0].strip()
@@ -828,6 +1721,7 @@ class DataAgent:
                     data.setdefault("company_name", company_name_text)
                     prov["company_name"] = "yahoo:quote"
                 else:
+                    note_request_failure("suspicious")
                     logger.warning(
                         "Descartando nombre sospechoso desde Yahoo para %s: %s",
                         ticker,
@@ -845,30 +1739,23 @@ class DataAgent:
         resp = self._get(url)
         if resp is None:
             return None
-        soup = BeautifulSoup(resp.text, "lxml")
-        tables = soup.find_all("table", class_="snapshot-table2")
-        if not tables:
+        page = extractors.finviz_snapshot(resp.text)
+        if not page.tables:
             return None
         data: Dict[str, Optional[float]] = {}
-        for table in tables:
-            cells = table.find_all("td")
+        for cells in page.tables:
             for idx in range(0, len(cells), 2):
                 if idx + 1 >= len(cells):
                     continue
-                key = cells[idx].get_text(strip=True)
-                value = cells[idx + 1].get_text(strip=True)
-                mapped = self._map_finviz_metric(key, value)
+                mapped = self._map_finviz_metric(cells[idx], cells[idx + 1])
                 if mapped:
                     for field, val in mapped.items():
                         data.setdefault(field, val)
                         self._merge_provenance({field: "finviz"})
 
-        name_tag = soup.select_one(".fullview-title .fullview-title-name")
-        if name_tag:
-            data.setdefault("company_name", name_tag.get_text(strip=True))
-        meta_rows = soup.select(".fullview-title .fullview-title-data span")
-        for span in meta_rows:
-            text = span.get_text(strip=True)
+        if page.company_name is not None:
+            data.setdefault("company_name", page.company_name)
+        for text in page.meta:
             if text.startswith("Sector:"):
                 data.setdefault("sector", text.replace("Sector:", "").strip())
             if text.startswith("Industry:"):
@@ -921,14 +1808,9 @@ class DataAgent:
         resp = self._get(url)
         if resp is None:
             return None
-        soup = BeautifulSoup(resp.text, "lxml")
+        profile = extractors.marketwatch_profile(resp.text)
         data: Dict[str, Optional[float]] = {}
-        for row in soup.select("tbody tr"):
-            cells = row.find_all("td")
-            if len(cells) != 2:
-                continue
-            key = cells[0].get_text(strip=True)
-            value = cells[1].get_text(strip=True)
+        for key, value in profile.rows:
             lower = key.lower()
             if "p/e" in lower:
                 parsed = self._parse_number(value)
@@ -961,9 +1843,9 @@ class DataAgent:
                     data.setdefault("roa", parsed)
                     self._merge_provenance({"roa": "marketwatch"})
 
-        description = soup.find("div", class_="description__text")
-        if description and "Sector" in description.text:
-            match = re.search(r"Sector\s+(.+?)\s+Industry", description.text)
+        description = profile.description
+        if description and "Sector" in description:
+            match = re.search(r"Sector\s+(.+?)\s+Industry", description)
             if match:
                 data.setdefault("sector", match.group(1).strip())
 
@@ -1269,6 +2151,10 @@ class DataAgent:
         self._maybe_recalc_peg(metrics)
 
         classification = self._classify_asset(metrics)
+        classified_at = self.classification_cache.get(classification.ticker, {}).get("classified_at")
+        metrics.setdefault("field_updated_at", {})["classification"] = (
+            datetime.utcfromtimestamp(classified_at).isoformat(timespec="seconds") if classified_at else None
+        )
         metrics["asset_type"] = classification.asset_type
         metrics["asset_type_label"] = classification.type_label
         metrics["asset_classification"] = {
@@ -1376,29 +2262,8 @@ class DataAgent:
         return finalized, applied, invalid
 
     def _calculate_completeness(self, metrics: Dict) -> float:
-        required = [
-            "pe_ratio",
-            "peg_ratio",
-            "price_to_book",
-            "roe",
-            "roic",
-            "operating_margin",
-            "net_margin",
-            "debt_to_equity",
-            "current_ratio",
-            "quick_ratio",
-            "revenue_growth",
-            "earnings_growth",
-        ]
-        alternatives = {
-            "revenue_growth": ["revenue_growth_5y", "revenue_growth_qoq"],
-            "earnings_growth": [
-                "earnings_growth_this_y",
-                "earnings_growth_next_y",
-                "earnings_growth_next_5y",
-                "earnings_growth_qoq",
-            ],
-        }
+        required = self.COMPLETENESS_FIELDS
+        alternatives = self.COMPLETENESS_ALTERNATIVES
         available = []
         for field in required:
             if metrics.get(field) is not None:
@@ -1468,10 +2333,12 @@ class DataAgent:
             ignored.append(f"Margen operativo ({op_margin:.1f}%)")
             metrics["operating_margin"] = None
 
+        margin_note = "Margen operativo ajustado por fuerte crecimiento (>25%)."
         if metrics.get("earnings_growth") and metrics.get("operating_margin") and metrics["operating_margin"] < 10:
-            if metrics["earnings_growth"] > 25:
+            # Sin repetir el ajuste al re-finalizar métricas ya ajustadas (overrides, migraciones)
+            if metrics["earnings_growth"] > 25 and margin_note not in warnings:
                 metrics["operating_margin"] = min(metrics["operating_margin"] * 1.5, 18)
-                warnings.append("Margen operativo ajustado por fuerte crecimiento (>25%).")
+                warnings.append(margin_note)
 
         if metrics.get("earnings_growth") and metrics.get("roe") is None and metrics.get("roa"):
             metrics["roe"] = metrics["roa"] * 1.2
@@ -1526,7 +2393,12 @@ class DataAgent:
             "primary_source": metrics.get("primary_source"),
         }
         cached = self.classification_cache.get(payload["ticker"])
+        classified_at = None
+        if cached and self._classification_expired(cached):
+            logger.info("Clasificación de %s caducada; se reclasifica", payload["ticker"])
+            cached = None
         if cached:
+            classified_at = cached.get("classified_at")
             classification = AssetClassification(
                 ticker=payload["ticker"],
                 asset_type=cached.get("asset_type", "UNKNOWN"),
@@ -1557,9 +2429,15 @@ class DataAgent:
                 classification.needs_special_metrics = False
         classification.is_analyzable = classification.asset_type == "EQUITY"
         classification.needs_special_metrics = classification.asset_type in AssetClassifier.SPECIAL_METRICS
-        self._cache_classification(classification)
+        self._cache_classification(classification, classified_at)
         return classification
 
+    def _classification_expired(self, cached: Dict[str, Any]) -> bool:
+        classified_at = cached.get("classified_at")
+        if CLASSIFICATION_TTL_HOURS <= 0 or not classified_at or cached.get("source") == "manual_override":
+            return False
+        return time.time() - classified_at > CLASSIFICATION_TTL_HOURS * 3600
+
     def _apply_asset_special_cases(self, metrics: Dict, classification) -> None:
         ticker = metrics.get("ticker", "")
         metrics.pop("analysis_note", None)
@@ -1722,15 +2600,16 @@ class DataAgent:
         normalized = name.strip().lower()
         if not normalized:
             return True
-        suspicious_keywords = [
-            "yahoo finance",
-            "finance.yahoo.com",
-            "captcha",
-            "temporarily unavailable",
-            "will be right back",
-            "service unavailable",
-        ]
+        suspicious_keywords = ["yahoo finance", "finance.yahoo.com", *self.BLOCK_PAGE_KEYWORDS]
         return any(keyword in normalized for keyword in suspicious_keywords)
+
+    def _is_block_page(self, html: str) -> bool:
+        """Detecta captchas / páginas de mantenimiento servidas con HTTP 200 (por su <title>)."""
+        match = self._TITLE_RE.search(html[:20000])
+        if not match:
+            return False
+        title = match.group(1).strip().lower()
+        return any(keyword in title for keyword in self.BLOCK_PAGE_KEYWORDS)
     
     def _calculate_derived_metrics(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -6,8 +6,12 @@ Permite persistir el contador de visitas entre redeploys en produccion.
 import os
 import sqlite3
 import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple, Any
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
 from urllib.parse import urlparse
 
 logger = logging.getLogger("DBManager")
@@ -29,6 +33,243 @@ else:
     logger.info("SQLite habilitado (desarrollo)")
 
 
+# Ajustes de conexiones SQLite persistentes
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024)))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+
+
+def connect_sqlite(
+    path: Path,
+    busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS,
+    cache_size_kb: int = SQLITE_CACHE_SIZE_KB,
+    mmap_size: int = SQLITE_MMAP_SIZE,
+    synchronous: str = SQLITE_SYNCHRONOUS,
+) -> sqlite3.Connection:
+    """
+    Abre una conexion SQLite con WAL, pragmas ajustados y busy_timeout.
+
+    ``check_same_thread=False`` permite que un pool entregue la conexion a
+    distintos hilos (nunca a dos a la vez).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(
+        str(path),
+        timeout=busy_timeout_ms / 1000.0,
+        check_same_thread=False,
+    )
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA synchronous = {synchronous}")
+    # Valor negativo = tamano en KiB
+    conn.execute(f"PRAGMA cache_size = -{int(cache_size_kb)}")
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+# Ajustes del pool de conexiones de DatabaseManager
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_HEALTH_CHECK_IDLE = float(os.getenv("DB_POOL_HEALTH_CHECK_IDLE", "30"))
+
+
+class PoolTimeout(Exception):
+    """No hubo conexion disponible dentro del tiempo de espera."""
+
+
+class _PooledConnection:
+    """Conexion del pool con sus marcas de tiempo."""
+
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones thread-safe, independiente del motor.
+
+    - min_size conexiones se abren al crear el pool; nunca se superan max_size
+    - Al hacer checkout, si la conexion estuvo ociosa mas de
+      ``health_check_idle`` segundos se valida con un ``SELECT 1``
+    - Las conexiones con mas de ``max_lifetime`` segundos se reciclan
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = DB_POOL_MIN_SIZE,
+        max_size: int = DB_POOL_MAX_SIZE,
+        max_lifetime: float = DB_POOL_MAX_LIFETIME,
+        timeout: float = DB_POOL_TIMEOUT,
+        health_check_idle: float = DB_POOL_HEALTH_CHECK_IDLE,
+    ):
+        self._connect = connect
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_idle = health_check_idle
+        self._idle: Deque[_PooledConnection] = deque()
+        self._checked_out: Dict[int, _PooledConnection] = {}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {"created": 0, "recycled": 0, "failed_checks": 0, "timeouts": 0}
+
+        for _ in range(self.min_size):
+            with self._cond:
+                self._size += 1
+            try:
+                self._idle.append(self._open())
+            except Exception as exc:
+                # Se reintentara en el primer checkout
+                logger.warning("No se pudo precargar el pool: %s", exc)
+                break
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Presta una conexion del pool.
+
+        Al salir sin error se hace commit; con error, rollback. La conexion
+        vuelve al pool (o se descarta si quedo inutilizable).
+        """
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.release(conn, discard=broken)
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            with self._cond:
+                pooled = None
+                while pooled is None:
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"Sin conexiones libres tras {self.timeout}s (max={self.max_size})")
+                    self._cond.wait(remaining)
+
+            if pooled is None:
+                pooled = self._open()
+            elif not self._usable(pooled):
+                self._discard(pooled)
+                continue
+
+            with self._cond:
+                self._checked_out[id(pooled.conn)] = pooled
+            return pooled.conn
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        with self._cond:
+            pooled = self._checked_out.pop(id(conn), None)
+        if pooled is None:
+            return
+        if discard or self._expired(pooled):
+            if not discard:
+                with self._cond:
+                    self._stats["recycled"] += 1
+            self._discard(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    def close_all(self) -> None:
+        """Cierra las conexiones ociosas (las prestadas se cierran al devolverse)."""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close(pooled.conn)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._checked_out),
+                "max_size": self.max_size,
+                **self._stats,
+            }
+
+    def _open(self) -> _PooledConnection:
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        return _PooledConnection(conn)
+
+    def _expired(self, pooled: _PooledConnection) -> bool:
+        return self.max_lifetime > 0 and time.monotonic() - pooled.created_at > self.max_lifetime
+
+    def _usable(self, pooled: _PooledConnection) -> bool:
+        if self._expired(pooled):
+            with self._cond:
+                self._stats["recycled"] += 1
+            return False
+        if time.monotonic() - pooled.last_used < self.health_check_idle:
+            return True
+        try:
+            cursor = pooled.conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            pooled.conn.rollback()
+            return True
+        except Exception as exc:
+            logger.warning("Conexion del pool descartada (health check): %s", exc)
+            with self._cond:
+                self._stats["failed_checks"] += 1
+            return False
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        self._close(pooled.conn)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
 class DatabaseManager:
     """
     Gestor de base de datos que soporta SQLite y PostgreSQL
@@ -55,12 +296,31 @@ class DatabaseManager:
         else:
             logger.info(f"Modo: DESARROLLO (SQLite: {self.sqlite_path})")
 
+        self.pool = ConnectionPool(self.get_connection)
+
     def get_connection(self):
-        """Retorna una conexion a la base de datos apropiada"""
+        """Retorna una conexion nueva (fuera del pool) a la base de datos apropiada"""
         if self.is_production:
             return psycopg2.connect(self.database_url, cursor_factory=DictCursor)
         else:
-            return sqlite3.connect(str(self.sqlite_path))
+            return connect_sqlite(self.sqlite_path)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Conexion prestada del pool (commit al salir, rollback si hay error).
+
+        Ejemplo:
+            with db_manager.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(...)
+        """
+        with self.pool.connection() as conn:
+            yield conn
+
+    def adapt_query(self, query: str) -> str:
+        """Convierte placeholders de SQLite (?) a PostgreSQL (%s) si es necesario"""
+        return query.replace("?", "%s") if self.is_production else query
 
     def execute_query(self, query: str, params: Tuple = ()) -> Any:
         """
@@ -73,21 +333,13 @@ class DatabaseManager:
         Returns:
             Lista de resultados
         """
-        # Convertir placeholders de SQLite (?) a PostgreSQL (%s) si es necesario
-        if self.is_production:
-            query = query.replace("?", "%s")
-
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            conn.commit()
-            return results
-        finally:
-            cursor.close()
-            conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self.adapt_query(query), params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
 
     def execute_update(self, query: str, params: Tuple = ()) -> int:
         """
@@ -100,21 +352,13 @@ class DatabaseManager:
         Returns:
             Numero de filas afectadas
         """
-        # Convertir placeholders de SQLite (?) a PostgreSQL (%s) si es necesario
-        if self.is_production:
-            query = query.replace("?", "%s")
-
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(query, params)
-            rowcount = cursor.rowcount
-            conn.commit()
-            return rowcount
-        finally:
-            cursor.close()
-            conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self.adapt_query(query), params)
+                return cursor.rowcount
+            finally:
+                cursor.close()
 
     def init_tables(self):
         """Inicializa las tablas necesarias en la base de datos"""
@@ -125,71 +369,125 @@ class DatabaseManager:
 
     def _init_sqlite_tables(self):
         """Inicializa tablas para SQLite"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            # Tabla de visitas totales
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS site_visits (
-                    id INTEGER PRIMARY KEY,
-                    total_visits INTEGER DEFAULT 0,
-                    last_updated TEXT
-                )
-            ''')
-
-            # Tabla de visitas diarias
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS daily_visits (
-                    date TEXT PRIMARY KEY,
-                    visits INTEGER DEFAULT 0
-                )
-            ''')
-
-            # Inicializar contador si no existe
-            cursor.execute('SELECT COUNT(*) FROM site_visits WHERE id = 1')
-            if cursor.fetchone()[0] == 0:
-                cursor.execute('INSERT INTO site_visits (id, total_visits) VALUES (1, 0)')
-
-            conn.commit()
-            logger.info("Tablas SQLite inicializadas")
-        finally:
-            cursor.close()
-            conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                # Tabla de visitas totales
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS site_visits (
+                        id INTEGER PRIMARY KEY,
+                        total_visits INTEGER DEFAULT 0,
+                        last_updated TEXT
+                    )
+                ''')
+
+                # Tabla de visitas diarias
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS daily_visits (
+                        date TEXT PRIMARY KEY,
+                        visits INTEGER DEFAULT 0
+                    )
+                ''')
+
+                # Locks de fetch entre procesos (single-flight distribuido)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS fetch_locks (
+                        lock_key TEXT PRIMARY KEY,
+                        owner TEXT,
+                        expires_at REAL
+                    )
+                ''')
+
+                # Token buckets de rate limit compartidos entre workers
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                        bucket_key TEXT PRIMARY KEY,
+                        tokens REAL,
+                        updated_at REAL
+                    )
+                ''')
+
+                # Estadisticas del planner de fuentes (aporte y latencia por fuente)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS source_stats (
+                        source TEXT PRIMARY KEY,
+                        runs REAL,
+                        hits REAL,
+                        latency_total REAL,
+                        group_counts TEXT,
+                        updated_at TEXT
+                    )
+                ''')
+
+                # Inicializar contador si no existe
+                cursor.execute('SELECT COUNT(*) FROM site_visits WHERE id = 1')
+                if cursor.fetchone()[0] == 0:
+                    cursor.execute('INSERT INTO site_visits (id, total_visits) VALUES (1, 0)')
+
+                logger.info("Tablas SQLite inicializadas")
+            finally:
+                cursor.close()
 
     def _init_postgres_tables(self):
         """Inicializa tablas para PostgreSQL"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            # Tabla de visitas totales
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS site_visits (
-                    id INTEGER PRIMARY KEY,
-                    total_visits INTEGER DEFAULT 0,
-                    last_updated TIMESTAMP
-                )
-            ''')
-
-            # Tabla de visitas diarias
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS daily_visits (
-                    date DATE PRIMARY KEY,
-                    visits INTEGER DEFAULT 0
-                )
-            ''')
-
-            # Inicializar contador si no existe
-            cursor.execute('SELECT COUNT(*) FROM site_visits WHERE id = 1')
-            if cursor.fetchone()[0] == 0:
-                cursor.execute('INSERT INTO site_visits (id, total_visits) VALUES (1, 0)')
-
-            conn.commit()
-            logger.info("Tablas PostgreSQL inicializadas")
-        finally:
-            cursor.close()
-            conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                # Tabla de visitas totales
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS site_visits (
+                        id INTEGER PRIMARY KEY,
+                        total_visits INTEGER DEFAULT 0,
+                        last_updated TIMESTAMP
+                    )
+                ''')
+
+                # Tabla de visitas diarias
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS daily_visits (
+                        date DATE PRIMARY KEY,
+                        visits INTEGER DEFAULT 0
+                    )
+                ''')
+
+                # Locks de fetch entre procesos (single-flight distribuido)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS fetch_locks (
+                        lock_key TEXT PRIMARY KEY,
+                        owner TEXT,
+                        expires_at DOUBLE PRECISION
+                    )
+                ''')
+
+                # Token buckets de rate limit compartidos entre workers
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                        bucket_key TEXT PRIMARY KEY,
+                        tokens DOUBLE PRECISION,
+                        updated_at DOUBLE PRECISION
+                    )
+                ''')
+
+                # Estadisticas del planner de fuentes (aporte y latencia por fuente)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS source_stats (
+                        source TEXT PRIMARY KEY,
+                        runs DOUBLE PRECISION,
+                        hits DOUBLE PRECISION,
+                        latency_total DOUBLE PRECISION,
+                        group_counts TEXT,
+                        updated_at TEXT
+                    )
+                ''')
+
+                # Inicializar contador si no existe
+                cursor.execute('SELECT COUNT(*) FROM site_visits WHERE id = 1')
+                if cursor.fetchone()[0] == 0:
+                    cursor.execute('INSERT INTO site_visits (id, total_visits) VALUES (1, 0)')
+
+                logger.info("Tablas PostgreSQL inicializadas")
+            finally:
+                cursor.close()
 
 
 # Instancia global del gestor de base de datos
@@ -283,18 +283,14 @@ def renew_license(email_or_key: str):
     print(f"⏱️  Extensión: 30 días adicionales")
     
     # Primero verificar si existe sin hacer UPDATE
-    import sqlite3
-    conn = sqlite3.connect(limiter.db_path)
-    cursor = conn.cursor()
-    
     if email_or_key.startswith('RVC-'):
-        cursor.execute("""
+        rows = limiter.db.execute_query("""
             SELECT license_key, email, expires_at, is_active, renewal_count
             FROM pro_licenses
             WHERE license_key = ?
         """, (email_or_key,))
     else:
-        cursor.execute("""
+        rows = limiter.db.execute_query("""
             SELECT license_key, email, expires_at, is_active, renewal_count
             FROM pro_licenses
             WHERE email = ?
@@ -302,8 +298,7 @@ def renew_license(email_or_key: str):
             LIMIT 1
         """, (email_or_key,))
     
-    result = cursor.fetchone()
-    conn.close()
+    result = rows[0] if rows else None
     
     if not result:
         print(f"\n⚠️  No se encontró licencia existente para: {email_or_key}")
@@ -524,22 +519,15 @@ williamppmm@hotmail.com
 
 def list_licenses():
     """Listar todas las licencias activas."""
-    import sqlite3
     limiter = get_limiter()
     
-    conn = sqlite3.connect(limiter.db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
+    licenses = limiter.db.execute_query("""
         SELECT license_key, email, plan_type, created_at, expires_at, is_active, 
                renewal_count, last_renewed_at
         FROM pro_licenses
         ORDER BY created_at DESC
     """)
     
-    licenses = cursor.fetchall()
-    conn.close()
-    
     if not licenses:
         print("\n📋 No hay licencias registradas")
         return
@@ -603,7 +591,6 @@ def validate_license_cmd(license_key: str):
 
 def deactivate_license(license_key: str):
     """Desactivar una licencia."""
-    import sqlite3
     limiter = get_limiter()
     
     print(f"\n⚠️  Desactivando licencia: {license_key}")
@@ -614,23 +601,17 @@ def deactivate_license(license_key: str):
         return
     
     try:
-        conn = sqlite3.connect(limiter.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        updated = limiter.db.execute_update("""
             UPDATE pro_licenses
             SET is_active = 0
             WHERE license_key = ?
         """, (license_key,))
         
-        if cursor.rowcount == 0:
+        if updated == 0:
             print(f"\n❌ Licencia no encontrada")
         else:
-            conn.commit()
             print(f"\n✅ Licencia desactivada exitosamente")
         
-        conn.close()
-        
     except Exception as e:
         print(f"\n❌ Error: {e}")
 
@@ -651,7 +632,6 @@ def show_stats():
 
 def delete_license(license_key: str):
     """Eliminar permanentemente una licencia de la base de datos."""
-    import sqlite3
     limiter = get_limiter()
     
     print(f"\n⚠️  ELIMINACIÓN PERMANENTE")
@@ -665,34 +645,25 @@ def delete_license(license_key: str):
         return
     
     try:
-        conn = sqlite3.connect(limiter.db_path)
-        cursor = conn.cursor()
-        
         # Primero mostrar info de la licencia
-        cursor.execute("""
+        rows = limiter.db.execute_query("""
             SELECT email, plan_type, created_at, expires_at
             FROM pro_licenses
             WHERE license_key = ?
         """, (license_key,))
         
-        license_info = cursor.fetchone()
-        
-        if not license_info:
+        if not rows:
             print(f"\n❌ Licencia no encontrada: {license_key}")
-            conn.close()
             return
         
-        email, plan, created, expires = license_info
+        email, plan, created, expires = rows[0]
         
         # Eliminar la licencia
-        cursor.execute("""
+        limiter.db.execute_update("""
             DELETE FROM pro_licenses
             WHERE license_key = ?
         """, (license_key,))
         
-        conn.commit()
-        conn.close()
-        
         print(f"\n✅ Licencia ELIMINADA permanentemente")
         print(f"\nDetalles de la licencia eliminada:")
         print(f"  • Key: {license_key}")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Cache LRU en memoria, acotada por número de entradas y por tamaño en bytes.
+
+Se usa delante de ``financial_cache`` para evitar la lectura de disco y el
+``json.loads`` en las consultas de tickers frecuentes.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class BoundedLRUCache:
+    """
+    LRU thread-safe con límites de entradas y bytes, y TTL opcional.
+
+    El tamaño de cada entrada lo indica el llamador (ej: longitud del JSON
+    original), así no hay que estimar el peso de objetos Python.
+
+    Ejemplo:
+        cache = BoundedLRUCache(max_entries=256, max_bytes=32 * 1024 * 1024)
+        cache.put(("AAPL", 5), metrics, size=len(payload))
+        metrics = cache.get(("AAPL", 5))
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # clave -> (valor, tamaño, timestamp de inserción)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, stored_at = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, size: int) -> bool:
+        """Guarda ``value``; retorna False si la entrada no cabe en la cache."""
+        if not self.enabled or size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Elimina las entradas cuya clave cumpla ``predicate``."""
+        with self._lock:
+            doomed = [key for key in self._entries if predicate(key)]
+            for key in doomed:
+                self._remove(key)
+        return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+class TimedMemo:
+    """
+    Memo de cómputos deterministas sobre una ``BoundedLRUCache``.
+
+    Cada valor se guarda con lo que costó calcularlo; cada acierto suma ese
+    tiempo a ``time_saved_seconds``. Los valores se comparten entre llamadas:
+    el llamador no debe mutarlos.
+
+    Ejemplo:
+        memo = TimedMemo(BoundedLRUCache(max_entries=1024))
+        scores = memo.get_or_compute(key, lambda: analyzer.analyze(metrics), size_of=len_json)
+    """
+
+    def __init__(self, cache: BoundedLRUCache):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self.compute_seconds = 0.0
+        self.time_saved_seconds = 0.0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], size_of: Callable[[Any], int]) -> Any:
+        if self.cache.enabled:
+            entry = self.cache.get(key)
+            if entry is not None:
+                value, elapsed = entry
+                with self._lock:
+                    self.time_saved_seconds += elapsed
+                return value
+
+        started = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.compute_seconds += elapsed
+        if self.cache.enabled:
+            self.cache.put(key, (value, elapsed), size=size_of(value))
+        return value
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        with self._lock:
+            stats["compute_seconds"] = round(self.compute_seconds, 4)
+            stats["time_saved_seconds"] = round(self.time_saved_seconds, 4)
+        return stats
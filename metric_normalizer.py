@@ -7,8 +7,12 @@ Convierte todas las métricas a USD como moneda interna.
 Parte de IMPROVEMENT_PLAN.md - Mejora #2 (Prioridad P0)
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any
 import logging
+import threading
+
+import numpy as np
+import pandas as pd
 
 logger = logging.getLogger("MetricNormalizer")
 
@@ -39,6 +43,15 @@ EXCHANGE_RATES = {
 }
 
 
+def empty_normalization_stats() -> Dict[str, Any]:
+    """Contadores de normalización a cero (agregados o de una sola invocación)."""
+    return {
+        "total_normalized": 0,
+        "period_usage": {period: 0 for period in PERIOD_HIERARCHY.keys()},
+        "currency_conversions": 0
+    }
+
+
 class MetricNormalizer:
     """
     Normaliza métricas financieras a período y moneda estándar.
@@ -66,17 +79,40 @@ class MetricNormalizer:
         """Inicializa el normalizador con configuración de períodos y monedas."""
         self.period_hierarchy = PERIOD_HIERARCHY
         self.exchange_rates = EXCHANGE_RATES
-        self.normalization_stats = {
-            "total_normalized": 0,
-            "period_usage": {period: 0 for period in PERIOD_HIERARCHY.keys()},
-            "currency_conversions": 0
-        }
+        # Agregados del proceso; cada invocación cuenta en su propio dict y los suma aquí
+        self.normalization_stats = empty_normalization_stats()
+        self._stats_lock = threading.Lock()
+    
+    def _count(
+        self,
+        stats: Optional[Dict[str, Any]],
+        period: Optional[str] = None,
+        conversion: bool = False
+    ) -> None:
+        """Anota un uso en ``stats`` (contadores de la invocación) o, sin ellos, en los agregados."""
+        counters = stats if stats is not None else empty_normalization_stats()
+        if period is not None:
+            counters["total_normalized"] += 1
+            counters["period_usage"][period] += 1
+        if conversion:
+            counters["currency_conversions"] += 1
+        if stats is None:
+            self.record_stats(counters)
+    
+    def record_stats(self, stats: Dict[str, Any]) -> None:
+        """Suma a los agregados compartidos los contadores de una invocación."""
+        with self._stats_lock:
+            self.normalization_stats["total_normalized"] += stats["total_normalized"]
+            self.normalization_stats["currency_conversions"] += stats["currency_conversions"]
+            for period, count in stats["period_usage"].items():
+                self.normalization_stats["period_usage"][period] += count
     
     def normalize_metric(
         self, 
         metric_name: str, 
         raw_values: Dict[str, Any],
-        allowed_periods: Optional[List[str]] = None
+        allowed_periods: Optional[List[str]] = None,
+        stats: Optional[Dict[str, Any]] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Normaliza una métrica siguiendo jerarquía de períodos.
@@ -86,6 +122,8 @@ class MetricNormalizer:
             raw_values: Dict con valores crudos que pueden incluir sufijos de período
                        Ej: {"roe_ttm": 22.3, "roe_mry": 21.8, "roe": 20.0}
             allowed_periods: Lista de períodos permitidos (None = todos)
+            stats: Contadores de la invocación (``empty_normalization_stats``);
+                   None = contar directamente en los agregados
         
         Returns:
             Dict con:
@@ -134,8 +172,7 @@ class MetricNormalizer:
                     continue
                 
                 # Actualizar stats
-                self.normalization_stats["total_normalized"] += 1
-                self.normalization_stats["period_usage"][period] += 1
+                self._count(stats, period=period)
                 
                 return {
                     "value": value,
@@ -149,8 +186,7 @@ class MetricNormalizer:
             try:
                 value = float(raw_values[metric_name])
                 
-                self.normalization_stats["total_normalized"] += 1
-                self.normalization_stats["period_usage"]["TTM"] += 1
+                self._count(stats, period="TTM")
                 
                 return {
                     "value": value,
@@ -169,7 +205,8 @@ class MetricNormalizer:
         self, 
         value: float, 
         from_currency: str,
-        to_currency: str = "USD"
+        to_currency: str = "USD",
+        stats: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Convierte un valor de una moneda a otra (por defecto a USD).
@@ -178,6 +215,7 @@ class MetricNormalizer:
             value: Valor a convertir
             from_currency: Código de moneda origen (ISO 4217)
             to_currency: Código de moneda destino (default: "USD")
+            stats: Contadores de la invocación (None = agregados)
         
         Returns:
             Dict con:
@@ -227,7 +265,7 @@ class MetricNormalizer:
         
         # Actualizar stats
         if from_currency != to_currency:
-            self.normalization_stats["currency_conversions"] += 1
+            self._count(stats, conversion=True)
         
         return {
             "value": converted_value,
@@ -241,7 +279,8 @@ class MetricNormalizer:
         self,
         metrics_dict: Dict[str, Any],
         metric_names: List[str],
-        currency: str = "USD"
+        currency: str = "USD",
+        stats: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Normaliza múltiples métricas en lote.
@@ -250,6 +289,7 @@ class MetricNormalizer:
             metrics_dict: Dict con todas las métricas crudas
             metric_names: Lista de nombres de métricas a normalizar
             currency: Moneda de las métricas (para conversión a USD)
+            stats: Contadores de la invocación (None = agregados)
         
         Returns:
             Dict con métricas normalizadas y metadata:
@@ -287,7 +327,7 @@ class MetricNormalizer:
         failed_metrics = []
         
         for metric_name in metric_names:
-            normalized = self.normalize_metric(metric_name, metrics_dict)
+            normalized = self.normalize_metric(metric_name, metrics_dict, stats=stats)
             
             if normalized:
                 result[metric_name] = normalized["value"]
@@ -307,6 +347,40 @@ class MetricNormalizer:
         
         return result
     
+    def normalize_columns(
+        self,
+        table: pd.DataFrame,
+        metric_names: Iterable[str]
+    ) -> pd.DataFrame:
+        """
+        Versión columnar de ``normalize_metrics_batch`` para muchos tickers a la vez.
+
+        Para cada métrica toma, fila a fila, la primera columna con valor numérico
+        siguiendo la misma jerarquía que ``normalize_metric`` (``roe_ttm`` >
+        ``roe_mrq`` > ... > ``roe``). NaN/None y valores no numéricos cuentan
+        como ausentes. No actualiza las estadísticas de uso.
+
+        Args:
+            table: DataFrame con una fila por ticker
+            metric_names: Nombres base de las métricas a normalizar
+
+        Returns:
+            DataFrame (mismo índice) con una columna float por métrica; NaN si no hay valor
+        """
+        periods = sorted(self.period_hierarchy, key=self.period_hierarchy.get)
+        result = {}
+
+        for metric_name in metric_names:
+            keys = [f"{metric_name}_{period.lower()}" for period in periods] + [metric_name]
+            values = np.full(len(table), np.nan)
+            for key in keys:
+                if key in table.columns:
+                    column = pd.to_numeric(table[key], errors="coerce").to_numpy(dtype=float)
+                    values = np.where(np.isnan(values), column, values)
+            result[metric_name] = values
+
+        return pd.DataFrame(result, index=table.index)
+
     def get_normalization_stats(self) -> Dict[str, Any]:
         """
         Retorna estadísticas de normalización.
@@ -318,24 +392,24 @@ class MetricNormalizer:
                 - period_usage_pct: Porcentaje de uso de cada período
                 - currency_conversions: Total de conversiones de moneda
         """
-        total = self.normalization_stats["total_normalized"]
+        with self._stats_lock:
+            total = self.normalization_stats["total_normalized"]
+            period_usage = self.normalization_stats["period_usage"].copy()
+            currency_conversions = self.normalization_stats["currency_conversions"]
         
         period_usage_pct = {}
         if total > 0:
-            for period, count in self.normalization_stats["period_usage"].items():
+            for period, count in period_usage.items():
                 period_usage_pct[period] = round((count / total) * 100, 2)
         
         return {
             "total_normalized": total,
-            "period_usage": self.normalization_stats["period_usage"].copy(),
+            "period_usage": period_usage,
             "period_usage_pct": period_usage_pct,
-            "currency_conversions": self.normalization_stats["currency_conversions"]
+            "currency_conversions": currency_conversions
         }
     
     def reset_stats(self):
         """Resetea las estadísticas de normalización."""
-        self.normalization_stats = {
-            "total_normalized": 0,
-            "period_usage": {period: 0 for period in PERIOD_HIERARCHY.keys()},
-            "currency_conversions": 0
-        }
+        with self._stats_lock:
+            self.normalization_stats = empty_normalization_stats()
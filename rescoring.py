@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Re-scoring del universo en cache sin consultar las fuentes.
+
+``rvc_scores`` se escribe como efecto de /analyze y /api/comparar, así que el
+ranking mezcla scores de distintas versiones del motor. Cada fila guarda la
+versión del motor (``EquityAnalyzer.engine_version``, que incluye pesos, tablas
+de umbrales y benchmarks) y un hash de las métricas que la produjeron
+(``EquityAnalyzer.input_hash``). Este job recorre financial_cache por lotes y
+re-puntúa con ``score_batch`` solo las acciones cuyo score falta o cuyo motor o
+entradas cambiaron.
+
+Uso (CLI):
+    python rescoring.py                  # re-puntúa las filas desactualizadas
+    python rescoring.py --dry-run        # solo cuenta qué se re-puntuaría
+    python rescoring.py --force          # re-puntúa todo el universo
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from cache_store import decode_payload
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def score_breakdown(quality: float, valuation: float, health: float, growth: float) -> Dict[str, float]:
+    """Breakdown simplificado que se guarda en rvc_scores (mismas claves que /analyze)."""
+    return {"calidad": quality, "valoracion": valuation, "salud": health, "crecimiento": growth}
+
+
+class Rescorer:
+    """
+    Re-puntúa financial_cache por lotes con el motor de scoring vigente.
+
+    Args:
+        store: ``CacheStore`` con financial_cache y rvc_scores
+        analyzer: ``EquityAnalyzer`` (score_batch, engine_version, input_hash)
+        on_progress: Callback opcional ``(revisadas, total)`` tras cada lote
+    """
+
+    def __init__(self, store, analyzer, on_progress: Optional[ProgressCallback] = None):
+        self.store = store
+        self.analyzer = analyzer
+        self.on_progress = on_progress
+
+    def _score_rows(self, entries: List[Tuple[str, Dict[str, Any], str]], engine_version: str) -> List[Tuple]:
+        """Filas de rvc_scores para ``entries`` = [(ticker, metrics, input_hash)]."""
+        frame = pd.DataFrame(
+            [self.analyzer.scoring_inputs(metrics) for _, metrics, _ in entries],
+            index=[ticker for ticker, _, _ in entries],
+        )
+        scores = self.analyzer.score_batch(frame)
+        calculated_at = datetime.now().isoformat(timespec="seconds")
+        rows = []
+        for (ticker, _, input_hash), row in zip(entries, scores.itertuples(index=False)):
+            breakdown = score_breakdown(
+                float(row.quality_score), float(row.valuation_score), float(row.financial_health_score),
+                float(row.growth_score),
+            )
+            rows.append(
+                (ticker, float(row.investment_score), row.category, breakdown, calculated_at, engine_version, input_hash)
+            )
+        return rows
+
+    def _process_batch(self, batch: List[Tuple[str, Dict[str, Any]]], engine_version: str, force: bool,
+                       dry_run: bool, report: Dict[str, Any]) -> None:
+        stamps = self.store.score_stamps([ticker for ticker, _ in batch])
+        dirty = []
+        for ticker, metrics in batch:
+            input_hash = self.analyzer.input_hash(metrics)
+            if not force and stamps.get(ticker) == (engine_version, input_hash):
+                report["unchanged"] += 1
+                continue
+            dirty.append((ticker, metrics, input_hash))
+        if not dirty:
+            return
+        try:
+            rows = self._score_rows(dirty, engine_version)
+            if not dry_run:
+                self.store.save_scores(rows)
+        except Exception as exc:
+            logger.error("Re-scoring: error en lote de %s tickers: %s", len(dirty), exc, exc_info=True)
+            report["failed"].extend(ticker for ticker, _, _ in dirty)
+            return
+        report["rescored"].extend(ticker for ticker, _, _ in dirty)
+
+    def run(self, batch_size: int = 200, force: bool = False, dry_run: bool = False) -> Dict[str, Any]:
+        """Recorre financial_cache y re-puntúa las acciones desactualizadas."""
+        started = time.monotonic()
+        engine_version = self.analyzer.engine_version()
+        total = self.store.count_entries()
+        report: Dict[str, Any] = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "dry_run": dry_run,
+            "force": force,
+            "engine_version": engine_version,
+            "total": total,
+            "scanned": 0,
+            "unchanged": 0,
+            "skipped": 0,
+            "rescored": [],
+            "corrupt": [],
+            "failed": [],
+        }
+
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+
+        def flush() -> None:
+            self._process_batch(batch, engine_version, force, dry_run, report)
+            batch.clear()
+            logger.info(
+                "Re-scoring: %s/%s revisadas, %s re-puntuadas", report["scanned"], total, len(report["rescored"])
+            )
+            if self.on_progress is not None:
+                self.on_progress(report["scanned"], total)
+
+        for ticker, payload, _last_updated, _source in self.store.iter_entries(batch_size):
+            report["scanned"] += 1
+            metrics, _ = decode_payload(payload)
+            if metrics is None:
+                report["corrupt"].append(ticker)
+            elif metrics.get("asset_type") != "EQUITY" or not metrics.get("analysis_allowed", False):
+                # Solo las acciones tienen score de inversión
+                report["skipped"] += 1
+            else:
+                batch.append((ticker, metrics))
+            if report["scanned"] % batch_size == 0:
+                flush()
+        if report["scanned"] % batch_size:
+            flush()
+
+        report["elapsed_seconds"] = round(time.monotonic() - started, 2)
+        logger.info(
+            "Re-scoring %s: %s re-puntuadas, %s sin cambios, %s omitidas, %s corruptas en %.1fs",
+            engine_version,
+            len(report["rescored"]),
+            report["unchanged"],
+            report["skipped"],
+            len(report["corrupt"]),
+            report["elapsed_seconds"],
+        )
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-puntúa rvc_scores desde financial_cache sin red")
+    parser.add_argument("--batch-size", type=int, default=200, help="Filas leídas y puntuadas por lote")
+    parser.add_argument("--dry-run", action="store_true", help="Solo contar, sin escribir")
+    parser.add_argument("--force", action="store_true", help="Re-puntuar aunque versión y entradas coincidan")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # Reutiliza el cableado de la app: misma BD y mismo motor de scoring
+    import app as rvc_app
+
+    def progress(done: int, total: int) -> None:
+        print(f"\r{done}/{total} revisadas", end="", flush=True)
+
+    rescorer = Rescorer(rvc_app.cache_store, rvc_app.investment_scorer, on_progress=progress)
+    report = rescorer.run(batch_size=max(1, args.batch_size), force=args.force, dry_run=args.dry_run)
+    print()
+    print(
+        f"Motor: {report['engine_version']} | Revisadas: {report['scanned']} | "
+        f"Re-puntuadas: {len(report['rescored'])} | Sin cambios: {report['unchanged']} | "
+        f"Omitidas: {report['skipped']} | Corruptas: {len(report['corrupt'])} | Errores: {len(report['failed'])}"
+    )
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
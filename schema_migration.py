@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Migración de financial_cache al esquema de métricas vigente sin volver a consultar las fuentes.
+
+Al subir ``METRIC_SCHEMA_VERSION`` las entradas antiguas se actualizan en sitio con
+``DataAgent.upgrade_metrics`` (migraciones registradas con ``schema_upgrade`` +
+métricas derivadas + ``_finalize_metrics``). Solo las entradas cuya migración lanza
+``SchemaRefetchRequired`` necesitan un fetch a los proveedores.
+
+La app migra bajo demanda al leer una entrada antigua; este módulo recorre la tabla
+completa por lotes tras un despliegue:
+
+Uso (CLI):
+    python schema_migration.py                  # migra todas las entradas antiguas
+    python schema_migration.py --dry-run        # solo cuenta qué se migraría
+    python schema_migration.py --refetch        # y además hace fetch de las que lo requieren
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from cache_store import decode_payload
+from data_agent import METRIC_SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+def needs_upgrade(metrics: Optional[Dict[str, Any]]) -> bool:
+    """True si las métricas cacheadas no están en el esquema vigente (o no tienen asset_type)."""
+    return bool(metrics) and (
+        not metrics.get("asset_type") or metrics.get("schema_version") != METRIC_SCHEMA_VERSION
+    )
+
+
+class SchemaMigrator:
+    """
+    Migra financial_cache por lotes.
+
+    Args:
+        store: ``CacheStore`` con financial_cache
+        upgrade: ``metrics -> metrics migradas o None`` (``DataAgent.upgrade_metrics``)
+        on_migrated: Callback opcional ``(ticker, metrics)`` tras guardar una entrada
+                     (p. ej. invalidar la LRU en memoria)
+    """
+
+    def __init__(
+        self,
+        store,
+        upgrade: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+        on_migrated: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ):
+        self.store = store
+        self.upgrade = upgrade
+        self.on_migrated = on_migrated
+
+    def migrate_entry(self, ticker: str, metrics: Dict[str, Any], last_updated: str) -> Optional[Dict[str, Any]]:
+        """
+        Migra y guarda una entrada conservando su ``last_updated``.
+
+        Retorna las métricas migradas o None si requieren fetch. Si la fila cambió
+        entretanto (fetch concurrente) no se sobrescribe, pero se devuelve el resultado.
+        """
+        upgraded = self.upgrade(metrics)
+        if upgraded is None:
+            return None
+        if self.store.update_payload(ticker, upgraded, last_updated):
+            if self.on_migrated is not None:
+                self.on_migrated(ticker, upgraded)
+        else:
+            logger.info("Migración de %s descartada: la entrada cambió durante la migración", ticker)
+        return upgraded
+
+    def run(self, batch_size: int = 200, dry_run: bool = False) -> Dict[str, Any]:
+        """Recorre toda la tabla y migra las entradas que no están en el esquema vigente."""
+        started = time.monotonic()
+        report: Dict[str, Any] = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "dry_run": dry_run,
+            "schema_version": METRIC_SCHEMA_VERSION,
+            "scanned": 0,
+            "current": 0,
+            "migrated": [],
+            "refetch_required": [],
+            "corrupt": [],
+            "failed": [],
+        }
+        for ticker, payload, last_updated, _source in self.store.iter_entries(batch_size):
+            report["scanned"] += 1
+            metrics, _ = decode_payload(payload)
+            if metrics is None:
+                report["corrupt"].append(ticker)
+                continue
+            if not needs_upgrade(metrics):
+                report["current"] += 1
+                continue
+            try:
+                if dry_run:
+                    upgraded = self.upgrade(metrics)
+                else:
+                    upgraded = self.migrate_entry(ticker, metrics, last_updated)
+            except Exception as exc:
+                logger.error("Migración de esquema: error en %s: %s", ticker, exc, exc_info=True)
+                report["failed"].append(ticker)
+                continue
+            report["refetch_required" if upgraded is None else "migrated"].append(ticker)
+            if report["scanned"] % batch_size == 0:
+                logger.info("Migración de esquema: %s entradas revisadas", report["scanned"])
+
+        report["elapsed_seconds"] = round(time.monotonic() - started, 2)
+        logger.info(
+            "Migración de esquema v%s: %s migradas, %s requieren fetch, %s vigentes, %s corruptas en %.1fs",
+            METRIC_SCHEMA_VERSION,
+            len(report["migrated"]),
+            len(report["refetch_required"]),
+            report["current"],
+            len(report["corrupt"]),
+            report["elapsed_seconds"],
+        )
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Migra financial_cache al esquema de métricas vigente")
+    parser.add_argument("--batch-size", type=int, default=200, help="Filas leídas por consulta")
+    parser.add_argument("--dry-run", action="store_true", help="Solo contar, sin escribir")
+    parser.add_argument("--refetch", action="store_true", help="Hacer fetch de las entradas que lo requieren")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # Reutiliza el cableado de la app: misma BD, DataAgent y LRU
+    import app as rvc_app
+
+    report = rvc_app.schema_migrator.run(batch_size=max(1, args.batch_size), dry_run=args.dry_run)
+    refetched: List[str] = []
+    if args.refetch and not args.dry_run:
+        for ticker in report["refetch_required"]:
+            if rvc_app.fetch_fresh_metrics(ticker):
+                refetched.append(ticker)
+    print(
+        f"Revisadas: {report['scanned']} | Migradas: {len(report['migrated'])} | "
+        f"Requieren fetch: {len(report['refetch_required'])} (refrescadas {len(refetched)}) | "
+        f"Vigentes: {report['current']} | Corruptas: {len(report['corrupt'])} | Errores: {len(report['failed'])}"
+    )
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de DataAgent contra respuestas grabadas (services.http_replay).
+
+1. Grabar (red real, una vez):
+       python scripts/bench_fetch.py --record AAPL MSFT KO
+   Cada respuesta de FMP, Alpha Vantage, Twelve Data, Yahoo, Finviz y MarketWatch
+   queda comprimida en --store (por defecto data/http_replay), sin claves de API.
+
+2. Reproducir (sin red), con latencia y errores inyectados:
+       python scripts/bench_fetch.py AAPL MSFT KO --requests 200 --workers 8 \\
+           --latency-ms 80-400 --error-rate 0.05 --mode concurrent
+
+Informa throughput, latencia p50/p95/p99 por consulta, completitud media y las
+llamadas por fuente. Los rate limits se desactivan salvo --keep-rate-limits, y la
+cache HTTP salvo --http-cache, para medir el agente y no la cuota ni la cache.
+Las claves de API deben estar en el entorno también al reproducir: sin ellas los
+clientes ni siquiera construyen la petición.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+from pathlib import Path
+from typing import List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from data_agent import DataAgent  # noqa: E402
+from services import http_cache  # noqa: E402
+from services.http_replay import (  # noqa: E402
+    REPLAY_DIR,
+    RecordingAdapter,
+    ReplayAdapter,
+    ResponseStore,
+    configure_transport,
+)
+from services.rate_limit import BucketSpec, RateLimiter, configure_rate_limiter  # noqa: E402
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de DataAgent con respuestas grabadas")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--store", default=REPLAY_DIR)
+    parser.add_argument("--record", action="store_true", help="consultar la red real y grabar las respuestas")
+    parser.add_argument("--requests", type=int, default=100, help="consultas totales en reproducción")
+    parser.add_argument("--workers", type=int, default=4, help="consultas simultáneas")
+    parser.add_argument("--mode", default="concurrent", help="sequential | concurrent | async | adaptive")
+    parser.add_argument("--latency-ms", default="0", help="latencia inyectada: ms o min-max")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--errors", default="timeout,503", help="errores inyectados: timeout, connection o códigos HTTP")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    parser.add_argument("--http-cache", action="store_true", help="reproducir a través de la cache HTTP (HTTP_CACHE_*)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    store = ResponseStore(args.store)
+    tickers = [ticker.upper() for ticker in args.tickers]
+
+    # Grabando, la cache HTTP respondería antes que la red; reproduciendo, ocultaría la latencia inyectada
+    if args.record or not args.http_cache:
+        http_cache.CACHE_ENABLED = False
+
+    if args.record:
+        adapter = RecordingAdapter(store)
+        configure_transport(adapter)
+        agent = DataAgent()
+        for ticker in tickers:
+            metrics = agent.fetch_financial_data(ticker, mode="sequential")
+            print(f"{ticker:<8} completitud {((metrics or {}).get('data_completeness') or 0):>5}%")
+        print(f"\nGrabadas {adapter.recorded} respuestas en {store.root} ({len(store)} entradas)")
+        return 0
+
+    if not args.keep_rate_limits:
+        unlimited = BucketSpec(capacity=1e12, refill_per_second=1e12)
+        configure_rate_limiter(RateLimiter(limits={}, default_host=unlimited))
+    adapter = ReplayAdapter(
+        store,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        errors=args.errors.split(","),
+        seed=args.seed,
+    )
+    configure_transport(adapter)
+    agent = DataAgent()
+
+    def run(ticker: str):
+        started = time.perf_counter()
+        with agent.track_source_calls() as calls:
+            metrics = agent.fetch_financial_data(ticker, mode=args.mode)
+        return time.perf_counter() - started, metrics, calls
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        outcomes = list(pool.map(run, islice(cycle(tickers), args.requests)))
+    wall = time.perf_counter() - started
+
+    latencies = [latency for latency, _, _ in outcomes]
+    completeness = [(metrics or {}).get("data_completeness") or 0 for _, metrics, _ in outcomes]
+    failed = sum(1 for _, metrics, _ in outcomes if not metrics)
+    calls: Counter = Counter()
+    for _, _, source_calls in outcomes:
+        calls.update(source_calls)
+
+    print(f"Consultas:    {len(outcomes)} en {wall:.2f}s ({len(outcomes) / wall:.1f}/s, {args.workers} en paralelo, modo {args.mode})")
+    print(
+        f"Latencia:     p50 {percentile(latencies, 0.5) * 1000:.0f}ms  "
+        f"p95 {percentile(latencies, 0.95) * 1000:.0f}ms  p99 {percentile(latencies, 0.99) * 1000:.0f}ms"
+    )
+    print(f"Completitud:  media {statistics.mean(completeness):.1f}%  sin datos {failed}")
+    print(f"Llamadas:     {dict(sorted(calls.items()))}")
+    print(f"Replay:       {adapter.snapshot()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
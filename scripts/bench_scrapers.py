@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extracción HTML: BeautifulSoup (implementación anterior) vs services.extractors.
+
+Usa las páginas guardadas en tests/fixtures/html. Para cada página verifica que ambas
+rutas extraen lo mismo y mide:
+
+- CPU por página (time.process_time, media de --iterations ejecuciones)
+- Pico de heap Python (tracemalloc)
+- Pico de RSS de un proceso nuevo al procesar la página (incluye la memoria de
+  libxml2, que tracemalloc no ve; solo Linux)
+
+Uso:
+    python scripts/bench_scrapers.py [--iterations 30] [--min-speedup 5]
+
+Con --min-speedup el script termina con código 1 si alguna página no alcanza
+esa mejora de CPU.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from services import extractors  # noqa: E402
+
+FIXTURES = BASE_DIR / "tests" / "fixtures" / "html"
+
+
+# ============================================
+# Implementación anterior (BeautifulSoup completo)
+# ============================================
+
+def legacy_finviz(html: str):
+    soup = BeautifulSoup(html, "lxml")
+    tables = [[td.get_text(strip=True) for td in table.find_all("td")]
+              for table in soup.find_all("table", class_="snapshot-table2")]
+    name_tag = soup.select_one(".fullview-title .fullview-title-name")
+    meta = [span.get_text(strip=True) for span in soup.select(".fullview-title .fullview-title-data span")]
+    return extractors.FinvizPage(tables=tables, company_name=name_tag.get_text(strip=True) if name_tag else None, meta=meta)
+
+
+def _legacy_rows(rows):
+    pairs = []
+    for row in rows:
+        cells = row.find_all("td")
+        if len(cells) == 2:
+            pairs.append((cells[0].get_text(strip=True), cells[1].get_text(strip=True)))
+    return pairs
+
+
+def legacy_yahoo_key_statistics(html: str):
+    return _legacy_rows(BeautifulSoup(html, "lxml").select("section table tr"))
+
+
+def legacy_yahoo_quote(html: str):
+    soup = BeautifulSoup(html, "lxml")
+    quote = extractors.YahooQuote()
+    price_tag = soup.select_one("fin-streamer[data-field='regularMarketPrice']")
+    if price_tag:
+        quote.price = price_tag.get("value") or price_tag.text
+    cap_tag = soup.select_one("fin-streamer[data-field='marketCap']")
+    if cap_tag:
+        quote.market_cap = cap_tag.get("value")
+    title = soup.select_one("h1")
+    if title:
+        quote.title = title.get_text(strip=True)
+    return quote
+
+
+def legacy_marketwatch_profile(html: str):
+    soup = BeautifulSoup(html, "lxml")
+    description = soup.find("div", class_="description__text")
+    return extractors.MarketWatchProfile(
+        rows=_legacy_rows(soup.select("tbody tr")),
+        description=description.text if description else None,
+    )
+
+
+CASES: Dict[str, Tuple[Callable, Callable]] = {
+    "finviz_quote": (legacy_finviz, extractors.finviz_snapshot),
+    "yahoo_key_statistics": (legacy_yahoo_key_statistics, extractors.yahoo_key_statistics),
+    "yahoo_quote": (legacy_yahoo_quote, extractors.yahoo_quote),
+    "marketwatch_profile": (legacy_marketwatch_profile, extractors.marketwatch_profile),
+}
+
+
+# ============================================
+# Mediciones
+# ============================================
+
+def cpu_ms(fn: Callable, html: str, iterations: int) -> float:
+    fn(html)  # calentamiento
+    started = time.process_time()
+    for _ in range(iterations):
+        fn(html)
+    return (time.process_time() - started) / iterations * 1000
+
+
+def heap_kb(fn: Callable, html: str) -> float:
+    tracemalloc.start()
+    try:
+        fn(html)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def _proc_status_kb(field: str) -> int:
+    with open("/proc/self/status", encoding="ascii") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _rss_child(case: str, legacy: bool, queue) -> None:
+    html = (FIXTURES / f"{case}.html").read_text(encoding="utf-8")
+    fn = CASES[case][0 if legacy else 1]
+    fn(html)  # importaciones perezosas y cachés fuera de la medición
+    try:
+        # Reinicia el pico de RSS (VmHWM) al RSS actual (Linux)
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as clear_refs:
+            clear_refs.write("5")
+        before = _proc_status_kb("VmRSS")
+        fn(html)
+        queue.put(_proc_status_kb("VmHWM") - before)
+    except OSError:
+        queue.put(None)
+
+
+def rss_kb(case: str, legacy: bool) -> Optional[float]:
+    """Pico de RSS (KB) sobre el RSS previo al procesar la página en un proceso nuevo (solo Linux)."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_rss_child, args=(case, legacy, queue))
+    process.start()
+    result = queue.get(timeout=60)
+    process.join()
+    return None if result is None else float(result)
+
+
+def _fmt_kb(value: Optional[float]) -> str:
+    return f"{'n/a':>10}" if value is None else f"{value:>8.0f}KB"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de extracción HTML de los scrapers")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--min-speedup", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    header = f"{'página':<22}{'KB':>6}{'cpu bs4':>10}{'cpu lxml':>10}{'x':>7}{'heap bs4':>10}{'heap lxml':>10}{'rss bs4':>10}{'rss lxml':>10}"
+    print(header)
+    print("-" * len(header))
+    failed = []
+    for case, (legacy, fast) in CASES.items():
+        html = (FIXTURES / f"{case}.html").read_text(encoding="utf-8")
+        if legacy(html) != fast(html):
+            print(f"{case}: las extracciones NO coinciden")
+            failed.append(case)
+            continue
+        cpu_old, cpu_new = cpu_ms(legacy, html, args.iterations), cpu_ms(fast, html, args.iterations)
+        speedup = cpu_old / cpu_new if cpu_new else float("inf")
+        print(
+            f"{case:<22}{len(html) // 1024:>6}{cpu_old:>8.1f}ms{cpu_new:>8.1f}ms{speedup:>6.1f}x"
+            f"{heap_kb(legacy, html):>8.0f}KB{heap_kb(fast, html):>8.0f}KB"
+            f"{_fmt_kb(rss_kb(case, True))}{_fmt_kb(rss_kb(case, False))}"
+        )
+        if args.min_speedup is not None and speedup < args.min_speedup:
+            failed.append(case)
+
+    if failed:
+        print(f"\nFallos: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,15 @@
 Service clients for external financial APIs.
 """
 
-from .alpha_vantage import AlphaVantageClient
-from .fmp import FMPClient
-from .twelve_data import TwelveDataClient
+from .alpha_vantage import AlphaVantageClient, AsyncAlphaVantageClient
+from .fmp import AsyncFMPClient, FMPClient
+from .twelve_data import AsyncTwelveDataClient, TwelveDataClient
 
-__all__ = ["AlphaVantageClient", "FMPClient", "TwelveDataClient"]
+__all__ = [
+    "AlphaVantageClient",
+    "AsyncAlphaVantageClient",
+    "AsyncFMPClient",
+    "AsyncTwelveDataClient",
+    "FMPClient",
+    "TwelveDataClient",
+]
@@ -12,6 +12,12 @@ from typing import Dict, Optional
 
 import requests
 
+from . import http_cache
+from .http_pool import bind_shared_session, run_blocking
+from .http_replay import mount_transport
+from .circuit_breaker import note_request_failure
+from .rate_limit import get_rate_limiter
+
 logger = logging.getLogger("AlphaVantageClient")
 
 
@@ -20,21 +26,24 @@ class AlphaVantageConfig:
     api_key: Optional[str]
     base_url: str = "https://www.alphavantage.co/query"
     timeout: int = 15
-    min_interval: float = 12.5  # Respect free tier (≈5 requests/min)
 
 
 class AlphaVantageClient:
     """
-    Minimal Alpha Vantage client with basic throttling and FX caching.
+    Minimal Alpha Vantage client with FX caching.
+
+    The free-tier quota (≈5 requests/min) is enforced by the shared token bucket:
+    when it is empty the call returns None at once instead of sleeping.
     """
 
+    RATE_LIMIT_KEY = "alpha_vantage"
+
     def __init__(self, api_key: Optional[str] = None):
         key = api_key or os.getenv("ALPHAVANTAGE_API_KEY") or os.getenv("ALPHA_VANTAGE_KEY")
         if key:
             key = key.strip()
         self.config = AlphaVantageConfig(api_key=key)
-        self.session = requests.Session()
-        self._last_request: float = 0.0
+        self.session = mount_transport(requests.Session())
         self._fx_cache: Dict[str, Dict[str, float]] = {}
 
     @property
@@ -94,27 +103,26 @@ class AlphaVantageClient:
         if not self.enabled:
             return None
 
-        now = time.time()
-        elapsed = now - self._last_request
-        if elapsed < self.config.min_interval:
-            time.sleep(self.config.min_interval - elapsed)
-
         params["apikey"] = self.config.api_key
-
-        try:
-            response = self.session.get(
-                self.config.base_url,
-                params=params,
-                timeout=self.config.timeout,
-            )
-        except requests.RequestException as exc:  # pragma: no cover - network
-            logger.warning("Alpha Vantage request failed: %s", exc)
-            return None
-        finally:
-            self._last_request = time.time()
+        response = http_cache.lookup(self.config.base_url, params)
+        if response is None:
+            if not get_rate_limiter().try_acquire(self.RATE_LIMIT_KEY):
+                return None
+            try:
+                response = http_cache.conditional_get(
+                    self.session,
+                    self.config.base_url,
+                    params=params,
+                    timeout=self.config.timeout,
+                )
+            except requests.RequestException as exc:  # pragma: no cover - network
+                logger.warning("Alpha Vantage request failed: %s", exc)
+                note_request_failure()
+                return None
 
         if response.status_code != 200:
             logger.warning("Alpha Vantage returned status %s for %s", response.status_code, params)
+            note_request_failure()
             return None
 
         try:
@@ -125,8 +133,37 @@ class AlphaVantageClient:
 
         if "Note" in payload or "Information" in payload:
             logger.warning("Alpha Vantage notice: %s", payload.get("Note") or payload.get("Information"))
+            note_request_failure()
             return None
 
         if not payload:
             return None
+        quote = params.get("function") == "GLOBAL_QUOTE"
+        http_cache.remember(response, http_cache.QUOTE_TTL_SECONDS if quote else None)
         return payload
+
+
+class AsyncAlphaVantageClient:
+    """
+    Async facade over :class:`AlphaVantageClient` sharing the process-wide connection pool.
+
+    Calls still go through the shared token bucket, so awaiting them together
+    does not bypass the free-tier quota.
+    """
+
+    def __init__(self, client: Optional[AlphaVantageClient] = None, api_key: Optional[str] = None):
+        # Copia propia sobre el pool compartido: el cliente recibido conserva su sesión
+        self.client = bind_shared_session(client or AlphaVantageClient(api_key))
+
+    @property
+    def enabled(self) -> bool:
+        return self.client.enabled
+
+    async def get_overview(self, symbol: str) -> Optional[Dict[str, str]]:
+        return await run_blocking(self.client.get_overview, symbol)
+
+    async def get_global_quote(self, symbol: str) -> Optional[Dict[str, str]]:
+        return await run_blocking(self.client.get_global_quote, symbol)
+
+    async def get_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        return await run_blocking(self.client.get_exchange_rate, from_currency, to_currency)
@@ -0,0 +1,225 @@
+"""
+Circuit breakers and health scoring per data source.
+
+Each source (``fmp``, ``yahoo``, ``finviz``...) keeps a rolling window of outcomes:
+success, latency and "suspicious content" (captcha / block pages). Repeated failures
+open the circuit so the cascade skips the source without spending retries on it;
+after a cool-down a limited number of half-open probes decide whether to close it.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_MIN_SUCCESS_RATE = float(os.getenv("BREAKER_MIN_SUCCESS_RATE", "0.4"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "60"))
+BREAKER_MAX_OPEN_SECONDS = float(os.getenv("BREAKER_MAX_OPEN_SECONDS", "900"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+# Latencia a partir de la cual el health score empieza a penalizar
+BREAKER_SLOW_SECONDS = float(os.getenv("BREAKER_SLOW_SECONDS", "3"))
+
+# Señales de la fuente en curso (peticiones fallidas, páginas de bloqueo)
+_signals: ContextVar[Optional[Counter]] = ContextVar("source_signals", default=None)
+
+_lock = threading.Lock()
+_registry: Optional["CircuitBreakerRegistry"] = None
+
+
+def note_request_failure(kind: str = "failure") -> None:
+    """Report a failed request (``"failure"``) or a block/captcha page (``"suspicious"``)."""
+    signals = _signals.get()
+    if signals is not None:
+        signals[kind] += 1
+
+
+@contextmanager
+def capture_signals() -> Iterator[Counter]:
+    """Collect the request signals emitted while a single source runs."""
+    signals: Counter = Counter()
+    token = _signals.set(signals)
+    try:
+        yield signals
+    finally:
+        _signals.reset(token)
+
+
+@dataclass
+class _Outcome:
+    ok: bool
+    latency: float
+    suspicious: bool
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open probes -> closed (or open again)."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        min_success_rate: float = BREAKER_MIN_SUCCESS_RATE,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        max_open_seconds: float = BREAKER_MAX_OPEN_SECONDS,
+        half_open_probes: int = BREAKER_HALF_OPEN_PROBES,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.min_success_rate = min_success_rate
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._window: Deque[_Outcome] = deque(maxlen=max(1, window))
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_seconds = open_seconds
+        self.opened_at: Optional[float] = None
+        self.probes_in_flight = 0
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """True if the source may be called now (counts a probe slot when half-open)."""
+        with self._lock:
+            if self.state == OPEN:
+                if self.clock() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self.probes_in_flight = 0
+            if self.state == HALF_OPEN:
+                if self.probes_in_flight >= self.half_open_probes:
+                    self.rejected += 1
+                    return False
+                self.probes_in_flight += 1
+            return True
+
+    def record(self, ok: Optional[bool], latency: float = 0.0, suspicious: bool = False) -> None:
+        """
+        Record the outcome of a call admitted by :meth:`allow`.
+
+        ``ok=None`` means "no verdict" (e.g. the ticker simply has no data there):
+        it frees the probe slot without changing the state.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            if ok is None:
+                return
+            self._window.append(_Outcome(ok=ok and not suspicious, latency=latency, suspicious=suspicious))
+            if ok and not suspicious:
+                self.consecutive_failures = 0
+                if self.state == HALF_OPEN:
+                    self.state = CLOSED
+                    self.open_seconds = self.base_open_seconds
+                    self.opened_at = None
+                return
+
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                # La prueba falló: reabrir con un enfriamiento más largo
+                self._trip(min(self.max_open_seconds, self.open_seconds * 2))
+            elif self.state == CLOSED and self._should_trip():
+                self._trip(self.base_open_seconds)
+
+    def _should_trip(self) -> bool:
+        if self.consecutive_failures >= self.failure_threshold:
+            return True
+        if len(self._window) >= self.min_calls:
+            return self._success_rate() < self.min_success_rate
+        return False
+
+    def _trip(self, open_seconds: float) -> None:
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.open_seconds = open_seconds
+        self.probes_in_flight = 0
+        self.trips += 1
+
+    def _success_rate(self) -> float:
+        if not self._window:
+            return 1.0
+        return sum(1 for o in self._window if o.ok) / len(self._window)
+
+    def health_score(self) -> float:
+        """0-100: success rate, penalised by suspicious content and slow responses."""
+        with self._lock:
+            return self._health_score()
+
+    def _health_score(self) -> float:
+        if not self._window:
+            return 100.0
+        suspicious_rate = sum(1 for o in self._window if o.suspicious) / len(self._window)
+        latencies = sorted(o.latency for o in self._window)
+        median = latencies[len(latencies) // 2]
+        latency_factor = 1.0 if median <= BREAKER_SLOW_SECONDS else max(0.5, BREAKER_SLOW_SECONDS / median)
+        return round(100 * self._success_rate() * (1 - 0.5 * suspicious_rate) * latency_factor, 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(o.latency for o in self._window)
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.open_seconds - (self.clock() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "health_score": self._health_score(),
+                "success_rate": round(self._success_rate(), 3),
+                "median_latency": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                "suspicious": sum(1 for o in self._window if o.suspicious),
+                "samples": len(self._window),
+                "consecutive_failures": self.consecutive_failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "retry_in_seconds": retry_in,
+            }
+
+
+class CircuitBreakerRegistry:
+    """Lazily created breaker per source name."""
+
+    def __init__(self, **breaker_kwargs: Any):
+        self._breaker_kwargs = breaker_kwargs
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, **self._breaker_kwargs)
+                self._breakers[name] = breaker
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.snapshot() for breaker in sorted(breakers, key=lambda b: b.name)}
+
+
+def get_breakers() -> CircuitBreakerRegistry:
+    """Return the process-wide breaker registry."""
+    global _registry
+    with _lock:
+        if _registry is None:
+            _registry = CircuitBreakerRegistry()
+        return _registry
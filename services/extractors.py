@@ -0,0 +1,175 @@
+"""
+Targeted HTML extraction for the scraped sources (Finviz, Yahoo, MarketWatch).
+
+Each extractor parses the page with lxml and pulls only the nodes DataAgent maps
+(snapshot cells, key-statistics rows, quote fields) with XPath, instead of building
+a BeautifulSoup tree and walking every ``td``. BeautifulSoup's ``"lxml"`` builder
+uses the same libxml2 parser, so the elements found are the same ones the former
+CSS selectors matched. Values are returned as raw text; parsing numbers stays in
+DataAgent.
+
+Finviz pages are reduced to the snapshot tables and the title block before parsing
+(see :func:`_element_spans`); if they cannot be delimited the whole page is parsed.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import lxml.html
+from lxml import etree
+
+Pairs = List[Tuple[str, str]]
+
+_PARSER = lxml.html.HTMLParser(remove_comments=True, no_network=True)
+# Texto visible de un nodo (como get_text(): sin comentarios, scripts ni estilos)
+_TEXT = etree.XPath(".//text()[not(parent::script) and not(parent::style)]")
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_FINVIZ_TABLES = etree.XPath(f"//table[{_has_class('snapshot-table2')}]")
+_FINVIZ_NAME = etree.XPath(f"//*[{_has_class('fullview-title')}]//*[{_has_class('fullview-title-name')}]")
+_FINVIZ_META = etree.XPath(f"//*[{_has_class('fullview-title')}]//*[{_has_class('fullview-title-data')}]//span")
+_SECTION_ROWS = etree.XPath("//section//table//tr")
+_BODY_ROWS = etree.XPath("//tbody//tr")
+_CELLS = etree.XPath(".//td")
+_YAHOO_PRICE = etree.XPath("//fin-streamer[@data-field='regularMarketPrice']")
+_YAHOO_MARKET_CAP = etree.XPath("//fin-streamer[@data-field='marketCap']")
+_FIRST_H1 = etree.XPath("(//h1)[1]")
+_MW_DESCRIPTION = etree.XPath(f"(//div[{_has_class('description__text')}])[1]")
+
+
+@dataclass
+class FinvizPage:
+    tables: List[List[str]] = field(default_factory=list)
+    company_name: Optional[str] = None
+    meta: List[str] = field(default_factory=list)
+
+
+@dataclass
+class YahooQuote:
+    price: Optional[str] = None
+    market_cap: Optional[str] = None
+    title: Optional[str] = None
+
+
+@dataclass
+class MarketWatchProfile:
+    rows: Pairs = field(default_factory=list)
+    description: Optional[str] = None
+
+
+def text_of(element, strip: bool = True) -> str:
+    """Text of ``element`` and its descendants (``get_text(strip=True)`` semantics by default)."""
+    parts = _TEXT(element)
+    if strip:
+        return "".join(part.strip() for part in parts)
+    return "".join(parts)
+
+
+def _parse(html: str):
+    return lxml.html.document_fromstring(html, parser=_PARSER)
+
+
+def _element_spans(html: str, marker: str, tag: str) -> Optional[List[Tuple[int, int]]]:
+    """
+    ``(start, end)`` of every ``<tag>`` element whose start tag contains ``marker``.
+
+    Nested ``<tag>`` elements are balanced by counting. Returns None if an element
+    cannot be delimited, in which case callers parse the whole page.
+    """
+    lower = html.lower()
+    tags = re.compile(rf"<{tag}[\s>]|</{tag}\s*>", re.IGNORECASE)
+    spans: List[Tuple[int, int]] = []
+    position = 0
+    while True:
+        hit = html.find(marker, position)
+        if hit == -1:
+            return spans
+        start = lower.rfind(f"<{tag}", 0, hit)
+        if start == -1 or ">" in html[start:hit]:
+            position = hit + len(marker)
+            continue
+        depth = 0
+        for match in tags.finditer(html, start):
+            depth += -1 if match.group().startswith("</") else 1
+            if depth == 0:
+                spans.append((start, match.end()))
+                position = match.end()
+                break
+        else:
+            return None
+
+
+def _slice(html: str, spans: List[Tuple[int, int]]) -> str:
+    """Concatenate ``spans`` of ``html`` in document order, dropping nested ones."""
+    parts: List[str] = []
+    end = -1
+    for start, stop in sorted(spans):
+        if start >= end:
+            parts.append(html[start:stop])
+            end = stop
+    return "<html><body>" + "".join(parts) + "</body></html>"
+
+
+def finviz_snapshot(html: str) -> FinvizPage:
+    """Cells of the ``snapshot-table2`` tables plus the title block (name, sector, industry)."""
+    tables = _element_spans(html, "snapshot-table2", "table")
+    title = _element_spans(html, "fullview-title", "div")
+    if tables and title is not None:
+        root = _parse(_slice(html, tables + title))
+    else:
+        root = _parse(html)
+
+    page = FinvizPage()
+    page.tables = [[text_of(cell) for cell in _CELLS(table)] for table in _FINVIZ_TABLES(root)]
+    names = _FINVIZ_NAME(root)
+    if names:
+        page.company_name = text_of(names[0])
+    page.meta = [text_of(span) for span in _FINVIZ_META(root)]
+    return page
+
+
+def _two_cell_rows(rows) -> Pairs:
+    pairs: Pairs = []
+    for row in rows:
+        cells = _CELLS(row)
+        if len(cells) == 2:
+            pairs.append((text_of(cells[0]), text_of(cells[1])))
+    return pairs
+
+
+def yahoo_key_statistics(html: str) -> Pairs:
+    """``(label, value)`` of the two-cell rows of the key-statistics tables."""
+    return _two_cell_rows(_SECTION_ROWS(_parse(html)))
+
+
+def yahoo_quote(html: str) -> YahooQuote:
+    """Raw price, market cap and ``<h1>`` title of the Yahoo quote page."""
+    root = _parse(html)
+    quote = YahooQuote()
+    prices = _YAHOO_PRICE(root)
+    if prices:
+        quote.price = prices[0].get("value") or text_of(prices[0], strip=False)
+    caps = _YAHOO_MARKET_CAP(root)
+    if caps:
+        quote.market_cap = caps[0].get("value")
+    titles = _FIRST_H1(root)
+    if titles:
+        quote.title = text_of(titles[0])
+    return quote
+
+
+def marketwatch_profile(html: str) -> MarketWatchProfile:
+    """Two-cell ``tbody`` rows and the description text of a MarketWatch profile."""
+    root = _parse(html)
+    profile = MarketWatchProfile(rows=_two_cell_rows(_BODY_ROWS(root)))
+    descriptions = _MW_DESCRIPTION(root)
+    if descriptions:
+        profile.description = text_of(descriptions[0], strip=False)
+    return profile
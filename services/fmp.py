@@ -4,13 +4,20 @@ Client helper for Financial Modeling Prep API.
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 import requests
 
+from . import http_cache
+from .http_pool import bind_shared_session, run_blocking
+from .http_replay import mount_transport
+from .circuit_breaker import note_request_failure
+from .rate_limit import get_rate_limiter
+
 logger = logging.getLogger("FMPClient")
 
 
@@ -26,12 +33,16 @@ class FMPClient:
     Minimal client for FMP endpoints used in the project.
     """
 
+    RATE_LIMIT_KEY = "fmp"
+    # Símbolos por petición en los endpoints que aceptan listas separadas por comas
+    MAX_BATCH_SYMBOLS = int(os.getenv("FMP_BATCH_SYMBOLS", "50"))
+
     def __init__(self, api_key: Optional[str] = None):
         key = api_key or os.getenv("FMP_API_KEY")
         if key:
             key = key.strip()
         self.config = FMPConfig(api_key=key)
-        self.session = requests.Session()
+        self.session = mount_transport(requests.Session())
 
     @property
     def enabled(self) -> bool:
@@ -49,6 +60,14 @@ class FMPClient:
         data = self._get(f"quote/{symbol.upper()}")
         return data[0] if isinstance(data, list) and data else None
 
+    def get_quotes(self, symbols: Iterable[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        """Quotes for several symbols, one request per ``MAX_BATCH_SYMBOLS`` (see :meth:`_get_batch`)."""
+        return self._get_batch("quote", symbols)
+
+    def get_profiles(self, symbols: Iterable[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        """Profiles for several symbols, one request per ``MAX_BATCH_SYMBOLS`` (see :meth:`_get_batch`)."""
+        return self._get_batch("profile", symbols)
+
     def get_ratios(self, symbol: str) -> Optional[Dict[str, str]]:
         data = self._get(f"ratios-ttm/{symbol.upper()}")
         return data[0] if isinstance(data, list) and data else None
@@ -61,19 +80,46 @@ class FMPClient:
     # Internal helpers
     # -------------------------------
 
+    def _get_batch(self, endpoint: str, symbols: Iterable[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Request ``endpoint/SYM1,SYM2,...`` in chunks and split the rows per symbol.
+
+        Every symbol of a chunk that was answered is present in the result (``None``
+        when FMP returned no row for it); symbols of failed or rate-limited chunks
+        are omitted so callers can fall back to the single-symbol endpoint.
+        """
+        unique = list(dict.fromkeys(symbol.upper() for symbol in symbols if symbol))
+        size = max(1, self.MAX_BATCH_SYMBOLS)
+        results: Dict[str, Optional[Dict[str, str]]] = {}
+        for start in range(0, len(unique), size):
+            chunk = unique[start:start + size]
+            data = self._get(f"{endpoint}/{','.join(chunk)}")
+            if not isinstance(data, list):
+                continue
+            rows = {str(row.get("symbol", "")).upper(): row for row in data if isinstance(row, dict)}
+            for symbol in chunk:
+                results[symbol] = rows.get(symbol)
+        return results
+
     def _get(self, path: str) -> Optional[List[Dict[str, str]]]:
         if not self.enabled:
             return None
         url = f"{self.config.base_url}/{path}"
         params = {"apikey": self.config.api_key}
-        try:
-            response = self.session.get(url, params=params, timeout=self.config.timeout)
-        except requests.RequestException as exc:  # pragma: no cover - network
-            logger.warning("FMP request failed: %s", exc)
-            return None
+        response = http_cache.lookup(url, params)
+        if response is None:
+            if not get_rate_limiter().try_acquire(self.RATE_LIMIT_KEY):
+                return None
+            try:
+                response = http_cache.conditional_get(self.session, url, params=params, timeout=self.config.timeout)
+            except requests.RequestException as exc:  # pragma: no cover - network
+                logger.warning("FMP request failed: %s", exc)
+                note_request_failure()
+                return None
 
         if response.status_code != 200:
             logger.warning("FMP returned status %s for %s", response.status_code, path)
+            note_request_failure()
             return None
 
         try:
@@ -86,5 +132,57 @@ class FMPClient:
             logger.warning("FMP error for %s: %s", path, payload["Error Message"])
             return None
 
+        quote = path.startswith("quote/")
+        http_cache.remember(response, http_cache.QUOTE_TTL_SECONDS if quote else None)
         return payload
 
+
+class AsyncFMPClient:
+    """
+    Async facade over :class:`FMPClient` sharing the process-wide connection pool.
+    """
+
+    def __init__(self, client: Optional[FMPClient] = None, api_key: Optional[str] = None):
+        # Copia propia sobre el pool compartido: el cliente recibido conserva su sesión
+        self.client = bind_shared_session(client or FMPClient(api_key))
+
+    @property
+    def enabled(self) -> bool:
+        return self.client.enabled
+
+    async def get_profile(self, symbol: str) -> Optional[Dict[str, str]]:
+        return await run_blocking(self.client.get_profile, symbol)
+
+    async def get_quote(self, symbol: str) -> Optional[Dict[str, str]]:
+        return await run_blocking(self.client.get_quote, symbol)
+
+    async def get_quotes(self, symbols: Iterable[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        return await run_blocking(self.client.get_quotes, list(symbols))
+
+    async def get_profiles(self, symbols: Iterable[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        return await run_blocking(self.client.get_profiles, list(symbols))
+
+    async def get_ratios(self, symbol: str) -> Optional[Dict[str, str]]:
+        return await run_blocking(self.client.get_ratios, symbol)
+
+    async def get_key_metrics(self, symbol: str) -> Optional[Dict[str, str]]:
+        return await run_blocking(self.client.get_key_metrics, symbol)
+
+    async def get_company_bundle(
+        self, symbol: str, known: Optional[Dict[str, Optional[Dict[str, str]]]] = None
+    ) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Fetch profile, quote, ratios and key metrics at the same time.
+
+        Parts already in ``known`` (e.g. from :meth:`get_quotes`) are not requested again.
+        """
+        known = known or {}
+        endpoints = {
+            "profile": self.get_profile,
+            "quote": self.get_quote,
+            "ratios": self.get_ratios,
+            "key_metrics": self.get_key_metrics,
+        }
+        missing = [name for name in endpoints if name not in known]
+        fetched = await asyncio.gather(*(endpoints[name](symbol) for name in missing))
+        return {**known, **dict(zip(missing, fetched))}
@@ -0,0 +1,334 @@
+"""
+HTTP response cache shared by the scrapers (``DataAgent._get``) and the API clients.
+
+Bodies are kept per URL (credentials stripped, see :func:`request_key`) in a local
+SQLite file, separate from the metrics cache, so re-deriving metrics from the same
+pages (e.g. after a ``schema_version`` bump) does not hit the network while the
+entries are fresh. Expired entries carrying an ``ETag`` or ``Last-Modified`` are
+revalidated with a conditional GET; a ``304`` reuses the stored body.
+
+Callers store a response only after validating it (no block pages, no API error
+payloads). The file is bounded by size: the least recently used entries are
+evicted first.
+
+Example:
+    response = http_cache.lookup(url)  # fresh entry: no request, no rate-limit token
+    if response is None:
+        response = http_cache.conditional_get(session, url, timeout=10)
+    ...validate...
+    http_cache.remember(response)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .http_replay import request_key
+
+logger = logging.getLogger("HttpCache")
+
+CACHE_ENABLED = os.getenv("HTTP_CACHE", "1").lower() not in ("0", "false", "no")
+CACHE_PATH = os.getenv("HTTP_CACHE_PATH", str(Path(__file__).resolve().parent.parent / "data" / "http_cache.db"))
+CACHE_TTL_SECONDS = float(os.getenv("HTTP_CACHE_TTL_SECONDS", "3600"))
+# Las cotizaciones caducan mucho antes: su fetched_at sella field_updated_at["quote"]
+QUOTE_TTL_SECONDS = float(os.getenv("HTTP_CACHE_QUOTE_TTL_SECONDS", "60"))
+CACHE_MAX_MB = float(os.getenv("HTTP_CACHE_MAX_MB", "256"))
+
+# Cabeceras útiles al reconstruir la respuesta; el resto no se guarda
+_KEPT_HEADERS = ("content-type", "etag", "last-modified", "date")
+
+_lock = threading.Lock()
+_cache: Optional["HttpCache"] = None
+
+
+def _full_url(url: str, params: Optional[Dict[str, Any]]) -> str:
+    if not params:
+        return url
+    return requests.Request("GET", url, params=params).prepare().url
+
+
+class HttpCache:
+    """
+    TTL'd body cache with conditional revalidation, bounded to ``max_bytes``.
+
+    ``hits`` are answered without a request, ``revalidated`` cost a ``304`` and
+    ``misses`` downloaded the full body; ``hit_rate`` counts the first two.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = CACHE_PATH,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        max_bytes: int = int(CACHE_MAX_MB * 1024 * 1024),
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats: Counter = Counter()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout = 5000")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                ttl REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_last_used ON http_cache(last_used)")
+        self._size = self._total_size()
+
+    # -------------------------------
+    # Lookups
+    # -------------------------------
+
+    def _row(self, key: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT status, headers, body, etag, last_modified, ttl, expires_at FROM http_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+    def _touch(self, key: str, expires_at: Optional[float] = None, headers: Optional[Dict[str, str]] = None) -> None:
+        now = time.time()
+        with self._lock:
+            if expires_at is None:
+                self._conn.execute("UPDATE http_cache SET last_used = ? WHERE key = ?", (now, key))
+            else:
+                self._conn.execute(
+                    "UPDATE http_cache SET last_used = ?, expires_at = ?, headers = ?, "
+                    "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE key = ?",
+                    (now, expires_at, json.dumps(headers), headers.get("etag"), headers.get("last-modified"), key),
+                )
+
+    def cached(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[requests.Response]:
+        """Fresh cached response for ``url`` (no request is made), or None."""
+        full_url = _full_url(url, params)
+        key = request_key("GET", full_url)
+        row = self._row(key)
+        if row is None or row[6] <= time.time():
+            return None
+        self._touch(key)
+        self._count("hits")
+        return self._response(full_url, row[0], json.loads(row[1]), row[2])
+
+    def request(
+        self,
+        session: requests.Session,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> requests.Response:
+        """
+        ``session.get`` with ``If-None-Match`` / ``If-Modified-Since`` from a stale entry.
+
+        A ``304`` is returned as the stored response (``from_cache`` set) and keeps
+        the entry for another TTL. Network errors propagate like ``session.get``.
+        """
+        full_url = _full_url(url, params)
+        key = request_key("GET", full_url)
+        row = self._row(key)
+        kwargs: Dict[str, Any] = {"timeout": timeout}
+        if params is not None:
+            kwargs["params"] = params
+        if row is not None and (row[3] or row[4]):
+            conditional = {}
+            if row[3]:
+                conditional["If-None-Match"] = row[3]
+            if row[4]:
+                conditional["If-Modified-Since"] = row[4]
+            kwargs["headers"] = conditional
+
+        response = session.get(url, **kwargs)
+        if response.status_code == 304 and row is not None:
+            headers = json.loads(row[1])
+            headers.update(self._kept_headers(response.headers))
+            self._touch(key, time.time() + row[5], headers)
+            self._count("revalidated")
+            return self._response(full_url, row[0], headers, row[2])
+        self._count("misses")
+        return response
+
+    # -------------------------------
+    # Storage
+    # -------------------------------
+
+    @staticmethod
+    def _kept_headers(headers) -> Dict[str, str]:
+        return {name: headers[name] for name in _KEPT_HEADERS if headers.get(name)}
+
+    def store(self, response: requests.Response, ttl: Optional[float] = None) -> bool:
+        """Cache a validated ``200`` response; returns False if it was not stored."""
+        if response.status_code != 200 or getattr(response, "from_cache", False):
+            return False
+        if "no-store" in response.headers.get("cache-control", "").lower():
+            return False
+        ttl = self.ttl_seconds if ttl is None else ttl
+        content = response.content
+        body = zlib.compress(content, 6)
+        if ttl <= 0 or len(body) > self.max_bytes:
+            return False
+        headers = self._kept_headers(response.headers)
+        # Tras una redirección la clave es la URL pedida, no la final
+        key = request_key("GET", (response.history[0] if response.history else response).url)
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM http_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache "
+                "(key, status, headers, body, size, etag, last_modified, ttl, expires_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    response.status_code,
+                    json.dumps(headers),
+                    body,
+                    len(body),
+                    headers.get("etag"),
+                    headers.get("last-modified"),
+                    ttl,
+                    now + ttl,
+                    now,
+                ),
+            )
+            self._size += len(body) - (previous[0] if previous else 0)
+            self.stats["stores"] += 1
+            if self._size > self.max_bytes:
+                self._evict()
+        return True
+
+    def _total_size(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0])
+
+    def _evict(self) -> None:
+        """Drop useless entries, then least recently used ones, down to 90% of the limit."""
+        now = time.time()
+        # Otros workers también escriben en el fichero: partir del tamaño real
+        self._size = int(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0])
+        removed = self._conn.execute(
+            "DELETE FROM http_cache WHERE expires_at <= ? AND etag IS NULL AND last_modified IS NULL", (now,)
+        ).rowcount
+        target = int(self.max_bytes * 0.9)
+        self._size = int(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0])
+        if self._size > target:
+            victims, freed = [], 0
+            for key, size in self._conn.execute("SELECT key, size FROM http_cache ORDER BY last_used"):
+                if self._size - freed <= target:
+                    break
+                victims.append((key,))
+                freed += size
+            self._conn.executemany("DELETE FROM http_cache WHERE key = ?", victims)
+            self._size -= freed
+            removed += len(victims)
+        self.stats["evictions"] += removed
+
+    # -------------------------------
+    # Helpers
+    # -------------------------------
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
+
+    @staticmethod
+    def _response(url: str, status: int, headers: Dict[str, str], body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = zlib.decompress(body)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = url
+        response.reason = "OK"
+        response.from_cache = True
+        return response
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            size = self._size
+        served = stats.get("hits", 0) + stats.get("revalidated", 0)
+        lookups = served + stats.get("misses", 0)
+        return {
+            "path": str(self.path),
+            "size_mb": round(size / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": round(served / lookups, 3) if lookups else None,
+            **stats,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def lookup(url: str, params: Optional[Dict[str, Any]] = None) -> Optional[requests.Response]:
+    """Fresh cached response for ``url`` (None if missing, stale or the cache is disabled)."""
+    cache = get_http_cache()
+    return cache.cached(url, params) if cache is not None else None
+
+
+def conditional_get(
+    session: requests.Session,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+) -> requests.Response:
+    """``session.get`` revalidating a stale cached entry when the cache is enabled."""
+    cache = get_http_cache()
+    if cache is not None:
+        return cache.request(session, url, params=params, timeout=timeout)
+    if params is None:
+        return session.get(url, timeout=timeout)
+    return session.get(url, params=params, timeout=timeout)
+
+
+def remember(response: requests.Response, ttl: Optional[float] = None) -> None:
+    """Store a validated response if the cache is enabled."""
+    cache = get_http_cache()
+    if cache is not None:
+        cache.store(response, ttl)
+
+
+def get_http_cache() -> Optional[HttpCache]:
+    """Return the process-wide HTTP cache, or None if disabled (``HTTP_CACHE=0``)."""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _lock:
+        if _cache is None:
+            _cache = HttpCache()
+        return _cache
+
+
+def configure_http_cache(cache: Optional[HttpCache]) -> None:
+    """Install ``cache`` as the process-wide HTTP cache."""
+    global _cache
+    with _lock:
+        _cache = cache
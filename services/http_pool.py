@@ -0,0 +1,80 @@
+"""
+Shared HTTP connection pool and executor for the async provider clients.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import copy
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .http_replay import mount_transport
+
+T = TypeVar("T")
+
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+MAX_WORKERS = int(os.getenv("HTTP_POOL_MAX_WORKERS", "16"))
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_shared_session() -> requests.Session:
+    """
+    Return the process-wide session used by the async clients.
+
+    All providers go through one urllib3 pool (keep-alive per host), sized so that
+    a provider's endpoint calls can be in flight at the same time.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = mount_transport(session)
+        return _session
+
+
+def bind_shared_session(client: T) -> T:
+    """
+    Return a shallow copy of a sync API client whose requests use the shared session.
+
+    The caller's client keeps its own session untouched; configuration and other
+    state (e.g. caches) are shared with the copy.
+    """
+    bound = copy.copy(client)
+    bound.session = get_shared_session()
+    return bound
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the bounded executor that runs the blocking HTTP calls."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="http-pool")
+        return _executor
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Await ``fn(*args, **kwargs)`` on the shared executor.
+
+    Like ``asyncio.to_thread`` the current context is propagated, but the executor
+    outlives the event loop, so ``asyncio.run`` never waits for abandoned calls.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
@@ -0,0 +1,348 @@
+"""
+Record/replay HTTP transport for the providers and scraped sites.
+
+A transport is a ``requests`` adapter mounted on every session that talks to a data
+source: ``DataAgent.session``, the FMP / Alpha Vantage / Twelve Data clients and the
+shared async pool. ``HTTP_TRANSPORT=record`` passes requests through and stores each
+raw response (JSON or HTML) in a compressed on-disk store; ``HTTP_TRANSPORT=replay``
+answers from that store without touching the network, optionally adding latency and
+errors so load tests see realistic timings and failure paths.
+
+Entries are keyed by method, URL and sorted query params. Credentials (``apikey``,
+``token``...) are dropped from the key and the stored URL, so recordings can be
+shared and replayed with any key.
+
+Example:
+    store = ResponseStore("data/http_replay")
+    configure_transport(ReplayAdapter(store, latency_ms=(50, 250), error_rate=0.05))
+    DataAgent().fetch_financial_data("AAPL")  # served from the recordings
+"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+logger = logging.getLogger("HttpReplay")
+
+TRANSPORT_MODE = os.getenv("HTTP_TRANSPORT", "live").lower()
+REPLAY_DIR = os.getenv("HTTP_REPLAY_DIR", str(Path(__file__).resolve().parent.parent / "data" / "http_replay"))
+REPLAY_LATENCY_MS = os.getenv("HTTP_REPLAY_LATENCY_MS", "0")
+REPLAY_ERROR_RATE = float(os.getenv("HTTP_REPLAY_ERROR_RATE", "0"))
+REPLAY_ERRORS = os.getenv("HTTP_REPLAY_ERRORS", "timeout,503")
+REPLAY_SEED = os.getenv("HTTP_REPLAY_SEED")
+
+# Parámetros que nunca forman parte de la clave ni se guardan en disco
+SECRET_PARAMS = frozenset({"apikey", "api_key", "token", "access_token", "key"})
+# Cabeceras que describen la codificación en tránsito: el cuerpo se guarda ya decodificado
+_TRANSFER_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "set-cookie", "connection"})
+
+_lock = threading.Lock()
+_transport: Optional[HTTPAdapter] = None
+_configured = False
+# Adaptadores originales de cada sesión registrada, para poder volver a "live"
+_sessions: "weakref.WeakKeyDictionary[requests.Session, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+def request_key(method: str, url: str, body: Optional[bytes] = None) -> str:
+    """Canonical ``"METHOD scheme://host/path?sorted-params"`` without credentials."""
+    parts = urlsplit(url)
+    params = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in SECRET_PARAMS
+    )
+    key = f"{method.upper()} {parts.scheme}://{parts.netloc.lower()}{parts.path}"
+    if params:
+        key += "?" + urlencode(params)
+    if body:
+        key += " #" + hashlib.sha256(body).hexdigest()[:16]
+    return key
+
+
+def parse_latency(spec: Union[str, float, Tuple[float, float], None]) -> Tuple[float, float]:
+    """``"120"`` -> (120, 120); ``"50-250"`` -> (50, 250) milliseconds."""
+    if spec is None or spec == "":
+        return (0.0, 0.0)
+    if isinstance(spec, (int, float)):
+        return (float(spec), float(spec))
+    if isinstance(spec, tuple):
+        low, high = spec
+        return (float(low), float(high))
+    low, sep, high = str(spec).partition("-")
+    low_ms = float(low)
+    high_ms = float(high) if sep else low_ms
+    if low_ms < 0 or high_ms < low_ms:
+        raise ValueError(f"Invalid replay latency {spec!r} (expected ms or min-max)")
+    return (low_ms, high_ms)
+
+
+class ResponseStore:
+    """
+    Gzip-compressed JSON file per recorded response under ``root``.
+
+    Files are named after the SHA-256 of the request key and sharded by its first
+    two hex digits; writes go to a temporary file that is renamed into place, so
+    concurrent recorders never leave partial entries.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / f"{digest}.json.gz"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as handle:
+                entry = json.load(handle)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning("Grabación ilegible para %s: %s", key, exc)
+            return None
+        return entry if entry.get("key") == key else None
+
+    def put(
+        self,
+        method: str,
+        url: str,
+        status: int,
+        content: bytes,
+        headers: Optional[Dict[str, str]] = None,
+        reason: Optional[str] = None,
+    ) -> str:
+        """Store a response and return its key."""
+        key = request_key(method, url)
+        entry: Dict[str, Any] = {
+            "key": key,
+            "url": key.split(" ", 1)[1],
+            "status": status,
+            "reason": reason or "",
+            "headers": {
+                name: value for name, value in (headers or {}).items() if name.lower() not in _TRANSFER_HEADERS
+            },
+            "recorded_at": time.time(),
+        }
+        try:
+            entry["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_b64"] = base64.b64encode(content).decode("ascii")
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as handle:
+            json.dump(entry, handle)
+        os.replace(tmp, path)
+        return key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.root.glob("*/*.json.gz"))
+
+
+def _entry_body(entry: Dict[str, Any]) -> bytes:
+    if "body_b64" in entry:
+        return base64.b64decode(entry["body_b64"])
+    return entry.get("text", "").encode("utf-8")
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Live adapter that stores every response it receives (any status) in ``store``."""
+
+    def __init__(self, store: ResponseStore, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.store = store
+        self._stats_lock = threading.Lock()
+        self.recorded = 0
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        if body:
+            logger.debug("Petición con cuerpo sin grabar: %s %s", request.method, request.url)
+            return response
+        try:
+            self.store.put(
+                request.method,
+                request.url,
+                response.status_code,
+                response.content,
+                dict(response.headers),
+                response.reason,
+            )
+        except OSError as exc:
+            logger.warning("No se pudo grabar %s: %s", request.url, exc)
+            return response
+        with self._stats_lock:
+            self.recorded += 1
+        return response
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"mode": "record", "store": str(self.store.root), "recorded": self.recorded}
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    Offline adapter answering from ``store``.
+
+    Every request waits a latency drawn uniformly from ``latency_ms`` (min, max).
+    With probability ``error_rate`` it fails instead with one of ``errors``:
+    ``"timeout"`` / ``"connection"`` raise like a network failure, a status code
+    (``"503"``, ``"429"``...) returns that status with an empty body. Requests that
+    were never recorded get a 404.
+    """
+
+    def __init__(
+        self,
+        store: ResponseStore,
+        latency_ms: Union[str, float, Tuple[float, float], None] = None,
+        error_rate: float = 0.0,
+        errors: Sequence[str] = ("timeout", "503"),
+        seed: Optional[int] = None,
+    ):
+        super().__init__()
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}")
+        self.store = store
+        self.latency_ms = parse_latency(latency_ms)
+        self.error_rate = error_rate
+        self.errors = tuple(error.strip().lower() for error in errors if error.strip()) or ("timeout",)
+        self._random = random.Random(seed)
+        self._stats_lock = threading.Lock()
+        self.stats: Counter = Counter()
+
+    def _draw(self) -> Tuple[float, Optional[str]]:
+        with self._stats_lock:
+            delay = self._random.uniform(*self.latency_ms) / 1000.0
+            error = None
+            if self.error_rate and self._random.random() < self.error_rate:
+                error = self._random.choice(self.errors)
+        return delay, error
+
+    def _count(self, outcome: str) -> None:
+        with self._stats_lock:
+            self.stats[outcome] += 1
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        delay, error = self._draw()
+        if delay:
+            time.sleep(delay)
+
+        if error in ("timeout", "connection"):
+            self._count("injected_errors")
+            exc_type = requests.Timeout if error == "timeout" else requests.ConnectionError
+            raise exc_type(f"Replay: error inyectado para {request.url}", request=request)
+        if error is not None:
+            self._count("injected_errors")
+            return self._response(request, int(error), b"", {}, "Injected error")
+
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        entry = self.store.get(request_key(request.method, request.url, body))
+        if entry is None:
+            self._count("misses")
+            logger.debug("Replay sin grabación para %s %s", request.method, request.url)
+            return self._response(request, 404, b"", {}, "Not Recorded")
+        self._count("hits")
+        return self._response(request, entry["status"], _entry_body(entry), entry["headers"], entry["reason"])
+
+    def _response(self, request, status: int, content: bytes, headers: Dict[str, str], reason: str):
+        raw = HTTPResponse(
+            body=io.BytesIO(content),
+            headers=headers,
+            status=status,
+            reason=reason,
+            preload_content=False,
+            decode_content=False,
+        )
+        return self.build_response(request, raw)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            "mode": "replay",
+            "store": str(self.store.root),
+            "latency_ms": list(self.latency_ms),
+            "error_rate": self.error_rate,
+            **stats,
+        }
+
+
+def transport_from_env() -> Optional[HTTPAdapter]:
+    """Build the adapter selected by ``HTTP_TRANSPORT`` (None for ``live``)."""
+    if TRANSPORT_MODE == "record":
+        pool_size = int(os.getenv("HTTP_POOL_SIZE", "16"))
+        return RecordingAdapter(ResponseStore(REPLAY_DIR), pool_connections=pool_size, pool_maxsize=pool_size)
+    if TRANSPORT_MODE == "replay":
+        return ReplayAdapter(
+            ResponseStore(REPLAY_DIR),
+            latency_ms=REPLAY_LATENCY_MS,
+            error_rate=REPLAY_ERROR_RATE,
+            errors=REPLAY_ERRORS.split(","),
+            seed=int(REPLAY_SEED) if REPLAY_SEED else None,
+        )
+    if TRANSPORT_MODE != "live":
+        logger.warning("HTTP_TRANSPORT desconocido: %s; se usa live", TRANSPORT_MODE)
+    return None
+
+
+def get_transport() -> Optional[HTTPAdapter]:
+    """Return the process-wide transport (None when requests go straight to the network)."""
+    global _transport, _configured
+    with _lock:
+        if not _configured:
+            _transport = transport_from_env()
+            _configured = True
+        return _transport
+
+
+def _mount(session: requests.Session, transport: Optional[HTTPAdapter]) -> None:
+    originals = _sessions.get(session)
+    if originals is None:
+        return
+    for prefix in ("https://", "http://"):
+        session.mount(prefix, transport if transport is not None else originals[prefix])
+
+
+def mount_transport(session: requests.Session) -> requests.Session:
+    """
+    Register ``session`` as a data-source session and mount the current transport.
+
+    Registered sessions follow later :func:`configure_transport` calls, so an agent
+    built before the transport was chosen switches too.
+    """
+    transport = get_transport()
+    with _lock:
+        if session not in _sessions:
+            _sessions[session] = {prefix: session.get_adapter(prefix + "x") for prefix in ("https://", "http://")}
+        _mount(session, transport)
+    return session
+
+
+def configure_transport(transport: Optional[HTTPAdapter]) -> None:
+    """Install ``transport`` process-wide (None restores the live adapters)."""
+    global _transport, _configured
+    with _lock:
+        _transport = transport
+        _configured = True
+        for session in list(_sessions.keys()):
+            _mount(session, transport)
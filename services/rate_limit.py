@@ -0,0 +1,272 @@
+"""
+Token-bucket rate limiting for the API providers and scraped hosts.
+
+Buckets never block: when a provider is out of tokens the caller skips it and the
+DataAgent cascade moves on to the next source. State lives in memory (per process)
+or in the ``rate_limit_buckets`` table so every gunicorn worker shares one quota.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger("RateLimiter")
+
+# "capacidad/segundos": la capacidad se repone por completo en ese periodo
+DEFAULT_RATE_LIMITS: Dict[str, str] = {
+    "fmp": "250/86400",          # Free tier: 250 requests/day
+    "alpha_vantage": "5/60",     # Free tier: 5 requests/min
+    "twelve_data": "8/60",       # Free tier: 8 requests/min
+    "host:finviz.com": "20/60",
+    "host:finance.yahoo.com": "30/60",
+    "host:marketwatch.com": "10/60",
+}
+RATE_LIMITS = os.getenv("RATE_LIMITS", "")
+RATE_LIMIT_DEFAULT_HOST = os.getenv("RATE_LIMIT_DEFAULT_HOST", "30/60")
+
+_lock = threading.Lock()
+_limiter: Optional["RateLimiter"] = None
+# Tokens concedidos dentro de track_requests(); los hilos con contexto copiado suman aquí
+_request_counter: ContextVar[Optional[Counter]] = ContextVar("rate_limit_requests", default=None)
+
+
+@dataclass(frozen=True)
+class BucketSpec:
+    capacity: float
+    refill_per_second: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "BucketSpec":
+        """Parse ``"capacity/seconds"`` (e.g. ``"5/60"``)."""
+        capacity, sep, period = spec.partition("/")
+        if not sep or float(period) <= 0 or float(capacity) <= 0:
+            raise ValueError(f"Invalid rate limit {spec!r} (expected capacity/seconds)")
+        return cls(capacity=float(capacity), refill_per_second=float(capacity) / float(period))
+
+
+def parse_rate_limits(spec: Optional[str]) -> Dict[str, BucketSpec]:
+    """Parse ``"alpha_vantage=5/60,host:finviz.com=10/60"`` into bucket specs."""
+    limits: Dict[str, BucketSpec] = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid rate limit entry {item!r} (expected key=capacity/seconds)")
+        limits[key.strip()] = BucketSpec.parse(value.strip())
+    return limits
+
+
+def _refill(tokens: float, updated_at: float, now: float, spec: BucketSpec) -> float:
+    return min(spec.capacity, tokens + max(0.0, now - updated_at) * spec.refill_per_second)
+
+
+class MemoryBucketStore:
+    """Buckets kept in process memory (each worker has its own quota)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, key: str, spec: BucketSpec, tokens: float, now: float) -> bool:
+        with self._lock:
+            current, updated_at = self._buckets.get(key, (spec.capacity, now))
+            available = _refill(current, updated_at, now, spec)
+            if available < tokens:
+                self._buckets[key] = (available, now)
+                return False
+            self._buckets[key] = (available - tokens, now)
+            return True
+
+    def peek(self, key: str, spec: BucketSpec, now: float) -> float:
+        with self._lock:
+            current, updated_at = self._buckets.get(key, (spec.capacity, now))
+            return _refill(current, updated_at, now, spec)
+
+
+class DatabaseBucketStore:
+    """
+    Buckets stored in the ``rate_limit_buckets`` table (SQLite or PostgreSQL).
+
+    Updates are compare-and-swap on the previous ``(tokens, updated_at)`` pair, so
+    concurrent workers never spend the same token twice and no row lock is held.
+    """
+
+    def __init__(self, db_manager, max_retries: int = 5):
+        self.db = db_manager
+        self.max_retries = max_retries
+
+    def take(self, key: str, spec: BucketSpec, tokens: float, now: float) -> bool:
+        for _ in range(self.max_retries):
+            rows = self.db.execute_query(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE bucket_key = ?",
+                (key,),
+            )
+            if not rows:
+                if tokens > spec.capacity:
+                    return False
+                inserted = self.db.execute_update(
+                    """
+                    INSERT INTO rate_limit_buckets (bucket_key, tokens, updated_at)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (bucket_key) DO NOTHING
+                    """,
+                    (key, spec.capacity - tokens, now),
+                )
+                if inserted == 1:
+                    return True
+                continue
+
+            current, updated_at = float(rows[0][0]), float(rows[0][1])
+            available = _refill(current, updated_at, now, spec)
+            if available < tokens:
+                return False
+            swapped = self.db.execute_update(
+                """
+                UPDATE rate_limit_buckets SET tokens = ?, updated_at = ?
+                WHERE bucket_key = ? AND tokens = ? AND updated_at = ?
+                """,
+                (available - tokens, now, key, rows[0][0], rows[0][1]),
+            )
+            if swapped == 1:
+                return True
+        # Contención sostenida: tratar como sin tokens y saltar la fuente
+        return False
+
+    def peek(self, key: str, spec: BucketSpec, now: float) -> float:
+        rows = self.db.execute_query(
+            "SELECT tokens, updated_at FROM rate_limit_buckets WHERE bucket_key = ?",
+            (key,),
+        )
+        if not rows:
+            return spec.capacity
+        return _refill(float(rows[0][0]), float(rows[0][1]), now, spec)
+
+
+class RateLimiter:
+    """
+    Non-blocking token buckets keyed by provider (``fmp``) or host (``host:finviz.com``).
+
+    Example:
+        limiter = RateLimiter(MemoryBucketStore())
+        if not limiter.try_acquire("alpha_vantage"):
+            return None  # skip this source now
+    """
+
+    def __init__(
+        self,
+        store=None,
+        limits: Optional[Dict[str, BucketSpec]] = None,
+        default_host: Optional[BucketSpec] = None,
+    ):
+        self.store = store or MemoryBucketStore()
+        if limits is None:
+            limits = parse_rate_limits(",".join(f"{k}={v}" for k, v in DEFAULT_RATE_LIMITS.items()))
+            limits.update(parse_rate_limits(RATE_LIMITS))
+        self.limits = limits
+        self.default_host = default_host or BucketSpec.parse(RATE_LIMIT_DEFAULT_HOST)
+        self._stats_lock = threading.Lock()
+        self.allowed: Counter = Counter()
+        self.denied: Counter = Counter()
+
+    def spec_for(self, key: str) -> Optional[BucketSpec]:
+        spec = self.limits.get(key)
+        if spec is None and key.startswith("host:"):
+            return self.default_host
+        return spec
+
+    def host_key(self, url: str) -> str:
+        """Bucket key for ``url``; subdomains share the configured parent host bucket."""
+        host = (urlparse(url).hostname or "").lower()
+        if host.startswith("www."):
+            host = host[4:]
+        for key in self.limits:
+            if key.startswith("host:"):
+                configured = key[5:]
+                if host == configured or host.endswith("." + configured):
+                    return key
+        return f"host:{host}"
+
+    def try_acquire(self, key: str, tokens: float = 1.0) -> bool:
+        """Take ``tokens`` from ``key`` if available; never waits. Unknown keys are unlimited."""
+        spec = self.spec_for(key)
+        if spec is None:
+            _count_request(key, tokens)
+            return True
+        try:
+            ok = self.store.take(key, spec, tokens, time.time())
+        except Exception as exc:
+            # Sin almacenamiento de buckets se prefiere disponibilidad a bloquear fuentes
+            logger.warning("Rate limit store unavailable for %s: %s", key, exc)
+            ok = True
+        with self._stats_lock:
+            (self.allowed if ok else self.denied)[key] += 1
+        if ok:
+            _count_request(key, tokens)
+        if not ok:
+            logger.info("Rate limit reached for %s; skipping for now", key)
+        return ok
+
+    def available(self, key: str) -> float:
+        """Tokens currently available for ``key`` (does not consume)."""
+        spec = self.spec_for(key)
+        if spec is None:
+            return float("inf")
+        try:
+            return self.store.peek(key, spec, time.time())
+        except Exception as exc:
+            logger.warning("Rate limit store unavailable for %s: %s", key, exc)
+            return spec.capacity
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._stats_lock:
+            keys = set(self.allowed) | set(self.denied)
+            return {key: {"allowed": self.allowed[key], "denied": self.denied[key]} for key in sorted(keys)}
+
+
+def _count_request(key: str, tokens: float) -> None:
+    counter = _request_counter.get()
+    if counter is not None:
+        counter[key] += int(tokens)
+
+
+@contextmanager
+def track_requests() -> Iterator[Counter]:
+    """
+    Count the tokens granted per key by ``try_acquire`` calls made inside the block.
+
+    Each granted token is one request (or one credit, for per-symbol batches) sent to
+    the provider; responses served by the HTTP cache never reach the limiter and are
+    not counted. Threads started with a copied context add to the same counter.
+    """
+    counter: Counter = Counter()
+    token = _request_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _request_counter.reset(token)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter (in-memory buckets unless configured otherwise)."""
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
+
+
+def configure_rate_limiter(limiter: RateLimiter) -> None:
+    """Install ``limiter`` as the process-wide limiter (e.g. backed by the database)."""
+    global _limiter
+    with _lock:
+        _limiter = limiter
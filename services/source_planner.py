@@ -0,0 +1,345 @@
+"""
+Adaptive source planning from observed yield, latency and quota cost.
+
+For every source the planner learns how often it supplies each target metric group
+(e.g. ``pe_ratio`` or ``current_price``), its mean latency and its quota cost. DataAgent
+asks it which source to query next (``adaptive`` mode) or which sources are not worth
+launching at all (``concurrent`` / ``async``), e.g. TwelveData once FMP reliably
+covers price and market cap. Stats persist in the ``source_stats`` table.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger("SourcePlanner")
+
+PLANNER_ENABLED = os.getenv("SOURCE_PLANNER", "1").strip().lower() in {"1", "true", "yes"}
+# Ejecuciones observadas antes de confiar en las estadísticas de una fuente
+PLANNER_MIN_SAMPLES = int(os.getenv("SOURCE_PLANNER_MIN_SAMPLES", "8"))
+# Grupos de métricas esperados por debajo de los cuales se omite la fuente
+PLANNER_MIN_GAIN = float(os.getenv("SOURCE_PLANNER_MIN_GAIN", "0.5"))
+# Probabilidad a partir de la cual se asume que una fuente anterior cubrirá un grupo
+PLANNER_ASSUME_PROBABILITY = float(os.getenv("SOURCE_PLANNER_ASSUME_PROBABILITY", "0.9"))
+# Segundos equivalentes por petición de cuota consumida
+PLANNER_QUOTA_WEIGHT = float(os.getenv("SOURCE_PLANNER_QUOTA_WEIGHT", "0.25"))
+# Al superar este número de ejecuciones los contadores se reducen a la mitad (olvido)
+PLANNER_WINDOW = int(os.getenv("SOURCE_PLANNER_WINDOW", "200"))
+PLANNER_FLUSH_SECONDS = float(os.getenv("SOURCE_PLANNER_FLUSH_SECONDS", "60"))
+# Cada N omisiones se consulta igualmente la fuente para no congelar sus estadísticas
+PLANNER_EXPLORE_EVERY = int(os.getenv("SOURCE_PLANNER_EXPLORE_EVERY", "20"))
+DEFAULT_LATENCY = 1.0
+
+_lock = threading.Lock()
+_planner: Optional["SourcePlanner"] = None
+
+
+@dataclass
+class SourceStats:
+    runs: float = 0.0
+    hits: float = 0.0
+    latency_total: float = 0.0
+    group_counts: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def mean_latency(self) -> float:
+        return self.latency_total / self.runs if self.runs else DEFAULT_LATENCY
+
+    def probability(self, group: str) -> float:
+        return self.group_counts.get(group, 0.0) / self.runs if self.runs else 0.0
+
+    def add(self, other: "SourceStats") -> None:
+        self.runs += other.runs
+        self.hits += other.hits
+        self.latency_total += other.latency_total
+        for group, count in other.group_counts.items():
+            self.group_counts[group] = self.group_counts.get(group, 0.0) + count
+
+    def decay(self, window: int) -> None:
+        """Halve every counter once ``runs`` exceeds ``window`` so recent behaviour dominates."""
+        while window > 0 and self.runs > window:
+            self.runs /= 2
+            self.hits /= 2
+            self.latency_total /= 2
+            self.group_counts = {group: count / 2 for group, count in self.group_counts.items()}
+
+
+class DatabaseStatsStore:
+    """Persist planner stats in ``source_stats`` (SQLite or PostgreSQL)."""
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+
+    def load(self) -> Dict[str, SourceStats]:
+        rows = self.db.execute_query(
+            "SELECT source, runs, hits, latency_total, group_counts FROM source_stats"
+        )
+        return {row[0]: _stats_from_row(row) for row in rows}
+
+    def add(self, deltas: Mapping[str, SourceStats], window: int) -> Dict[str, SourceStats]:
+        """
+        Add ``deltas`` to the stored rows and return the merged stats.
+
+        Read and write share one transaction; concurrent workers may still lose a
+        delta on SQLite, which only makes the estimates marginally older.
+        """
+        merged: Dict[str, SourceStats] = {}
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for source, delta in deltas.items():
+                    cursor.execute(
+                        self.db.adapt_query(
+                            "SELECT source, runs, hits, latency_total, group_counts FROM source_stats WHERE source = ?"
+                        ),
+                        (source,),
+                    )
+                    row = cursor.fetchone()
+                    stats = _stats_from_row(row) if row else SourceStats()
+                    stats.add(delta)
+                    stats.decay(window)
+                    cursor.execute(
+                        self.db.adapt_query(
+                            """
+                            INSERT INTO source_stats (source, runs, hits, latency_total, group_counts, updated_at)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                            ON CONFLICT (source) DO UPDATE SET
+                                runs = excluded.runs,
+                                hits = excluded.hits,
+                                latency_total = excluded.latency_total,
+                                group_counts = excluded.group_counts,
+                                updated_at = excluded.updated_at
+                            """
+                        ),
+                        (source, stats.runs, stats.hits, stats.latency_total, json.dumps(stats.group_counts), now),
+                    )
+                    merged[source] = stats
+            finally:
+                cursor.close()
+        return merged
+
+
+def _stats_from_row(row: Sequence[Any]) -> SourceStats:
+    try:
+        group_counts = json.loads(row[4]) if row[4] else {}
+    except (TypeError, ValueError):
+        group_counts = {}
+    return SourceStats(
+        runs=float(row[1] or 0),
+        hits=float(row[2] or 0),
+        latency_total=float(row[3] or 0),
+        group_counts={str(k): float(v) for k, v in group_counts.items()},
+    )
+
+
+class SourcePlanner:
+    """
+    Learns per-source yield and cost and plans the cascade from it.
+
+    Sources with fewer than ``min_samples`` runs are treated optimistically (they
+    are never skipped and keep their static position), so a cold planner behaves
+    like the classic cascade. Every ``explore_every``-th skip of a source is turned
+    into a real call so a source that improves is eventually noticed.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        min_samples: int = PLANNER_MIN_SAMPLES,
+        min_gain: float = PLANNER_MIN_GAIN,
+        assume_probability: float = PLANNER_ASSUME_PROBABILITY,
+        quota_weight: float = PLANNER_QUOTA_WEIGHT,
+        window: int = PLANNER_WINDOW,
+        flush_seconds: float = PLANNER_FLUSH_SECONDS,
+        explore_every: int = PLANNER_EXPLORE_EVERY,
+    ):
+        self.store = store
+        self.min_samples = min_samples
+        self.min_gain = min_gain
+        self.assume_probability = assume_probability
+        self.quota_weight = quota_weight
+        self.window = window
+        self.flush_seconds = flush_seconds
+        self.explore_every = explore_every
+        self._lock = threading.Lock()
+        self._stats: Dict[str, SourceStats] = {}
+        self._pending: Dict[str, SourceStats] = {}
+        self._last_flush = time.monotonic()
+        self.skipped: Dict[str, int] = {}
+        if store is not None:
+            try:
+                self._stats = store.load()
+            except Exception as exc:
+                logger.warning("Source planner stats unavailable: %s", exc)
+
+    # -------------------------------
+    # Learning
+    # -------------------------------
+
+    def record(self, source: str, latency: float, groups: Optional[Iterable[str]]) -> None:
+        """Record one run of ``source``; ``groups`` are the target groups it supplied (None = no data)."""
+        delta = SourceStats(runs=1.0, latency_total=max(0.0, latency))
+        if groups is not None:
+            delta.hits = 1.0
+            delta.group_counts = {group: 1.0 for group in groups}
+        with self._lock:
+            self._stats.setdefault(source, SourceStats()).add(delta)
+            self._stats[source].decay(self.window)
+            self._pending.setdefault(source, SourceStats()).add(delta)
+            due = self.store is not None and time.monotonic() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write pending deltas to the store and reload the merged stats (other workers included)."""
+        if self.store is None:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            merged = self.store.add(pending, self.window)
+        except Exception as exc:
+            logger.warning("Could not persist source planner stats: %s", exc)
+            with self._lock:
+                for source, delta in pending.items():
+                    self._pending.setdefault(source, SourceStats()).add(delta)
+            return
+        with self._lock:
+            for source, stats in merged.items():
+                # Lo registrado durante la escritura sigue pendiente y se suma encima
+                local_pending = self._pending.get(source)
+                if local_pending is not None:
+                    stats = SourceStats(stats.runs, stats.hits, stats.latency_total, dict(stats.group_counts))
+                    stats.add(local_pending)
+                self._stats[source] = stats
+
+    # -------------------------------
+    # Planning
+    # -------------------------------
+
+    def _known(self, source: str) -> Optional[SourceStats]:
+        stats = self._stats.get(source)
+        if stats is None or stats.runs < self.min_samples:
+            return None
+        return stats
+
+    def expected_gain(self, source: str, missing: Iterable[str]) -> Optional[float]:
+        """Expected number of ``missing`` groups ``source`` will supply (None while still learning)."""
+        with self._lock:
+            stats = self._known(source)
+            if stats is None:
+                return None
+            return sum(stats.probability(group) for group in missing)
+
+    def expected_cost(self, source: str, quota_cost: float = 0.0) -> float:
+        with self._lock:
+            stats = self._known(source)
+            latency = stats.mean_latency if stats is not None else DEFAULT_LATENCY
+        return latency + self.quota_weight * quota_cost
+
+    def choose_next(
+        self,
+        candidates: Sequence[str],
+        missing: Set[str],
+        quota_costs: Mapping[str, float],
+    ) -> Tuple[Optional[str], List[str]]:
+        """
+        Pick the source with the best expected gain per second among ``candidates``.
+
+        Returns ``(source or None, skipped)`` where ``skipped`` are learned sources whose
+        expected gain is below ``min_gain``. Sources still learning come first and ties
+        keep the static order of ``candidates``.
+        """
+        best: Optional[str] = None
+        best_score = -1.0
+        skipped: List[str] = []
+        for source in candidates:
+            gain = self.expected_gain(source, missing)
+            if self._skip(source, gain):
+                skipped.append(source)
+                continue
+            if gain is None:
+                # Fuente aún sin muestras suficientes: se consulta en su orden estático
+                score = float("inf")
+            else:
+                score = gain / max(0.05, self.expected_cost(source, quota_costs.get(source, 0.0)))
+            if score > best_score:
+                best, best_score = source, score
+        return best, skipped
+
+    def prune(self, sources: Sequence[str], targets: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Drop sources that add little over what higher-priority sources almost surely supply.
+
+        Used when every source is launched at once: a group counts as covered once a kept
+        source supplies it with probability >= ``assume_probability``.
+        """
+        covered: Set[str] = set()
+        targets = list(targets)
+        kept: List[str] = []
+        skipped: List[str] = []
+        for source in sources:
+            missing = [group for group in targets if group not in covered]
+            if self._skip(source, self.expected_gain(source, missing)):
+                skipped.append(source)
+                continue
+            kept.append(source)
+            with self._lock:
+                stats = self._known(source)
+                if stats is not None:
+                    covered.update(g for g in targets if stats.probability(g) >= self.assume_probability)
+        return kept, skipped
+
+    def _skip(self, source: str, gain: Optional[float]) -> bool:
+        """True if ``source`` should be skipped for an expected ``gain`` (None = still learning)."""
+        if gain is None or gain >= self.min_gain:
+            return False
+        with self._lock:
+            self.skipped[source] = self.skipped.get(source, 0) + 1
+            if self.explore_every > 0 and self.skipped[source] % self.explore_every == 0:
+                return False
+        return True
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for source, stats in sorted(self._stats.items()):
+                top = sorted(stats.group_counts, key=lambda g: -stats.group_counts[g])[:5]
+                result[source] = {
+                    "runs": round(stats.runs, 1),
+                    "hit_rate": round(stats.hits / stats.runs, 3) if stats.runs else 0.0,
+                    "mean_latency": round(stats.mean_latency, 3),
+                    "learned": stats.runs >= self.min_samples,
+                    "skipped": self.skipped.get(source, 0),
+                    "top_groups": {g: round(stats.probability(g), 2) for g in top},
+                }
+            return result
+
+
+def get_source_planner() -> Optional[SourcePlanner]:
+    """Return the process-wide planner (in-memory unless configured), or None if disabled."""
+    global _planner
+    if not PLANNER_ENABLED:
+        return None
+    with _lock:
+        if _planner is None:
+            _planner = SourcePlanner()
+        return _planner
+
+
+def configure_source_planner(planner: Optional[SourcePlanner]) -> None:
+    """Install ``planner`` as the process-wide planner (e.g. with a database store)."""
+    global _planner
+    with _lock:
+        _planner = planner
@@ -7,10 +7,16 @@ from __future__ import annotations
 import logging
 import os
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional
 
 import requests
 
+from . import http_cache
+from .http_pool import bind_shared_session, run_blocking
+from .http_replay import mount_transport
+from .circuit_breaker import note_request_failure
+from .rate_limit import get_rate_limiter
+
 logger = logging.getLogger("TwelveDataClient")
 
 
@@ -26,12 +32,16 @@ class TwelveDataClient:
     Minimal client for Twelve Data quote endpoint.
     """
 
+    RATE_LIMIT_KEY = "twelve_data"
+    # Cada símbolo de una petición por lotes consume un crédito de la cuota
+    MAX_BATCH_SYMBOLS = int(os.getenv("TWELVE_DATA_BATCH_SYMBOLS", "8"))
+
     def __init__(self, api_key: Optional[str] = None):
         key = api_key or os.getenv("TWELVEDATA_API_KEY") or os.getenv("TWELVE_DATA_API_KEY")
         if key:
             key = key.strip()
         self.config = TwelveDataConfig(api_key=key)
-        self.session = requests.Session()
+        self.session = mount_transport(requests.Session())
 
     @property
     def enabled(self) -> bool:
@@ -45,14 +55,20 @@ class TwelveDataClient:
             "apikey": self.config.api_key,
         }
         url = f"{self.config.base_url}/quote"
-        try:
-            response = self.session.get(url, params=params, timeout=self.config.timeout)
-        except requests.RequestException as exc:  # pragma: no cover - network
-            logger.warning("Twelve Data request failed: %s", exc)
-            return None
+        response = http_cache.lookup(url, params)
+        if response is None:
+            if not get_rate_limiter().try_acquire(self.RATE_LIMIT_KEY):
+                return None
+            try:
+                response = http_cache.conditional_get(self.session, url, params=params, timeout=self.config.timeout)
+            except requests.RequestException as exc:  # pragma: no cover - network
+                logger.warning("Twelve Data request failed: %s", exc)
+                note_request_failure()
+                return None
 
         if response.status_code != 200:
             logger.warning("Twelve Data returned status %s for %s", response.status_code, symbol)
+            note_request_failure()
             return None
 
         try:
@@ -65,5 +81,89 @@ class TwelveDataClient:
             logger.warning("Twelve Data error for %s: %s", symbol, payload.get("message"))
             return None
 
-        return payload if isinstance(payload, dict) else None
+        if not isinstance(payload, dict):
+            return None
+        http_cache.remember(response, http_cache.QUOTE_TTL_SECONDS)
+        return payload
+
+    def get_quotes(self, symbols: Iterable[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Quotes for several symbols with ``symbol=SYM1,SYM2,...`` requests.
+
+        Each request takes one rate-limit token per symbol (Twelve Data bills batch
+        requests per symbol). Every symbol of an answered chunk is present in the
+        result (``None`` on a per-symbol error); symbols of failed or rate-limited
+        chunks are omitted so callers can fall back to :meth:`get_quote`.
+        """
+        if not self.enabled:
+            return {}
+        unique = list(dict.fromkeys(symbol.upper() for symbol in symbols if symbol))
+        size = max(1, self.MAX_BATCH_SYMBOLS)
+        results: Dict[str, Optional[Dict[str, str]]] = {}
+        for start in range(0, len(unique), size):
+            chunk = unique[start:start + size]
+            payload = self._get_quote_batch(chunk)
+            if payload is None:
+                continue
+            if len(chunk) == 1:
+                # Con un solo símbolo la API responde con la cotización sin anidar
+                payload = {chunk[0]: payload}
+            for symbol in chunk:
+                quote = payload.get(symbol)
+                ok = isinstance(quote, dict) and quote.get("status") != "error"
+                results[symbol] = quote if ok else None
+        return results
+
+    def _get_quote_batch(self, chunk: List[str]) -> Optional[Dict[str, Dict[str, str]]]:
+        params = {
+            "symbol": ",".join(chunk),
+            "apikey": self.config.api_key,
+        }
+        url = f"{self.config.base_url}/quote"
+        response = http_cache.lookup(url, params)
+        if response is None:
+            if not get_rate_limiter().try_acquire(self.RATE_LIMIT_KEY, tokens=len(chunk)):
+                return None
+            try:
+                response = http_cache.conditional_get(self.session, url, params=params, timeout=self.config.timeout)
+            except requests.RequestException as exc:  # pragma: no cover - network
+                logger.warning("Twelve Data batch request failed: %s", exc)
+                note_request_failure()
+                return None
+
+        if response.status_code != 200:
+            logger.warning("Twelve Data returned status %s for batch %s", response.status_code, params["symbol"])
+            note_request_failure()
+            return None
+
+        try:
+            payload = response.json()
+        except ValueError:
+            logger.warning("Twelve Data invalid JSON for batch %s", params["symbol"])
+            return None
+
+        if not isinstance(payload, dict) or payload.get("status") == "error":
+            logger.warning("Twelve Data error for batch %s: %s", params["symbol"], payload)
+            return None
+        http_cache.remember(response, http_cache.QUOTE_TTL_SECONDS)
+        return payload
+
+
+class AsyncTwelveDataClient:
+    """
+    Async facade over :class:`TwelveDataClient` sharing the process-wide connection pool.
+    """
+
+    def __init__(self, client: Optional[TwelveDataClient] = None, api_key: Optional[str] = None):
+        # Copia propia sobre el pool compartido: el cliente recibido conserva su sesión
+        self.client = bind_shared_session(client or TwelveDataClient(api_key))
+
+    @property
+    def enabled(self) -> bool:
+        return self.client.enabled
+
+    async def get_quote(self, symbol: str) -> Optional[Dict[str, str]]:
+        return await run_blocking(self.client.get_quote, symbol)
 
+    async def get_quotes(self, symbols: Iterable[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        return await run_blocking(self.client.get_quotes, list(symbols))
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Coalescencia de peticiones (single-flight) para fetches concurrentes.
+
+Cuando varios hilos piden el mismo ticker con la cache expirada, solo uno
+ejecuta la cascada de fuentes; el resto espera y reutiliza su resultado.
+Opcionalmente, un lock en la base de datos (tabla ``fetch_locks``) extiende
+la coalescencia entre procesos (workers de gunicorn).
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    """Fetch en curso para una clave."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class DatabaseLock:
+    """
+    Lock con arrendamiento (lease) guardado en la tabla ``fetch_locks``.
+
+    Funciona igual en SQLite y PostgreSQL: la fila de cada clave expira tras
+    ``ttl`` segundos, de modo que un worker caído nunca bloquea para siempre.
+    """
+
+    def __init__(self, db_manager, ttl: float = 120.0, poll_interval: float = 0.25):
+        self.db = db_manager
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+    def try_acquire(self, key: str) -> bool:
+        """Intenta tomar el lock sin esperar."""
+        now = time.time()
+        self.db.execute_update(
+            "DELETE FROM fetch_locks WHERE lock_key = ? AND expires_at < ?",
+            (key, now),
+        )
+        inserted = self.db.execute_update(
+            """
+            INSERT INTO fetch_locks (lock_key, owner, expires_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT (lock_key) DO NOTHING
+            """,
+            (key, self.owner, now + self.ttl),
+        )
+        return inserted == 1
+
+    def release(self, key: str) -> None:
+        self.db.execute_update(
+            "DELETE FROM fetch_locks WHERE lock_key = ? AND owner = ?",
+            (key, self.owner),
+        )
+
+    @contextmanager
+    def hold(self, key: str, timeout: float) -> Iterator[bool]:
+        """
+        Mantiene el lock de ``key`` durante el bloque.
+
+        Produce True si hubo que esperar a otro proceso (su resultado puede
+        estar ya en cache). Si se agota ``timeout`` se continúa sin lock.
+        """
+        deadline = time.monotonic() + timeout
+        waited = False
+        acquired = False
+        try:
+            while True:
+                try:
+                    acquired = self.try_acquire(key)
+                except Exception as exc:
+                    logger.warning("Lock distribuido no disponible para %s: %s", key, exc)
+                    break
+                if acquired or time.monotonic() >= deadline:
+                    break
+                waited = True
+                time.sleep(self.poll_interval)
+            if waited and not acquired:
+                logger.warning("Timeout esperando lock distribuido de %s; se continúa sin lock", key)
+            yield waited
+        finally:
+            if acquired:
+                try:
+                    self.release(key)
+                except Exception as exc:
+                    logger.warning("No se pudo liberar lock distribuido de %s: %s", key, exc)
+
+
+class SingleFlight:
+    """
+    Garantiza una sola ejecución en curso por clave dentro del proceso.
+
+    Ejemplo:
+        flight = SingleFlight()
+        metrics, shared = flight.do("AAPL", lambda: agent.fetch_financial_data("AAPL"))
+    """
+
+    def __init__(self, distributed_lock: Optional[DatabaseLock] = None, lock_timeout: float = 60.0):
+        self.distributed_lock = distributed_lock
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.stats = {"executions": 0, "shared": 0}
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], T],
+        recheck: Optional[Callable[[], Optional[T]]] = None,
+    ) -> Tuple[T, bool]:
+        """
+        Ejecuta ``fn`` una sola vez por ``key`` entre llamadas concurrentes.
+
+        Args:
+            key: Clave de coalescencia (ej: ticker)
+            fn: Función que realiza el trabajo costoso
+            recheck: Con lock distribuido, se invoca tras esperar a otro proceso;
+                     si retorna un valor se usa en lugar de ejecutar ``fn``
+
+        Returns:
+            Tupla (resultado, shared) donde shared indica si se reutilizó
+            el resultado de otro hilo
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            with self._lock:
+                self.stats["shared"] += 1
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = self._execute(key, fn, recheck)
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                self.stats["executions"] += 1
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def waiting(self, key: Optional[str] = None) -> int:
+        """Hilos bloqueados esperando el resultado de ``key`` (o de cualquier clave)."""
+        with self._lock:
+            if key is not None:
+                call = self._calls.get(key)
+                return call.waiters if call else 0
+            return sum(call.waiters for call in self._calls.values())
+
+    def snapshot(self) -> Dict[str, int]:
+        """Contadores para /health: ejecuciones, resultados compartidos y espera actual."""
+        with self._lock:
+            return {
+                **self.stats,
+                "in_flight": len(self._calls),
+                "waiting": sum(call.waiters for call in self._calls.values()),
+            }
+
+    def _execute(
+        self,
+        key: str,
+        fn: Callable[[], T],
+        recheck: Optional[Callable[[], Optional[T]]],
+    ) -> T:
+        if self.distributed_lock is None:
+            return fn()
+
+        with self.distributed_lock.hold(key, self.lock_timeout) as waited:
+            if waited and recheck is not None:
+                result = recheck()
+                if result is not None:
+                    logger.info("Single-flight: %s resuelto por otro proceso", key)
+                    return result
+            return fn()
@@ -2,4 +2,60 @@ import sys
 from pathlib import Path
 
 # Allow imports from the project root
-sys.path.insert(0, str(Path(__file__).parent.parent))
\ No newline at end of file
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+import data_agent as data_agent_module
+import db_manager as db_module
+from cache_store import CacheStore
+from data_agent import DataAgent
+from db_manager import DatabaseManager
+from services import circuit_breaker as circuit_breaker_module
+from services import http_cache as http_cache_module
+from services import rate_limit as rate_limit_module
+from services import source_planner as source_planner_module
+from services.circuit_breaker import CircuitBreakerRegistry
+from services.rate_limit import MemoryBucketStore, RateLimiter
+from services.source_planner import SourcePlanner
+
+
+@pytest.fixture(autouse=True)
+def no_http_cache(monkeypatch):
+    """La cache HTTP vive en disco: deshabilitada salvo en los tests que la configuran."""
+    monkeypatch.setattr(http_cache_module, "CACHE_ENABLED", False)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """DatabaseManager sobre una base SQLite temporal (nunca la de DATABASE_URL) con sus tablas."""
+    monkeypatch.setattr(db_module, "IS_PRODUCTION", False)
+    manager = DatabaseManager(tmp_path / "cache.db")
+    manager.init_tables()
+    yield manager
+    manager.pool.close_all()
+
+
+@pytest.fixture
+def store(db):
+    """CacheStore sobre ``db`` con sus tablas creadas."""
+    cache_store = CacheStore(db)
+    cache_store.init_tables()
+    return cache_store
+
+
+@pytest.fixture
+def agent(monkeypatch, tmp_path):
+    """DataAgent aislado: sin claves de API, sin esperas y con limiter, circuitos y planner propios."""
+    monkeypatch.setattr(data_agent_module, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(data_agent_module.time, "sleep", lambda *_: None)
+    # Buckets en memoria y aislados por test
+    monkeypatch.setattr(rate_limit_module, "_limiter", RateLimiter(MemoryBucketStore()))
+    monkeypatch.setattr(circuit_breaker_module, "_registry", CircuitBreakerRegistry())
+    monkeypatch.setattr(source_planner_module, "_planner", SourcePlanner())
+    instance = DataAgent()
+    instance.alpha_client.config.api_key = None
+    instance.twelve_client.config.api_key = None
+    instance.fmp_client.config.api_key = None
+    monkeypatch.setattr(instance, "_refresh_clients", lambda: None)
+    return instance
@@ -8,10 +8,20 @@ Consolidates:
   - test_tier1_valuation.py → TIER1/TIER2 valuation scoring
   - test_metric_normalizer.py → MetricNormalizer
   - test_sector_relative.py   → Sector-relative (z-score) scoring
+  - EquityAnalyzer.score_batch → parity with the scalar path
+  - analyzers.scoring_tables   → compiled threshold tables
+  - EquityAnalyzer.result_key  → memoization of equity scores
+  - AnalysisContext            → per-call state, thread-safe shared analyzer
 """
 
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
 import pytest
 from analyzers import EquityAnalyzer
+from analyzers.scoring_tables import SCORE_TABLES, SCORING_RULES, ScoreTable
 from analyzers.sector_benchmarks import SectorNormalizer
 from metric_normalizer import MetricNormalizer
 from scoring_engine import InvestmentScorer
@@ -376,4 +386,222 @@ class TestSectorRelative:
     def test_normalizer_stats(self):
         self.normalizer.normalize_metric(35.0, "roe", "Technology")
         stats = self.normalizer.get_stats()
-        assert stats["total_normalized"] > 0
\ No newline at end of file
+        assert stats["total_normalized"] > 0
+
+# ---------------------------------------------------------------------------
+# Columnar scoring (score_batch) – bit-identical to calculate_all_scores
+# ---------------------------------------------------------------------------
+
+# Every threshold used by the scalar ladders, so boundaries are exercised
+BOUNDARIES = [-2, -0.5, 0, 0.3, 0.5, 0.7, 0.8, 1, 1.2, 1.25, 1.5, 2, 2.5, 3, 5, 7,
+              8, 10, 12, 15, 20, 25, 30, 40]
+SECTORS = ["Technology", "Technology - Semiconductors", "Utilities", "Financials",
+           "Unknown", "Martian Mining", ""]
+SCORED_FIELDS = [
+    "roe", "roic", "operating_margin", "net_margin", "pe_ratio", "peg_ratio",
+    "price_to_book", "debt_to_equity", "current_ratio", "quick_ratio",
+    "revenue_growth", "revenue_growth_5y", "revenue_growth_qoq", "earnings_growth",
+    "earnings_growth_this_y", "earnings_growth_next_y", "earnings_growth_qoq",
+    "ev_to_ebit", "fcf_yield", "net_debt_to_ebitda", "interest_coverage",
+]
+SUFFIXED_FIELDS = ["roe_ttm", "roic_mry", "pe_ratio_ttm", "debt_to_equity_mrq", "revenue_growth_5y_fwd"]
+BATCH_COLUMNS = ["quality_score", "valuation_score", "financial_health_score", "growth_score", "investment_score"]
+
+
+def _random_universe(size, seed=7):
+    rng = random.Random(seed)
+
+    def value():
+        roll = rng.random()
+        if roll < 0.3:
+            return rng.choice(BOUNDARIES)
+        if roll < 0.45:
+            return None
+        return round(rng.uniform(-10, 60), rng.choice([1, 2, 6]))
+
+    universe = []
+    for index in range(size):
+        metrics = {"ticker": f"T{index}"}
+        for field in SCORED_FIELDS + SUFFIXED_FIELDS:
+            if rng.random() < 0.75:
+                metrics[field] = value()
+        if rng.random() < 0.8:
+            metrics["sector"] = rng.choice(SECTORS)
+        universe.append(metrics)
+    return universe
+
+
+class TestScoreBatch:
+    def setup_method(self):
+        self.analyzer = EquityAnalyzer()
+
+    def _assert_parity(self, universe, batch):
+        for position, metrics in enumerate(universe):
+            scalar = self.analyzer.calculate_all_scores(metrics)
+            row = batch.iloc[position]
+            for column in BATCH_COLUMNS:
+                assert row[column] == scalar[column], (metrics, column)
+                assert np.float64(row[column]).tobytes() == np.float64(scalar[column]).tobytes()
+            assert row["category"] == scalar["category"]["name"], metrics
+
+    @pytest.mark.parametrize("sector_relative", [True, False])
+    def test_matches_scalar_path(self, sector_relative):
+        self.analyzer.use_sector_relative = sector_relative
+        universe = _random_universe(600)
+        batch = self.analyzer.score_batch(pd.DataFrame(universe))
+        assert len(batch) == len(universe)
+        self._assert_parity(universe, batch)
+
+    def test_accepts_numpy_columns(self):
+        universe = _random_universe(50, seed=11)
+        frame = pd.DataFrame(universe)
+        columns = {
+            name: frame[name].to_numpy(dtype=float) if name in SCORED_FIELDS + SUFFIXED_FIELDS else frame[name].to_numpy()
+            for name in frame.columns
+        }
+        self._assert_parity(universe, self.analyzer.score_batch(columns))
+
+    def test_keeps_index_and_neutral_defaults(self):
+        frame = pd.DataFrame({"roe": [None, 31.0]}, index=["EMPTY", "ROE"])
+        batch = self.analyzer.score_batch(frame)
+        assert list(batch.index) == ["EMPTY", "ROE"]
+        assert batch.loc["EMPTY", "quality_score"] == 50.0
+        assert batch.loc["ROE", "quality_score"] == 100.0
+
+    def test_normalize_columns_follows_period_hierarchy(self):
+        frame = pd.DataFrame({
+            "roe": [10.0, 10.0, None],
+            "roe_mry": [21.8, None, "n/a"],
+            "roe_ttm": [22.3, None, None],
+        })
+        roe = MetricNormalizer().normalize_columns(frame, ["roe"])["roe"].tolist()
+        assert roe[:2] == [22.3, 10.0]
+        assert np.isnan(roe[2])
+
+
+# ---------------------------------------------------------------------------
+# Compiled scoring tables
+# ---------------------------------------------------------------------------
+
+def _ladder(operator, steps, default, value):
+    """Reference if/elif evaluation of a declarative rule."""
+    for threshold, score in steps:
+        if (value > threshold) if operator == ">" else (value < threshold):
+            return score
+    return default
+
+
+class TestScoringTables:
+    @pytest.mark.parametrize("name", sorted(SCORING_RULES))
+    def test_scalar_and_array_match_the_ladder(self, name):
+        operator, steps, default = SCORING_RULES[name]
+        thresholds = [threshold for threshold, _ in steps]
+        values = sorted({t + delta for t in thresholds for delta in (-1e-9, 0, 1e-9)} | {-1e6, 1e6})
+        table = SCORE_TABLES[name]
+
+        expected = [_ladder(operator, steps, default, value) for value in values]
+        assert [table.score(value) for value in values] == expected
+        assert table.score_array(np.array(values)).tolist() == expected
+
+    def test_scalar_keeps_declared_type(self):
+        assert type(SCORE_TABLES["roe"].score(31)) is int
+        assert SectorNormalizer().z_to_score(2.5) == 100.0
+
+    def test_rejects_unsorted_thresholds(self):
+        with pytest.raises(ValueError):
+            ScoreTable("bad", ">", [(5, 30), (10, 50)], 10)
+        with pytest.raises(ValueError):
+            ScoreTable("bad", "<", [(10, 100), (5, 50)], 10)
+        with pytest.raises(ValueError):
+            ScoreTable("bad", ">=", [(10, 100)], 10)
+
+
+# ---------------------------------------------------------------------------
+# Memoization key (EquityAnalyzer.result_key + app.score_equity)
+# ---------------------------------------------------------------------------
+
+MEMO_METRICS = {
+    "ticker": "MEMO", "sector": "Technology", "roe": 28.0, "roic": 21.0, "pe_ratio": 18.0,
+    "debt_to_equity": 0.4, "revenue_growth": 12.0, "currency": "USD", "current_price": 100.0,
+}
+
+
+class TestResultKey:
+    def test_ignores_fields_outside_the_analysis(self):
+        analyzer = EquityAnalyzer()
+        key = analyzer.result_key(MEMO_METRICS)
+        assert analyzer.result_key(dict(MEMO_METRICS, current_price=120.0, company_name="Memo Inc")) == key
+        assert analyzer.result_key(dict(MEMO_METRICS, roe=None, roe_ttm=None)) != key
+
+    def test_changes_with_inputs_and_configuration(self):
+        analyzer = EquityAnalyzer()
+        key = analyzer.result_key(MEMO_METRICS)
+        assert analyzer.result_key(dict(MEMO_METRICS, roe=29.0)) != key
+        assert analyzer.result_key(dict(MEMO_METRICS, currency="EUR")) != key
+
+        analyzer.quality_weights["roe"] = 0.30
+        assert analyzer.result_key(MEMO_METRICS)[0] != key[0]
+        analyzer.use_sector_relative = False
+        assert analyzer.engine_version() == analyzer.engine_version()
+        assert analyzer.result_key(MEMO_METRICS)[0] != key[0]
+
+    def test_app_reuses_memoized_scores(self, monkeypatch):
+        import app as app_module
+        from memory_cache import BoundedLRUCache, TimedMemo
+
+        memo = TimedMemo(BoundedLRUCache(max_entries=10, max_bytes=1024 * 1024))
+        monkeypatch.setattr(app_module, "score_memo", memo)
+        first = app_module.score_equity(dict(MEMO_METRICS))
+        second = app_module.score_equity(dict(MEMO_METRICS, current_price=101.0))
+
+        assert second is first
+        assert first[0] == app_module.investment_scorer.calculate_all_scores(MEMO_METRICS)
+        assert memo.stats()["hits"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Per-call state (AnalysisContext) – one analyzer shared across threads
+# ---------------------------------------------------------------------------
+
+def _context_universe(size):
+    universe = []
+    for metrics in _random_universe(size, seed=23):
+        position = int(metrics["ticker"][1:])
+        metrics["dispersion"] = {"roe": {"confidence_adj": (position % 10) / 10}} if position % 3 else {}
+        universe.append(metrics)
+    return universe
+
+
+class TestAnalysisContext:
+    def test_context_holds_call_state_and_feeds_aggregates(self):
+        analyzer = EquityAnalyzer()
+        metrics = {"sector": "Technology", "roe_ttm": 30.0, "roic": 20.0, "pe_ratio": 15.0,
+                   "dispersion": {"roe": {"confidence_adj": 0.6}}}
+        context = analyzer.new_context()
+        result = analyzer.calculate_all_scores(metrics, context)
+
+        assert context.confidence_factors["dispersion"] == 0.6
+        assert context.confidence_factors["completeness"] == 0.75
+        assert result["confidence_factors"]["dispersion"] == 60.0
+        assert context.normalization_stats["period_usage"]["TTM"] == 3
+        assert context.sector_stats["sector_usage"]["Technology"] == 2
+        assert not hasattr(analyzer, "confidence_factors")
+
+        analyzer.calculate_all_scores(metrics)
+        assert analyzer.normalizer.get_normalization_stats()["total_normalized"] == 6
+        assert analyzer.sector_normalizer.get_stats()["sector_usage"]["Technology"] == 4
+
+    def test_shared_analyzer_is_thread_safe(self):
+        analyzer = EquityAnalyzer()
+        universe = _context_universe(300)
+        expected = [EquityAnalyzer().calculate_all_scores(metrics) for metrics in universe]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(analyzer.calculate_all_scores, universe))
+
+        assert results == expected
+        sequential = EquityAnalyzer()
+        for metrics in universe:
+            sequential.calculate_all_scores(metrics)
+        assert analyzer.normalizer.get_normalization_stats() == sequential.normalizer.get_normalization_stats()
+        assert analyzer.sector_normalizer.get_stats() == sequential.sector_normalizer.get_stats()
@@ -5,12 +5,18 @@ Tests for Flask API endpoints.
 Consolidates:
   - test_top_opportunities.py → /api/top-opportunities
   - test_visit_counter.py     → /api/visit-count, bot detection, visit increment
+  - financial_cache stale-while-revalidate and in-memory LRU
+  - quote-only refresh over cached fundamentals
 """
 
 import json
 import sqlite3
+import threading
 import unittest
+from datetime import datetime, timedelta
+from unittest import mock
 
+import app as app_module
 from app import app, DB_PATH, BOT_PATTERN
 
 
@@ -167,5 +173,174 @@ class TestVisitCounter(unittest.TestCase):
         self.assertGreaterEqual(after, before)
 
 
+# ---------------------------------------------------------------------------
+# financial_cache stale-while-revalidate
+# ---------------------------------------------------------------------------
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+    TICKER = "ZZSWR"
+
+    def _store(self, age_hours):
+        updated = datetime.now() - timedelta(hours=age_hours)
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO financial_cache (ticker, data, last_updated, source) VALUES (?, ?, ?, ?)",
+                (self.TICKER, json.dumps({"ticker": self.TICKER}), updated.isoformat(timespec="seconds"), "web"),
+            )
+        app_module.invalidate_memory_cache(self.TICKER)
+
+    def tearDown(self):
+        app_module.delete_cache_entry(self.TICKER)
+
+    def test_fresh_entry_is_not_stale(self):
+        self._store(age_hours=1)
+        entry = app_module.get_cached_data(self.TICKER, allow_stale=True)
+        self.assertFalse(entry["stale"])
+
+    def test_expired_entry_served_only_when_stale_allowed(self):
+        self._store(age_hours=app_module.CACHE_EXPIRATION_HOURS + 1)
+        self.assertIsNone(app_module.get_cached_data(self.TICKER))
+        entry = app_module.get_cached_data(self.TICKER, allow_stale=True)
+        self.assertTrue(entry["stale"])
+
+    def test_entry_past_hard_max_is_deleted(self):
+        self._store(age_hours=app_module.CACHE_STALE_MAX_HOURS + 1)
+        self.assertIsNone(app_module.get_cached_data(self.TICKER, allow_stale=True))
+        with sqlite3.connect(DB_PATH) as conn:
+            row = conn.execute("SELECT 1 FROM financial_cache WHERE ticker = ?", (self.TICKER,)).fetchone()
+        self.assertIsNone(row)
+
+    def test_background_refresh_is_deduplicated(self):
+        release = threading.Event()
+        done = threading.Event()
+
+        def fake_fetch(ticker):
+            release.wait(2)
+            done.set()
+            return {"ticker": ticker}
+
+        with mock.patch.object(app_module, "fetch_fresh_metrics", side_effect=fake_fetch) as fetch:
+            self.assertTrue(app_module.schedule_background_refresh(self.TICKER))
+            self.assertFalse(app_module.schedule_background_refresh(self.TICKER))
+            release.set()
+            self.assertTrue(done.wait(2))
+        fetch.assert_called_once_with(self.TICKER)
+
+
+class TestMetricsMemoryCache(unittest.TestCase):
+    TICKER = "ZZLRU"
+
+    def setUp(self):
+        app_module.metrics_memory_cache.clear()
+
+    def tearDown(self):
+        app_module.delete_cache_entry(self.TICKER)
+
+    def _metrics(self, price):
+        return {"ticker": self.TICKER, "current_price": price, "schema_version": app_module.METRIC_SCHEMA_VERSION}
+
+    def test_second_read_is_served_from_memory(self):
+        app_module.save_cache(self.TICKER, self._metrics(10.0))
+        hits = app_module.metrics_memory_cache.hits
+
+        first = app_module.get_cached_data(self.TICKER)
+        second = app_module.get_cached_data(self.TICKER)
+
+        self.assertEqual(first["metrics"], second["metrics"])
+        self.assertEqual(app_module.metrics_memory_cache.hits, hits + 1)
+        # Cada llamador recibe su propio dict de nivel superior
+        second["metrics"]["current_price"] = 0
+        self.assertEqual(app_module.get_cached_data(self.TICKER)["metrics"]["current_price"], 10.0)
+
+    def test_save_cache_invalidates_memory(self):
+        app_module.save_cache(self.TICKER, self._metrics(10.0))
+        app_module.get_cached_data(self.TICKER)
+        app_module.save_cache(self.TICKER, self._metrics(12.5))
+        self.assertEqual(app_module.get_cached_data(self.TICKER)["metrics"]["current_price"], 12.5)
+
+    def test_cache_clear_endpoint_invalidates_memory(self):
+        app_module.save_cache(self.TICKER, self._metrics(10.0))
+        app_module.get_cached_data(self.TICKER)
+
+        response = app.test_client().post("/cache/clear", json={"ticker": self.TICKER})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(app_module.get_cached_data(self.TICKER))
+
+
+# ---------------------------------------------------------------------------
+# Refresco de solo cotización
+# ---------------------------------------------------------------------------
+
+class TestQuoteRefresh(unittest.TestCase):
+    TICKER = "ZZQTE"
+
+    def tearDown(self):
+        app_module.delete_cache_entry(self.TICKER)
+
+    def _metrics(self, quote_age_minutes):
+        stamp = (datetime.utcnow() - timedelta(minutes=quote_age_minutes)).isoformat(timespec="seconds")
+        return {
+            "ticker": self.TICKER,
+            "current_price": 10.0,
+            "schema_version": app_module.METRIC_SCHEMA_VERSION,
+            "scraped_at": stamp,
+            "field_updated_at": {"quote": stamp, "fundamentals": stamp},
+        }
+
+    def test_quote_expiry_follows_quote_stamp(self):
+        self.assertFalse(app_module.quote_expired(self._metrics(1)))
+        self.assertTrue(app_module.quote_expired(self._metrics(app_module.QUOTE_TTL_MINUTES + 5)))
+        self.assertFalse(app_module.quote_expired({"ticker": self.TICKER}))
+
+    def test_refresh_keeps_last_updated(self):
+        app_module.save_cache(self.TICKER, self._metrics(app_module.QUOTE_TTL_MINUTES + 5))
+        cached = app_module.get_cached_data(self.TICKER)
+
+        def fake_refresh(metrics):
+            return {**metrics, "current_price": 11.0}
+
+        with mock.patch.object(app_module.data_agent, "refresh_quote", side_effect=fake_refresh):
+            refreshed = app_module.refresh_cached_quote(self.TICKER, cached)
+
+        self.assertEqual(refreshed["current_price"], 11.0)
+        entry = app_module.get_cached_data(self.TICKER)
+        self.assertEqual(entry["metrics"]["current_price"], 11.0)
+        self.assertEqual(entry["last_updated"], cached["last_updated"])
+
+    def test_no_quote_leaves_entry_untouched(self):
+        app_module.save_cache(self.TICKER, self._metrics(app_module.QUOTE_TTL_MINUTES + 5))
+        cached = app_module.get_cached_data(self.TICKER)
+        with mock.patch.object(app_module.data_agent, "refresh_quote", return_value=None):
+            self.assertIsNone(app_module.refresh_cached_quote(self.TICKER, cached))
+        self.assertEqual(app_module.get_cached_data(self.TICKER)["metrics"]["current_price"], 10.0)
+
+    def test_comparar_refreshes_expired_quotes(self):
+        tickers = [self.TICKER, "ZZQTF"]
+        for ticker in tickers:
+            metrics = self._metrics(app_module.QUOTE_TTL_MINUTES + 5)
+            metrics.update(ticker=ticker, asset_type="EQUITY", analysis_allowed=True, roe=20.0, pe_ratio=15.0)
+            app_module.save_cache(ticker, metrics)
+        self.addCleanup(app_module.delete_cache_entry, "ZZQTF")
+
+        def fake_refresh(metrics):
+            stamp = datetime.utcnow().isoformat(timespec="seconds")
+            return {**metrics, "current_price": 11.0, "field_updated_at": {**metrics["field_updated_at"], "quote": stamp}}
+
+        allowed = mock.Mock(**{"check_limit.return_value": {"allowed": True}})
+        with mock.patch.object(app_module, "get_limiter", return_value=allowed), \
+                mock.patch.object(app_module.data_agent, "refresh_quote", side_effect=fake_refresh) as refresh, \
+                mock.patch.object(app_module, "fetch_fresh_metrics") as fetch, \
+                mock.patch.object(app_module, "save_score") as save_score:
+            response = app.test_client().post("/api/comparar", json={"tickers": tickers})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(refresh.call_count, 2)
+        fetch.assert_not_called()
+        self.assertEqual([company["current_price"] for company in response.get_json()["companies"]], [11.0, 11.0])
+        # El score se guarda con las métricas de precio refrescado
+        self.assertEqual({call.args[2]["current_price"] for call in save_score.call_args_list}, {11.0})
+        self.assertEqual(app_module.get_cached_data("ZZQTF")["metrics"]["current_price"], 11.0)
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
\ No newline at end of file
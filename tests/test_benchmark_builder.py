@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Tests para los benchmarks sectoriales calculados desde financial_cache
+(benchmark_builder.BenchmarkBuilder): estadísticos robustos, fichero compacto,
+recarga atómica y percentiles empíricos.
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyzers import EquityAnalyzer
+from analyzers.sector_benchmarks import (
+    BenchmarkSet,
+    SectorNormalizer,
+    load_benchmark_set,
+    robust_stats,
+    save_benchmark_set,
+)
+from benchmark_builder import BenchmarkBuilder
+
+
+def _equity(ticker, sector, industry, roe, **extra):
+    metrics = {
+        "ticker": ticker,
+        "asset_type": "EQUITY",
+        "analysis_allowed": True,
+        "sector": sector,
+        "industry": industry,
+        "roe": roe,
+        "roic": roe * 0.8,
+        "operating_margin": roe + 5,
+        "net_margin": roe - 2,
+    }
+    metrics.update(extra)
+    return metrics
+
+
+@pytest.fixture
+def universe(store):
+    for index in range(6):
+        store.save_entry(f"SW{index}", _equity(f"SW{index}", "Technology - Software", "Software", 30.0 + index),
+                         "2025-01-01T00:00:00", "web")
+        store.save_entry(f"HW{index}", _equity(f"HW{index}", "Technology", "Hardware", 10.0 + index),
+                         "2025-01-01T00:00:00", "web")
+    # Período explícito: roe_ttm prevalece sobre roe
+    store.save_entry("UT0", _equity("UT0", "Utilities", None, 99.0, roe_ttm=8.0), "2025-01-01T00:00:00", "web")
+    store.save_entry("SPY", {"ticker": "SPY", "asset_type": "ETF", "analysis_allowed": True, "sector": "Technology"},
+                     "2025-01-01T00:00:00", "web")
+    store.db.execute_update(
+        "INSERT INTO financial_cache (ticker, data, last_updated, source) VALUES (?, ?, ?, ?)",
+        ("ZZZ", "{not json", "2025-01-01T00:00:00", "web"),
+    )
+    return store
+
+
+class TestRobustStats:
+    def test_winsorized_mean_resists_outliers(self):
+        values = np.array([10.0] * 20 + [11.0] * 19 + [10_000.0])
+        stats, _ = robust_stats(values)
+        assert stats["n"] == 40
+        assert stats["mean"] < 11.0
+        assert stats["std"] < 1.0
+
+    def test_small_samples_keep_every_value(self):
+        values = np.array([5.0, 1.0, 3.0, 2.0, 4.0])
+        _, quantiles = robust_stats(values)
+        assert quantiles.tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    def test_large_samples_are_capped(self):
+        values = np.random.default_rng(3).normal(size=5000)
+        _, quantiles = robust_stats(values)
+        assert len(quantiles) == 100
+        assert np.all(np.diff(quantiles) >= 0)
+
+
+class TestBenchmarkBuilder:
+    def test_builds_sector_and_industry_groups(self, universe):
+        groups, report = BenchmarkBuilder(universe, min_samples=5).build(batch_size=4)
+
+        assert report["scanned"] == 15
+        assert report["equities"] == 13
+        assert (report["skipped"], report["corrupt"]) == (1, 1)
+        # Utilities tiene una sola acción: por debajo del mínimo
+        assert ("sector", "Utilities", "roe") not in groups
+        assert report["sectors"] == 1
+        assert report["industries"] == 2
+
+        stats, quantiles = groups[("sector", "Technology", "roe")]
+        assert stats["n"] == 12
+        assert len(quantiles) == 12
+        industry_stats, _ = groups[("industry", "Software", "roe")]
+        assert industry_stats["mean"] == pytest.approx(32.5)
+
+    def test_period_hierarchy_is_applied(self, universe):
+        groups, _ = BenchmarkBuilder(universe, min_samples=2).build()
+        stats, _ = groups[("sector", "Technology", "roe")]
+        assert stats["n"] == 12
+        universe.save_entry("UT1", _equity("UT1", "Utilities", None, 10.0), "2025-01-01T00:00:00", "web")
+        groups, _ = BenchmarkBuilder(universe, min_samples=2).build()
+        assert groups[("sector", "Utilities", "roe")][0]["mean"] == pytest.approx(9.0)
+
+    def test_run_writes_loadable_file(self, universe, tmp_path):
+        path = tmp_path / "benchmarks" / "sector_benchmarks.npz"
+        report = BenchmarkBuilder(universe, min_samples=5).run(path)
+
+        assert report["version"].startswith("data-")
+        assert list(path.parent.iterdir()) == [path]
+        loaded = load_benchmark_set(path)
+        assert loaded.version == report["version"]
+        assert loaded.industries["Software"]["roe"]["n"] == 6
+        # Sectores sin datos suficientes conservan la tabla estática
+        assert loaded.sectors["Utilities"] == BenchmarkSet.static().sectors["Utilities"]
+
+    def test_empty_universe_writes_nothing(self, store, tmp_path):
+        path = tmp_path / "sector_benchmarks.npz"
+        report = BenchmarkBuilder(store).run(path)
+        assert report["version"] is None
+        assert not path.exists()
+
+
+class TestBenchmarkFile:
+    def test_percentiles_use_empirical_quantiles(self, tmp_path):
+        values = np.arange(1.0, 11.0)
+        path = tmp_path / "b.npz"
+        save_benchmark_set({("sector", "Technology", "roe"): robust_stats(values)}, path)
+        normalizer = SectorNormalizer(load_benchmark_set(path))
+
+        result = normalizer.normalize_metric(7.0, "roe", "Technology")
+        assert result["percentile"] == 70.0
+        assert result["benchmark_group"] == "sector:Technology"
+        assert normalizer.normalize_metric(0.5, "roe", "Technology")["percentile"] == 0.0
+        # Métrica sin cuantiles (tabla estática): CDF normal del z-score
+        assert normalizer.normalize_metric(0.4 + 0.3, "debt_to_equity", "Technology")["percentile"] == 84.1
+
+    def test_static_percentile_is_normal_cdf(self):
+        result = SectorNormalizer().normalize_metric(35.0, "roe", "Technology")
+        assert result["percentile"] == 93.7
+
+    def test_same_content_same_version(self, tmp_path):
+        groups = {("industry", "Software", "roe"): robust_stats(np.arange(20.0))}
+        assert save_benchmark_set(groups, tmp_path / "a.npz") == save_benchmark_set(groups, tmp_path / "b.npz", "x")
+
+
+class TestReload:
+    def test_reload_if_changed(self, tmp_path):
+        path = tmp_path / "sector_benchmarks.npz"
+        normalizer = SectorNormalizer()
+        static_version = normalizer.benchmark_set.version
+
+        assert not normalizer.reload_if_changed(path)
+        assert normalizer.benchmark_set.version == static_version
+
+        save_benchmark_set({("sector", "Technology", "roe"): robust_stats(np.arange(30.0))}, path)
+        assert normalizer.reload_if_changed(path)
+        first = normalizer.benchmark_set
+        assert first.version.startswith("data-")
+        assert not normalizer.reload_if_changed(path)
+
+        save_benchmark_set({("sector", "Technology", "roe"): robust_stats(np.arange(40.0))}, path)
+        # Dentro del intervalo mínimo no se vuelve a mirar el fichero
+        assert not normalizer.reload_if_changed(path, min_interval=3600)
+        assert normalizer.reload_if_changed(path)
+        assert normalizer.benchmark_set.version != first.version
+
+    def test_corrupt_file_keeps_current_set(self, tmp_path):
+        path = tmp_path / "sector_benchmarks.npz"
+        save_benchmark_set({("sector", "Technology", "roe"): robust_stats(np.arange(30.0))}, path)
+        normalizer = SectorNormalizer()
+        normalizer.reload_if_changed(path)
+        version = normalizer.benchmark_set.version
+
+        path.write_bytes(b"not a zip file")
+        assert not normalizer.reload_if_changed(path)
+        assert normalizer.benchmark_set.version == version
+
+
+def _industry_universe(size, seed=5):
+    rng = random.Random(seed)
+    sectors = ["Technology", "Technology - Software", "Utilities", "Martian Mining", None]
+    industries = ["Software", "Hardware", "Utilities - Regulated", "", None]
+    universe = []
+    for index in range(size):
+        metrics = {"ticker": f"T{index}", "sector": rng.choice(sectors), "industry": rng.choice(industries)}
+        for key in ("roe", "roic", "operating_margin", "net_margin", "pe_ratio", "debt_to_equity"):
+            if rng.random() < 0.8:
+                metrics[key] = round(rng.uniform(-5, 45), rng.choice([1, 3]))
+        universe.append(metrics)
+    return universe
+
+
+class TestAnalyzerWithBenchmarks:
+    @pytest.fixture
+    def analyzer(self, tmp_path):
+        rng = np.random.default_rng(9)
+        groups = {
+            ("sector", "Technology", "roe"): robust_stats(rng.normal(20, 8, 200)),
+            ("sector", "Martian Mining", "roe"): robust_stats(rng.normal(5, 2, 50)),
+            ("industry", "Software", "roe"): robust_stats(rng.normal(35, 5, 80)),
+            ("industry", "Software", "net_margin"): robust_stats(rng.normal(25, 4, 80)),
+            ("industry", "Hardware", "roic"): robust_stats(rng.normal(12, 3, 40)),
+        }
+        path = tmp_path / "sector_benchmarks.npz"
+        save_benchmark_set(groups, path)
+        analyzer = EquityAnalyzer()
+        analyzer.sector_normalizer.reload_if_changed(path)
+        return analyzer
+
+    def test_engine_version_follows_benchmarks(self, analyzer):
+        assert analyzer.engine_version() != EquityAnalyzer().engine_version()
+
+    def test_industry_benchmark_takes_precedence(self, analyzer):
+        base = {"sector": "Technology", "roe": 35.0}
+        software = analyzer.calculate_all_scores(dict(base, industry="Software"))["breakdown"]["quality"]
+        generic = analyzer.calculate_all_scores(base)["breakdown"]["quality"]
+
+        assert software["industry"] == "Software"
+        assert software["score"] < generic["score"]
+
+    def test_data_only_sector_is_sector_relative(self, analyzer):
+        quality = analyzer.calculate_all_scores({"sector": "Martian Mining", "roe": 9.0, "roic": 4.0})["breakdown"]["quality"]
+        assert quality["method"] == "sector_relative"
+        assert any("sin benchmark" in used for used in quality["metrics_used"])
+
+    def test_batch_matches_scalar(self, analyzer):
+        universe = _industry_universe(400)
+        batch = analyzer.score_batch(pd.DataFrame(universe))
+        for position, metrics in enumerate(universe):
+            scalar = analyzer.calculate_all_scores(metrics)
+            assert batch.iloc[position]["quality_score"] == scalar["quality_score"], metrics
+            assert batch.iloc[position]["investment_score"] == scalar["investment_score"], metrics
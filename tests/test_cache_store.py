@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests para cache_store y UsageLimiter sobre DatabaseManager (SQLite).
+"""
+
+import json
+import sqlite3
+
+import pytest
+
+from cache_store import CacheStore, decode_payload
+from usage_limiter import UsageLimiter
+
+
+class TestDecodePayload:
+    def test_text_payload(self):
+        payload = json.dumps({"price": 10})
+        assert decode_payload(payload) == ({"price": 10}, len(payload))
+
+    def test_jsonb_payload_already_decoded(self):
+        metrics, size = decode_payload({"price": 10})
+        assert metrics == {"price": 10}
+        assert size > 0
+
+    def test_invalid_payload(self):
+        assert decode_payload("{not json")[0] is None
+        assert decode_payload(None) == (None, 0)
+
+
+class TestCacheStore:
+    def test_refresh_candidates(self, store):
+        store.save_entry("AAPL", {}, "2024-01-01T00:00:00", "fmp")
+        store.save_score("AAPL", 80.0, "BUY", {}, "2024-01-01T00:00:00")
+        store.save_score("KO", 60.0, "HOLD", {}, "2024-01-01T00:00:00")
+
+        assert sorted(store.refresh_candidates(), key=str) == sorted(
+            [("AAPL", "2024-01-01T00:00:00"), ("KO", None)], key=str
+        )
+
+    def test_jsonb_ignored_on_sqlite(self, db):
+        assert CacheStore(db, use_jsonb=True).use_jsonb is False
+
+    def test_save_entry_upserts(self, store):
+        store.save_entry("AAPL", {"price": 1}, "2024-01-01T00:00:00", "fmp")
+        store.save_entry("AAPL", {"price": 2}, "2024-01-02T00:00:00", "yahoo")
+
+        payload, last_updated, source = store.get_entry("AAPL")
+        assert json.loads(payload) == {"price": 2}
+        assert last_updated == "2024-01-02T00:00:00"
+        assert source == "yahoo"
+
+    def test_missing_entry(self, store):
+        assert store.get_entry("MSFT") is None
+
+    def test_purge_and_delete(self, store):
+        store.save_entry("OLD", {}, "2020-01-01T00:00:00", "fmp")
+        store.save_entry("NEW", {}, "2030-01-01T00:00:00", "fmp")
+
+        assert store.purge_older_than("2025-01-01T00:00:00") == 1
+        assert store.get_entry("OLD") is None
+        assert store.delete_entry("NEW") == 1
+        assert store.get_entry("NEW") is None
+
+    def test_scores_with_financials(self, store):
+        store.save_entry("AAPL", {"price": 1}, "2024-01-01T00:00:00", "fmp")
+        store.save_score("AAPL", 80.0, "BUY", {"quality": 30}, "2024-01-01T00:00:00")
+        store.save_score("AAPL", 75.0, "BUY", {"quality": 25}, "2024-01-02T00:00:00")
+        store.save_score("MSFT", 40.0, "HOLD", {}, "2024-01-01T00:00:00")
+
+        rows = store.scores_with_financials(50)
+        assert [row[0] for row in rows] == ["AAPL"]
+        assert rows[0][1] == 75.0
+        assert decode_payload(rows[0][5])[0] == {"price": 1}
+
+        history = store.score_history("AAPL")
+        assert len(history) == 1
+        assert json.loads(history[0][2]) == {"quality": 25}
+
+    def test_clear_single_ticker(self, store):
+        store.save_entry("AAPL", {}, "2024-01-01T00:00:00", "fmp")
+        store.save_entry("MSFT", {}, "2024-01-01T00:00:00", "fmp")
+        store.save_score("AAPL", 80.0, "BUY", {}, "2024-01-01T00:00:00")
+
+        store.clear("AAPL")
+        assert store.get_entry("AAPL") is None
+        assert store.score_history("AAPL") == []
+        assert store.get_entry("MSFT") is not None
+
+
+class TestUsageLimiterOnDatabaseManager:
+    @pytest.fixture
+    def limiter(self, tmp_path):
+        limiter = UsageLimiter(db_path=str(tmp_path / "rvc.db"))
+        yield limiter
+        limiter.db.pool.close_all()
+
+    def test_tracks_usage(self, limiter):
+        limiter.track_usage("1.2.3.4", "/analyze")
+        limiter.track_usage("1.2.3.4", "/analyze")
+        limiter.track_usage("1.2.3.4", "/health")
+
+        assert limiter.get_usage_count("1.2.3.4") == 2
+        assert limiter.get_usage_stats()["total_queries"] == 3
+
+    def test_license_lifecycle(self, limiter):
+        key = limiter.create_license("user@example.com", duration_days=5)
+        assert limiter.validate_license(key)["valid"] is True
+
+        renewal = limiter.renew_license("user@example.com", duration_days=10)
+        assert renewal["success"] is True
+        assert renewal["license_key"] == key
+        assert renewal["renewal_count"] == 1
+        assert limiter.validate_license(key)["days_left"] >= 14
+
+    def test_ticker_popularity(self, limiter):
+        limiter.track_usage("1.2.3.4", "/analyze", tickers="AAPL")
+        limiter.track_usage("5.6.7.8", "/analyze", tickers="AAPL")
+        limiter.track_usage("1.2.3.4", "/api/comparar", tickers=["AAPL", "MSFT"])
+        limiter.track_usage("1.2.3.4", "/health")
+
+        assert limiter.get_ticker_popularity() == {"AAPL": 3, "MSFT": 1}
+
+    def test_adds_ticker_column_to_existing_table(self, tmp_path):
+        path = tmp_path / "old.db"
+        conn = sqlite3.connect(path)
+        conn.execute("""
+            CREATE TABLE usage_tracking (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                identifier TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                user_agent TEXT,
+                response_status INTEGER
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+        limiter = UsageLimiter(db_path=str(path))
+        limiter.track_usage("1.2.3.4", "/analyze", tickers="KO")
+        assert limiter.get_ticker_popularity() == {"KO": 1}
+        limiter.db.pool.close_all()
+
+    def test_renew_unknown_license(self, limiter):
+        assert limiter.renew_license("RVC-PRO-NOPE")["action"] == "create_new"
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tests para cache_warmer: orden de refresco, presupuesto por proveedor y lock.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from cache_warmer import CacheWarmer, ProviderBudget, parse_budget
+
+
+def _hours_ago(hours):
+    return (datetime.now() - timedelta(hours=hours)).isoformat(timespec="seconds")
+
+
+class FakeStore:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def refresh_candidates(self):
+        return list(self.rows)
+
+
+class FakeSources:
+    """fetch/track_calls de prueba: cada fetch consulta los proveedores indicados."""
+
+    def __init__(self, providers=("fmp",), failing=()):
+        self.providers = providers
+        self.failing = set(failing)
+        self.fetched = []
+        self._calls = None
+
+    @contextmanager
+    def track_calls(self):
+        self._calls = Counter()
+        try:
+            yield self._calls
+        finally:
+            self._calls = None
+
+    def fetch(self, ticker):
+        self.fetched.append(ticker)
+        if self._calls is not None:
+            self._calls.update(self.providers)
+        if ticker in self.failing:
+            return None
+        return {"ticker": ticker}
+
+
+@pytest.fixture
+def store():
+    return FakeStore([
+        ("AAPL", _hours_ago(30)),
+        ("MSFT", _hours_ago(48)),
+        ("NVDA", _hours_ago(2)),   # reciente: no se refresca
+        ("KO", None),              # solo con score guardado
+    ])
+
+
+def _warmer(store, sources, rescored=None, **kwargs):
+    return CacheWarmer(
+        store,
+        fetch=sources.fetch,
+        rescore=lambda ticker, metrics: rescored.append(ticker) if rescored is not None else None,
+        track_calls=sources.track_calls,
+        refresh_after_hours=18,
+        **kwargs,
+    )
+
+
+class TestParseBudget:
+    def test_parses_pairs(self):
+        assert parse_budget("fmp=200, alpha_vantage=20") == {"fmp": 200, "alpha_vantage": 20}
+
+    def test_empty(self):
+        assert parse_budget("") == {}
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            parse_budget("fmp")
+
+
+class TestProviderBudget:
+    def test_exhausted_and_remaining(self):
+        budget = ProviderBudget({"fmp": 2, "alpha_vantage": 5})
+        budget.charge({"fmp": 2, "alpha_vantage": 1, "finviz": 3})
+        assert budget.exhausted() == ["fmp"]
+        assert budget.remaining() == {"fmp": 0, "alpha_vantage": 4}
+
+
+class TestPlan:
+    def test_popular_first_then_stalest(self, store):
+        warmer = _warmer(store, FakeSources(), popularity=lambda days: {"AAPL": 5})
+        assert [c.ticker for c in warmer.plan()] == ["AAPL", "KO", "MSFT"]
+
+    def test_limit(self, store):
+        warmer = _warmer(store, FakeSources())
+        assert [c.ticker for c in warmer.plan(limit=1)] == ["KO"]
+
+    def test_popularity_failure_falls_back_to_staleness(self, store):
+        def broken(days):
+            raise RuntimeError("db down")
+
+        warmer = _warmer(store, FakeSources(), popularity=broken)
+        assert [c.ticker for c in warmer.plan()] == ["KO", "MSFT", "AAPL"]
+
+
+class TestRun:
+    def test_refreshes_and_rescores(self, store):
+        sources = FakeSources(failing={"MSFT"})
+        rescored = []
+        report = _warmer(store, sources, rescored, budget={}).run()
+
+        assert sources.fetched == ["KO", "MSFT", "AAPL"]
+        assert rescored == ["KO", "AAPL"]
+        assert report["refreshed"] == ["KO", "AAPL"]
+        assert report["failed"] == ["MSFT"]
+        assert report["provider_calls"] == {"fmp": 3}
+
+    def test_stops_when_budget_exhausted(self, store):
+        sources = FakeSources(providers=("fmp", "alpha_vantage"))
+        report = _warmer(store, sources, budget={"alpha_vantage": 2}).run()
+
+        assert sources.fetched == ["KO", "MSFT"]
+        assert report["exhausted"] == ["alpha_vantage"]
+        assert report["skipped_budget"] == 1
+
+    def test_prefetches_candidates_in_one_batch(self, store):
+        sources = FakeSources()
+        events = []
+
+        @contextmanager
+        def prefetch(tickers):
+            events.append(("enter", tuple(tickers)))
+            yield
+            events.append(("exit", tuple(sources.fetched)))
+
+        _warmer(store, sources, budget={}, prefetch=prefetch).run()
+
+        assert events == [("enter", ("KO", "MSFT", "AAPL")), ("exit", ("KO", "MSFT", "AAPL"))]
+
+    def test_prefetch_requests_are_charged(self, store):
+        sources = FakeSources()
+
+        @contextmanager
+        def prefetch(tickers):
+            # Perfil y cotización por lotes: dos peticiones a FMP
+            sources._calls.update({"fmp": 2})
+            yield
+
+        report = _warmer(store, sources, budget={"fmp": 4}, prefetch=prefetch).run()
+
+        assert sources.fetched == ["KO", "MSFT"]
+        assert report["provider_calls"] == {"fmp": 4}
+        assert report["exhausted"] == ["fmp"]
+
+    def test_dry_run_does_not_fetch(self, store):
+        sources = FakeSources()
+        report = _warmer(store, sources).run(dry_run=True)
+        assert sources.fetched == []
+        assert [item["ticker"] for item in report["plan"]] == ["KO", "MSFT", "AAPL"]
+
+    def test_skips_when_lock_held(self, store):
+        class HeldLock:
+            def try_acquire(self, key):
+                return False
+
+        sources = FakeSources()
+        report = _warmer(store, sources, lock=HeldLock()).run()
+        assert report == {"skipped": "locked"}
+        assert sources.fetched == []
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests para services.circuit_breaker: transiciones de estado y health score.
+"""
+
+import pytest
+
+from services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    capture_signals,
+    note_request_failure,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _breaker(clock, **kwargs):
+    params = dict(failure_threshold=3, window=10, min_calls=5, min_success_rate=0.5, open_seconds=10, clock=clock)
+    params.update(kwargs)
+    return CircuitBreaker("yahoo", **params)
+
+
+def _fail(breaker, times=1):
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record(False, latency=0.1)
+
+
+class TestStateTransitions:
+    def test_opens_after_consecutive_failures(self, clock):
+        breaker = _breaker(clock)
+        _fail(breaker, 3)
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.snapshot()["rejected"] == 1
+
+    def test_success_resets_consecutive_failures(self, clock):
+        breaker = _breaker(clock, min_calls=100)
+        _fail(breaker, 2)
+        breaker.allow()
+        breaker.record(True)
+        _fail(breaker, 2)
+        assert breaker.state == CLOSED
+
+    def test_opens_on_low_success_rate(self, clock):
+        breaker = _breaker(clock, failure_threshold=100)
+        for ok in [True, False, False, True, False]:
+            breaker.allow()
+            breaker.record(ok)
+        assert breaker.state == OPEN
+
+    def test_half_open_probe_closes_on_success(self, clock):
+        breaker = _breaker(clock)
+        _fail(breaker, 3)
+        clock.now = 11
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        # Solo una prueba simultánea
+        assert not breaker.allow()
+        breaker.record(True)
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_half_open_failure_reopens_with_backoff(self, clock):
+        breaker = _breaker(clock, max_open_seconds=15)
+        _fail(breaker, 3)
+        clock.now = 11
+        _fail(breaker)
+        assert breaker.state == OPEN
+        assert breaker.open_seconds == 15
+        clock.now = 25
+        assert not breaker.allow()
+        clock.now = 27
+        assert breaker.allow()
+
+    def test_no_verdict_releases_probe(self, clock):
+        breaker = _breaker(clock)
+        _fail(breaker, 3)
+        clock.now = 11
+        assert breaker.allow()
+        breaker.record(None)
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+
+    def test_suspicious_success_counts_as_failure(self, clock):
+        breaker = _breaker(clock)
+        for _ in range(3):
+            breaker.allow()
+            breaker.record(True, suspicious=True)
+        assert breaker.state == OPEN
+        assert breaker.snapshot()["suspicious"] == 3
+
+
+class TestHealthScore:
+    def test_perfect_source(self, clock):
+        breaker = _breaker(clock)
+        breaker.allow()
+        breaker.record(True, latency=0.2)
+        assert breaker.health_score() == 100.0
+
+    def test_penalises_failures_and_latency(self, clock):
+        breaker = _breaker(clock, failure_threshold=100, min_calls=100)
+        for ok in [True, False]:
+            breaker.allow()
+            breaker.record(ok, latency=6.0)
+        assert breaker.health_score() == pytest.approx(25.0)
+
+
+class TestSignals:
+    def test_signals_captured_only_inside_block(self):
+        note_request_failure()
+        with capture_signals() as signals:
+            note_request_failure()
+            note_request_failure("suspicious")
+        assert signals == {"failure": 1, "suspicious": 1}
+
+    def test_registry_snapshot(self):
+        registry = CircuitBreakerRegistry()
+        assert registry.get("fmp") is registry.get("fmp")
+        assert list(registry.snapshot()) == ["fmp"]
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests para la cache persistente de clasificaciones (ClassificationStore):
+volcado diferido y temporizado, escritura atómica y en orden, e importación del JSON antiguo.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import classification_store as classification_store_module
+from classification_store import ClassificationStore
+
+ENTRY = {"asset_type": "ETF", "type_label": "ETF", "source": "fmp", "classified_at": 1.0}
+
+
+def _rows(path):
+    with sqlite3.connect(str(path)) as conn:
+        return {ticker: json.loads(data) for ticker, data in conn.execute("SELECT ticker, data FROM asset_classifications")}
+
+
+class TestClassificationStore:
+    def test_writes_are_debounced_until_flush(self, tmp_path):
+        store = ClassificationStore(tmp_path / "classes.db", flush_seconds=3600)
+        store["SPY"] = ENTRY
+        store["QQQ"] = ENTRY
+
+        assert store["SPY"] == ENTRY
+        assert store.pending == 2
+        assert _rows(tmp_path / "classes.db") == {}
+
+        assert store.flush() == 2
+        assert store.flushes == 1
+        assert set(_rows(tmp_path / "classes.db")) == {"SPY", "QQQ"}
+
+    def test_unchanged_value_is_not_rewritten(self, tmp_path):
+        store = ClassificationStore(tmp_path / "classes.db", flush_seconds=3600)
+        store["SPY"] = ENTRY
+        store.flush()
+        store["SPY"] = dict(ENTRY)
+        assert store.pending == 0
+        assert store.flush() == 0
+
+    def test_flushes_when_interval_elapsed(self, tmp_path):
+        store = ClassificationStore(tmp_path / "classes.db", flush_seconds=0)
+        store["SPY"] = ENTRY
+        assert store.pending == 0
+        assert _rows(tmp_path / "classes.db") == {"SPY": ENTRY}
+
+    def test_reload_and_delete(self, tmp_path):
+        store = ClassificationStore(tmp_path / "classes.db", flush_seconds=3600)
+        store["SPY"] = ENTRY
+        store["AAPL"] = dict(ENTRY, asset_type="EQUITY")
+        store.close()
+
+        reopened = ClassificationStore(tmp_path / "classes.db", flush_seconds=3600)
+        assert reopened["AAPL"]["asset_type"] == "EQUITY"
+        del reopened["SPY"]
+        reopened.flush()
+        assert set(_rows(tmp_path / "classes.db")) == {"AAPL"}
+
+    def test_imports_legacy_json_once(self, tmp_path):
+        legacy = tmp_path / "asset_classifications.json"
+        legacy.write_text(json.dumps({"SPY": ENTRY, "BROKEN": "not-a-dict"}), encoding="utf-8")
+
+        store = ClassificationStore(tmp_path / "classes.db", legacy_json=legacy)
+        assert dict(store) == {"SPY": ENTRY}
+        assert store.pending == 0
+
+        # Con la tabla ya poblada el JSON no se vuelve a leer
+        legacy.write_text(json.dumps({"QQQ": ENTRY}), encoding="utf-8")
+        assert set(ClassificationStore(tmp_path / "classes.db", legacy_json=legacy)) == {"SPY"}
+
+    def test_concurrent_writers(self, tmp_path):
+        store = ClassificationStore(tmp_path / "classes.db", flush_seconds=0.001)
+
+        def writer(offset):
+            for index in range(50):
+                store[f"T{offset}_{index}"] = dict(ENTRY, classified_at=float(index))
+
+        threads = [threading.Thread(target=writer, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.flush()
+
+        assert len(_rows(tmp_path / "classes.db")) == 400
+
+    def test_quiet_store_flushes_after_interval(self, tmp_path):
+        store = ClassificationStore(tmp_path / "classes.db", flush_seconds=0.05)
+        store["SPY"] = ENTRY
+        assert store.pending == 1
+
+        deadline = time.monotonic() + 2
+        while store.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert _rows(tmp_path / "classes.db") == {"SPY": ENTRY}
+        store.close()
+
+    def test_overlapping_flushes_keep_order(self, tmp_path, monkeypatch):
+        store = ClassificationStore(tmp_path / "classes.db", flush_seconds=3600)
+        first_taken, release = threading.Event(), threading.Event()
+
+        def dumps(entry, **kwargs):
+            # El primer volcado se detiene tras tomar su lote {"v": 1}
+            if entry.get("v") == 1 and not first_taken.is_set():
+                first_taken.set()
+                release.wait(2)
+            return json.dumps(entry, **kwargs)
+
+        monkeypatch.setattr(classification_store_module, "json", SimpleNamespace(dumps=dumps, loads=json.loads))
+        store["SPY"] = {"v": 1}
+        first = threading.Thread(target=store.flush)
+        first.start()
+        assert first_taken.wait(2)
+
+        store["SPY"] = {"v": 2}
+        second = threading.Thread(target=store.flush)
+        second.start()
+        time.sleep(0.05)
+        release.set()
+        first.join()
+        second.join()
+
+        assert store["SPY"] == {"v": 2}
+        assert _rows(tmp_path / "classes.db") == {"SPY": {"v": 2}}
+        store.close()
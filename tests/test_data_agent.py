@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+Tests for DataAgent fetch orchestration (no network: every source is stubbed).
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+import data_agent as data_agent_module
+from data_agent import SourceResult
+from services import (
+    AlphaVantageClient,
+    AsyncAlphaVantageClient,
+    AsyncFMPClient,
+    AsyncTwelveDataClient,
+    FMPClient,
+    TwelveDataClient,
+)
+from services import circuit_breaker as circuit_breaker_module
+from services import rate_limit as rate_limit_module
+from services import source_planner as source_planner_module
+from services.circuit_breaker import OPEN, CircuitBreakerRegistry
+from services.http_pool import get_shared_session
+from services.rate_limit import BucketSpec, MemoryBucketStore, RateLimiter
+from services.source_planner import SourcePlanner
+
+
+FMP_DATA = {
+    "company_name": "Test Corp",
+    "sector": "Technology",
+    "current_price": 100.0,
+    "market_cap": 5e11,
+    "pe_ratio": 20.0,
+    "roe": 25.0,
+}
+FINVIZ_DATA = {
+    "current_price": 101.0,
+    "pe_ratio": 22.0,
+    "peg_ratio": 1.5,
+    "price_to_book": 4.0,
+    "roic": 18.0,
+    "operating_margin": 30.0,
+    "net_margin": 22.0,
+    "debt_to_equity": 0.4,
+    "current_ratio": 1.8,
+    "quick_ratio": 1.4,
+    "revenue_growth_qoq": 12.0,
+    "earnings_growth_this_y": 15.0,
+}
+
+
+def _stub(name, source, data, delay=0.0, calls=None):
+    def fetcher(self, ticker):
+        if calls is not None:
+            calls.append(name)
+        if delay:
+            threading.Event().wait(delay)
+        self._merge_provenance({key: f"{source}:stub" for key in data})
+        return SourceResult(data=dict(data), source=source, coverage=len(data))
+
+    fetcher.__name__ = name
+    return fetcher
+
+
+def _async_stub(name, source, data, delay=0.0):
+    async def fetcher(self, ticker):
+        if delay:
+            await asyncio.sleep(delay)
+        self._merge_provenance({key: f"{source}:stub" for key in data})
+        return SourceResult(data=dict(data), source=source, coverage=len(data))
+
+    fetcher.__name__ = name
+    return fetcher
+
+
+def _empty(name, calls=None, delay=0.0):
+    def fetcher(self, ticker):
+        if calls is not None:
+            calls.append(name)
+        if delay:
+            threading.Event().wait(delay)
+        return None
+
+    fetcher.__name__ = name
+    return fetcher
+
+
+def _install(monkeypatch, agent, **fetchers):
+    for attr, fn in fetchers.items():
+        monkeypatch.setattr(agent, attr, fn.__get__(agent))
+
+
+def _comparable(metrics):
+    return {k: v for k, v in metrics.items() if k not in ("scraped_at", "field_updated_at")}
+
+
+class TestConcurrentFetch:
+    def test_concurrent_matches_sequential(self, monkeypatch, agent):
+        _install(
+            monkeypatch,
+            agent,
+            _fetch_fmp=_stub("_fetch_fmp", "fmp", FMP_DATA, delay=0.05),
+            _fetch_alpha_vantage=_empty("_fetch_alpha_vantage"),
+            _fetch_twelve_data=_empty("_fetch_twelve_data"),
+            _fetch_finviz=_stub("_fetch_finviz", "finviz", FINVIZ_DATA),
+            _fetch_yahoo=_empty("_fetch_yahoo"),
+            _fetch_marketwatch=_empty("_fetch_marketwatch"),
+        )
+        sequential = agent.fetch_financial_data("test", mode="sequential")
+        concurrent = agent.fetch_financial_data("test", mode="concurrent")
+
+        assert _comparable(concurrent) == _comparable(sequential)
+        # FMP tiene prioridad para el precio aunque Finviz responda antes
+        assert concurrent["current_price"] == 100.0
+        assert concurrent["provenance"]["current_price"] == "fmp:stub"
+
+    def test_sources_run_in_parallel(self, monkeypatch, agent):
+        barrier = threading.Barrier(2, timeout=2)
+
+        def waiting(name, source, data):
+            def fetcher(self, ticker):
+                barrier.wait()
+                return SourceResult(data=dict(data), source=source, coverage=len(data))
+
+            fetcher.__name__ = name
+            return fetcher
+
+        _install(
+            monkeypatch,
+            agent,
+            _fetch_fmp=waiting("_fetch_fmp", "fmp", FMP_DATA),
+            _fetch_alpha_vantage=_empty("_fetch_alpha_vantage"),
+            _fetch_twelve_data=_empty("_fetch_twelve_data"),
+            _fetch_finviz=waiting("_fetch_finviz", "finviz", FINVIZ_DATA),
+            _fetch_yahoo=_empty("_fetch_yahoo"),
+            _fetch_marketwatch=_empty("_fetch_marketwatch"),
+        )
+        # Con la cascada secuencial la barrera nunca se completaría
+        metrics = agent.fetch_financial_data("TEST", mode="concurrent")
+        assert metrics["pe_ratio"] is not None
+
+    def test_early_exit_skips_queued_sources(self, monkeypatch, agent):
+        calls = []
+        monkeypatch.setattr(data_agent_module, "FETCH_MAX_WORKERS", 1)
+        complete = {**FMP_DATA, **{k: v for k, v in FINVIZ_DATA.items() if k != "current_price"}}
+        _install(
+            monkeypatch,
+            agent,
+            _fetch_fmp=_stub("_fetch_fmp", "fmp", complete, calls=calls),
+            _fetch_alpha_vantage=_empty("_fetch_alpha_vantage", calls=calls, delay=0.3),
+            _fetch_twelve_data=_empty("_fetch_twelve_data", calls=calls),
+            _fetch_finviz=_empty("_fetch_finviz", calls=calls),
+            _fetch_yahoo=_empty("_fetch_yahoo", calls=calls),
+            _fetch_marketwatch=_empty("_fetch_marketwatch", calls=calls),
+        )
+        metrics = agent.fetch_financial_data("TEST", mode="concurrent")
+
+        assert metrics["primary_source"] == "fmp"
+        assert "_fetch_marketwatch" not in calls
+
+
+class TestSourceCallTracking:
+    def _install_sources(self, monkeypatch, agent):
+        complete = {**FMP_DATA, **{k: v for k, v in FINVIZ_DATA.items() if k != "current_price"}}
+        _install(
+            monkeypatch,
+            agent,
+            _fetch_fmp=_stub("_fetch_fmp", "fmp", complete),
+            _fetch_alpha_vantage=_empty("_fetch_alpha_vantage"),
+            _fetch_twelve_data=_empty("_fetch_twelve_data"),
+            _fetch_finviz=_empty("_fetch_finviz"),
+            _fetch_yahoo=_empty("_fetch_yahoo"),
+            _fetch_marketwatch=_empty("_fetch_marketwatch"),
+        )
+
+    def test_sequential_counts_only_queried_sources(self, monkeypatch, agent):
+        self._install_sources(monkeypatch, agent)
+        with agent.track_source_calls() as calls:
+            agent.fetch_financial_data("TEST", mode="sequential")
+        assert calls == {"fmp": 1}
+
+    def test_concurrent_counts_from_worker_threads(self, monkeypatch, agent):
+        self._install_sources(monkeypatch, agent)
+        with agent.track_source_calls() as calls:
+            agent.fetch_financial_data("TEST", mode="concurrent")
+        assert calls["fmp"] == 1
+        assert sum(calls.values()) >= 1
+
+    def test_no_tracking_outside_block(self, monkeypatch, agent):
+        self._install_sources(monkeypatch, agent)
+        with agent.track_source_calls() as calls:
+            pass
+        agent.fetch_financial_data("TEST", mode="sequential")
+        assert calls == {}
+
+
+class TestRateLimitedSources:
+    def _install_sources(self, monkeypatch, agent, calls):
+        _install(
+            monkeypatch,
+            agent,
+            _fetch_fmp=_stub("_fetch_fmp", "fmp", FMP_DATA, calls=calls),
+            _fetch_alpha_vantage=_empty("_fetch_alpha_vantage", calls=calls),
+            _fetch_twelve_data=_empty("_fetch_twelve_data", calls=calls),
+            _fetch_finviz=_stub("_fetch_finviz", "finviz", FINVIZ_DATA, calls=calls),
+            _fetch_yahoo=_empty("_fetch_yahoo", calls=calls),
+            _fetch_marketwatch=_empty("_fetch_marketwatch", calls=calls),
+        )
+
+    @pytest.mark.parametrize("mode", ["sequential", "concurrent", "async"])
+    def test_exhausted_provider_is_skipped(self, monkeypatch, agent, mode):
+        limiter = RateLimiter(MemoryBucketStore(), limits={"fmp": BucketSpec.parse("3/86400")})
+        monkeypatch.setattr(rate_limit_module, "_limiter", limiter)
+        calls = []
+        self._install_sources(monkeypatch, agent, calls)
+
+        metrics = agent.fetch_financial_data("TEST", mode=mode)
+
+        # FMP necesita 4 peticiones y solo quedan 3: la cascada sigue sin esperar
+        assert "_fetch_fmp" not in calls
+        assert metrics["primary_source"] == "finviz"
+
+    def test_scraper_request_skipped_without_tokens(self, monkeypatch, agent):
+        limiter = RateLimiter(MemoryBucketStore(), limits={"host:finviz.com": BucketSpec.parse("1/3600")})
+        monkeypatch.setattr(rate_limit_module, "_limiter", limiter)
+        requested = []
+
+        class FakeResponse:
+            status_code = 500
+            text = ""
+
+        monkeypatch.setattr(agent.session, "get", lambda url, timeout: requested.append(url) or FakeResponse())
+
+        assert agent._get("https://finviz.com/quote.ashx?t=TEST") is None
+        # Un solo intento: el reintento no tiene token
+        assert len(requested) == 1
+        assert limiter.denied["host:finviz.com"] == 1
+
+
+class TestCircuitBreakers:
+    def _failing(self, name, calls):
+        def fetcher(self, ticker):
+            calls.append(name)
+            circuit_breaker_module.note_request_failure()
+            return None
+
+        fetcher.__name__ = name
+        return fetcher
+
+    def _install_sources(self, monkeypatch, agent, calls):
+        _install(
+            monkeypatch,
+            agent,
+            _fetch_fmp=_empty("_fetch_fmp"),
+            _fetch_alpha_vantage=_empty("_fetch_alpha_vantage"),
+            _fetch_twelve_data=_empty("_fetch_twelve_data"),
+            _fetch_finviz=_empty("_fetch_finviz"),
+            _fetch_yahoo=self._failing("_fetch_yahoo", calls),
+            _fetch_marketwatch=_empty("_fetch_marketwatch"),
+        )
+
+    @pytest.mark.parametrize("mode", ["sequential", "concurrent", "async"])
+    def test_repeated_failures_open_circuit(self, monkeypatch, agent, mode):
+        monkeypatch.setattr(circuit_breaker_module, "_registry", CircuitBreakerRegistry(failure_threshold=2))
+        calls = []
+        self._install_sources(monkeypatch, agent, calls)
+
+        for _ in range(4):
+            agent.fetch_financial_data("TEST", mode=mode)
+
+        assert calls == ["_fetch_yahoo", "_fetch_yahoo"]
+        snapshot = circuit_breaker_module.get_breakers().snapshot()
+        assert snapshot["yahoo"]["state"] == OPEN
+        assert snapshot["yahoo"]["rejected"] == 2
+        assert snapshot["example_data"]["success_rate"] == 1.0
+
+    def test_empty_result_without_errors_has_no_verdict(self, monkeypatch, agent):
+        monkeypatch.setattr(circuit_breaker_module, "_registry", CircuitBreakerRegistry(failure_threshold=1))
+        self._install_sources(monkeypatch, agent, [])
+        agent.fetch_financial_data("TEST", mode="sequential")
+        agent.fetch_financial_data("TEST", mode="sequential")
+
+        snapshot = circuit_breaker_module.get_breakers().snapshot()
+        assert snapshot["marketwatch"]["samples"] == 0
+        assert snapshot["marketwatch"]["state"] == "closed"
+
+
+class TestAdaptivePlanning:
+    def _install_sources(self, monkeypatch, agent, calls):
+        _install(
+            monkeypatch,
+            agent,
+            _fetch_fmp=_empty("_fetch_fmp", calls=calls),
+            _fetch_alpha_vantage=_empty("_fetch_alpha_vantage", calls=calls),
+            _fetch_twelve_data=_stub("_fetch_twelve_data", "twelvedata", {"current_price": 99.0}, calls=calls),
+            _fetch_finviz=_stub("_fetch_finviz", "finviz", FINVIZ_DATA, calls=calls),
+            _fetch_yahoo=_empty("_fetch_yahoo", calls=calls),
+            _fetch_marketwatch=_empty("_fetch_marketwatch", calls=calls),
+        )
+
+    def _planner(self, monkeypatch):
+        planner = SourcePlanner(min_samples=3, explore_every=0)
+        monkeypatch.setattr(source_planner_module, "_planner", planner)
+        return planner
+
+    def _train(self, agent, planner):
+        for _ in range(3):
+            agent.fetch_financial_data("TEST", mode="sequential")
+            # La cascada termina en Finviz: los scrapers posteriores se registran vacíos
+            planner.record("yahoo", 2.0, None)
+            planner.record("marketwatch", 2.0, None)
+
+    def test_cold_planner_matches_sequential(self, monkeypatch, agent):
+        self._planner(monkeypatch)
+        self._install_sources(monkeypatch, agent, [])
+        sequential = agent.fetch_financial_data("TEST", mode="sequential")
+        adaptive = agent.fetch_financial_data("TEST", mode="adaptive")
+        assert _comparable(adaptive) == _comparable(sequential)
+
+    def test_outcomes_are_recorded_per_group(self, monkeypatch, agent):
+        planner = self._planner(monkeypatch)
+        self._install_sources(monkeypatch, agent, [])
+        agent.fetch_financial_data("TEST", mode="sequential")
+        snapshot = planner.snapshot()
+        assert snapshot["fmp"]["hit_rate"] == 0.0
+        assert snapshot["twelve_data"]["top_groups"] == {"current_price": 1.0}
+        assert planner._stats["finviz"].probability("revenue_growth") == 1.0
+
+    def test_learned_order_skips_useless_sources(self, monkeypatch, agent):
+        planner = self._planner(monkeypatch)
+        calls = []
+        self._install_sources(monkeypatch, agent, calls)
+        self._train(agent, planner)
+
+        calls.clear()
+        metrics = agent.fetch_financial_data("TEST", mode="adaptive")
+
+        # Finviz aporta casi todo: se consulta primero y se omiten las fuentes vacías
+        assert calls[0] == "_fetch_finviz"
+        assert "_fetch_fmp" not in calls
+        assert "_fetch_yahoo" not in calls
+        assert metrics["primary_source"] == "finviz"
+
+    @pytest.mark.parametrize("mode", ["concurrent", "async"])
+    def test_parallel_modes_prune_learned_empty_sources(self, monkeypatch, agent, mode):
+        planner = self._planner(monkeypatch)
+        calls = []
+        self._install_sources(monkeypatch, agent, calls)
+        self._train(agent, planner)
+
+        calls.clear()
+        metrics = agent.fetch_financial_data("TEST", mode=mode)
+
+        assert "_fetch_fmp" not in calls
+        assert "_fetch_marketwatch" not in calls
+        assert metrics["primary_source"] in {"twelvedata", "finviz"}
+
+
+class TestScraperRequests:
+    class FakeResponse:
+        def __init__(self, status_code, text=""):
+            self.status_code = status_code
+            self.text = text
+
+    def _serve(self, monkeypatch, agent, response):
+        requested = []
+        monkeypatch.setattr(agent.session, "get", lambda url, timeout: requested.append(url) or response)
+        return requested
+
+    def test_forbidden_is_not_retried(self, monkeypatch, agent):
+        requested = self._serve(monkeypatch, agent, self.FakeResponse(403))
+        with circuit_breaker_module.capture_signals() as signals:
+            assert agent._get("https://finviz.com/quote.ashx?t=TEST") is None
+        assert len(requested) == 1
+        assert signals["failure"] == 1
+
+    def test_block_page_is_suspicious(self, monkeypatch, agent):
+        page = "<html><head><title>Please complete the CAPTCHA</title></head></html>"
+        requested = self._serve(monkeypatch, agent, self.FakeResponse(200, page))
+        with circuit_breaker_module.capture_signals() as signals:
+            assert agent._get("https://finance.yahoo.com/quote/TEST") is None
+        assert len(requested) == 1
+        assert signals["suspicious"] == 1
+
+    def test_regular_page_is_returned(self, monkeypatch, agent):
+        page = "<html><head><title>Apple Inc. (AAPL) Stock Price</title></head></html>"
+        self._serve(monkeypatch, agent, self.FakeResponse(200, page))
+        assert agent._get("https://finance.yahoo.com/quote/AAPL") is not None
+
+
+class TestAsyncFetch:
+    def _install_sources(self, monkeypatch, agent):
+        _install(
+            monkeypatch,
+            agent,
+            _fetch_fmp=_stub("_fetch_fmp", "fmp", FMP_DATA),
+            _fetch_fmp_async=_async_stub("_fetch_fmp_async", "fmp", FMP_DATA, delay=0.05),
+            _fetch_alpha_vantage=_empty("_fetch_alpha_vantage"),
+            _fetch_twelve_data=_empty("_fetch_twelve_data"),
+            _fetch_finviz=_stub("_fetch_finviz", "finviz", FINVIZ_DATA),
+            _fetch_yahoo=_empty("_fetch_yahoo"),
+            _fetch_marketwatch=_empty("_fetch_marketwatch"),
+        )
+
+    def test_async_matches_sequential(self, monkeypatch, agent):
+        self._install_sources(monkeypatch, agent)
+        sequential = agent.fetch_financial_data("TEST", mode="sequential")
+        via_async = asyncio.run(agent.fetch_financial_data_async("TEST"))
+
+        assert _comparable(via_async) == _comparable(sequential)
+        assert via_async["provenance"]["current_price"] == "fmp:stub"
+
+    def test_sync_wrapper_uses_async_mode(self, monkeypatch, agent):
+        self._install_sources(monkeypatch, agent)
+        metrics = agent.fetch_financial_data("TEST", mode="async")
+        assert metrics["primary_source"] == "fmp"
+        assert metrics["peg_ratio"] == 1.5
+
+    def test_fmp_bundle_requests_overlap(self):
+        barrier = threading.Barrier(4, timeout=2)
+        client = FMPClient(api_key="demo")
+
+        def endpoint(name):
+            def call(symbol):
+                barrier.wait()
+                return {"endpoint": name}
+
+            return call
+
+        for name in ("get_profile", "get_quote", "get_ratios", "get_key_metrics"):
+            setattr(client, name, endpoint(name))
+
+        # Secuencialmente la barrera de 4 nunca se completaría
+        bundle = asyncio.run(AsyncFMPClient(client).get_company_bundle("TEST"))
+        assert bundle["ratios"] == {"endpoint": "get_ratios"}
+        assert all(bundle.values())
+
+    def test_facade_does_not_rewire_callers_session(self):
+        for client_cls, facade_cls in (
+            (FMPClient, AsyncFMPClient),
+            (AlphaVantageClient, AsyncAlphaVantageClient),
+            (TwelveDataClient, AsyncTwelveDataClient),
+        ):
+            client = client_cls(api_key="demo")
+            own_session = client.session
+            facade = facade_cls(client)
+
+            assert client.session is own_session
+            assert facade.client is not client
+            assert facade.client.session is get_shared_session()
+            assert facade.client.config is client.config
+
+
+class TestBatchFetch:
+    class FakeResponse:
+        status_code = 200
+
+        def __init__(self, payload):
+            self._payload = payload
+
+        def json(self):
+            return self._payload
+
+    def test_fmp_batches_are_chunked_and_split(self, monkeypatch):
+        monkeypatch.setattr(rate_limit_module, "_limiter", RateLimiter(MemoryBucketStore()))
+        client = FMPClient(api_key="demo")
+        client.MAX_BATCH_SYMBOLS = 2
+        paths = []
+
+        def fake_get(path):
+            paths.append(path)
+            symbols = path.split("/", 1)[1].split(",")
+            return [{"symbol": s, "price": 10.0} for s in symbols if s != "ZZZZ"]
+
+        monkeypatch.setattr(client, "_get", fake_get)
+        quotes = client.get_quotes(["aapl", "MSFT", "AAPL", "ZZZZ"])
+
+        assert paths == ["quote/AAPL,MSFT", "quote/ZZZZ"]
+        assert quotes["MSFT"] == {"symbol": "MSFT", "price": 10.0}
+        # Símbolo respondido por el lote pero sin fila: None (no se reintenta por separado)
+        assert "ZZZZ" in quotes and quotes["ZZZZ"] is None
+
+    def test_twelve_data_batch_charges_per_symbol(self, monkeypatch):
+        limiter = RateLimiter(MemoryBucketStore(), limits={"twelve_data": BucketSpec.parse("3/60")})
+        monkeypatch.setattr(rate_limit_module, "_limiter", limiter)
+        client = TwelveDataClient(api_key="demo")
+        client.MAX_BATCH_SYMBOLS = 2
+        requested = []
+
+        def fake_get(url, params, timeout):
+            requested.append(params["symbol"])
+            symbols = params["symbol"].split(",")
+            if len(symbols) == 1:
+                return self.FakeResponse({"symbol": symbols[0], "close": "5"})
+            return self.FakeResponse({
+                symbols[0]: {"symbol": symbols[0], "close": "1"},
+                symbols[1]: {"code": 404, "status": "error", "message": "not found"},
+            })
+
+        monkeypatch.setattr(client.session, "get", fake_get)
+        quotes = client.get_quotes(["AAA", "BBB", "CCC", "DDD"])
+
+        # 3 tokens: el primer lote (2) entra y el segundo (2) se omite sin petición
+        assert requested == ["AAA,BBB"]
+        assert quotes == {"AAA": {"symbol": "AAA", "close": "1"}, "BBB": None}
+
+    @pytest.mark.parametrize("mode", ["sequential", "concurrent", "async"])
+    def test_fetch_many_uses_batched_quotes(self, monkeypatch, agent, mode):
+        agent.fmp_client.config.api_key = "demo"
+        calls = []
+        monkeypatch.setattr(
+            agent.fmp_client,
+            "get_quotes",
+            lambda symbols: calls.append(("quotes", tuple(symbols)))
+            or {s: {"symbol": s, "price": 10.0 + i, "marketCap": 1e9} for i, s in enumerate(symbols)},
+        )
+        monkeypatch.setattr(agent.fmp_client, "get_profiles", lambda symbols: calls.append(("profiles",)) or {})
+
+        def single(name):
+            def call(symbol):
+                calls.append((name, symbol))
+                return None
+
+            return call
+
+        for name in ("get_profile", "get_quote", "get_ratios", "get_key_metrics"):
+            monkeypatch.setattr(agent.fmp_client, name, single(name))
+        _install(
+            monkeypatch,
+            agent,
+            _fetch_alpha_vantage=_empty("_fetch_alpha_vantage"),
+            _fetch_twelve_data=_empty("_fetch_twelve_data"),
+            _fetch_finviz=_stub("_fetch_finviz", "finviz", FINVIZ_DATA),
+            _fetch_yahoo=_empty("_fetch_yahoo"),
+            _fetch_marketwatch=_empty("_fetch_marketwatch"),
+        )
+
+        results = agent.fetch_many(["aaa", "BBB", "AAA"], mode=mode)
+
+        assert list(results) == ["AAA", "BBB"]
+        assert results["AAA"]["current_price"] == 10.0
+        assert results["BBB"]["current_price"] == 11.0
+        assert results["BBB"]["provenance"]["current_price"] == "fmp:quote"
+        assert calls.count(("quotes", ("AAA", "BBB"))) == 1
+        # Perfil vacío en el lote => sin fila; quote del lote => no se piden por separado
+        assert not [c for c in calls if c[0] == "get_quote"]
+        assert ("get_ratios", "AAA") in calls
+
+    def test_single_ticker_skips_batch(self, monkeypatch, agent):
+        agent.fmp_client.config.api_key = "demo"
+        monkeypatch.setattr(agent.fmp_client, "get_quotes", lambda symbols: pytest.fail("batch for one ticker"))
+        with agent.batch_prefetch(["AAA"]) as payloads:
+            assert payloads == {}
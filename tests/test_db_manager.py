@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests para db_manager: conexiones SQLite en WAL y pool de conexiones.
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+import db_manager as db_module
+from db_manager import (
+    ConnectionPool,
+    DatabaseManager,
+    PoolTimeout,
+)
+
+
+class TestConnectSqlite:
+    def test_wal_and_pragmas_applied(self, tmp_path):
+        conn = db_module.connect_sqlite(tmp_path / "cache.db", busy_timeout_ms=1234)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        conn.close()
+
+    def test_reader_not_blocked_by_open_write(self, tmp_path):
+        path = tmp_path / "cache.db"
+        writer = db_module.connect_sqlite(path)
+        with writer:
+            writer.execute("CREATE TABLE t (v INTEGER)")
+            writer.execute("INSERT INTO t VALUES (1)")
+        writer.execute("INSERT INTO t VALUES (2)")  # transacción abierta sin commit
+
+        seen = []
+
+        def read():
+            reader = db_module.connect_sqlite(path)
+            seen.append(reader.execute("SELECT COUNT(*) FROM t").fetchone()[0])
+            reader.close()
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join(timeout=2)
+        writer.commit()
+        writer.close()
+
+        # Con WAL el lector ve el último snapshot confirmado sin esperar
+        assert seen == [1]
+
+
+class _Counter:
+    """Fabrica de conexiones SQLite en memoria que cuenta aperturas."""
+
+    def __init__(self):
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return sqlite3.connect(":memory:", check_same_thread=False)
+
+
+class TestConnectionPool:
+    def test_connections_are_reused(self):
+        factory = _Counter()
+        pool = ConnectionPool(factory, min_size=1, max_size=2)
+        for _ in range(5):
+            with pool.connection() as conn:
+                conn.execute("SELECT 1")
+        assert factory.opened == 1
+        assert pool.stats()["idle"] == 1
+
+    def test_max_size_blocks_then_times_out(self):
+        pool = ConnectionPool(_Counter(), min_size=0, max_size=1, timeout=0.05)
+        held = pool.acquire()
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+        pool.release(held)
+        assert pool.acquire() is held
+
+    def test_waiter_gets_released_connection(self):
+        pool = ConnectionPool(_Counter(), min_size=0, max_size=1, timeout=2)
+        held = pool.acquire()
+        got = []
+        thread = threading.Thread(target=lambda: got.append(pool.acquire()))
+        thread.start()
+        threading.Timer(0.05, pool.release, args=(held,)).start()
+        thread.join(timeout=2)
+        assert got == [held]
+
+    def test_broken_connection_fails_health_check(self):
+        factory = _Counter()
+        pool = ConnectionPool(factory, min_size=1, max_size=2, health_check_idle=0)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.close()  # simula una conexion cortada por el servidor
+
+        fresh = pool.acquire()
+        assert fresh is not conn
+        assert pool.stats()["failed_checks"] == 1
+        assert factory.opened == 2
+
+    def test_connections_recycled_after_max_lifetime(self):
+        factory = _Counter()
+        pool = ConnectionPool(factory, min_size=1, max_size=1, max_lifetime=0.01)
+        first = pool.acquire()
+        pool.release(first)
+        threading.Event().wait(0.02)
+        second = pool.acquire()
+        assert second is not first
+        assert pool.stats()["recycled"] == 1
+        assert factory.opened == 2
+
+    def test_rollback_on_error(self):
+        pool = ConnectionPool(_Counter(), min_size=1, max_size=1)
+        with pool.connection() as conn:
+            conn.execute("CREATE TABLE t (v INTEGER)")
+        with pytest.raises(RuntimeError):
+            with pool.connection() as conn:
+                conn.execute("INSERT INTO t VALUES (1)")
+                raise RuntimeError("boom")
+        with pool.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+class TestDatabaseManagerPool:
+    def test_sqlite_mode_uses_pool(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(db_module, "IS_PRODUCTION", False)
+        manager = DatabaseManager(tmp_path / "cache.db")
+        manager.init_tables()
+
+        manager.execute_update("UPDATE site_visits SET total_visits = total_visits + 1 WHERE id = 1")
+        assert manager.execute_query("SELECT total_visits FROM site_visits WHERE id = 1") == [(1,)]
+        stats = manager.pool.stats()
+        assert stats["created"] == 1
+        assert stats["in_use"] == 0
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests para services.extractors: misma extracción que el recorrido BeautifulSoup anterior
+sobre las páginas guardadas en tests/fixtures/html, y uso desde DataAgent.
+"""
+
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+import data_agent as data_agent_module
+from data_agent import DataAgent
+from services import extractors
+
+FIXTURES = Path(__file__).parent / "fixtures" / "html"
+
+
+def _fixture(name):
+    return (FIXTURES / f"{name}.html").read_text(encoding="utf-8")
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, text):
+        self.text = text
+
+
+class TestFinviz:
+    def test_matches_beautifulsoup(self):
+        html = _fixture("finviz_quote")
+        soup = BeautifulSoup(html, "lxml")
+        page = extractors.finviz_snapshot(html)
+
+        expected = [[td.get_text(strip=True) for td in table.find_all("td")]
+                    for table in soup.find_all("table", class_="snapshot-table2")]
+        assert page.tables == expected
+        assert page.company_name == soup.select_one(".fullview-title .fullview-title-name").get_text(strip=True)
+        assert page.meta == [s.get_text(strip=True) for s in soup.select(".fullview-title .fullview-title-data span")]
+
+    def test_nested_table_is_balanced(self):
+        html = (
+            "<html><body><div class='fullview-title'><a class='fullview-title-name'>X Corp</a></div>"
+            "<table class='snapshot-table2'><tr><td>P/E</td><td><table><tr><td>12.5</td></tr></table></td></tr>"
+            "<tr><td>ROE</td><td>10%</td></tr></table><table><tr><td>other</td></tr></table></body></html>"
+        )
+        page = extractors.finviz_snapshot(html)
+        assert page.tables == [["P/E", "12.5", "12.5", "ROE", "10%"]]
+        assert page.company_name == "X Corp"
+
+    def test_unbalanced_markup_falls_back_to_full_parse(self):
+        html = "<html><body><table class='snapshot-table2'><tr><td>PEG</td><td>1.2</td></tr>"
+        page = extractors.finviz_snapshot(html)
+        assert page.tables == [["PEG", "1.2"]]
+
+    def test_page_without_snapshot(self):
+        assert extractors.finviz_snapshot("<html><body><p>captcha</p></body></html>").tables == []
+
+
+class TestYahooAndMarketWatch:
+    def test_key_statistics_match_beautifulsoup(self):
+        html = _fixture("yahoo_key_statistics")
+        expected = []
+        for row in BeautifulSoup(html, "lxml").select("section table tr"):
+            cells = row.find_all("td")
+            if len(cells) == 2:
+                expected.append((cells[0].get_text(strip=True), cells[1].get_text(strip=True)))
+        assert extractors.yahoo_key_statistics(html) == expected
+        assert ("Return on Equity (ttm)3", "157.41%") in expected
+
+    def test_quote(self):
+        quote = extractors.yahoo_quote(_fixture("yahoo_quote"))
+        assert quote == extractors.YahooQuote(price="222.91", market_cap="3312450000000", title="Apple Inc. (AAPL)")
+
+    def test_marketwatch_profile(self):
+        html = _fixture("marketwatch_profile")
+        profile = extractors.marketwatch_profile(html)
+        soup = BeautifulSoup(html, "lxml")
+        assert profile.description == soup.find("div", class_="description__text").text
+        assert ("Return on Equity", "164.59%") in profile.rows
+
+    def test_text_skips_scripts_and_comments(self):
+        html = "<html><body><section><table><tr><td> a <!-- b --><script>c</script></td><td> d </td></tr></table></section></body></html>"
+        assert extractors.yahoo_key_statistics(html) == [("a", "d")]
+
+
+@pytest.fixture
+def agent(monkeypatch, tmp_path):
+    monkeypatch.setattr(data_agent_module, "DATA_DIR", tmp_path)
+    instance = DataAgent()
+    pages = {
+        "finviz.com": _fixture("finviz_quote"),
+        "key-statistics": _fixture("yahoo_key_statistics"),
+        "finance.yahoo.com/quote": _fixture("yahoo_quote"),
+        "marketwatch.com": _fixture("marketwatch_profile"),
+    }
+
+    def fake_get(url, **kwargs):
+        for marker, html in pages.items():
+            if marker in url:
+                return FakeResponse(html)
+        return None
+
+    monkeypatch.setattr(instance, "_get", fake_get)
+    return instance
+
+
+class TestDataAgentScrapers:
+    def test_finviz(self, agent):
+        result = agent._fetch_finviz("AAPL")
+        assert result.data["pe_ratio"] == 34.12
+        assert result.data["roe"] == 157.4
+        assert result.data["revenue_growth_qoq"] == 6.1
+        assert result.data["company_name"] == "Apple Inc"
+        assert result.data["sector"] == "Technology"
+        assert result.data["industry"] == "Consumer Electronics"
+
+    def test_yahoo(self, agent):
+        result = agent._fetch_yahoo("AAPL")
+        assert result.data["current_price"] == 222.91
+        assert result.data["market_cap"] == 3312450000000.0
+        assert result.data["company_name"] == "Apple Inc."
+        assert result.data["roe"] == 157.41
+        assert result.data["pe_ratio"] == 34.12
+
+    def test_marketwatch(self, agent):
+        result = agent._fetch_marketwatch("AAPL")
+        assert result.data["pe_ratio"] == 34.1
+        assert result.data["net_margin"] == 23.97
+        assert result.data["sector"] == "Technology"
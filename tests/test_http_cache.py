@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Tests para services.http_cache: respuestas vigentes sin red, revalidación con
+ETag/Last-Modified, expulsión por tamaño y uso desde DataAgent y los clientes.
+"""
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import data_agent as data_agent_module
+from data_agent import DataAgent
+from services import FMPClient
+from services import http_cache as http_cache_module
+from services import rate_limit as rate_limit_module
+from services.http_cache import HttpCache
+from services.rate_limit import BucketSpec, RateLimiter
+
+PAGE = "<html><head><title>Apple Inc. (AAPL)</title></head><body>" + "x" * 500 + "</body></html>"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    instance = HttpCache(tmp_path / "http_cache.db", ttl_seconds=3600, max_bytes=1024 * 1024)
+    yield instance
+    instance.close()
+
+
+@pytest.fixture
+def enabled(monkeypatch, cache):
+    monkeypatch.setattr(http_cache_module, "CACHE_ENABLED", True)
+    monkeypatch.setattr(http_cache_module, "_cache", cache)
+    monkeypatch.setattr(rate_limit_module, "_limiter", RateLimiter(limits={}))
+    return cache
+
+
+@pytest.fixture
+def server():
+    class Handler(BaseHTTPRequestHandler):
+        requests = []
+        routes = {
+            "/page": (PAGE.encode(), {"Content-Type": "text/html; charset=utf-8", "ETag": '"v1"'}),
+            "/dated": (b"dated", {"Content-Type": "text/plain", "Last-Modified": "Wed, 01 Oct 2025 10:00:00 GMT"}),
+            "/private": (b"secret", {"Content-Type": "text/plain", "Cache-Control": "no-store"}),
+            "/api/v3/quote/AAPL": (b'[{"symbol": "AAPL", "price": 222.91}]', {"Content-Type": "application/json"}),
+            "/api/v3/quote/NOPE": (b'{"Error Message": "Invalid"}', {"Content-Type": "application/json"}),
+        }
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            Handler.requests.append((path, dict(self.headers)))
+            body, headers = self.routes[path]
+            etag, modified = self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")
+            if (etag and etag == headers.get("ETag")) or (modified and modified == headers.get("Last-Modified")):
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}", Handler.requests
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _expire(cache):
+    cache._conn.execute("UPDATE http_cache SET expires_at = 0")
+
+
+class TestHttpCache:
+    def test_fresh_entry_is_served_without_request(self, cache, server):
+        base, seen = server
+        session = requests.Session()
+        response = cache.request(session, f"{base}/page")
+        assert cache.store(response)
+        cached = cache.cached(f"{base}/page")
+        assert cached.text == PAGE
+        assert cached.from_cache
+        assert cached.headers["content-type"] == "text/html; charset=utf-8"
+        assert len(seen) == 1
+        assert cache.snapshot()["hit_rate"] == 0.5
+
+    def test_etag_revalidation_reuses_body(self, cache, server):
+        base, seen = server
+        session = requests.Session()
+        cache.store(cache.request(session, f"{base}/page"))
+        _expire(cache)
+        assert cache.cached(f"{base}/page") is None
+
+        revalidated = cache.request(session, f"{base}/page")
+        assert revalidated.status_code == 200
+        assert revalidated.text == PAGE
+        assert seen[-1][1]["If-None-Match"] == '"v1"'
+        assert cache.stats["revalidated"] == 1
+        # La revalidación renueva el TTL
+        assert cache.cached(f"{base}/page") is not None
+
+    def test_last_modified_revalidation(self, cache, server):
+        base, seen = server
+        session = requests.Session()
+        cache.store(cache.request(session, f"{base}/dated"))
+        _expire(cache)
+        assert cache.request(session, f"{base}/dated").content == b"dated"
+        assert seen[-1][1]["If-Modified-Since"] == "Wed, 01 Oct 2025 10:00:00 GMT"
+
+    def test_no_store_is_not_cached(self, cache, server):
+        base, _ = server
+        assert not cache.store(requests.get(f"{base}/private"))
+
+    def test_credentials_do_not_split_entries(self, cache, server):
+        base, _ = server
+        cache.store(cache.request(requests.Session(), f"{base}/page", params={"apikey": "one"}))
+        assert cache.cached(f"{base}/page", params={"apikey": "two"}) is not None
+
+    def test_size_bound_evicts_least_recently_used(self, tmp_path):
+        cache = HttpCache(tmp_path / "small.db", max_bytes=5000)
+
+        def response(name):
+            item = requests.Response()
+            item.status_code = 200
+            item.url = f"https://example.com/{name}"
+            item._content = os.urandom(2000)
+            return item
+
+        for name in ("a", "b"):
+            cache.store(response(name))
+        cache.cached("https://example.com/a")  # "a" pasa a ser la más reciente
+        cache.store(response("c"))
+
+        assert cache.cached("https://example.com/a") is not None
+        assert cache.cached("https://example.com/b") is None
+        assert cache.cached("https://example.com/c") is not None
+        assert cache.stats["evictions"] == 1
+        assert cache.snapshot()["size_mb"] <= 5000 / (1024 * 1024)
+        cache.close()
+
+    def test_disabled_cache_is_transparent(self, server):
+        base, _ = server
+        assert http_cache_module.lookup(f"{base}/page") is None
+        assert http_cache_module.conditional_get(requests.Session(), f"{base}/page").status_code == 200
+
+
+class TestCallers:
+    def test_agent_get_uses_cache(self, monkeypatch, tmp_path, enabled, server):
+        base, seen = server
+        monkeypatch.setattr(data_agent_module, "DATA_DIR", tmp_path)
+        agent = DataAgent()
+        assert "Cache-Control" not in agent.session.headers
+
+        first = agent._get(f"{base}/page")
+        second = agent._get(f"{base}/page")
+        assert first.text == second.text == PAGE
+        assert second.from_cache
+        assert len(seen) == 1
+
+    def test_agent_does_not_cache_block_pages(self, monkeypatch, tmp_path, enabled):
+        monkeypatch.setattr(data_agent_module, "DATA_DIR", tmp_path)
+        agent = DataAgent()
+        blocked = requests.Response()
+        blocked.status_code = 200
+        blocked.url = "https://finance.yahoo.com/quote/TEST"
+        blocked._content = b"<html><head><title>Please complete the CAPTCHA</title></head></html>"
+        monkeypatch.setattr(agent.session, "get", lambda url, timeout: blocked)
+        assert agent._get("https://finance.yahoo.com/quote/TEST", tries=1) is None
+        assert enabled.stats["stores"] == 0
+
+    def test_fmp_client_skips_request_and_token(self, monkeypatch, enabled, server):
+        base, seen = server
+        limiter = RateLimiter(limits={"fmp": BucketSpec.parse("100/60")})
+        monkeypatch.setattr(rate_limit_module, "_limiter", limiter)
+        client = FMPClient(api_key="secret")
+        client.config.base_url = f"{base}/api/v3"
+
+        assert client.get_quote("AAPL") == {"symbol": "AAPL", "price": 222.91}
+        assert client.get_quote("AAPL") == {"symbol": "AAPL", "price": 222.91}
+        assert len(seen) == 1
+        assert limiter.allowed["fmp"] == 1
+
+        assert client.get_quote("NOPE") is None
+        assert client.get_quote("NOPE") is None
+        assert len(seen) == 3
+        assert enabled.stats["stores"] == 1
+
+    def test_quotes_use_short_ttl(self, monkeypatch, enabled, server):
+        base, seen = server
+        monkeypatch.setattr(http_cache_module, "QUOTE_TTL_SECONDS", 30)
+        client = FMPClient(api_key="secret")
+        client.config.base_url = f"{base}/api/v3"
+
+        client.get_quote("AAPL")
+        client.get_quotes(["AAPL"])
+        # Una cotización cacheada nunca es más antigua que QUOTE_TTL_SECONDS
+        assert [row[0] for row in enabled._conn.execute("SELECT ttl FROM http_cache")] == [30]
+        assert len(seen) == 1
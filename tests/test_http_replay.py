@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tests para services.http_replay: grabación, reproducción offline, latencia/errores
+inyectados y montaje en las sesiones de DataAgent y los clientes.
+"""
+
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+import data_agent as data_agent_module
+from data_agent import DataAgent
+from services import FMPClient
+from services import http_replay
+from services import rate_limit as rate_limit_module
+from services.http_replay import RecordingAdapter, ReplayAdapter, ResponseStore, configure_transport, request_key
+from services.rate_limit import RateLimiter
+
+FIXTURES = Path(__file__).parent / "fixtures" / "html"
+
+
+@pytest.fixture(autouse=True)
+def live_transport(monkeypatch):
+    monkeypatch.setattr(rate_limit_module, "_limiter", RateLimiter(limits={}))
+    yield
+    configure_transport(None)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResponseStore(tmp_path / "replay")
+
+
+@pytest.fixture
+def server():
+    class Handler(BaseHTTPRequestHandler):
+        calls = 0
+
+        def do_GET(self):
+            Handler.calls += 1
+            body = json.dumps([{"symbol": "AAPL", "price": 222.91}]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield httpd, Handler
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestRequestKey:
+    def test_sorts_params_and_drops_credentials(self):
+        first = request_key("get", "https://API.example.com/quote/AAPL?b=2&apikey=secret&a=1")
+        second = request_key("GET", "https://api.example.com/quote/AAPL?a=1&b=2&apikey=other")
+        assert first == second == "GET https://api.example.com/quote/AAPL?a=1&b=2"
+
+    def test_parse_latency(self):
+        assert http_replay.parse_latency("120") == (120.0, 120.0)
+        assert http_replay.parse_latency("50-250") == (50.0, 250.0)
+        with pytest.raises(ValueError):
+            http_replay.parse_latency("250-50")
+
+
+class TestRecordReplay:
+    def test_record_then_replay_offline(self, server, store):
+        httpd, handler = server
+        url = f"http://127.0.0.1:{httpd.server_port}/quote/AAPL"
+        session = requests.Session()
+        session.mount("http://", RecordingAdapter(store))
+        recorded = session.get(url, params={"apikey": "secret", "limit": 1})
+        assert recorded.status_code == 200
+
+        files = list(store.root.glob("*/*.json.gz"))
+        assert len(files) == 1
+        raw = gzip.open(files[0], "rt", encoding="utf-8").read()
+        assert "secret" not in raw
+
+        httpd.shutdown()
+        replay = requests.Session()
+        replay.mount("http://", ReplayAdapter(store))
+        response = replay.get(url, params={"limit": 1, "apikey": "another"})
+        assert response.status_code == 200
+        assert response.json() == recorded.json()
+        assert response.headers["Content-Type"] == "application/json"
+        assert handler.calls == 1
+
+    def test_binary_body_roundtrip(self, store):
+        store.put("GET", "https://example.com/logo.png", 200, b"\x89PNG\xff\x00")
+        session = requests.Session()
+        session.mount("https://", ReplayAdapter(store))
+        assert session.get("https://example.com/logo.png").content == b"\x89PNG\xff\x00"
+
+    def test_missing_recording_is_404(self, store):
+        adapter = ReplayAdapter(store)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        assert session.get("https://example.com/none").status_code == 404
+        assert adapter.snapshot()["misses"] == 1
+
+    def test_injected_latency(self, store):
+        store.put("GET", "https://example.com/a", 200, b"{}")
+        session = requests.Session()
+        session.mount("https://", ReplayAdapter(store, latency_ms=(40, 60), seed=1))
+        started = time.perf_counter()
+        session.get("https://example.com/a")
+        assert time.perf_counter() - started >= 0.04
+
+    def test_injected_errors(self, store):
+        store.put("GET", "https://example.com/a", 200, b"{}")
+        session = requests.Session()
+        session.mount("https://", ReplayAdapter(store, error_rate=1.0, errors=["timeout"]))
+        with pytest.raises(requests.Timeout):
+            session.get("https://example.com/a")
+
+        session.mount("https://", ReplayAdapter(store, error_rate=1.0, errors=["503"]))
+        assert session.get("https://example.com/a").status_code == 503
+
+    def test_error_rate_is_reproducible_with_seed(self, store):
+        store.put("GET", "https://example.com/a", 200, b"{}")
+
+        def outcomes():
+            session = requests.Session()
+            session.mount("https://", ReplayAdapter(store, error_rate=0.5, errors=["503"], seed=7))
+            return [session.get("https://example.com/a").status_code for _ in range(20)]
+
+        first = outcomes()
+        assert first == outcomes()
+        assert {200, 503} == set(first)
+
+
+class TestMounting:
+    def test_agent_and_clients_follow_configured_transport(self, monkeypatch, tmp_path, store):
+        monkeypatch.setattr(data_agent_module, "DATA_DIR", tmp_path)
+        agent = DataAgent()
+        client = FMPClient(api_key="secret")
+        adapter = ReplayAdapter(store)
+        configure_transport(adapter)
+        assert agent.session.get_adapter("https://finviz.com") is adapter
+        assert client.session.get_adapter("https://financialmodelingprep.com") is adapter
+
+        configure_transport(None)
+        assert agent.session.get_adapter("https://finviz.com") is not adapter
+
+    def test_fmp_client_replays_recording(self, store):
+        store.put(
+            "GET",
+            "https://financialmodelingprep.com/api/v3/quote/AAPL?apikey=recorded",
+            200,
+            json.dumps([{"symbol": "AAPL", "price": 222.91}]).encode(),
+            {"Content-Type": "application/json"},
+        )
+        configure_transport(ReplayAdapter(store))
+        assert FMPClient(api_key="secret").get_quote("aapl") == {"symbol": "AAPL", "price": 222.91}
+
+    def test_agent_scraper_replays_html(self, monkeypatch, tmp_path, store):
+        monkeypatch.setattr(data_agent_module, "DATA_DIR", tmp_path)
+        html = (FIXTURES / "finviz_quote.html").read_bytes()
+        store.put("GET", "https://finviz.com/quote.ashx?t=AAPL", 200, html, {"Content-Type": "text/html; charset=utf-8"})
+        configure_transport(ReplayAdapter(store))
+        result = DataAgent()._fetch_finviz("AAPL")
+        assert result.data["pe_ratio"] == 34.12
+        assert result.data["company_name"] == "Apple Inc"
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests para la LRU en memoria acotada por entradas y bytes.
+"""
+
+from memory_cache import BoundedLRUCache, TimedMemo
+
+
+class TestBoundedLRUCache:
+    def test_evicts_least_recently_used_by_count(self):
+        cache = BoundedLRUCache(max_entries=2, max_bytes=1000)
+        cache.put("a", 1, size=10)
+        cache.put("b", 2, size=10)
+        assert cache.get("a") == 1  # "a" pasa a ser el más reciente
+        cache.put("c", 3, size=10)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_evicts_by_bytes(self):
+        cache = BoundedLRUCache(max_entries=10, max_bytes=100)
+        cache.put("a", 1, size=60)
+        cache.put("b", 2, size=60)
+
+        assert cache.get("a") is None
+        assert cache.stats()["bytes"] == 60
+
+    def test_oversized_entry_is_rejected(self):
+        cache = BoundedLRUCache(max_entries=10, max_bytes=100)
+        assert not cache.put("big", 1, size=101)
+        assert cache.stats()["entries"] == 0
+
+    def test_ttl_expires_entries(self):
+        cache = BoundedLRUCache(max_entries=10, max_bytes=100, ttl_seconds=-1)
+        cache.put("a", 1, size=1)
+        assert cache.get("a") is None
+
+    def test_invalidate_where_and_counters(self):
+        cache = BoundedLRUCache(max_entries=10, max_bytes=100)
+        cache.put(("AAPL", 4), 1, size=1)
+        cache.put(("AAPL", 5), 2, size=1)
+        cache.put(("MSFT", 5), 3, size=1)
+
+        assert cache.invalidate_where(lambda key: key[0] == "AAPL") == 2
+        assert cache.get(("AAPL", 5)) is None
+        assert cache.get(("MSFT", 5)) == 3
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        assert stats["hit_rate"] == 0.5
+
+
+class TestTimedMemo:
+    def test_hit_reuses_value_and_accounts_saved_time(self):
+        memo = TimedMemo(BoundedLRUCache(max_entries=10, max_bytes=1000))
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"score": 80}
+
+        first = memo.get_or_compute("k", compute, size_of=lambda value: 10)
+        second = memo.get_or_compute("k", compute, size_of=lambda value: 10)
+
+        assert first is second
+        assert len(calls) == 1
+        stats = memo.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        assert stats["time_saved_seconds"] == round(memo.compute_seconds, 4)
+
+    def test_disabled_cache_always_computes(self):
+        memo = TimedMemo(BoundedLRUCache(max_entries=0, max_bytes=1000))
+        calls = []
+        for _ in range(3):
+            memo.get_or_compute("k", lambda: calls.append(1), size_of=lambda value: 1)
+
+        assert len(calls) == 3
+        assert memo.stats()["time_saved_seconds"] == 0
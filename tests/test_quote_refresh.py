@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tests para la frescura por clase de campos: refresco de solo cotización
+(DataAgent.refresh_quote) y caducidad de la clasificación de activos.
+"""
+
+import threading
+import time
+
+import pytest
+
+import data_agent as data_agent_module
+from data_agent import METRIC_SCHEMA_VERSION, SourceResult
+from services import circuit_breaker as circuit_breaker_module
+
+STAMP = "2025-01-01T00:00:00"
+
+
+def _cached(**overrides):
+    metrics = {
+        "ticker": "QTE",
+        "company_name": "Quote Corp",
+        "source": "web",
+        "primary_source": "fmp",
+        "currency": "USD",
+        "current_price": 100.0,
+        "market_cap": 1e9,
+        "pe_ratio": 20.0,
+        "price_to_book": 4.0,
+        "enterprise_value": 1.2e9,
+        "ebit": 1e8,
+        "free_cash_flow": 5e7,
+        "roe": 25.0,
+        "warnings": [],
+        "provenance": {"current_price": "fmp:quote", "pe_ratio": "fmp:quote"},
+        "scraped_at": STAMP,
+        "field_updated_at": {"quote": STAMP, "fundamentals": STAMP},
+        "schema_version": METRIC_SCHEMA_VERSION,
+        "asset_type": "EQUITY",
+    }
+    metrics.update(overrides)
+    return metrics
+
+
+@pytest.fixture
+def agent(agent):
+    """El DataAgent aislado de conftest con FMP habilitado (las cotizaciones se simulan)."""
+    agent.fmp_client.config.api_key = "test"
+    return agent
+
+
+class TestRefreshQuote:
+    def test_refreshes_quote_over_cached_fundamentals(self, agent, monkeypatch):
+        calls = []
+
+        def get_quote(ticker):
+            calls.append(ticker)
+            return {"symbol": ticker, "price": 110.0, "marketCap": 1.1e9}
+
+        monkeypatch.setattr(agent.fmp_client, "get_quote", get_quote)
+        refreshed = agent.refresh_quote(_cached())
+
+        assert calls == ["QTE"]
+        assert refreshed["current_price"] == 110.0
+        assert refreshed["market_cap"] == 1.1e9
+        # P/E y P/B escalan con el precio; EV se mueve con el market cap
+        assert refreshed["pe_ratio"] == pytest.approx(22.0)
+        assert refreshed["price_to_book"] == pytest.approx(4.4)
+        assert refreshed["enterprise_value"] == pytest.approx(1.3e9)
+        assert refreshed["ev_to_ebit"] == pytest.approx(13.0)
+        assert refreshed["fcf_yield"] == pytest.approx(5e7 / 1.1e9 * 100)
+        assert refreshed["roe"] == 25.0
+        assert refreshed["provenance"]["current_price"] == "fmp:quote"
+        assert refreshed["scraped_at"] == STAMP
+        assert refreshed["field_updated_at"]["fundamentals"] == STAMP
+        assert refreshed["field_updated_at"]["quote"] > STAMP
+        assert refreshed["price_converted"]["USD"] == 110.0
+
+    def test_quote_pe_wins_over_scaling(self, agent, monkeypatch):
+        monkeypatch.setattr(agent.fmp_client, "get_quote", lambda t: {"price": 110.0, "pe": 30.0})
+        assert agent.refresh_quote(_cached())["pe_ratio"] == 30.0
+
+    def test_manual_overrides_are_kept(self, agent, monkeypatch):
+        monkeypatch.setattr(agent.fmp_client, "get_quote", lambda t: {"price": 110.0, "marketCap": 1.1e9})
+        cached = _cached(provenance={"current_price": "manual_override", "pe_ratio": "fmp:quote"})
+        refreshed = agent.refresh_quote(cached)
+        assert refreshed["current_price"] == 100.0
+        assert refreshed["pe_ratio"] == 20.0
+        assert refreshed["market_cap"] == 1.1e9
+
+    def test_falls_back_to_twelve_data(self, agent, monkeypatch):
+        agent.twelve_client.config.api_key = "test"
+        breaker = circuit_breaker_module.get_breakers().get("fmp")
+        monkeypatch.setattr(breaker, "allow", lambda: False)
+        monkeypatch.setattr(
+            agent, "_fetch_twelve_data", lambda ticker: SourceResult(data={"current_price": 105.0}, source="twelvedata")
+        )
+        refreshed = agent.refresh_quote(_cached())
+        assert refreshed["current_price"] == 105.0
+        assert refreshed["pe_ratio"] == pytest.approx(21.0)
+
+    def test_no_quote_returns_none(self, agent, monkeypatch):
+        monkeypatch.setattr(agent.fmp_client, "get_quote", lambda t: None)
+        assert agent.refresh_quote(_cached()) is None
+
+
+class TestConcurrentProvenance:
+    def test_refresh_and_fetch_keep_their_own_provenance(self, agent, monkeypatch):
+        agent.fmp_client.config.api_key = None
+        monkeypatch.setattr(
+            agent,
+            "_fetch_quote",
+            lambda ticker: SourceResult(
+                data={"current_price": 110.0}, source="fmp", provenance={"current_price": "fmp:quote"}, provider="fmp"
+            ),
+        )
+
+        def fetch_fmp(ticker):
+            agent._merge_provenance({"current_price": "fmp:stub", "roe": "fmp:stub"})
+            return SourceResult(data={"current_price": 50.0, "roe": 10.0}, source="fmp", coverage=2)
+
+        fetch_fmp.__name__ = "_fetch_fmp"
+        monkeypatch.setattr(agent, "_source_chain", lambda: [fetch_fmp])
+
+        # Ambas llamadas fijan su provenance antes de que cualquiera finalice
+        barrier = threading.Barrier(2, timeout=5)
+        derived = agent._calculate_derived_metrics
+
+        def synchronized(metrics):
+            barrier.wait()
+            return derived(metrics)
+
+        monkeypatch.setattr(agent, "_calculate_derived_metrics", synchronized)
+        results = {}
+        cached = _cached(provenance={"current_price": "fmp:quote", "roe": "finviz"})
+        threads = [
+            threading.Thread(target=lambda: results.update(refreshed=agent.refresh_quote(cached))),
+            threading.Thread(target=lambda: results.update(fetched=agent.fetch_financial_data("NEW", mode="sequential"))),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results["refreshed"]["provenance"]["roe"] == "finviz"
+        assert "fmp:stub" not in results["refreshed"]["provenance"].values()
+        assert results["fetched"]["provenance"]["current_price"] == "fmp:stub"
+        assert results["fetched"]["provenance"]["roe"] == "fmp:stub"
+
+
+class TestClassificationFreshness:
+    def test_expired_classification_is_recomputed(self, agent, monkeypatch):
+        old = time.time() - (data_agent_module.CLASSIFICATION_TTL_HOURS + 1) * 3600
+        agent.classification_cache["QTE"] = {
+            "asset_type": "ETF",
+            "type_label": "ETF",
+            "source": "fmp",
+            "classified_at": old,
+        }
+        metrics = agent._finalize_metrics(_cached())
+        assert metrics["asset_type"] == "EQUITY"
+        assert agent.classification_cache["QTE"]["classified_at"] > old
+        assert metrics["field_updated_at"]["classification"] > STAMP
+
+    def test_fresh_classification_keeps_its_stamp(self, agent):
+        stamp = time.time() - 3600
+        agent.classification_cache["QTE"] = {"asset_type": "ETF", "type_label": "ETF", "source": "fmp", "classified_at": stamp}
+        metrics = agent._finalize_metrics(_cached())
+        assert metrics["asset_type"] == "ETF"
+        assert agent.classification_cache["QTE"]["classified_at"] == stamp
+
+    def test_manual_overrides_never_expire(self, agent, monkeypatch):
+        monkeypatch.setattr(data_agent_module, "CLASSIFICATION_TTL_HOURS", 0.0001)
+        symbol, asset_type = next(iter(agent.classifier.MANUAL_OVERRIDES.items()))
+        entry = dict(agent.classification_cache[symbol], classified_at=1.0)
+        assert not agent._classification_expired(entry)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests para services.rate_limit: token buckets en memoria y compartidos vía BD.
+"""
+
+import contextvars
+import threading
+
+import pytest
+
+from services.rate_limit import (
+    BucketSpec,
+    DatabaseBucketStore,
+    MemoryBucketStore,
+    RateLimiter,
+    parse_rate_limits,
+    track_requests,
+)
+
+
+class TestParsing:
+    def test_bucket_spec(self):
+        spec = BucketSpec.parse("5/60")
+        assert spec.capacity == 5
+        assert spec.refill_per_second == pytest.approx(5 / 60)
+
+    @pytest.mark.parametrize("spec", ["5", "5/0", "0/60"])
+    def test_invalid_spec(self, spec):
+        with pytest.raises(ValueError):
+            BucketSpec.parse(spec)
+
+    def test_rate_limits(self):
+        limits = parse_rate_limits("fmp=250/86400, host:finviz.com=10/60")
+        assert set(limits) == {"fmp", "host:finviz.com"}
+
+
+@pytest.mark.parametrize("store_factory", ["memory", "database"])
+class TestBucketStores:
+    @pytest.fixture
+    def store(self, request, store_factory):
+        if store_factory == "memory":
+            return MemoryBucketStore()
+        return DatabaseBucketStore(request.getfixturevalue("db"))
+
+    def test_take_until_empty_then_refill(self, store):
+        spec = BucketSpec.parse("2/10")  # 0.2 tokens/s
+        assert store.take("k", spec, 1, now=100.0)
+        assert store.take("k", spec, 1, now=100.0)
+        assert not store.take("k", spec, 1, now=100.0)
+        assert store.take("k", spec, 1, now=105.0)
+
+    def test_peek_does_not_consume(self, store):
+        spec = BucketSpec.parse("3/60")
+        assert store.peek("k", spec, now=0.0) == 3
+        assert store.take("k", spec, 3, now=0.0)
+        assert store.peek("k", spec, now=0.0) == 0
+
+    def test_refill_capped_at_capacity(self, store):
+        spec = BucketSpec.parse("2/10")
+        assert store.take("k", spec, 2, now=0.0)
+        assert store.peek("k", spec, now=1000.0) == 2
+
+
+class TestDatabaseBucketStore:
+    def test_shared_between_store_instances(self, db):
+        spec = BucketSpec.parse("1/3600")
+        assert DatabaseBucketStore(db).take("fmp", spec, 1, now=0.0)
+        assert not DatabaseBucketStore(db).take("fmp", spec, 1, now=1.0)
+
+    def test_concurrent_takes_never_overspend(self, db):
+        limiter = RateLimiter(DatabaseBucketStore(db, max_retries=50), limits={"fmp": BucketSpec.parse("10/86400")})
+        results = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(5):
+                ok = limiter.try_acquire("fmp")
+                with lock:
+                    results.append(ok)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert 0 < sum(results) <= 10
+
+
+class TestRateLimiter:
+    def test_unknown_key_is_unlimited(self):
+        limiter = RateLimiter(limits={})
+        assert all(limiter.try_acquire("other") for _ in range(100))
+        assert limiter.available("other") == float("inf")
+
+    def test_host_key_groups_subdomains(self):
+        limiter = RateLimiter(limits=parse_rate_limits("host:finance.yahoo.com=30/60"))
+        assert limiter.host_key("https://query2.finance.yahoo.com/v7/quote") == "host:finance.yahoo.com"
+        assert limiter.host_key("https://www.example.com/x") == "host:example.com"
+
+    def test_unknown_host_uses_default_bucket(self):
+        limiter = RateLimiter(limits={}, default_host=BucketSpec.parse("1/3600"))
+        key = limiter.host_key("https://example.com")
+        assert limiter.try_acquire(key)
+        assert not limiter.try_acquire(key)
+        assert limiter.stats()[key] == {"allowed": 1, "denied": 1}
+
+    def test_store_failure_fails_open(self):
+        class BrokenStore:
+            def take(self, *args):
+                raise RuntimeError("db down")
+
+        limiter = RateLimiter(BrokenStore(), limits={"fmp": BucketSpec.parse("1/60")})
+        assert limiter.try_acquire("fmp")
+
+    def test_track_requests_counts_granted_tokens(self):
+        limiter = RateLimiter(limits=parse_rate_limits("fmp=2/3600,twelve_data=8/60"))
+        with track_requests() as requests:
+            limiter.try_acquire("fmp")
+            limiter.try_acquire("fmp")
+            limiter.try_acquire("fmp")  # denegada: no sale ninguna petición
+            limiter.try_acquire("twelve_data", tokens=3)
+            limiter.try_acquire("host:example.com")
+            thread = threading.Thread(target=contextvars.copy_context().run, args=(limiter.try_acquire, "fmp"))
+            thread.start()
+            thread.join()
+        limiter.try_acquire("twelve_data")  # fuera del bloque
+
+        assert requests == {"fmp": 2, "twelve_data": 3, "host:example.com": 1}
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests para el re-scoring del universo en cache (rescoring.Rescorer): sellos de
+versión del motor y hash de entradas en rvc_scores, y re-puntuación incremental.
+"""
+
+import json
+import sqlite3
+
+import pytest
+
+from analyzers import EquityAnalyzer
+from cache_store import CacheStore
+from db_manager import DatabaseManager
+from rescoring import Rescorer
+
+
+def _equity(ticker, **overrides):
+    metrics = {
+        "ticker": ticker,
+        "company_name": f"{ticker} Corp",
+        "sector": "Technology",
+        "asset_type": "EQUITY",
+        "analysis_allowed": True,
+        "roe": 28.0,
+        "roic": 21.0,
+        "operating_margin": 31.0,
+        "net_margin": 24.0,
+        "pe_ratio": 18.0,
+        "peg_ratio": 1.1,
+        "price_to_book": 4.0,
+        "ev_to_ebit": 14.0,
+        "fcf_yield": 4.2,
+        "debt_to_equity": 0.4,
+        "current_ratio": 1.9,
+        "quick_ratio": 1.4,
+        "revenue_growth": 12.0,
+        "earnings_growth": 18.0,
+        "provenance": {"roe": "fmp"},
+    }
+    metrics.update(overrides)
+    return metrics
+
+
+@pytest.fixture
+def universe(store):
+    store.save_entry("AAA", _equity("AAA"), last_updated="2025-01-01T00:00:00", source="web")
+    store.save_entry("BBB", _equity("BBB", sector="Utilities", roe=9.0, ev_to_ebit=None), "2025-01-01T00:00:00", "web")
+    store.save_entry("CCC", _equity("CCC", sector=None, net_debt_to_ebitda=2.0, interest_coverage=8.0),
+                     "2025-01-01T00:00:00", "web")
+    store.save_entry("SPY", {"ticker": "SPY", "asset_type": "ETF", "analysis_allowed": True},
+                     "2025-01-01T00:00:00", "web")
+    store.db.execute_update(
+        "INSERT INTO financial_cache (ticker, data, last_updated, source) VALUES (?, ?, ?, ?)",
+        ("ZZZ", "{not json", "2025-01-01T00:00:00", "web"),
+    )
+    return store
+
+
+def _scores(store):
+    rows = store.db.execute_query(
+        "SELECT ticker, score, classification, breakdown, engine_version, input_hash FROM rvc_scores"
+    )
+    return {row[0]: row[1:] for row in rows}
+
+
+class TestRescorer:
+    def test_scores_match_scalar_engine_and_are_stamped(self, universe):
+        analyzer = EquityAnalyzer()
+        report = Rescorer(universe, analyzer).run(batch_size=2)
+
+        assert sorted(report["rescored"]) == ["AAA", "BBB", "CCC"]
+        assert report["skipped"] == 1
+        assert report["corrupt"] == ["ZZZ"]
+        assert report["scanned"] == report["total"] == 5
+
+        stored = _scores(universe)
+        for ticker in ("AAA", "BBB", "CCC"):
+            metrics = json.loads(universe.get_entry(ticker)[0])
+            scalar = analyzer.calculate_all_scores(metrics)
+            score, classification, breakdown, engine_version, input_hash = stored[ticker]
+            assert score == scalar["investment_score"]
+            assert classification == scalar["category"]["name"]
+            assert json.loads(breakdown) == {
+                "calidad": scalar["quality_score"],
+                "valoracion": scalar["valuation_score"],
+                "salud": scalar["financial_health_score"],
+                "crecimiento": scalar["growth_score"],
+            }
+            assert engine_version == analyzer.engine_version()
+            assert input_hash == analyzer.input_hash(metrics)
+
+    def test_second_run_skips_unchanged_rows(self, universe):
+        analyzer = EquityAnalyzer()
+        Rescorer(universe, analyzer).run()
+        report = Rescorer(universe, analyzer).run()
+        assert report["rescored"] == []
+        assert report["unchanged"] == 3
+
+    def test_only_changed_inputs_are_rescored(self, universe):
+        analyzer = EquityAnalyzer()
+        Rescorer(universe, analyzer).run()
+        # Campos que no intervienen en el score no ensucian la fila
+        universe.save_entry("AAA", _equity("AAA", provenance={"roe": "yahoo"}), "2025-01-02T00:00:00", "web")
+        universe.save_entry("BBB", _equity("BBB", sector="Utilities", roe=14.0, ev_to_ebit=None),
+                            "2025-01-02T00:00:00", "web")
+        assert Rescorer(universe, analyzer).run()["rescored"] == ["BBB"]
+
+    def test_engine_change_rescores_everything(self, universe):
+        analyzer = EquityAnalyzer()
+        Rescorer(universe, analyzer).run()
+        before = analyzer.engine_version()
+
+        analyzer.quality_weights["roe"] = 0.30
+        assert analyzer.engine_version() != before
+        assert len(Rescorer(universe, analyzer).run()["rescored"]) == 3
+
+        analyzer.use_sector_relative = False
+        assert len(Rescorer(universe, analyzer).run()["rescored"]) == 3
+
+    def test_dry_run_and_force(self, universe):
+        analyzer = EquityAnalyzer()
+        report = Rescorer(universe, analyzer).run(dry_run=True)
+        assert len(report["rescored"]) == 3
+        assert _scores(universe) == {}
+
+        Rescorer(universe, analyzer).run()
+        assert len(Rescorer(universe, analyzer).run(force=True)["rescored"]) == 3
+
+    def test_progress_is_reported_per_batch(self, universe):
+        progress = []
+        Rescorer(universe, EquityAnalyzer(), on_progress=lambda done, total: progress.append((done, total))).run(
+            batch_size=2
+        )
+        assert progress == [(2, 5), (4, 5), (5, 5)]
+
+
+class TestScoreStamps:
+    def test_legacy_rvc_scores_table_gets_stamp_columns(self, tmp_path):
+        path = tmp_path / "legacy.db"
+        with sqlite3.connect(str(path)) as conn:
+            conn.execute(
+                "CREATE TABLE rvc_scores (ticker TEXT PRIMARY KEY, score REAL, classification TEXT, "
+                "breakdown TEXT, last_calculated TEXT)"
+            )
+            conn.execute("INSERT INTO rvc_scores VALUES ('OLD', 50.0, 'EVITAR', '{}', '2024-01-01')")
+
+        manager = DatabaseManager(path)
+        store = CacheStore(manager)
+        store.init_tables()
+        try:
+            assert store.score_stamps(["OLD", "MISSING"]) == {"OLD": (None, None)}
+        finally:
+            manager.pool.close_all()
+
+    def test_app_scores_are_stamped(self, universe, monkeypatch):
+        import app as app_module
+
+        monkeypatch.setattr(app_module, "cache_store", universe)
+        metrics = json.loads(universe.get_entry("AAA")[0])
+        app_module.prepare_analysis_response("AAA", metrics)
+
+        report = Rescorer(universe, app_module.investment_scorer).run()
+        assert "AAA" not in report["rescored"]
+        assert sorted(report["rescored"]) == ["BBB", "CCC"]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests para la migración de esquema de métricas sin refetch (DataAgent.upgrade_metrics
+y schema_migration.SchemaMigrator sobre financial_cache).
+"""
+
+import json
+
+import pytest
+
+import data_agent as data_agent_module
+from data_agent import METRIC_SCHEMA_VERSION, SchemaRefetchRequired
+from schema_migration import SchemaMigrator, needs_upgrade
+
+MARGIN_NOTE = "Margen operativo ajustado por fuerte crecimiento (>25%)."
+
+
+def _old_metrics(ticker="ZZOLD", version=METRIC_SCHEMA_VERSION - 1):
+    return {
+        "ticker": ticker,
+        "company_name": "Old Corp",
+        "source": "web",
+        "primary_source": "fmp",
+        "currency": "USD",
+        "current_price": 100.0,
+        "market_cap": 1e9,
+        "free_cash_flow": 5e7,
+        "pe_ratio": 20.0,
+        "roe": 25.0,
+        "operating_margin": 7.5,
+        "earnings_growth": 30.0,
+        "warnings": [MARGIN_NOTE, "Las APIs no devolvieron metricas criticas: roic, fcf_yield."],
+        "provenance": {"pe_ratio": "fmp", "free_cash_flow": "fmp"},
+        "scraped_at": "2025-01-01T00:00:00",
+        "schema_version": version,
+        "asset_type": "EQUITY",
+    }
+
+
+class TestUpgradeMetrics:
+    def test_recomputes_without_compounding_adjustments(self, agent):
+        upgraded = agent.upgrade_metrics(_old_metrics())
+
+        assert upgraded["schema_version"] == METRIC_SCHEMA_VERSION
+        assert upgraded["migrated_from"] == METRIC_SCHEMA_VERSION - 1
+        assert upgraded["scraped_at"] == "2025-01-01T00:00:00"
+        assert upgraded["fcf_yield"] == pytest.approx(5.0)
+        assert upgraded["provenance"]["pe_ratio"] == "fmp"
+        assert upgraded["provenance"]["fcf_yield"] == "calculated:fcf/mcap"
+        # El margen ya estaba ajustado: no se vuelve a multiplicar
+        assert upgraded["operating_margin"] == 7.5
+        assert upgraded["warnings"].count(MARGIN_NOTE) == 1
+        # El aviso de críticas se regenera con la lista vigente, sin duplicarse
+        critical = [w for w in upgraded["warnings"] if w.startswith("Las APIs no devolvieron")]
+        assert len(critical) == 1
+        assert "fcf_yield" not in critical[0]
+
+    def test_migration_is_idempotent(self, agent):
+        once = agent.upgrade_metrics(_old_metrics())
+        twice = agent.upgrade_metrics(once)
+        for key in ("operating_margin", "roic", "fcf_yield", "warnings", "data_completeness"):
+            assert twice[key] == once[key]
+
+    def test_runs_registered_upgrades(self, agent, monkeypatch):
+        def rename(metrics):
+            metrics["roe"] = metrics.pop("return_on_equity")
+            return metrics
+
+        monkeypatch.setitem(data_agent_module.SCHEMA_UPGRADES, METRIC_SCHEMA_VERSION - 1, rename)
+        metrics = _old_metrics()
+        metrics["return_on_equity"] = metrics.pop("roe")
+        assert agent.upgrade_metrics(metrics)["roe"] == 25.0
+
+    def test_refetch_required(self, agent, monkeypatch):
+        def needs_sources(metrics):
+            raise SchemaRefetchRequired("nuevo campo de las fuentes")
+
+        monkeypatch.setitem(data_agent_module.SCHEMA_UPGRADES, METRIC_SCHEMA_VERSION - 1, needs_sources)
+        assert agent.upgrade_metrics(_old_metrics()) is None
+
+    def test_newer_schema_is_not_downgraded(self, agent):
+        assert agent.upgrade_metrics(_old_metrics(version=METRIC_SCHEMA_VERSION + 1)) is None
+
+    def test_needs_upgrade(self):
+        assert needs_upgrade(_old_metrics())
+        assert not needs_upgrade(_old_metrics(version=METRIC_SCHEMA_VERSION))
+        assert needs_upgrade({"ticker": "X", "schema_version": METRIC_SCHEMA_VERSION})
+
+
+class TestBulkMigration:
+    def test_run_migrates_table_in_batches(self, agent, store, monkeypatch):
+        store.save_entry("AAA", _old_metrics("AAA"), last_updated="2025-01-01T00:00:00", source="web")
+        store.save_entry("BBB", _old_metrics("BBB", METRIC_SCHEMA_VERSION), last_updated="2025-01-02T00:00:00", source="web")
+        store.save_entry("CCC", _old_metrics("CCC"), last_updated="2025-01-03T00:00:00", source="web")
+        store.db.execute_update(
+            "INSERT INTO financial_cache (ticker, data, last_updated, source) VALUES (?, ?, ?, ?)",
+            ("DDD", "{not json", "2025-01-04T00:00:00", "web"),
+        )
+
+        def upgrade(metrics):
+            if metrics["ticker"] == "CCC":
+                return None
+            return agent.upgrade_metrics(metrics)
+
+        migrated = []
+        report = SchemaMigrator(store, upgrade, on_migrated=lambda ticker, _m: migrated.append(ticker)).run(batch_size=2)
+
+        assert report["scanned"] == 4
+        assert report["migrated"] == ["AAA"]
+        assert report["refetch_required"] == ["CCC"]
+        assert report["current"] == 1
+        assert report["corrupt"] == ["DDD"]
+        assert migrated == ["AAA"]
+
+        payload, last_updated, _ = store.get_entry("AAA")
+        assert json.loads(payload)["schema_version"] == METRIC_SCHEMA_VERSION
+        assert last_updated == "2025-01-01T00:00:00"
+
+    def test_dry_run_does_not_write(self, agent, store):
+        store.save_entry("AAA", _old_metrics("AAA"), last_updated="2025-01-01T00:00:00", source="web")
+        report = SchemaMigrator(store, agent.upgrade_metrics).run(dry_run=True)
+        assert report["migrated"] == ["AAA"]
+        assert json.loads(store.get_entry("AAA")[0])["schema_version"] == METRIC_SCHEMA_VERSION - 1
+
+    def test_concurrent_refresh_is_not_overwritten(self, agent, store):
+        store.save_entry("AAA", _old_metrics("AAA"), last_updated="2025-01-01T00:00:00", source="web")
+        fresh = _old_metrics("AAA", METRIC_SCHEMA_VERSION)
+        store.save_entry("AAA", fresh, last_updated="2025-02-01T00:00:00", source="web")
+
+        migrator = SchemaMigrator(store, agent.upgrade_metrics)
+        assert migrator.migrate_entry("AAA", _old_metrics("AAA"), "2025-01-01T00:00:00") is not None
+        payload, last_updated, _ = store.get_entry("AAA")
+        assert last_updated == "2025-02-01T00:00:00"
+        assert "migrated_from" not in json.loads(payload)
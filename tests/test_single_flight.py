@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests para la coalescencia de fetches (single-flight).
+"""
+
+import threading
+
+import pytest
+
+from single_flight import DatabaseLock, SingleFlight
+
+
+class TestSingleFlight:
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(2)
+            return {"ticker": "AAPL"}
+
+        results = []
+
+        def worker():
+            results.append(flight.do("AAPL", fetch))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        # Esperar a que todos estén bloqueados en el mismo fetch
+        while flight.in_flight() == 0 or flight.waiting("AAPL") < 4:
+            threading.Event().wait(0.01)
+        assert flight.snapshot()["waiting"] == 4
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert flight.snapshot() == {"executions": 1, "shared": 4, "in_flight": 0, "waiting": 0}
+        assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+        assert all(result == {"ticker": "AAPL"} for result, _ in results)
+        assert flight.in_flight() == 0
+
+    def test_error_propagates_and_key_is_released(self):
+        flight = SingleFlight()
+
+        def boom():
+            raise RuntimeError("provider down")
+
+        with pytest.raises(RuntimeError):
+            flight.do("MSFT", boom)
+        assert flight.do("MSFT", lambda: 42) == (42, False)
+
+
+class TestDatabaseLock:
+    def test_lock_is_exclusive_until_released(self, db):
+        first = DatabaseLock(db, ttl=60)
+        second = DatabaseLock(db, ttl=60)
+
+        assert first.try_acquire("AAPL")
+        assert not second.try_acquire("AAPL")
+        first.release("AAPL")
+        assert second.try_acquire("AAPL")
+
+    def test_expired_lease_can_be_taken(self, db):
+        stale = DatabaseLock(db, ttl=-1)
+        assert stale.try_acquire("NVDA")
+        assert DatabaseLock(db, ttl=60).try_acquire("NVDA")
+
+    def test_waiter_uses_recheck_result(self, db):
+        holder = DatabaseLock(db, ttl=60)
+        assert holder.try_acquire("TSLA")
+        threading.Timer(0.1, holder.release, args=("TSLA",)).start()
+
+        flight = SingleFlight(distributed_lock=DatabaseLock(db, ttl=60, poll_interval=0.02), lock_timeout=2)
+        result, shared = flight.do("TSLA", lambda: "fetched", recheck=lambda: "from-cache")
+
+        assert (result, shared) == ("from-cache", False)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests para services.source_planner: aprendizaje por fuente, orden, omisión y persistencia.
+"""
+
+import pytest
+
+from services.source_planner import DatabaseStatsStore, SourcePlanner, SourceStats
+
+
+PRICE = {"current_price", "market_cap"}
+FUNDAMENTALS = {"pe_ratio", "roe", "roic", "net_margin"}
+
+
+def _train(planner, source, groups, latency=1.0, runs=10):
+    for _ in range(runs):
+        planner.record(source, latency, groups)
+
+
+class TestSourceStats:
+    def test_probability_and_latency(self):
+        planner = SourcePlanner(min_samples=1)
+        planner.record("fmp", 2.0, {"pe_ratio"})
+        planner.record("fmp", 4.0, None)
+        stats = planner._stats["fmp"]
+        assert stats.probability("pe_ratio") == 0.5
+        assert stats.mean_latency == 3.0
+        assert stats.hits == 1
+
+    def test_decay_halves_counters(self):
+        stats = SourceStats(runs=12, hits=10, latency_total=24, group_counts={"roe": 8})
+        stats.decay(10)
+        assert stats.runs == 6
+        assert stats.probability("roe") == pytest.approx(8 / 12)
+        assert stats.mean_latency == 2.0
+
+
+class TestPlanning:
+    def test_unknown_sources_keep_static_order(self):
+        planner = SourcePlanner(min_samples=5)
+        source, skipped = planner.choose_next(["fmp", "finviz"], FUNDAMENTALS, {})
+        assert source == "fmp"
+        assert skipped == []
+
+    def test_prefers_cheaper_source_with_same_yield(self):
+        planner = SourcePlanner(min_samples=5)
+        _train(planner, "yahoo", FUNDAMENTALS, latency=3.0)
+        _train(planner, "finviz", FUNDAMENTALS, latency=0.5)
+        source, _ = planner.choose_next(["yahoo", "finviz"], FUNDAMENTALS, {})
+        assert source == "finviz"
+
+    def test_quota_cost_penalises_provider(self):
+        planner = SourcePlanner(min_samples=5, quota_weight=1.0)
+        _train(planner, "fmp", FUNDAMENTALS, latency=0.5)
+        _train(planner, "finviz", FUNDAMENTALS, latency=1.0)
+        source, _ = planner.choose_next(["fmp", "finviz"], FUNDAMENTALS, {"fmp": 4})
+        assert source == "finviz"
+
+    def test_skips_source_without_missing_groups(self):
+        planner = SourcePlanner(min_samples=5, explore_every=0)
+        _train(planner, "twelve_data", PRICE, latency=0.2)
+        _train(planner, "finviz", FUNDAMENTALS)
+        source, skipped = planner.choose_next(["twelve_data", "finviz"], FUNDAMENTALS, {})
+        assert source == "finviz"
+        assert skipped == ["twelve_data"]
+        assert planner.snapshot()["twelve_data"]["skipped"] == 1
+
+    def test_prune_drops_redundant_source(self):
+        planner = SourcePlanner(min_samples=5, explore_every=0)
+        _train(planner, "fmp", PRICE | FUNDAMENTALS)
+        _train(planner, "twelve_data", PRICE)
+        kept, skipped = planner.prune(["fmp", "twelve_data", "finviz"], PRICE | FUNDAMENTALS | {"sector"})
+        assert kept == ["fmp", "finviz"]
+        assert skipped == ["twelve_data"]
+
+    def test_explores_skipped_source_periodically(self):
+        planner = SourcePlanner(min_samples=5, explore_every=3)
+        _train(planner, "twelve_data", set())
+        outcomes = [planner.prune(["twelve_data"], PRICE)[0] for _ in range(6)]
+        assert outcomes == [[], [], ["twelve_data"], [], [], ["twelve_data"]]
+
+
+class TestPersistence:
+    def test_stats_survive_restart(self, db):
+        planner = SourcePlanner(DatabaseStatsStore(db), min_samples=5, flush_seconds=3600)
+        _train(planner, "finviz", FUNDAMENTALS, latency=0.5)
+        planner.flush()
+
+        restarted = SourcePlanner(DatabaseStatsStore(db), min_samples=5)
+        assert restarted.snapshot()["finviz"]["runs"] == 10
+        assert restarted.expected_gain("finviz", FUNDAMENTALS) == pytest.approx(4.0)
+
+    def test_flush_merges_other_workers(self, db):
+        first = SourcePlanner(DatabaseStatsStore(db), flush_seconds=3600)
+        second = SourcePlanner(DatabaseStatsStore(db), flush_seconds=3600)
+        _train(first, "yahoo", {"roe"}, runs=3)
+        _train(second, "yahoo", set(), runs=1)
+        first.flush()
+        second.flush()
+        assert second._stats["yahoo"].runs == 4
+        assert second._stats["yahoo"].probability("roe") == 0.75
+
+    def test_store_errors_keep_pending(self):
+        class BrokenStore:
+            def load(self):
+                return {}
+
+            def add(self, deltas, window):
+                raise RuntimeError("db down")
+
+        planner = SourcePlanner(BrokenStore(), flush_seconds=3600)
+        planner.record("fmp", 1.0, {"roe"})
+        planner.flush()
+        assert planner._pending["fmp"].runs == 1
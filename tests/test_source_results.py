@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests para los resultados crudos por fuente (tabla source_results): reutilización
+según el TTL de cada proveedor y re-merge sin red (DataAgent.remerge).
+"""
+
+import pytest
+
+import data_agent as data_agent_module
+from data_agent import METRIC_SCHEMA_VERSION, SchemaRefetchRequired, SourceResult, parse_source_ttls
+
+FMP_DATA = {
+    "company_name": "Test Corp",
+    "sector": "Technology",
+    "current_price": 100.0,
+    "market_cap": 5e11,
+    "pe_ratio": 20.0,
+    "roe": 25.0,
+}
+FINVIZ_DATA = {
+    "current_price": 101.0,
+    "pe_ratio": 22.0,
+    "peg_ratio": 1.5,
+    "price_to_book": 4.0,
+    "roic": 18.0,
+    "operating_margin": 30.0,
+    "net_margin": 22.0,
+    "debt_to_equity": 0.4,
+    "current_ratio": 1.8,
+    "quick_ratio": 1.4,
+    "revenue_growth_qoq": 12.0,
+    "earnings_growth_this_y": 15.0,
+}
+
+
+def _stub(name, source, data, calls):
+    def fetcher(self, ticker):
+        calls.append(name)
+        self._merge_provenance({key: f"{source}:stub" for key in data})
+        return SourceResult(data=dict(data), source=source, coverage=len(data))
+
+    fetcher.__name__ = name
+    return fetcher
+
+
+def _empty(name, calls):
+    def fetcher(self, ticker):
+        calls.append(name)
+        return None
+
+    fetcher.__name__ = name
+    return fetcher
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def agent(agent, monkeypatch, store, calls):
+    """El DataAgent aislado de conftest con source_results en ``store`` y fuentes de prueba."""
+    agent.source_store = store
+    fetchers = {
+        "_fetch_fmp": _stub("_fetch_fmp", "fmp", FMP_DATA, calls),
+        "_fetch_alpha_vantage": _empty("_fetch_alpha_vantage", calls),
+        "_fetch_twelve_data": _empty("_fetch_twelve_data", calls),
+        "_fetch_finviz": _stub("_fetch_finviz", "finviz", FINVIZ_DATA, calls),
+        "_fetch_yahoo": _empty("_fetch_yahoo", calls),
+        "_fetch_marketwatch": _empty("_fetch_marketwatch", calls),
+    }
+    for attr, fn in fetchers.items():
+        monkeypatch.setattr(agent, attr, fn.__get__(agent))
+        # Sin variante nativa: el modo async ejecuta los stubs en el executor
+        monkeypatch.setattr(agent, f"{attr}_async", None, raising=False)
+    return agent
+
+
+def _age(store, ticker, provider, hours):
+    store.db.execute_update(
+        "UPDATE source_results SET fetched_at = fetched_at - ? WHERE ticker = ? AND provider = ?",
+        (hours * 3600, ticker, provider),
+    )
+
+
+def _comparable(metrics):
+    return {k: v for k, v in metrics.items() if k not in ("scraped_at", "field_updated_at")}
+
+
+class TestSourceResultStore:
+    @pytest.mark.parametrize("mode", ["sequential", "concurrent", "async"])
+    def test_fresh_sources_are_not_queried_again(self, agent, store, calls, mode):
+        first = agent.fetch_financial_data("test", mode=mode)
+        stored = {row[0]: row for row in store.get_source_results("TEST")}
+        assert set(stored) == {"fmp", "finviz"}
+        assert stored["fmp"][2] == FMP_DATA
+        assert stored["fmp"][4]["pe_ratio"] == "fmp:stub"
+
+        calls.clear()
+        second = agent.fetch_financial_data("test", mode=mode)
+        assert "_fetch_fmp" not in calls and "_fetch_finviz" not in calls
+        assert _comparable(second) == _comparable(first)
+
+    def test_stale_source_refreshes_alone(self, agent, store, calls):
+        agent.fetch_financial_data("test", mode="sequential")
+        before = {row[0]: row[5] for row in store.get_source_results("TEST")}
+        _age(store, "TEST", "finviz", 25)
+
+        calls.clear()
+        agent.fetch_financial_data("test", mode="sequential")
+        assert "_fetch_finviz" in calls
+        assert "_fetch_fmp" not in calls
+        after = {row[0]: row[5] for row in store.get_source_results("TEST")}
+        assert after["fmp"] == before["fmp"]
+        assert after["finviz"] > before["finviz"] - 25 * 3600
+
+    def test_ttls_are_configurable(self):
+        ttls = parse_source_ttls("twelve_data=0.5, fmp=6")
+        assert ttls["twelve_data"] == 0.5
+        assert ttls["fmp"] == 6
+        assert ttls["alpha_vantage"] == 168
+        with pytest.raises(ValueError):
+            parse_source_ttls("fmp")
+
+    def test_clear_removes_source_results(self, agent, store):
+        agent.fetch_financial_data("test", mode="sequential")
+        store.clear("TEST")
+        assert store.get_source_results("TEST") == []
+
+
+class TestRemerge:
+    def test_remerge_applies_new_priorities_without_network(self, agent, store, calls):
+        agent.fetch_financial_data("test", mode="sequential")
+        _age(store, "TEST", "fmp", 48)
+        agent.metric_priority["current_price"] = ["finviz", "fmp"]
+
+        calls.clear()
+        remerged = agent.remerge("test")
+        assert calls == []
+        assert remerged["current_price"] == 101.0
+        assert remerged["provenance"]["current_price"] == "finviz"
+        assert remerged["schema_version"] == METRIC_SCHEMA_VERSION
+        oldest = min(row[5] for row in store.get_source_results("TEST"))
+        assert remerged["scraped_at"] == data_agent_module.datetime.utcfromtimestamp(oldest).isoformat(
+            timespec="seconds"
+        )
+
+    def test_remerge_without_stored_results(self, agent):
+        assert agent.remerge("nothing") is None
+
+    def test_schema_refetch_uses_stored_results(self, agent, monkeypatch, calls):
+        cached = agent.fetch_financial_data("test", mode="sequential")
+        cached["schema_version"] = METRIC_SCHEMA_VERSION - 1
+
+        def needs_sources(metrics):
+            raise SchemaRefetchRequired("campo nuevo del merge")
+
+        monkeypatch.setitem(data_agent_module.SCHEMA_UPGRADES, METRIC_SCHEMA_VERSION - 1, needs_sources)
+        calls.clear()
+        upgraded = agent.upgrade_metrics(cached)
+        assert calls == []
+        assert upgraded["migrated_from"] == METRIC_SCHEMA_VERSION - 1
+        assert upgraded["pe_ratio"] == cached["pe_ratio"]
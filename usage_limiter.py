@@ -4,13 +4,23 @@ Sistema de límite de uso para modelo freemium.
 Controla consultas gratuitas y valida licencias PRO.
 """
 
-import sqlite3
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Optional
+
+from db_manager import IS_PRODUCTION, DatabaseManager, get_db_manager
 
 logger = logging.getLogger(__name__)
 
+
+def _default_database(db_path: str) -> DatabaseManager:
+    """En producción se comparte la BD principal (PostgreSQL); en desarrollo, el SQLite propio."""
+    if IS_PRODUCTION:
+        return get_db_manager()
+    return DatabaseManager(Path(db_path))
+
+
 class UsageLimiter:
     """Gestor de límites de uso y licencias."""
     
@@ -20,64 +30,89 @@ class UsageLimiter:
     LICENSE_DURATION_DAYS = 30  # Licencias válidas por 30 días
     LICENSE_PRICE_USD = 3       # Precio sugerido por licencia mensual
     
-    def __init__(self, db_path="data/rvc_database.db"):
+    def __init__(self, db_path="data/rvc_database.db", db: Optional[DatabaseManager] = None):
         """Inicializar limiter con base de datos."""
         self.db_path = db_path
+        self.db = db or _default_database(db_path)
         self._ensure_tables()
     
     def _ensure_tables(self):
         """Crear tablas si no existen."""
-        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        if self.db.is_production:
+            # Mismo formato que CURRENT_TIMESTAMP de SQLite (UTC, sin 'T')
+            id_column = "id SERIAL PRIMARY KEY"
+            timestamp_type = "TEXT DEFAULT to_char(now() AT TIME ZONE 'utc', 'YYYY-MM-DD HH24:MI:SS')"
+        else:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            id_column = "id INTEGER PRIMARY KEY AUTOINCREMENT"
+            timestamp_type = "DATETIME DEFAULT CURRENT_TIMESTAMP"
         
-        # Tabla de uso por IP/sesión
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS usage_tracking (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                identifier TEXT NOT NULL,
-                endpoint TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                user_agent TEXT,
-                response_status INTEGER
-            )
-        """)
-        
-        # Tabla de licencias PRO
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS pro_licenses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                license_key TEXT UNIQUE NOT NULL,
-                email TEXT,
-                plan_type TEXT DEFAULT 'PRO',
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                expires_at DATETIME,
-                last_renewed_at DATETIME,
-                renewal_count INTEGER DEFAULT 0,
-                is_active INTEGER DEFAULT 1,
-                max_monthly_queries INTEGER DEFAULT -1,
-                notes TEXT
-            )
-        """)
-        
-        # Índices para performance
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_usage_identifier 
-            ON usage_tracking(identifier, timestamp)
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_license_key 
-            ON pro_licenses(license_key, is_active)
-        """)
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Tabla de uso por IP/sesión
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS usage_tracking (
+                    {id_column},
+                    identifier TEXT NOT NULL,
+                    endpoint TEXT NOT NULL,
+                    timestamp {timestamp_type},
+                    user_agent TEXT,
+                    response_status INTEGER,
+                    ticker TEXT
+                )
+            """)
+            self._ensure_ticker_column(cursor)
+            
+            # Tabla de licencias PRO
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS pro_licenses (
+                    {id_column},
+                    license_key TEXT UNIQUE NOT NULL,
+                    email TEXT,
+                    plan_type TEXT DEFAULT 'PRO',
+                    created_at {timestamp_type},
+                    expires_at TEXT,
+                    last_renewed_at TEXT,
+                    renewal_count INTEGER DEFAULT 0,
+                    is_active INTEGER DEFAULT 1,
+                    max_monthly_queries INTEGER DEFAULT -1,
+                    notes TEXT
+                )
+            """)
+            
+            # Índices para performance
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_usage_identifier 
+                ON usage_tracking(identifier, timestamp)
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_license_key 
+                ON pro_licenses(license_key, is_active)
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_usage_ticker 
+                ON usage_tracking(ticker, timestamp)
+            """)
+            cursor.close()
         
         logger.info("✅ Tablas de usage limiter inicializadas")
     
-    def track_usage(self, identifier: str, endpoint: str, user_agent: str = None, status: int = 200):
+    def _ensure_ticker_column(self, cursor):
+        """Agregar la columna ticker a tablas creadas antes de existir (popularidad por ticker)."""
+        if self.db.is_production:
+            cursor.execute("ALTER TABLE usage_tracking ADD COLUMN IF NOT EXISTS ticker TEXT")
+            return
+        cursor.execute("PRAGMA table_info(usage_tracking)")
+        columns = [col[1] for col in cursor.fetchall()]
+        if "ticker" not in columns:
+            cursor.execute("ALTER TABLE usage_tracking ADD COLUMN ticker TEXT")
+            logger.info("➕ Columna ticker agregada a usage_tracking")
+    
+    def track_usage(self, identifier: str, endpoint: str, user_agent: str = None, status: int = 200,
+                    tickers=None):
         """
         Registrar una consulta.
         
@@ -86,18 +121,16 @@ class UsageLimiter:
             endpoint: Endpoint usado (/analyze, /api/comparar, etc.)
             user_agent: User agent del navegador
             status: HTTP status de la respuesta
+            tickers: Ticker o lista de tickers consultados (se guardan separados por coma)
         """
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        ticker_value = ",".join(tickers) if tickers else None
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO usage_tracking (identifier, endpoint, user_agent, response_status)
-                VALUES (?, ?, ?, ?)
-            """, (identifier, endpoint, user_agent, status))
-            
-            conn.commit()
-            conn.close()
+            self.db.execute_update("""
+                INSERT INTO usage_tracking (identifier, endpoint, user_agent, response_status, ticker)
+                VALUES (?, ?, ?, ?, ?)
+            """, (identifier, endpoint, user_agent, status, ticker_value))
             
             logger.debug(f"📊 Uso registrado: {identifier} → {endpoint}")
             
@@ -116,24 +149,18 @@ class UsageLimiter:
             Número de consultas en el período
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Calcular fecha límite (últimas 24 horas)
             now = datetime.now()
             cutoff = now - timedelta(days=1)
             
-            cursor.execute("""
+            rows = self.db.execute_query("""
                 SELECT COUNT(*) FROM usage_tracking
                 WHERE identifier = ?
                 AND timestamp >= ?
                 AND endpoint IN ('/analyze', '/api/comparar')
             """, (identifier, cutoff.isoformat()))
             
-            count = cursor.fetchone()[0]
-            conn.close()
-            
-            return count
+            return rows[0][0]
             
         except Exception as e:
             logger.error(f"❌ Error al obtener uso: {e}")
@@ -214,22 +241,16 @@ class UsageLimiter:
             }
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            rows = self.db.execute_query("""
                 SELECT plan_type, expires_at, email, is_active
                 FROM pro_licenses
                 WHERE license_key = ?
             """, (license_key,))
             
-            result = cursor.fetchone()
-            conn.close()
-            
-            if not result:
+            if not rows:
                 return {"valid": False, "reason": "Licencia no encontrada"}
             
-            plan, expires_at, email, is_active = result
+            plan, expires_at, email, is_active = tuple(rows[0])
             
             # Verificar si está activa
             if not is_active:
@@ -291,17 +312,11 @@ class UsageLimiter:
         expires_at = (datetime.now() + timedelta(days=duration_days)).isoformat()
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            self.db.execute_update("""
                 INSERT INTO pro_licenses (license_key, email, plan_type, expires_at)
                 VALUES (?, ?, ?, ?)
             """, (license_key, email, plan_type, expires_at))
             
-            conn.commit()
-            conn.close()
-            
             expiry_date = datetime.fromisoformat(expires_at)
             logger.info(f"✅ Licencia creada: {license_key} para {email} (expira: {expiry_date.strftime('%d/%m/%Y')})")
             return license_key
@@ -323,64 +338,61 @@ class UsageLimiter:
             dict con información de la renovación
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Buscar por email o clave
-            if email_or_key.startswith('RVC-'):
-                # Es una clave de licencia
-                cursor.execute("""
-                    SELECT license_key, email, expires_at, is_active, renewal_count
-                    FROM pro_licenses
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                
+                # Buscar por email o clave
+                if email_or_key.startswith('RVC-'):
+                    # Es una clave de licencia
+                    cursor.execute(self.db.adapt_query("""
+                        SELECT license_key, email, expires_at, is_active, renewal_count
+                        FROM pro_licenses
+                        WHERE license_key = ?
+                    """), (email_or_key,))
+                else:
+                    # Es un email - buscar licencia más reciente
+                    cursor.execute(self.db.adapt_query("""
+                        SELECT license_key, email, expires_at, is_active, renewal_count
+                        FROM pro_licenses
+                        WHERE email = ?
+                        ORDER BY created_at DESC
+                        LIMIT 1
+                    """), (email_or_key,))
+                
+                result = cursor.fetchone()
+                
+                if not result:
+                    return {
+                        "success": False,
+                        "reason": "No se encontró licencia para este email/clave",
+                        "action": "create_new"
+                    }
+                
+                license_key, email, old_expires_at, is_active, renewal_count = result
+                
+                # Calcular nueva fecha de expiración
+                # Si está expirada, extender desde HOY
+                # Si aún está activa, extender desde fecha de expiración actual
+                now = datetime.now()
+                old_expiry = datetime.fromisoformat(old_expires_at) if old_expires_at else now
+                
+                if old_expiry < now:
+                    # Licencia expirada - extender desde hoy
+                    new_expires_at = now + timedelta(days=duration_days)
+                else:
+                    # Licencia activa - extender desde fecha actual de expiración
+                    new_expires_at = old_expiry + timedelta(days=duration_days)
+                
+                # Actualizar licencia
+                cursor.execute(self.db.adapt_query("""
+                    UPDATE pro_licenses
+                    SET expires_at = ?,
+                        last_renewed_at = ?,
+                        renewal_count = renewal_count + 1,
+                        is_active = 1
                     WHERE license_key = ?
-                """, (email_or_key,))
-            else:
-                # Es un email - buscar licencia más reciente
-                cursor.execute("""
-                    SELECT license_key, email, expires_at, is_active, renewal_count
-                    FROM pro_licenses
-                    WHERE email = ?
-                    ORDER BY created_at DESC
-                    LIMIT 1
-                """, (email_or_key,))
-            
-            result = cursor.fetchone()
-            
-            if not result:
-                conn.close()
-                return {
-                    "success": False,
-                    "reason": "No se encontró licencia para este email/clave",
-                    "action": "create_new"
-                }
-            
-            license_key, email, old_expires_at, is_active, renewal_count = result
-            
-            # Calcular nueva fecha de expiración
-            # Si está expirada, extender desde HOY
-            # Si aún está activa, extender desde fecha de expiración actual
-            now = datetime.now()
-            old_expiry = datetime.fromisoformat(old_expires_at) if old_expires_at else now
-            
-            if old_expiry < now:
-                # Licencia expirada - extender desde hoy
-                new_expires_at = now + timedelta(days=duration_days)
-            else:
-                # Licencia activa - extender desde fecha actual de expiración
-                new_expires_at = old_expiry + timedelta(days=duration_days)
-            
-            # Actualizar licencia
-            cursor.execute("""
-                UPDATE pro_licenses
-                SET expires_at = ?,
-                    last_renewed_at = ?,
-                    renewal_count = renewal_count + 1,
-                    is_active = 1
-                WHERE license_key = ?
-            """, (new_expires_at.isoformat(), now.isoformat(), license_key))
-            
-            conn.commit()
-            conn.close()
+                """), (new_expires_at.isoformat(), now.isoformat(), license_key))
+                cursor.close()
             
             logger.info(f"♻️  Licencia renovada: {license_key} para {email} (expira: {new_expires_at.strftime('%d/%m/%Y')})")
             
@@ -413,12 +425,9 @@ class UsageLimiter:
             Diccionario con estadísticas
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             if identifier:
                 # Stats de un usuario específico
-                cursor.execute("""
+                rows = self.db.execute_query("""
                     SELECT 
                         COUNT(*) as total_queries,
                         COUNT(DISTINCT endpoint) as endpoints_used,
@@ -429,7 +438,7 @@ class UsageLimiter:
                 """, (identifier,))
             else:
                 # Stats globales
-                cursor.execute("""
+                rows = self.db.execute_query("""
                     SELECT 
                         COUNT(*) as total_queries,
                         COUNT(DISTINCT identifier) as unique_users,
@@ -438,8 +447,7 @@ class UsageLimiter:
                     FROM usage_tracking
                 """)
             
-            result = cursor.fetchone()
-            conn.close()
+            result = rows[0]
             
             return {
                 "total_queries": result[0],
@@ -452,23 +460,44 @@ class UsageLimiter:
             logger.error(f"❌ Error al obtener stats: {e}")
             return {}
     
+    def get_ticker_popularity(self, days: int = 7) -> dict:
+        """
+        Contar consultas por ticker en los últimos ``days`` días.
+        
+        Returns:
+            {ticker: número de consultas}; vacío si hay error
+        """
+        try:
+            cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+            rows = self.db.execute_query("""
+                SELECT ticker, COUNT(*) FROM usage_tracking
+                WHERE ticker IS NOT NULL
+                AND timestamp >= ?
+                GROUP BY ticker
+            """, (cutoff,))
+            
+            # Las consultas de /api/comparar guardan varios tickers en la misma fila
+            popularity = {}
+            for ticker_value, count in rows:
+                for ticker in ticker_value.split(","):
+                    if ticker:
+                        popularity[ticker] = popularity.get(ticker, 0) + count
+            return popularity
+            
+        except Exception as e:
+            logger.error(f"❌ Error al obtener popularidad: {e}")
+            return {}
+    
     def cleanup_old_records(self, days: int = 30):
         """Limpiar registros antiguos para mantener BD ligera."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             cutoff = (datetime.now() - timedelta(days=days)).isoformat()
             
-            cursor.execute("""
+            deleted = self.db.execute_update("""
                 DELETE FROM usage_tracking
                 WHERE timestamp < ?
             """, (cutoff,))
             
-            deleted = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
             logger.info(f"🧹 Limpieza: {deleted} registros eliminados (>{days} días)")
             
         except Exception as e: